@@ -929,6 +929,21 @@ def get_all_devices_vgs(name_prefix: str = '') -> List[VolumeGroup]:
     vgs = _output_parser(stdout, vg_fields)
     return [VolumeGroup(**vg) for vg in vgs if vg['vg_name']]
 
+def get_vg_seqnos() -> Dict[str, int]:
+    """
+    Return the metadata sequence number of every VG, keyed by VG UUID. LVM
+    increments it on every change to the metadata of the VG (LVs created,
+    removed, resized, tagged, PVs added or removed...).
+    """
+    fields = 'vg_uuid,vg_seqno'
+    stdout, stderr, returncode = process.call(
+        ['vgs'] + VG_CMD_OPTIONS + ['-o', fields],
+        run_on_host=True,
+        verbose_on_failure=False
+    )
+    return {vg['vg_uuid']: int(vg['vg_seqno'])
+            for vg in _output_parser(stdout, fields) if vg['vg_uuid']}
+
 #################################
 #
 # Code for LVM Logical Volumes
@@ -1265,6 +1280,25 @@ def get_device_lvs(device: str, name_prefix: str = '') -> List[Volume]:
     return [Volume(**lv) for lv in lvs if lv['lv_name'] and
             lv['lv_name'].startswith(name_prefix)]
 
+def get_all_devices_lvs(name_prefix: str = '') -> Dict[str, List[Volume]]:
+    """
+    Return the LVs of every PV on the system, keyed by PV name. This is what
+    ``get_device_lvs()`` returns for each PV, gathered with a single ``pvs``
+    call.
+    """
+    lv_fields = f'pv_name,{LV_FIELDS}'
+    stdout, stderr, returncode = process.call(
+        ['pvs'] + LV_CMD_OPTIONS + ['-o', lv_fields],
+        run_on_host=True,
+        verbose_on_failure=False
+    )
+    device_lvs: Dict[str, List[Volume]] = {}
+    for lv in _output_parser(stdout, lv_fields):
+        pv_name = lv.pop('pv_name')
+        if lv['lv_name'] and lv['lv_name'].startswith(name_prefix):
+            device_lvs.setdefault(pv_name, []).append(Volume(**lv))
+    return device_lvs
+
 def get_lvs_from_path(devpath: str) -> List[Volume]:
     lvs = []
     if os.path.isabs(devpath):
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Cache of ``ceph-volume inventory`` reports.
+
+The cache is a file in the ceph data dir of the host, so that it outlives
+the container ceph-volume usually runs in. A cached report is only returned
+as long as nothing it depends on changed since it was gathered, which is
+tracked with a fingerprint of:
+
+* the udev database: udev rewrites the entry of a device on every event
+  (add, remove, change, which includes new partition tables, labels and
+  signatures written to the device)
+* the block devices listed in sysfs
+* the metadata sequence numbers of the LVM volume groups
+* the mount table, for the devices filtered out as mounted
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from ceph_volume import __release__
+from ceph_volume.api import lvm
+from ceph_volume.util.system import host_rootfs
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = '/var/lib/ceph'
+CACHE_FILE = 'ceph-volume-inventory.json'
+UDEV_DATA_DIR = '/run/udev/data'
+SYS_BLOCK_DIR = '/sys/block'
+MOUNTS_FILE = '/proc/mounts'
+
+
+def cache_path() -> str:
+    host_dir = os.path.join(host_rootfs, CACHE_DIR.lstrip('/'))
+    if os.path.isdir(host_dir):
+        # running in a container, with the host mounted
+        return os.path.join(host_dir, CACHE_FILE)
+    return os.path.join(CACHE_DIR, CACHE_FILE)
+
+
+def fingerprint() -> Optional[Dict[str, Any]]:
+    """
+    Return the state a cached report is valid for, or None if changes to
+    the devices can not be detected on this host.
+    """
+    try:
+        # entries are written to a temporary file and renamed, so the
+        # directory changes on every event
+        udev = os.stat(UDEV_DATA_DIR).st_mtime_ns
+        block = sorted(os.listdir(SYS_BLOCK_DIR))
+        with open(MOUNTS_FILE, 'rb') as f:
+            mounts = hashlib.sha256(f.read()).hexdigest()
+    except OSError as e:
+        logger.info('not using the inventory cache: %s', e)
+        return None
+    return {
+        'release': __release__,
+        'udev': udev,
+        'block': block,
+        'lvm': lvm.get_vg_seqnos(),
+        'mounts': mounts,
+    }
+
+
+class InventoryCache(object):
+    """
+    Reports for the different inventory options (``--filter-for-batch``,
+    ``--list-all``) gathered against the same fingerprint. Gathering a
+    report with a different fingerprint drops all the others.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or cache_path()
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning('ignoring inventory cache %s: %s', self.path, e)
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get(self, key: str, fingerprint: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        data = self._load()
+        if data.get('fingerprint') != fingerprint:
+            return None
+        return data.get('reports', {}).get(key)
+
+    def put(self, key: str, fingerprint: Dict[str, Any], report: List[Dict[str, Any]]) -> None:
+        data = self._load()
+        if data.get('fingerprint') != fingerprint:
+            data = {'fingerprint': fingerprint, 'reports': {}}
+        data['reports'][key] = report
+        tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.info('unable to write inventory cache %s: %s', self.path, e)
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
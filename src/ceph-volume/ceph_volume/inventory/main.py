@@ -3,6 +3,7 @@
 import argparse
 import json
 
+from ceph_volume.inventory import cache
 from ceph_volume.util.device import Devices, Device
 
 
@@ -51,14 +52,53 @@ class Inventory(object):
             help=('Whether ceph-volume should list lvm devices'),
             default=False
         )
+        parser.add_argument(
+            '--cached',
+            action='store_true',
+            help=('Return the report cached in {} if no device, LVM or mount '
+                  'changed since it was gathered. Only for the json formats of '
+                  'a full inventory without --with-lsm'.format(cache.CACHE_DIR)),
+            default=False
+        )
+        parser.add_argument(
+            '--refresh',
+            action='store_true',
+            help=('With --cached, probe the devices even if the cached report '
+                  'is still valid, and cache the new report'),
+            default=False
+        )
         self.args = parser.parse_args(self.argv)
         if self.args.path:
             self.format_report(Device(self.args.path, with_lsm=self.args.with_lsm))
+        elif self.use_cache:
+            self.print_json(self.get_cached_report())
         else:
             self.format_report(Devices(filter_for_batch=self.args.filter_for_batch,
                                        with_lsm=self.args.with_lsm,
                                        list_all=self.args.list_all))
 
+    @property
+    def use_cache(self):
+        # LSM data (health, LED states...) can change without any event
+        return (self.args.cached and
+                self.args.format != 'plain' and
+                not self.args.with_lsm)
+
+    def get_cached_report(self):
+        fingerprint = cache.fingerprint()
+        if fingerprint is None:
+            return self.get_report()
+        key = 'filter_for_batch={},list_all={}'.format(self.args.filter_for_batch,
+                                                       self.args.list_all)
+        inventory_cache = cache.InventoryCache()
+        if not self.args.refresh:
+            report = inventory_cache.get(key, fingerprint)
+            if report is not None:
+                return report
+        report = self.get_report()
+        inventory_cache.put(key, fingerprint, report)
+        return report
+
     def get_report(self):
         if self.args.path:
             return Device(self.args.path, with_lsm=self.args.with_lsm).json_report()
@@ -68,9 +108,13 @@ class Inventory(object):
                            list_all=self.args.list_all).json_report()
 
     def format_report(self, inventory):
-        if self.args.format == 'json':
-            print(json.dumps(inventory.json_report()))
-        elif self.args.format == 'json-pretty':
-            print(json.dumps(inventory.json_report(), indent=4, sort_keys=True))
+        if self.args.format in ('json', 'json-pretty'):
+            self.print_json(inventory.json_report())
         else:
             print(inventory.pretty_report())
+
+    def print_json(self, report):
+        if self.args.format == 'json':
+            print(json.dumps(report))
+        else:
+            print(json.dumps(report, indent=4, sort_keys=True))
@@ -691,6 +691,32 @@ class TestGetDeviceLvs(object):
         vgs = api.get_device_lvs('/dev/foo')
         assert vgs == []
 
+class TestGetVgSeqnos(object):
+
+    @patch('ceph_volume.process.call')
+    def test_seqnos_keyed_by_uuid(self, pcall):
+        pcall.return_value = ([
+            '  "uuid1";"12"',
+            '  "uuid2";"3"',
+        ], '', 0)
+        assert api.get_vg_seqnos() == {'uuid1': 12, 'uuid2': 3}
+
+class TestGetAllDevicesLvs(object):
+
+    @patch('ceph_volume.process.call')
+    def test_lvs_keyed_by_pv(self, pcall):
+        pcall.return_value = ([
+            '  "/dev/sda";"";"/dev/vg1/lv1";"lv1";"vg1";"uuid1";"1024"',
+            '  "/dev/sda";"";"/dev/vg1/lv2";"lv2";"vg1";"uuid2";"1024"',
+            '  "/dev/sdb";"";"/dev/vg2/lv3";"lv3";"vg2";"uuid3";"1024"',
+            '  "/dev/sdc";"";"";"";"";"";""',
+        ], '', 0)
+        lvs = api.get_all_devices_lvs()
+        assert sorted(lvs) == ['/dev/sda', '/dev/sdb']
+        assert [lv.lv_path for lv in lvs['/dev/sda']] == ['/dev/vg1/lv1', '/dev/vg1/lv2']
+        assert lvs['/dev/sdb'][0].vg_name == 'vg2'
+        assert pcall.call_count == 1
+
 
 # NOTE: api.convert_filters_to_str() and api.convert_tags_to_str() should get
 # tested automatically while testing api.make_filters_lvmcmd_ready()
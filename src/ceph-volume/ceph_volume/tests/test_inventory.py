@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
 
+import json
+import os
 import pytest
+from ceph_volume.inventory import cache
+from ceph_volume.inventory.main import Inventory
 from ceph_volume.util.device import Devices
 from ceph_volume.util.lsmdisk import LSMDisk
 from unittest.mock import patch
@@ -261,3 +265,93 @@ class TestLSM(object):
         assert lsm_info.led_fault_state == 'Off'
     def test_lsmdisk_report(self, lsm_info):
         assert isinstance(lsm_info.json_report(), dict)
+
+
+class TestInventoryCache(object):
+
+    @pytest.fixture
+    def cached(self, monkeypatch, tmp_path):
+        state = {'fingerprint': {'udev': 1, 'lvm': {'vg-uuid': 3}}, 'gathered': 0}
+
+        class FakeDevices(object):
+            def __init__(self, **kw):
+                state['gathered'] += 1
+
+            def json_report(self):
+                return [{'path': '/dev/sda', 'gathered': state['gathered']}]
+
+        monkeypatch.setattr(cache, 'cache_path', lambda: str(tmp_path / 'inventory.json'))
+        monkeypatch.setattr(cache, 'fingerprint', lambda: state['fingerprint'])
+        monkeypatch.setattr('ceph_volume.inventory.main.Devices', FakeDevices)
+        return state
+
+    def run(self, capsys, *args):
+        Inventory(['--format=json'] + list(args)).main()
+        return json.loads(capsys.readouterr().out)
+
+    def test_cache_hit(self, cached, capsys):
+        assert self.run(capsys, '--cached') == [{'path': '/dev/sda', 'gathered': 1}]
+        assert self.run(capsys, '--cached') == [{'path': '/dev/sda', 'gathered': 1}]
+        assert cached['gathered'] == 1
+
+    def test_refresh(self, cached, capsys):
+        self.run(capsys, '--cached')
+        assert self.run(capsys, '--cached', '--refresh')[0]['gathered'] == 2
+        assert self.run(capsys, '--cached')[0]['gathered'] == 2
+
+    def test_invalidated_by_changes(self, cached, capsys):
+        self.run(capsys, '--cached')
+        cached['fingerprint'] = {'udev': 1, 'lvm': {'vg-uuid': 4}}
+        assert self.run(capsys, '--cached')[0]['gathered'] == 2
+
+    def test_cached_per_options(self, cached, capsys):
+        self.run(capsys, '--cached')
+        self.run(capsys, '--cached', '--list-all')
+        assert cached['gathered'] == 2
+        self.run(capsys, '--cached')
+        self.run(capsys, '--cached', '--list-all')
+        assert cached['gathered'] == 2
+
+    def test_not_cached(self, cached, capsys, monkeypatch):
+        self.run(capsys)
+        self.run(capsys, '--cached', '--with-lsm')
+        assert cached['gathered'] == 2
+        monkeypatch.setattr(cache, 'fingerprint', lambda: None)
+        self.run(capsys, '--cached')
+        self.run(capsys, '--cached')
+        assert cached['gathered'] == 4
+
+    def test_fingerprint(self, monkeypatch, tmp_path):
+        udev = tmp_path / 'udev'
+        block = tmp_path / 'block'
+        mounts = tmp_path / 'mounts'
+        udev.mkdir()
+        block.mkdir()
+        mounts.write_text('/dev/sda1 /boot xfs rw 0 0\n')
+        monkeypatch.setattr(cache, 'UDEV_DATA_DIR', str(udev))
+        monkeypatch.setattr(cache, 'SYS_BLOCK_DIR', str(block))
+        monkeypatch.setattr(cache, 'MOUNTS_FILE', str(mounts))
+        monkeypatch.setattr(cache.lvm, 'get_vg_seqnos', lambda: {'vg-uuid': 3})
+
+        first = cache.fingerprint()
+        assert first == cache.fingerprint()
+        os.utime(str(udev), ns=(0, first['udev'] + 1))
+        assert first != cache.fingerprint()
+        first = cache.fingerprint()
+        (block / 'sdb').mkdir()
+        assert first != cache.fingerprint()
+        first = cache.fingerprint()
+        mounts.write_text('')
+        assert first != cache.fingerprint()
+
+        monkeypatch.setattr(cache, 'UDEV_DATA_DIR', str(tmp_path / 'nonexistent'))
+        assert cache.fingerprint() is None
+
+    def test_corrupted_cache(self, tmp_path):
+        path = tmp_path / 'inventory.json'
+        path.write_text('{not json')
+        inventory_cache = cache.InventoryCache(str(path))
+        assert inventory_cache.get('key', {'udev': 1}) is None
+        inventory_cache.put('key', {'udev': 1}, [{'path': '/dev/sda'}])
+        assert inventory_cache.get('key', {'udev': 1}) == [{'path': '/dev/sda'}]
+        assert inventory_cache.get('key', {'udev': 2}) is None
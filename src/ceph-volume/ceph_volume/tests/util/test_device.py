@@ -627,6 +627,70 @@ class TestDeviceEncryption(object):
         assert disk.is_encrypted is False
 
 
+class TestDevices(object):
+
+    def test_inventory_is_gathered_once(self, monkeypatch, patch_udevdata):
+        def sys_api(name):
+            return {'path': '/dev/' + name, 'partitions': {}, 'removable': '0',
+                    'ro': '0', 'size': 10737418240.0, 'rotational': '1',
+                    'device_nodes': [name]}
+        devices = {'/dev/' + name: sys_api(name) for name in ['sda', 'sdb', 'sdc']}
+        lv = api.Volume(lv_path='/dev/vg/lv', lv_name='lv', vg_name='vg',
+                        lv_tags='ceph.osd_id=0,ceph.type=block')
+        vg = api.VolumeGroup(pv_name='/dev/sdb', vg_name='vg', vg_free_count=0)
+        calls = {'blkid': [], 'device_lvs': 0}
+
+        def blkid(path):
+            calls['blkid'].append(path)
+            return {}
+
+        def get_all_devices_lvs():
+            calls['device_lvs'] += 1
+            return {'/dev/sdb': [lv]}
+
+        def lsblk(*a, **kw):
+            raise AssertionError('lsblk called for a single device')
+
+        monkeypatch.setattr('ceph_volume.sys_info.devices', {})
+        monkeypatch.setattr(device.disk, 'get_devices', lambda device='': devices)
+        monkeypatch.setattr(device.disk, 'lsblk_all', lambda: [
+            {'NAME': name, 'KNAME': name, 'TYPE': 'disk'} for name in ['sda', 'sdb', 'sdc']])
+        monkeypatch.setattr(device.disk, 'lsblk', lsblk)
+        monkeypatch.setattr(device.disk, 'blkid', blkid)
+        monkeypatch.setattr(device.disk, 'get_lvm_mappers', lambda: [])
+        monkeypatch.setattr(device.disk, 'has_bluestore_label', lambda path: path == '/dev/sdc')
+        monkeypatch.setattr(device.disk, '_dd_read', lambda path, count: '')
+        monkeypatch.setattr(api, 'get_lvs', lambda: [lv])
+        monkeypatch.setattr(api, 'get_all_devices_vgs', lambda: [vg])
+        monkeypatch.setattr(api, 'get_all_devices_lvs', get_all_devices_lvs)
+        monkeypatch.setattr(api, 'get_device_lvs', lambda path: pytest.fail('per device lvs'))
+
+        report = {d.path: d for d in device.Devices().devices}
+
+        assert sorted(calls['blkid']) == ['/dev/sda', '/dev/sdb', '/dev/sdc']
+        assert calls['device_lvs'] == 1
+        assert report['/dev/sda'].available
+        assert report['/dev/sdb'].vg_name == 'vg'
+        assert report['/dev/sdb'].lvs == [lv]
+        assert report['/dev/sdb'].ceph_device_lvm
+        assert 'Has BlueStore device label' in report['/dev/sdc'].rejected_reasons
+
+    def test_inventory_label_probe_failure(self, monkeypatch):
+        def has_bluestore_label(path):
+            raise PermissionError(13, 'Permission denied')
+        monkeypatch.setattr(device.disk, 'lsblk_all', lambda: [])
+        monkeypatch.setattr(device.disk, 'blkid', lambda path: {})
+        monkeypatch.setattr(device.disk, 'get_lvm_mappers', lambda: [])
+        monkeypatch.setattr(device.disk, 'has_bluestore_label', has_bluestore_label)
+        monkeypatch.setattr(device.disk, '_dd_read', lambda path, count: '')
+        monkeypatch.setattr(api, 'get_lvs', lambda: [])
+        monkeypatch.setattr(api, 'get_all_devices_vgs', lambda: [])
+
+        inventory = device.InventorySnapshot(['/dev/sda'])
+        with pytest.raises(PermissionError):
+            inventory.has_bluestore_label('/dev/sda')
+
+
 class TestDeviceOrdering(object):
 
     def setup_method(self):
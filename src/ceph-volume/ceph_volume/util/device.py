@@ -2,6 +2,7 @@
 import logging
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from functools import total_ordering
 from ceph_volume import sys_info, allow_loop_devices, BEING_REPLACED_HEADER
 from ceph_volume.api import lvm
@@ -26,6 +27,89 @@ def encryption_status(abspath: str) -> Dict[str, Any]:
     return encryption.status(abspath)
 
 
+class InventorySnapshot(object):
+    """
+    Everything ``Devices`` needs to know about the block devices of the host,
+    gathered once: ``lsblk``, LVs, PV/VG membership and LVM mappers with one
+    call each, ``blkid`` and the device headers (BlueStore label, being
+    replaced) with one parallel probe per device. Lookups are indexed so that
+    building a ``Device`` does not depend on the number of devices.
+    """
+
+    # max number of devices probed in parallel
+    probe_workers = 16
+
+    def __init__(self, paths: List[str]) -> None:
+        self.lvs = lvm.get_lvs()
+        self.lsblk_all = disk.lsblk_all()
+        self.all_devices_vgs = lvm.get_all_devices_vgs()
+        self.lvm_mappers = set(disk.get_lvm_mappers())
+        self._device_lvs: Optional[Dict[str, List[lvm.Volume]]] = None
+
+        self.lvs_by_path: Dict[str, lvm.Volume] = {}
+        self.lvs_by_name: Dict[Tuple[str, str], lvm.Volume] = {}
+        for lv in self.lvs:
+            self.lvs_by_path.setdefault(lv.lv_path, lv)
+            self.lvs_by_name.setdefault((lv.vg_name, lv.lv_name), lv)
+        self.lsblk_by_name: Dict[str, Dict[str, str]] = {}
+        for dev in self.lsblk_all:
+            self.lsblk_by_name.setdefault(dev['NAME'], dev)
+        # a PV belongs to a single VG, the last one reported wins
+        self.vgs_by_pv: Dict[str, lvm.VolumeGroup] = {
+            vg.pv_name: vg for vg in self.all_devices_vgs}
+
+        self.blkid_api: Dict[str, Dict[str, Any]] = {}
+        self.bluestore_labels: Dict[str, Union[bool, OSError]] = {}
+        self.being_replaced: Dict[str, bool] = {}
+        if paths:
+            workers = min(self.probe_workers, len(paths))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for path, probed in zip(paths, executor.map(self._probe, paths)):
+                    (self.blkid_api[path],
+                     self.bluestore_labels[path],
+                     self.being_replaced[path]) = probed
+
+    @staticmethod
+    def _probe(path: str) -> Tuple[Dict[str, Any], Union[bool, OSError], bool]:
+        try:
+            label: Union[bool, OSError] = disk.has_bluestore_label(path)
+        except OSError as e:
+            label = e
+        return (disk.blkid(path),
+                label,
+                disk._dd_read(path, 26) == BEING_REPLACED_HEADER)
+
+    def find_lv(self, path: str) -> Optional[lvm.Volume]:
+        # if the path is not absolute, we have 'vg/lv'
+        if path[0] == '/':
+            return self.lvs_by_path.get(path)
+        vgname, lvname = path.split('/')
+        return self.lvs_by_name.get((vgname, lvname))
+
+    def device_lvs(self, path: str) -> List[lvm.Volume]:
+        if self._device_lvs is None:
+            self._device_lvs = lvm.get_all_devices_lvs()
+        return list(self._device_lvs.get(path, []))
+
+    def blkid(self, path: str) -> Dict[str, Any]:
+        if path not in self.blkid_api:
+            return disk.blkid(path)
+        return self.blkid_api[path]
+
+    def has_bluestore_label(self, path: str) -> bool:
+        label = self.bluestore_labels.get(path)
+        if label is None:
+            return disk.has_bluestore_label(path)
+        if isinstance(label, OSError):
+            raise label
+        return label
+
+    def is_being_replaced(self, path: str) -> bool:
+        if path not in self.being_replaced:
+            return disk._dd_read(path, 26) == BEING_REPLACED_HEADER
+        return self.being_replaced[path]
+
+
 class Devices(object):
     """
     A container for Device instances with reporting
@@ -35,16 +119,12 @@ class Devices(object):
                  filter_for_batch: bool = False,
                  with_lsm: bool = False,
                  list_all: bool = False) -> None:
-        lvs = lvm.get_lvs()
-        lsblk_all = disk.lsblk_all()
-        all_devices_vgs = lvm.get_all_devices_vgs()
         if not sys_info.devices:
             sys_info.devices = disk.get_devices()
+        inventory = InventorySnapshot(list(sys_info.devices.keys()))
         self._devices = [Device(k,
                                 with_lsm,
-                                lvs=lvs,
-                                lsblk_all=lsblk_all,
-                                all_devices_vgs=all_devices_vgs) for k in
+                                inventory=inventory) for k in
                          sys_info.devices.keys()]
         self.devices = []
         for device in self._devices:
@@ -108,14 +188,22 @@ class Device(object):
     # define some class variables; mostly to enable the use of autospec in
     # unittests
     lvs: List[lvm.Volume] = []
+    inventory: Optional[InventorySnapshot] = None
 
     def __init__(self,
                  path: str,
                  with_lsm: bool = False,
                  lvs: Optional[List[lvm.Volume]] = None,
                  lsblk_all: Optional[List[Dict[str, str]]] = None,
-                 all_devices_vgs: Optional[List[lvm.VolumeGroup]] = None) -> None:
+                 all_devices_vgs: Optional[List[lvm.VolumeGroup]] = None,
+                 inventory: Optional[InventorySnapshot] = None) -> None:
         self.path = path
+        # set when built by Devices(), host wide data is then looked up there
+        self.inventory = inventory
+        if inventory is not None:
+            lvs = inventory.lvs
+            lsblk_all = inventory.lsblk_all
+            all_devices_vgs = inventory.all_devices_vgs
         # LVs can have a vg/lv path, while disks will have /dev/sda
         self.symlink = None
         # check if we are a symlink
@@ -190,7 +278,10 @@ class Device(object):
 
     def load_blkid_api(self) -> None:
         if not self.blkid_api:
-            self.blkid_api = disk.blkid(self.path)
+            if self.inventory is not None:
+                self.blkid_api = self.inventory.blkid(self.path)
+            else:
+                self.blkid_api = disk.blkid(self.path)
 
     def _parse(self) -> None:
         lv = None
@@ -203,7 +294,9 @@ class Device(object):
                     self.sys_api = part
                     break
 
-        if self.lvs:
+        if self.inventory is not None:
+            lv = self.inventory.find_lv(self.path)
+        elif self.lvs:
             for _lv in self.lvs:
                 # if the path is not absolute, we have 'vg/lv', let's use LV name
                 # to get the LV.
@@ -243,7 +336,10 @@ class Device(object):
             self.ceph_device_lvm = lvm.is_ceph_device(lv)
         else:
             self.lvs = []
-            if self.lsblk_all:
+            if self.inventory is not None:
+                dev = self.inventory.lsblk_by_name.get(os.path.basename(self.path)) or \
+                    disk.lsblk(self.path)
+            elif self.lsblk_all:
                 for dev in self.lsblk_all:
                     if dev['NAME'] == os.path.basename(self.path):
                         break
@@ -365,17 +461,25 @@ class Device(object):
             # can each host a PV and VG. I think the vg_name property is
             # actually unused (not 100% sure) and can simply be removed
             vgs = None
-            if not self.all_devices_vgs:
+            if not self.all_devices_vgs and self.inventory is None:
                 self.all_devices_vgs = lvm.get_all_devices_vgs()
             for path in device_to_check:
-                for dev_vg in self.all_devices_vgs:
-                    if dev_vg.pv_name == path:
+                if self.inventory is not None:
+                    dev_vg = self.inventory.vgs_by_pv.get(path)
+                    if dev_vg is not None:
                         vgs = [dev_vg]
+                else:
+                    for dev_vg in self.all_devices_vgs:
+                        if dev_vg.pv_name == path:
+                            vgs = [dev_vg]
                 if vgs:
                     self.vgs.extend(vgs)
                     self.vg_name = vgs[0].vg_name
                     self._is_lvm_member = True
-                    self.lvs.extend(lvm.get_device_lvs(path))
+                    if self.inventory is not None:
+                        self.lvs.extend(self.inventory.device_lvs(path))
+                    else:
+                        self.lvs.extend(lvm.get_device_lvs(path))
                 if self.lvs:
                     self.ceph_device_lvm = any([True if lv.tags.get('ceph.osd_id') else False for lv in self.lvs])
 
@@ -454,7 +558,10 @@ class Device(object):
                 device.get('PARTTYPE', '') in ceph_disk_guids.keys()
         # If we come from Devices(), self.lsblk_all is set already.
         # Otherwise, we have to grab the data.
-        details = self.lsblk_all or disk.lsblk_all()
+        if self.inventory is not None:
+            details = self.inventory.lsblk_all
+        else:
+            details = self.lsblk_all or disk.lsblk_all()
         _is_member = False
         if self.sys_api.get("partitions"):
             for part in self.sys_api.get("partitions").keys():
@@ -469,6 +576,8 @@ class Device(object):
 
     @property
     def has_bluestore_label(self) -> bool:
+        if self.inventory is not None:
+            return self.inventory.has_bluestore_label(self.path)
         return disk.has_bluestore_label(self.path)
 
     @property
@@ -493,6 +602,8 @@ class Device(object):
     @property
     def is_lv(self) -> bool:
         path = os.path.realpath(self.path)
+        if self.inventory is not None:
+            return path in self.inventory.lvm_mappers
         return path in disk.get_lvm_mappers()
 
     @property
@@ -618,6 +729,8 @@ class Device(object):
         '''
         Boolean to indicate if the device is being replaced.
         '''
+        if self.inventory is not None:
+            return self.inventory.is_being_replaced(self.path)
         return disk._dd_read(self.path, 26) == BEING_REPLACED_HEADER
 
     def _check_generic_reject_reasons(self) -> List[str]:
@@ -647,7 +760,11 @@ class Device(object):
 
         if self.is_partition:
             try:
-                if disk.has_bluestore_label(self.parent_device):
+                if self.inventory is not None:
+                    parent_has_label = self.inventory.has_bluestore_label(self.parent_device)
+                else:
+                    parent_has_label = disk.has_bluestore_label(self.parent_device)
+                if parent_has_label:
                     rejected.append('Parent has BlueStore device label')
             except OSError as e:
                 # likely failed to open the device. assuming the parent is BlueStore is the safest
@@ -223,6 +223,7 @@ from cephadmlib.daemons import (
     NodeProxy,
 )
 from cephadmlib.agent import http_query
+from cephadmlib.change_watch import ChangeWatcher, SYSTEMD_UNITS_DIR
 from cephadmlib.listing import (
     CombinedStatusUpdater,
     DaemonStatusUpdater,
@@ -1550,6 +1551,7 @@ class MgrListener(Thread):
                                 self.agent.wakeup()
                             self.agent.ls_gatherer.wakeup()
                             self.agent.volume_gatherer.wakeup()
+                            self.agent.request_full_report()
                             logger.debug(f'Got mgr message {data}')
             except Exception as e:
                 if self.stop:
@@ -1583,6 +1585,12 @@ class CephadmAgent(DaemonForm):
     daemon_type = 'agent'
     default_port = 8498
     loop_interval = 30
+    # polling interval of the data that change notifications are set up for,
+    # and interval of the full reports to the mgr
+    fallback_interval = 600
+    # wait for this many seconds without changes before gathering on a change
+    # notification
+    settle_time = 2
     stop = False
 
     required_files = [
@@ -1629,6 +1637,15 @@ class CephadmAgent(DaemonForm):
         self.recent_iteration_run_times: List[float] = [0.0, 0.0, 0.0]
         self.recent_iteration_index: int = 0
         self.cached_ls_values: Dict[str, Dict[str, str]] = {}
+        self.watcher = ChangeWatcher()
+        self.networks: Optional[Dict[str, Dict[str, List[str]]]] = None
+        self.networks_listed = 0.0
+        self.networks_dirty = True
+        self.networks_watched = False
+        # the sections of the last report accepted by the mgr
+        self.reported: Dict[str, Any] = {}
+        self.reported_ack: Optional[int] = None
+        self.last_full_report = 0.0
         self.ssl_ctx = ssl.create_default_context()
         self.ssl_ctx.check_hostname = True
         self.ssl_ctx.verify_mode = ssl.CERT_REQUIRED
@@ -1714,10 +1731,12 @@ class CephadmAgent(DaemonForm):
             self.ls_gatherer.shutdown()
         if self.volume_gatherer.is_alive():
             self.volume_gatherer.shutdown()
+        if self.watcher.is_alive():
+            self.watcher.shutdown()
         self.wakeup()
 
     def join_threads(self, timeout: float = 2.0) -> None:
-        for t in (self.mgr_listener, self.ls_gatherer, self.volume_gatherer):
+        for t in (self.mgr_listener, self.ls_gatherer, self.volume_gatherer, self.watcher):
             if t.is_alive():
                 t.join(timeout=timeout)
 
@@ -1776,30 +1795,35 @@ class CephadmAgent(DaemonForm):
         if not self.volume_gatherer.is_alive():
             self.volume_gatherer.start()
 
+        if not self.watcher.sources:
+            self.watch_host_changes()
+
         while not self.stop:
             start_time = time.monotonic()
             ack = self.ack
 
-            # part of the networks info is returned as a set which is not JSON
-            # serializable. The set must be converted to a list
-            networks = list_networks(self.ctx)
-            networks_list: Dict[str, Dict[str, List[str]]] = {}
-            for key in networks.keys():
-                networks_list[key] = {}
-                for k, v in networks[key].items():
-                    networks_list[key][k] = list(v)
-
-            data = json.dumps({'host': self.host,
-                               'ls': (self.ls_gatherer.data if self.ack == self.ls_gatherer.ack
-                                      and self.ls_gatherer.data is not None else []),
-                               'networks': networks_list,
-                               'facts': HostFacts(self.ctx).dump(),
-                               'volume': (self.volume_gatherer.data if self.ack == self.volume_gatherer.ack
-                                          and self.volume_gatherer.data is not None else ''),
-                               'ack': str(ack),
-                               'keyring': self.keyring,
-                               'port': self.listener_port})
-            data = data.encode('ascii')
+            sections = {
+                'ls': (self.ls_gatherer.data if self.ack == self.ls_gatherer.ack
+                       and self.ls_gatherer.data is not None else []),
+                'networks': self._get_networks(),
+                'volume': (self.volume_gatherer.data if self.ack == self.volume_gatherer.ack
+                           and self.volume_gatherer.data is not None else ''),
+            }
+            # leave out what the mgr already got from us
+            unchanged = self._unchanged_sections(ack, sections)
+            report = {name: type(value)() if name in unchanged else value
+                      for name, value in sections.items()}
+            payload: Dict[str, Any] = {'host': self.host,
+                                       'ls': report['ls'],
+                                       'networks': report['networks'],
+                                       'facts': HostFacts(self.ctx).dump(),
+                                       'volume': report['volume'],
+                                       'ack': str(ack),
+                                       'keyring': self.keyring,
+                                       'port': self.listener_port}
+            if unchanged:
+                payload['unchanged'] = unchanged
+            data = json.dumps(payload).encode('ascii')
 
             try:
                 send_time = time.monotonic()
@@ -1814,6 +1838,8 @@ class CephadmAgent(DaemonForm):
                 response_json = json.loads(response)
                 total_request_time = datetime.timedelta(seconds=(time.monotonic() - send_time)).total_seconds()
                 logger.info(f'Received mgr response: "{response_json["result"]}" {total_request_time} seconds after sending request.')
+                if response_json['result'] == 'Successfully processed metadata.':
+                    self._reported(ack, sections, full=not unchanged)
             except Exception as e:
                 logger.error(f'Failed to send metadata to mgr: {e}')
 
@@ -1826,6 +1852,75 @@ class CephadmAgent(DaemonForm):
             self.event.wait(max(self.loop_interval - int(run_time_average), 0))
             self.event.clear()
 
+    def watch_host_changes(self) -> None:
+        """
+        Set up change notifications for the gathered data. Daemons being
+        added, removed, started or stopped wake the ls gatherer up early, it
+        still polls every loop_interval for the state of the containers.
+        Block device and network changes trigger the volume gatherer and the
+        networks listing, which are then only polled every fallback_interval.
+        """
+        cluster_dir = os.path.join(self.ctx.data_dir, self.fsid)
+        self.watcher.watch_paths([cluster_dir], self.ls_gatherer.notify_change,
+                                 name_filter=lambda name: '.' in name)
+        self.watcher.watch_paths([SYSTEMD_UNITS_DIR], self.ls_gatherer.notify_change,
+                                 name_filter=lambda name: self.fsid in name)
+        if self.watcher.watch_block_devices(self.volume_gatherer.notify_change):
+            self.volume_gatherer.interval = self.fallback_interval
+        self.networks_watched = self.watcher.watch_networks(self.networks_changed)
+        if self.watcher.sources:
+            self.watcher.start()
+
+    def networks_changed(self) -> None:
+        self.networks_dirty = True
+        self.wakeup()
+
+    def request_full_report(self) -> None:
+        # the mgr asked for our metadata, send all of it next time
+        self.networks_dirty = True
+        self.reported_ack = None
+
+    def _get_networks(self) -> Dict[str, Dict[str, List[str]]]:
+        now = time.monotonic()
+        if (
+            self.networks is None
+            or not self.networks_watched
+            or self.networks_dirty
+            or now - self.networks_listed >= self.fallback_interval
+        ):
+            self.networks_dirty = False
+            # part of the networks info is returned as a set which is not JSON
+            # serializable. The set must be converted to a list
+            networks = list_networks(self.ctx)
+            networks_list: Dict[str, Dict[str, List[str]]] = {}
+            for key in networks.keys():
+                networks_list[key] = {}
+                for k, v in networks[key].items():
+                    networks_list[key][k] = list(v)
+            self.networks = networks_list
+            self.networks_listed = now
+        return self.networks
+
+    def _unchanged_sections(self, ack: int, sections: Dict[str, Any]) -> List[str]:
+        """
+        names of the sections that are the same as in the last report the mgr
+        accepted. Everything is sent when the mgr asks for new metadata (the
+        ack counter moved) and at least every fallback_interval.
+        """
+        if (
+            ack != self.reported_ack
+            or time.monotonic() - self.last_full_report >= self.fallback_interval
+        ):
+            return []
+        return [name for name, value in sections.items()
+                if value and self.reported.get(name) == value]
+
+    def _reported(self, ack: int, sections: Dict[str, Any], full: bool) -> None:
+        self.reported = sections
+        self.reported_ack = ack
+        if full:
+            self.last_full_report = time.monotonic()
+
     def _ceph_volume(self, enhanced: bool = False) -> Tuple[str, bool]:
         self.ctx.command = 'inventory --format=json'.split()
         if enhanced:
@@ -1979,6 +2074,9 @@ class AgentGatherer(Thread):
         self.event = Event()
         self.data: Any = None
         self.stop = False
+        # seconds between two gathers, the agent's loop_interval if not set
+        self.interval: Optional[int] = None
+        self.changes_pending = False
         self.recent_iteration_run_times: List[float] = [0.0, 0.0, 0.0]
         self.recent_iteration_index: int = 0
         super(AgentGatherer, self).__init__(target=self.run)
@@ -1987,6 +2085,7 @@ class AgentGatherer(Thread):
         while not self.stop:
             try:
                 start_time = time.monotonic()
+                self.changes_pending = False
 
                 ack = self.agent.ack
                 change = False
@@ -2005,8 +2104,19 @@ class AgentGatherer(Thread):
                 self.recent_iteration_index = (self.recent_iteration_index + 1) % 3
                 run_time_average = sum(self.recent_iteration_run_times, 0.0) / len([t for t in self.recent_iteration_run_times if t])
 
-                self.event.wait(max(self.agent.loop_interval - int(run_time_average), 0))
+                interval = self.interval or self.agent.loop_interval
+                self.event.wait(max(interval - int(run_time_average), 0))
                 self.event.clear()
+                if self.changes_pending:
+                    # changes tend to come in bursts, e.g. udev processing a
+                    # new disk. Wait (a bounded time) for things to calm down.
+                    settle_end = time.monotonic() + self.agent.loop_interval
+                    while (
+                        not self.stop
+                        and time.monotonic() < settle_end
+                        and self.event.wait(self.agent.settle_time)
+                    ):
+                        self.event.clear()
             except Exception as e:
                 logger.error(f'{self.gatherer_type} Gatherer encountered exception: {e}')
 
@@ -2017,6 +2127,11 @@ class AgentGatherer(Thread):
     def wakeup(self) -> None:
         self.event.set()
 
+    def notify_change(self) -> None:
+        # called by the agent's ChangeWatcher
+        self.changes_pending = True
+        self.event.set()
+
     def update_func(self, func: Callable) -> None:
         self.func = func
 
@@ -3747,7 +3862,7 @@ def list_daemons(
         daemon_name=daemon_name,
         daemon_type=type_of_daemon,
     )
-    return [_updater.expand(ctx, entry) for entry in daemon_entries]
+    return _updater.expand_all(ctx, daemon_entries)
 
 
 def get_daemon_description(ctx, fsid, name, detail=False, legacy_dir=None):
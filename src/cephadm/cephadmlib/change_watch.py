@@ -0,0 +1,266 @@
+# change_watch.py - notifications of host changes for the cephadm agent
+
+import ctypes
+import logging
+import os
+import selectors
+import socket
+import struct
+
+from threading import Thread
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+logger = logging.getLogger()
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+# netlink(7) and rtnetlink(7)
+NETLINK_ROUTE = 0
+NETLINK_KOBJECT_UEVENT = 15
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+RTMGRP_IPV6_IFADDR = 0x100
+RTMGRP_IPV6_ROUTE = 0x400
+# uevent multicast groups: events as sent by the kernel, and as re-sent by
+# udev once its rules have been applied
+UEVENT_GROUP_KERNEL = 1
+UEVENT_GROUP_UDEV = 2
+_UDEV_MONITOR_PREFIX = b'libudev\0'
+
+# directory holding an invocation:<unit> link for every running unit
+SYSTEMD_UNITS_DIR = '/run/systemd/units'
+
+# reads the pending events of a source, returns true if any was relevant
+EventReader = Callable[[], bool]
+
+
+def _uevent_properties(msg: bytes) -> Dict[str, str]:
+    if msg.startswith(_UDEV_MONITOR_PREFIX):
+        # udev_monitor_netlink_header: prefix, magic, header_size,
+        # properties_off, properties_len, ...
+        if len(msg) < 24:
+            return {}
+        _, offset, length = struct.unpack_from('=III', msg, 12)
+        fields = msg[offset : offset + length].split(b'\0')
+    else:
+        # kernel format: action@devpath followed by the properties
+        fields = msg.split(b'\0')[1:]
+    props = {}
+    for field in fields:
+        key, sep, value = field.decode('utf-8', 'replace').partition('=')
+        if sep:
+            props[key] = value
+    return props
+
+
+class ChangeWatcher(Thread):
+    """Calls back when something changes on the host: files in a directory
+    (inotify), block devices (uevents) or network links, addresses and
+    routes (rtnetlink). The watch methods return False when their kind of
+    notification is not available, in which case callers have to keep
+    polling.
+    """
+
+    def __init__(self) -> None:
+        self.stop = False
+        self.sources: Dict[int, Tuple[EventReader, Callable[[], None]]] = {}
+        self._closers: List[Callable[[], None]] = []
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._wake_fds: Optional[Tuple[int, int]] = None
+        super(ChangeWatcher, self).__init__(target=self.run, daemon=True)
+
+    def _add(
+        self, fd: int, reader: EventReader, callback: Callable[[], None]
+    ) -> None:
+        if self._selector is None:
+            self._selector = selectors.DefaultSelector()
+            self._wake_fds = os.pipe()
+            self._selector.register(self._wake_fds[0], selectors.EVENT_READ)
+        self._selector.register(fd, selectors.EVENT_READ)
+        self.sources[fd] = (reader, callback)
+
+    def watch_paths(
+        self,
+        paths: Iterable[str],
+        callback: Callable[[], None],
+        name_filter: Optional[Callable[[str], bool]] = None,
+    ) -> bool:
+        """Call back when entries are created, removed, renamed or written
+        in the given directories, for entry names accepted by name_filter.
+        """
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (AttributeError, OSError) as e:
+            logger.debug('inotify not available: %s', e)
+            return False
+        if fd < 0:
+            logger.debug(
+                'inotify_init1 failed: %s', os.strerror(ctypes.get_errno())
+            )
+            return False
+        mask = (
+            IN_CREATE
+            | IN_DELETE
+            | IN_MOVED_FROM
+            | IN_MOVED_TO
+            | IN_CLOSE_WRITE
+        )
+        watched = 0
+        for path in paths:
+            if libc.inotify_add_watch(fd, os.fsencode(path), mask) >= 0:
+                watched += 1
+            else:
+                logger.debug(
+                    'unable to watch %s: %s',
+                    path,
+                    os.strerror(ctypes.get_errno()),
+                )
+        if not watched:
+            os.close(fd)
+            return False
+
+        def _read() -> bool:
+            relevant = False
+            while True:
+                try:
+                    buf = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    return relevant
+                offset = 0
+                while offset + _INOTIFY_EVENT.size <= len(buf):
+                    _, _, _, length = _INOTIFY_EVENT.unpack_from(buf, offset)
+                    offset += _INOTIFY_EVENT.size
+                    raw_name = buf[offset : offset + length].rstrip(b'\0')
+                    name = os.fsdecode(raw_name)
+                    offset += length
+                    if name_filter is None or name_filter(name):
+                        relevant = True
+
+        self._add(fd, _read, callback)
+        self._closers.append(lambda: os.close(fd))
+        return True
+
+    def _netlink_socket(
+        self, protocol: int, groups: int, kind: str
+    ) -> Optional[socket.socket]:
+        try:
+            sock = socket.socket(
+                socket.AF_NETLINK,
+                socket.SOCK_RAW | socket.SOCK_CLOEXEC,
+                protocol,
+            )
+        except (AttributeError, OSError) as e:
+            logger.debug('%s notifications not available: %s', kind, e)
+            return None
+        try:
+            sock.bind((0, groups))
+        except OSError as e:
+            logger.debug('%s notifications not available: %s', kind, e)
+            sock.close()
+            return None
+        sock.setblocking(False)
+        self._closers.append(sock.close)
+        return sock
+
+    def watch_block_devices(self, callback: Callable[[], None]) -> bool:
+        """Call back when block devices are added, removed or changed."""
+        sock = self._netlink_socket(
+            NETLINK_KOBJECT_UEVENT,
+            UEVENT_GROUP_KERNEL | UEVENT_GROUP_UDEV,
+            'uevent',
+        )
+        if sock is None:
+            return False
+
+        def _read() -> bool:
+            relevant = False
+            while True:
+                try:
+                    msg = sock.recv(64 * 1024)
+                except BlockingIOError:
+                    return relevant
+                if _uevent_properties(msg).get('SUBSYSTEM') == 'block':
+                    relevant = True
+
+        self._add(sock.fileno(), _read, callback)
+        return True
+
+    def watch_networks(self, callback: Callable[[], None]) -> bool:
+        """Call back when network links, addresses or routes change."""
+        sock = self._netlink_socket(
+            NETLINK_ROUTE,
+            RTMGRP_LINK
+            | RTMGRP_IPV4_IFADDR
+            | RTMGRP_IPV4_ROUTE
+            | RTMGRP_IPV6_IFADDR
+            | RTMGRP_IPV6_ROUTE,
+            'rtnetlink',
+        )
+        if sock is None:
+            return False
+
+        def _read() -> bool:
+            relevant = False
+            while True:
+                try:
+                    if sock.recv(64 * 1024):
+                        relevant = True
+                except BlockingIOError:
+                    return relevant
+
+        self._add(sock.fileno(), _read, callback)
+        return True
+
+    def run(self) -> None:
+        if self._selector is None:
+            return
+        try:
+            while not self.stop:
+                for key, _ in self._selector.select():
+                    if self.stop:
+                        break
+                    source = self.sources.get(key.fd)
+                    if source is None:
+                        continue  # woken up by shutdown
+                    reader, callback = source
+                    try:
+                        if reader():
+                            callback()
+                    except Exception as e:
+                        logger.error(
+                            f'Change watcher encountered exception: {e}'
+                        )
+        finally:
+            self._close()
+
+    def _close(self) -> None:
+        for close in self._closers:
+            close()
+        self._closers = []
+        self.sources = {}
+        if self._selector is not None:
+            self._selector.close()
+            self._selector = None
+        if self._wake_fds is not None:
+            for fd in self._wake_fds:
+                os.close(fd)
+            self._wake_fds = None
+
+    def shutdown(self) -> None:
+        self.stop = True
+        if self._wake_fds is not None:
+            try:
+                os.write(self._wake_fds[1], b'\0')
+            except OSError:
+                pass  # already closed by run()
@@ -331,6 +331,9 @@ class ContainerInfo:
         )
 
 
+_CONTAINER_STATS_FORMAT = '{{.Id}},{{.Config.Image}},{{.Image}},{{.Created}},{{index .Config.Labels "io.ceph.version"}}'
+
+
 def _container_stats(
     ctx: CephadmContext,
     container_name: str,
@@ -344,7 +347,7 @@ def _container_stats(
         container_path,
         'inspect',
         '--format',
-        '{{.Id}},{{.Config.Image}},{{.Image}},{{.Created}},{{index .Config.Labels "io.ceph.version"}}',
+        _CONTAINER_STATS_FORMAT,
         container_name,
     ]
     out, err, code = call(ctx, cmd, verbosity=CallVerbosity.QUIET)
@@ -372,6 +375,42 @@ def parsed_container_stats(
     return _parse_container_stats(out, err, code)
 
 
+def parsed_container_stats_by_name(
+    ctx: CephadmContext,
+    container_names: List[str],
+    *,
+    container_path: str = '',
+) -> Dict[str, ContainerInfo]:
+    """Inspect many containers with a single call. Returns a dict mapping the
+    names of the containers that exist to their stats.
+    """
+    if not container_names:
+        return {}
+    container_path = container_path or ctx.container_engine.path
+    cmd = [
+        container_path,
+        'inspect',
+        '--format',
+        '{{.Name}},' + _CONTAINER_STATS_FORMAT,
+    ] + container_names
+    try:
+        out, err, code = call(ctx, cmd, verbosity=CallVerbosity.QUIET)
+    except Exception as e:
+        logger.debug('unable to inspect containers: %s', e)
+        return {}
+    # the exit status is non-zero if any of the containers is missing, the
+    # output still has a line for each of the others
+    result: Dict[str, ContainerInfo] = {}
+    for line in out.splitlines():
+        fields = line.strip().split(',')
+        if len(fields) != 6:
+            continue
+        # docker prefixes container names with a slash
+        name = fields[0].lstrip('/')
+        result[name] = ContainerInfo(*fields[1:])
+    return result
+
+
 def _container_image_stats(
     ctx: CephadmContext, image_name: str, *, container_path: str = ''
 ) -> Tuple[str, str, int]:
@@ -49,10 +49,9 @@ def get_container_info(
     # lookup right away.
     _cinfo_key = '_container_info'
     _updater = CoreStatusUpdater(keep_container_info=_cinfo_key)
-    matching_daemons = [
-        _updater.expand(ctx, entry)
-        for entry in daemons_matching(ctx, **kwargs)
-    ]
+    entries = list(daemons_matching(ctx, **kwargs))
+    _updater.prefetch(ctx, entries)
+    matching_daemons = [_updater.expand(ctx, entry) for entry in entries]
 
     if not matching_daemons:
         # no matches at all
@@ -126,11 +125,15 @@ def infer_local_ceph_image(
     daemon_name = getattr(ctx, 'name', '')
     _cinfo_key = '_container_info'
     _updater = CoreStatusUpdater(keep_container_info=_cinfo_key)
-    matching_daemons = [
-        itemgetter(_cinfo_key, 'name')(_updater.expand(ctx, entry))
-        for entry in daemons_matching(
+    entries = list(
+        daemons_matching(
             ctx, fsid=ctx.fsid, daemon_type_predicate=lambda t: t in _daemons
         )
+    )
+    _updater.prefetch(ctx, entries)
+    matching_daemons = [
+        itemgetter(_cinfo_key, 'name')(_updater.expand(ctx, entry))
+        for entry in entries
     ]
     # collect the running ceph daemon image ids
     images_in_use_by_daemon = set(
@@ -15,6 +15,7 @@ from .container_engines import (
     Docker,
     Podman,
     parsed_container_stats,
+    parsed_container_stats_by_name,
 )
 from .context import CephadmContext
 from .daemon_identity import DaemonIdentity, DaemonSubIdentity
@@ -688,3 +689,25 @@ def get_container_stats(
         if ci is not None:
             return ci
     return None
+
+
+def get_containers_stats(
+    ctx: CephadmContext,
+    identities: List[DaemonIdentity],
+    *,
+    container_path: str = '',
+) -> List[Optional[ContainerInfo]]:
+    """Like get_container_stats for many daemons, using a single container
+    inspect call. Returns the stats in the order of the identities, None for
+    the daemons without a container.
+    """
+    cnames = []
+    for identity in identities:
+        c = CephContainer.for_daemon(ctx, identity, 'bash')
+        cnames.append((c.cname, c.old_cname))
+    found = parsed_container_stats_by_name(
+        ctx,
+        list(dict.fromkeys(n for pair in cnames for n in pair)),
+        container_path=container_path,
+    )
+    return [found.get(cname) or found.get(old) for cname, old in cnames]
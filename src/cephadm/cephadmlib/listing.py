@@ -29,6 +29,12 @@
 # iterator and gather extra details in an ad-hoc way or get too much info than
 # needed and incur extra costs getting that unwanted data.
 #
+# Updaters that can gather data for many daemons more cheaply than for each
+# daemon separately (one `systemctl show` or `podman inspect` call instead of
+# one call per daemon) do so in the prefetch method. The expand_all method
+# calls prefetch with all the entries before expanding each of them, and is
+# the preferred way to process a complete listing.
+#
 # The CombinedStatusUpdater class exists so that multiple updaters can be
 # easily combined. The init method of the class takes a list of other
 # DaemonStatusUpdater classes and calls them (in order) to update the status
@@ -41,7 +47,7 @@
 # ...     PowerLevelUpdater(),
 # ...     MyCoolCustomUpdater(),
 # ... ])
-# >>> result = [updater.expand(ctx, entry) for entry in daemons(ctx)]
+# >>> result = updater.expand_all(ctx, daemons(ctx))
 #
 # These six lines let you flexibly perform the equivalent of list_daemons
 # with a more precice level of detail needed by the caller.
@@ -54,6 +60,7 @@ from typing import (
     Any,
     Callable,
     Dict,
+    Iterable,
     Iterator,
     List,
     Optional,
@@ -267,6 +274,17 @@ class DaemonStatusUpdater:
     provided by the core listing functions in this module.
     """
 
+    def prefetch(
+        self,
+        ctx: CephadmContext,
+        entries: List[Union[LegacyDaemonEntry, DaemonEntry]],
+    ) -> None:
+        """Gather, in bulk, data that later update or legacy_update calls for
+        the given entries will use. Entries that were not prefetched must
+        still be handled by the update methods.
+        """
+        pass
+
     def update(
         self,
         val: Dict[str, Any],
@@ -316,6 +334,18 @@ class DaemonStatusUpdater:
         self.update(status, ctx, entry.identity, entry.data_dir)
         return status
 
+    def expand_all(
+        self,
+        ctx: CephadmContext,
+        entries: Iterable[Union[LegacyDaemonEntry, DaemonEntry]],
+    ) -> List[Dict[str, Any]]:
+        """Return the expanded status dictionaries of all the entries,
+        prefetching the data needed for them first.
+        """
+        entries = list(entries)
+        self.prefetch(ctx, entries)
+        return [self.expand(ctx, entry) for entry in entries]
+
 
 class NoOpDaemonStatusUpdater(DaemonStatusUpdater):
     """A daemon status updater that adds no new information to the status
@@ -331,6 +361,14 @@ class CombinedStatusUpdater(DaemonStatusUpdater):
     def __init__(self, updaters: List[DaemonStatusUpdater]):
         self.updaters = updaters
 
+    def prefetch(
+        self,
+        ctx: CephadmContext,
+        entries: List[Union[LegacyDaemonEntry, DaemonEntry]],
+    ) -> None:
+        for updater in self.updaters:
+            updater.prefetch(ctx, entries)
+
     def update(
         self,
         val: Dict[str, Any],
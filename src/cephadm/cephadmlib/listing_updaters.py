@@ -1,6 +1,6 @@
 # Additional types to help with container & daemon listing
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import json
 import logging
@@ -8,11 +8,12 @@ import os
 
 from .call_wrappers import call, CallVerbosity
 from .container_engines import (
+    ContainerInfo,
     normalize_container_id,
     parsed_container_cpu_perc,
     parsed_container_mem_usage,
 )
-from .container_types import get_container_stats
+from .container_types import get_container_stats, get_containers_stats
 from .context import CephadmContext
 from .daemon_identity import DaemonIdentity
 from .daemons import (
@@ -29,8 +30,9 @@ from .daemons import (
 from .daemons.ceph import ceph_daemons
 from .data_utils import normalize_image_digest, try_convert_datetime
 from .file_utils import get_file_timestamp
-from .listing import DaemonStatusUpdater
-from .systemd import check_unit
+from .listing import DaemonEntry, DaemonStatusUpdater, LegacyDaemonEntry
+from .systemd import check_unit, check_unit_states
+from .version_cache import ImageVersionCache
 
 
 logger = logging.getLogger()
@@ -41,6 +43,49 @@ class CoreStatusUpdater(DaemonStatusUpdater):
         # set keep_container_info to a custom key that will be used to cache
         # the ContainerInfo object in the status dict.
         self.keep_container_info = keep_container_info
+        # unit name -> check_unit result, filled in by prefetch
+        self.unit_states: Dict[str, Tuple[bool, str, bool]] = {}
+        # unit name -> container stats, filled in by prefetch
+        self.container_stats: Dict[str, Optional[ContainerInfo]] = {}
+
+    def prefetch(
+        self,
+        ctx: CephadmContext,
+        entries: List[Union[LegacyDaemonEntry, DaemonEntry]],
+    ) -> None:
+        # one systemctl call for all the units
+        unit_names = [
+            # legacy_update checks the unit named after the daemon
+            e.status['name']
+            if isinstance(e, LegacyDaemonEntry)
+            else e.identity.unit_name
+            for e in entries
+        ]
+        self.unit_states.update(check_unit_states(ctx, unit_names))
+        # and one container inspect call for all the containers
+        identities = [
+            e.identity for e in entries if isinstance(e, DaemonEntry)
+        ]
+        cinfos = get_containers_stats(ctx, identities)
+        if any(cinfos):
+            # the container engine answered: daemons missing from the
+            # output have no container
+            for identity, cinfo in zip(identities, cinfos):
+                self.container_stats[identity.unit_name] = cinfo
+
+    def _check_unit(
+        self, ctx: CephadmContext, unit_name: str
+    ) -> Tuple[bool, str, bool]:
+        if unit_name in self.unit_states:
+            return self.unit_states[unit_name]
+        return check_unit(ctx, unit_name)
+
+    def _container_stats(
+        self, ctx: CephadmContext, identity: DaemonIdentity
+    ) -> Optional[ContainerInfo]:
+        if identity.unit_name in self.container_stats:
+            return self.container_stats[identity.unit_name]
+        return get_container_stats(ctx, identity)
 
     def update(
         self,
@@ -49,7 +94,7 @@ class CoreStatusUpdater(DaemonStatusUpdater):
         identity: DaemonIdentity,
         data_dir: str,
     ) -> None:
-        enabled, state, _ = check_unit(ctx, identity.unit_name)
+        enabled, state, _ = self._check_unit(ctx, identity.unit_name)
         val['enabled'] = enabled
         val['state'] = state
 
@@ -58,7 +103,7 @@ class CoreStatusUpdater(DaemonStatusUpdater):
         daemon_dir = os.path.join(
             data_dir, identity.fsid, identity.daemon_name
         )
-        cinfo = get_container_stats(ctx, identity)
+        cinfo = self._container_stats(ctx, identity)
         if self.keep_container_info:
             val[self.keep_container_info] = cinfo
         if cinfo:
@@ -112,7 +157,9 @@ class CoreStatusUpdater(DaemonStatusUpdater):
         cache = getattr(self, '_cache', {})
         setattr(self, '_cache', cache)
         legacy_unit_name = val['name']
-        (val['enabled'], val['state'], _) = check_unit(ctx, legacy_unit_name)
+        (val['enabled'], val['state'], _) = self._check_unit(
+            ctx, legacy_unit_name
+        )
         if not cache.get('host_version'):
             try:
                 out, err, code = call(
@@ -175,6 +222,25 @@ class DigestsStatusUpdater(DaemonStatusUpdater):
 class VersionStatusUpdater(DaemonStatusUpdater):
     def __init__(self) -> None:
         self.seen_versions: Dict[str, Optional[str]] = {}
+        # versions learned by earlier runs, see ImageVersionCache
+        self._version_cache: Optional[ImageVersionCache] = None
+
+    def _cache(self, ctx: CephadmContext) -> ImageVersionCache:
+        if self._version_cache is None:
+            self._version_cache = ImageVersionCache.for_context(ctx)
+        return self._version_cache
+
+    def _seen_version(
+        self, ctx: CephadmContext, image_id: Optional[str]
+    ) -> Optional[str]:
+        if not image_id:
+            return None
+        version = self.seen_versions.get(image_id, None)
+        if not version:
+            version = self._cache(ctx).get(image_id)
+            if version:
+                self.seen_versions[image_id] = version
+        return version
 
     def update(
         self,
@@ -193,7 +259,7 @@ class VersionStatusUpdater(DaemonStatusUpdater):
             return  # container info missing or no longer running?
         # identify software version inside the container (if we can)
         if not version or '.' not in version:
-            version = self.seen_versions.get(image_id, None)
+            version = self._seen_version(ctx, image_id)
         if daemon_type == NFSGanesha.daemon_type:
             version = NFSGanesha.get_version(ctx, container_id)
         if daemon_type == CephIscsi.daemon_type:
@@ -302,6 +368,10 @@ class VersionStatusUpdater(DaemonStatusUpdater):
                 logger.warning(
                     'version for unknown daemon type %s' % daemon_type
                 )
+        if image_id:
+            seen = self.seen_versions.get(image_id)
+            if seen:
+                self._cache(ctx).set(ctx, image_id, seen)
         val['version'] = version
 
 
@@ -2,7 +2,7 @@
 
 import logging
 
-from typing import Tuple, List
+from typing import Dict, Iterable, Tuple, List
 
 from .constants import DISABLED_SERVICES
 from .context import CephadmContext
@@ -41,21 +41,83 @@ def check_unit(ctx: CephadmContext, unit_name: str) -> Tuple[bool, str, bool]:
             ['systemctl', 'is-active', unit_name],
             verbosity=CallVerbosity.QUIET,
         )
-        out = out.strip()
-        if out in ['active']:
-            state = 'running'
-        elif out in ['inactive']:
-            state = 'stopped'
-        elif out in ['failed', 'auto-restart']:
-            state = 'error'
-        else:
-            state = 'unknown'
+        state = _unit_state(out.strip())
     except Exception as e:
         logger.warning('unable to run systemctl: %s' % e)
         state = 'unknown'
     return (enabled, state, installed)
 
 
+# UnitFileState values for which `systemctl is-enabled` exits with 0
+_ENABLED_UNIT_FILE_STATES = {
+    'enabled',
+    'enabled-runtime',
+    'static',
+    'alias',
+    'indirect',
+    'generated',
+    'transient',
+}
+
+
+def _unit_state(active_state: str) -> str:
+    # same mapping as the `systemctl is-active` output in check_unit
+    if active_state in ['active']:
+        return 'running'
+    elif active_state in ['inactive']:
+        return 'stopped'
+    elif active_state in ['failed', 'auto-restart']:
+        return 'error'
+    return 'unknown'
+
+
+def check_unit_states(
+    ctx: CephadmContext, unit_names: Iterable[str]
+) -> Dict[str, Tuple[bool, str, bool]]:
+    """Return the (enabled, state, installed) tuple of check_unit for many
+    units using a single `systemctl show` call. Units that could not be
+    probed this way are missing from the result.
+    """
+    unit_names = list(dict.fromkeys(unit_names))
+    if not unit_names:
+        return {}
+    try:
+        out, err, code = call(
+            ctx,
+            [
+                'systemctl',
+                'show',
+                '--property=UnitFileState,ActiveState',
+                '--',
+            ]
+            + unit_names,
+            verbosity=CallVerbosity.QUIET,
+        )
+    except Exception as e:
+        logger.warning('unable to run systemctl: %s' % e)
+        return {}
+    # systemctl prints one block of properties per unit, in argument order
+    blocks = [b for b in out.strip().split('\n\n') if b.strip()]
+    if code or len(blocks) != len(unit_names):
+        return {}
+    result: Dict[str, Tuple[bool, str, bool]] = {}
+    for unit_name, block in zip(unit_names, blocks):
+        props = dict(
+            line.split('=', 1) for line in block.splitlines() if '=' in line
+        )
+        if 'ActiveState' not in props:
+            continue
+        unit_file_state = props.get('UnitFileState', '')
+        enabled = unit_file_state in _ENABLED_UNIT_FILE_STATES
+        installed = enabled or unit_file_state == 'disabled'
+        result[unit_name] = (
+            enabled,
+            _unit_state(props['ActiveState']),
+            installed,
+        )
+    return result
+
+
 def check_units(ctx: CephadmContext, units: List[str]) -> bool:
     for u in units:
         (enabled, state, installed) = check_unit(ctx, u)
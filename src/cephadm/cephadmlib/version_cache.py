@@ -0,0 +1,103 @@
+# version_cache.py - on-disk cache of container image software versions
+
+import json
+import logging
+import os
+
+from typing import Dict, Optional, Set
+
+from .call_wrappers import call, CallVerbosity
+from .container_engines import normalize_container_id
+from .context import CephadmContext
+from .file_utils import write_new
+
+
+logger = logging.getLogger()
+
+IMAGE_VERSIONS_FILE = 'cephadm-image-versions.json'
+
+
+class ImageVersionCache:
+    """Software versions of container images, keyed by image id and kept in a
+    file in the data dir, so that the version of an image is only probed
+    (by running a command inside one of its containers) once per host rather
+    than on every daemon listing.
+
+    An image id identifies the image contents, so a cached version can not
+    go stale. Entries of images that no longer exist on the host are dropped
+    whenever the file is rewritten.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._loaded = False
+        self.versions: Dict[str, str] = {}
+
+    @classmethod
+    def for_context(cls, ctx: CephadmContext) -> 'ImageVersionCache':
+        return cls(os.path.join(ctx.data_dir, IMAGE_VERSIONS_FILE))
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.debug('ignoring image version cache %s: %s', self.path, e)
+            return
+        if isinstance(data, dict):
+            self.versions = {
+                k: v
+                for k, v in data.items()
+                if isinstance(k, str) and isinstance(v, str) and v
+            }
+
+    def get(self, image_id: str) -> Optional[str]:
+        self._load()
+        return self.versions.get(normalize_container_id(image_id))
+
+    def set(self, ctx: CephadmContext, image_id: str, version: str) -> None:
+        """Record the version of an image, rewriting the cache file if the
+        version was not known yet.
+        """
+        self._load()
+        image_id = normalize_container_id(image_id)
+        if not version or self.versions.get(image_id) == version:
+            return
+        self.versions[image_id] = version
+        existing = _image_ids(ctx)
+        if existing is not None:
+            self.versions = {
+                k: v
+                for k, v in self.versions.items()
+                if k in existing or k == image_id
+            }
+        try:
+            with write_new(self.path, encoding='utf-8') as f:
+                json.dump(self.versions, f, sort_keys=True)
+        except OSError as e:
+            logger.debug(
+                'unable to write image version cache %s: %s', self.path, e
+            )
+
+
+def _image_ids(ctx: CephadmContext) -> Optional[Set[str]]:
+    """Return the ids of all the images on the host, None if they could not
+    be listed.
+    """
+    try:
+        out, _, code = call(
+            ctx,
+            [ctx.container_engine.path, 'images', '-q', '--no-trunc'],
+            verbosity=CallVerbosity.QUIET,
+        )
+    except Exception as e:
+        logger.debug('unable to list images: %s', e)
+        return None
+    if code:
+        return None
+    return {normalize_container_id(i) for i in out.split()}
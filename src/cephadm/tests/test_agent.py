@@ -933,6 +933,98 @@ def test_gatherer_run(_wait, _time, _agent_wakeup, cephadm_fs):
             _clear.assert_not_called()
 
 
+def test_agent_unchanged_sections():
+    with with_cephadm_ctx([]) as ctx:
+        agent = _cephadm.CephadmAgent(ctx, FSID, AGENT_ID)
+        sections = {
+            'ls': [{'name': 'mon.host1'}],
+            'networks': {'10.2.1.0/24': {'eth1': ['10.2.1.122']}},
+            'volume': '',
+        }
+        # nothing reported yet
+        assert agent._unchanged_sections(7, sections) == []
+        agent._reported(7, sections, full=True)
+        assert agent._unchanged_sections(7, sections) == ['ls', 'networks']
+        changed = dict(sections, ls=[{'name': 'mon.host2'}])
+        assert agent._unchanged_sections(7, changed) == ['networks']
+        # the mgr asked for new metadata
+        assert agent._unchanged_sections(8, sections) == []
+        agent.request_full_report()
+        assert agent._unchanged_sections(7, sections) == []
+        # periodic full report
+        agent._reported(7, sections, full=False)
+        assert agent._unchanged_sections(7, sections) == ['ls', 'networks']
+        agent.last_full_report -= agent.fallback_interval
+        assert agent._unchanged_sections(7, sections) == []
+
+
+@mock.patch("cephadm.list_networks")
+def test_agent_networks_listing(_list_networks):
+    with with_cephadm_ctx([]) as ctx:
+        agent = _cephadm.CephadmAgent(ctx, FSID, AGENT_ID)
+        _list_networks.return_value = {'10.2.1.0/24': {'eth1': set(['10.2.1.122'])}}
+        expected = {'10.2.1.0/24': {'eth1': ['10.2.1.122']}}
+        assert agent._get_networks() == expected
+        # without change notifications the networks are listed every time
+        assert agent._get_networks() == expected
+        assert _list_networks.call_count == 2
+        agent.networks_watched = True
+        assert agent._get_networks() == expected
+        assert _list_networks.call_count == 2
+        with mock.patch.object(agent, 'wakeup') as _wakeup:
+            agent.networks_changed()
+            _wakeup.assert_called_once()
+        assert agent._get_networks() == expected
+        assert _list_networks.call_count == 3
+
+
+def test_uevent_properties():
+    import struct
+    from cephadmlib.change_watch import _uevent_properties
+
+    kernel = (
+        b'add@/devices/virtual/block/loop0\0ACTION=add\0'
+        b'SUBSYSTEM=block\0DEVNAME=loop0\0'
+    )
+    assert _uevent_properties(kernel) == {
+        'ACTION': 'add',
+        'SUBSYSTEM': 'block',
+        'DEVNAME': 'loop0',
+    }
+    props = b'ACTION=change\0SUBSYSTEM=net\0'
+    header = (
+        b'libudev\0'
+        + struct.pack('!I', 0xfeedcafe)
+        + struct.pack('=III', 40, 40, len(props))
+        + b'\0' * 16
+    )
+    assert _uevent_properties(header + props) == {
+        'ACTION': 'change',
+        'SUBSYSTEM': 'net',
+    }
+
+
+def test_change_watcher_paths(tmp_path):
+    from cephadmlib.change_watch import ChangeWatcher
+
+    changed = threading.Event()
+    watcher = ChangeWatcher()
+    assert watcher.watch_paths(
+        [str(tmp_path)], changed.set, name_filter=lambda n: n.startswith('osd.')
+    )
+    watcher.start()
+    try:
+        (tmp_path / 'unrelated').touch()
+        assert not changed.wait(0.2)
+        (tmp_path / 'osd.1').mkdir()
+        assert changed.wait(5)
+    finally:
+        watcher.shutdown()
+        watcher.join(5)
+    assert not watcher.is_alive()
+    assert not watcher.sources
+
+
 @mock.patch("cephadm.CephadmAgent.run")
 def test_command_agent(_agent_run, cephadm_fs):
     with with_cephadm_ctx([]) as ctx:
@@ -330,6 +330,88 @@ def test_list_daemons_detail_mgrnotrunning(cephadm_fs, funkypatch):
     edl.assert_checked_all()
 
 
+def test_list_daemons_detail_bulk(cephadm_fs, funkypatch):
+    _cephadm = import_cephadm()
+    _call = funkypatch.patch('cephadmlib.call_wrappers.call')
+
+    # container command fakery
+    img = 'quay.io/fake/ceph:ci'
+    img_id = 'fd6b0fb89677f907edf0f5dbec41b2d09850d58ff860a8a0671ad24fafa1e889'
+    img_sha = 'sha256:c217e3d06df0334fba3f33242e76548a4f71cec619dfa29f64dec9321bd518f3'
+    ctr1 = 'cd9ceec3fc3aa59901e3ced4f4eab8557d067cf05cbc24fa2521962d4bef3b92'
+    ctr2 = '7d067cf05cbc24fa2521962d4bef3b92cd9ceec3fc3aa59901e3ced4f4eab855'
+    date = '2025-01-31 08:13:30.148338962 -0500 EST'
+    vers = '19.2.1'
+    fsid = 'dc93cfee-ddc5-11ef-a056-525400220000'
+    calls = []
+
+    def _fake_call(ctx, cmd, *args, **kwargs):
+        calls.append(cmd)
+        out = ''
+        code = 0
+        if 'stats' in cmd and any('MemUsage' in a for a in cmd):
+            out = '\n'.join(['bob,500 / 1000', 'kit,100 / 1000'])
+        elif 'inspect' in cmd and any('RepoDigests' in a for a in cmd):
+            out = f'[{img}@{img_sha}]'
+        elif cmd[:2] == ['systemctl', 'show']:
+            # units are listed in the order they were requested
+            states = {
+                'mon': 'ActiveState=active\nUnitFileState=enabled',
+                'mgr': 'ActiveState=inactive\nUnitFileState=disabled',
+                'osd': 'ActiveState=failed\nUnitFileState=enabled',
+            }
+            blocks = [
+                states[u.split('@')[1].split('.')[0]]
+                for u in cmd[cmd.index('--') + 1:]
+            ]
+            out = '\n\n'.join(blocks) + '\n'
+        elif 'inspect' in cmd and any('{{.Name}}' in a for a in cmd):
+            # only the mon and osd containers exist, docker style names
+            out = '\n'.join([
+                f'/ceph-{fsid}-mon-ceph0,{ctr1},{img},{img_id},{date},{vers}',
+                f'/ceph-{fsid}-osd-3,{ctr2},{img},{img_id},{date},{vers}',
+            ])
+            code = 1
+        return out, '', code
+
+    _call.side_effect = _fake_call
+
+    fake_ceph = pathlib.Path('/var/tmp/_lib/fake/ceph')
+    cluster_dir = fake_ceph / fsid
+    for name in ['mon.ceph0', 'mgr.ceph0.zzzabc', 'osd.3']:
+        (cluster_dir / name).mkdir(parents=True)
+    with (cluster_dir / 'mgr.ceph0.zzzabc' / 'unit.image').open('w') as fh:
+        fh.write(f'{img}\n')
+
+    with with_cephadm_ctx([], mock_cephadm_call_fn=False) as ctx:
+        ctx.data_dir = str(fake_ceph)
+        dl = _cephadm.list_daemons(ctx)
+    assert len(dl) == 3
+    edl = _EntryHelper(dl)
+    mon_entry = edl.get('mon.ceph0')
+    assert mon_entry['enabled'] == True
+    assert mon_entry['state'] == 'running'
+    assert mon_entry['container_id'] == ctr1
+    assert mon_entry['container_image_id'] == img_id
+    assert mon_entry['version'] == vers
+    mgr_entry = edl.get('mgr.ceph0.zzzabc')
+    assert mgr_entry['enabled'] == False
+    assert mgr_entry['state'] == 'stopped'
+    assert mgr_entry['container_id'] is None
+    assert mgr_entry['container_image_name'] == img
+    osd_entry = edl.get('osd.3')
+    assert osd_entry['enabled'] == True
+    assert osd_entry['state'] == 'error'
+    assert osd_entry['container_id'] == ctr2
+    edl.assert_checked_all()
+    # no per daemon systemctl or container inspect calls
+    assert len([c for c in calls if c[0] == 'systemctl']) == 1
+    assert len([
+        c for c in calls
+        if 'inspect' in c and not any('RepoDigests' in a for a in c)
+    ]) == 1
+
+
 def test_list_daemons_no_detail_legacy(cephadm_fs, funkypatch):
     _cephadm = import_cephadm()
     _call = funkypatch.patch('cephadmlib.call_wrappers.call')
@@ -558,3 +640,51 @@ fsid = {fsid}
     assert losd_entry['state'] == 'running'
     assert losd_entry['host_version'] == 'v1.2.3'
     edl.assert_checked_all()
+
+
+def test_list_daemons_detail_version_cache(cephadm_fs, funkypatch):
+    _cephadm = import_cephadm()
+    _call = funkypatch.patch('cephadmlib.call_wrappers.call')
+
+    img = 'quay.io/fake/ceph:ci'
+    img_id = 'fd6b0fb89677f907edf0f5dbec41b2d09850d58ff860a8a0671ad24fafa1e889'
+    old_img_id = 'c217e3d06df0334fba3f33242e76548a4f71cec619dfa29f64dec9321bd518f3'
+    ctr1 = 'cd9ceec3fc3aa59901e3ced4f4eab8557d067cf05cbc24fa2521962d4bef3b92'
+    date = '2025-01-31 08:13:30.148338962 -0500 EST'
+    fsid = 'dc93cfee-ddc5-11ef-a056-525400220000'
+    execs = []
+
+    def _fake_call(ctx, cmd, *args, **kwargs):
+        out = ''
+        if 'is-active' in cmd:
+            out = 'active'
+        elif 'exec' in cmd:
+            execs.append(cmd)
+            out = 'ceph version 19.2.1 (abc) squid (stable)'
+        elif 'images' in cmd:
+            out = f'sha256:{img_id}\n'
+        elif 'inspect' in cmd and 'mon' in cmd[-1]:
+            out = f'{ctr1},{img},{img_id},{date},'
+        return out, '', 0
+
+    _call.side_effect = _fake_call
+
+    fake_ceph = pathlib.Path('/var/tmp/_lib/fake/ceph')
+    (fake_ceph / fsid / 'mon.ceph0').mkdir(parents=True)
+    cache_file = fake_ceph / 'cephadm-image-versions.json'
+    # a stale entry for an image that is gone from the host
+    with cache_file.open('w') as fh:
+        json.dump({old_img_id: '18.2.4'}, fh)
+
+    with with_cephadm_ctx([], mock_cephadm_call_fn=False) as ctx:
+        ctx.data_dir = str(fake_ceph)
+        dl = _cephadm.list_daemons(ctx)
+        assert dl[0]['version'] == '19.2.1'
+        assert len(execs) == 1
+        with cache_file.open() as fh:
+            assert json.load(fh) == {img_id: '19.2.1'}
+
+        # the next listing finds the version in the cache
+        dl = _cephadm.list_daemons(ctx)
+        assert dl[0]['version'] == '19.2.1'
+        assert len(execs) == 1
@@ -17,6 +17,9 @@
 
 #include "ActivePyModules.h"
 
+#include <algorithm>
+#include <unordered_map>
+
 #include <rocksdb/version.h>
 
 #include "common/errno.h"
@@ -1306,6 +1309,203 @@ PyObject* ActivePyModules::get_perf_schema_python(
   return f.get();
 }
 
+PyObject* ActivePyModules::get_perf_counters_bulk_python(
+    const std::set<std::string>& svc_types,
+    uint64_t prio_limit,
+    bool labeled)
+{
+  // The schema of a daemon is the ordered list of counter paths (and their
+  // types) that passed the filters.  Daemons of the same type almost always
+  // share a schema, so it is emitted once and keyed by a digest of its
+  // paths.  Schemas are looked up by digest and compared in full, and the
+  // keys of different schemas with colliding digests are disambiguated, so
+  // a key names exactly one schema within a call.
+  struct BulkSchema {
+    std::string key;
+    std::vector<std::string> paths;
+    std::vector<PerfCounterType> types;
+  };
+  struct BulkValues {
+    std::string daemon;
+    std::string schema_key;
+    std::vector<uint64_t> values;
+    std::vector<uint64_t> counts;
+  };
+  std::map<std::string, std::vector<BulkSchema>> schemas_by_type;
+  std::vector<BulkValues> values;
+  auto same_types = [](const std::vector<PerfCounterType>& a,
+                       const std::vector<PerfCounterType>& b) {
+    return std::equal(a.begin(), a.end(), b.begin(), b.end(),
+                      [](const auto& x, const auto& y) {
+                        return x.type == y.type &&
+                               x.priority == y.priority &&
+                               x.unit == y.unit &&
+                               x.description == y.description &&
+                               x.nick == y.nick;
+                      });
+  };
+
+  without_gil([&] {
+    std::lock_guard l(lock);
+    for (const auto& svc_type : svc_types) {
+      auto daemons = daemon_state.get_by_service(svc_type);
+      auto& type_schemas = schemas_by_type[svc_type];
+      // digest => indexes of the schemas in type_schemas
+      std::unordered_map<size_t, std::vector<size_t>> schemas_by_digest;
+      for (auto& [key, state] : daemons) {
+        std::vector<std::string> paths;
+        std::vector<PerfCounterType> types;
+        BulkValues v;
+        v.daemon = ceph::to_string(key);
+        {
+          std::lock_guard l2(state->lock);
+          auto& counters = state->perf_counters;
+          for (const auto& [path, instance] : counters.instances) {
+            auto labels = ceph::perf_counters::key_labels(path);
+            if (!labeled && labels.begin() != labels.end()) {
+              continue;
+            }
+            auto type = counters.types.find(path);
+            if (type == counters.types.end() ||
+                type->second.priority < prio_limit) {
+              continue;
+            }
+            uint64_t value = 0;
+            uint64_t count = 0;
+            if (type->second.type & PERFCOUNTER_LONGRUNAVG) {
+              if (!instance.get_data_avg().empty()) {
+                const auto& datapoint = instance.get_latest_data_avg();
+                value = datapoint.s;
+                count = datapoint.c;
+              }
+            } else if (!instance.get_data().empty()) {
+              value = instance.get_latest_data().v;
+            }
+            paths.push_back(path);
+            types.push_back(type->second);
+            v.values.push_back(value);
+            v.counts.push_back(count);
+          }
+        }
+        size_t digest = 0;
+        for (const auto& path : paths) {
+          digest ^= std::hash<std::string>{}(path) + 0x9e3779b9 +
+                    (digest << 6) + (digest >> 2);
+        }
+        auto& candidates = schemas_by_digest[digest];
+        auto schema = std::find_if(
+          candidates.begin(), candidates.end(),
+          [&](size_t i) {
+            return type_schemas[i].paths == paths &&
+                   same_types(type_schemas[i].types, types);
+          });
+        if (schema == candidates.end()) {
+          auto schema_key = fmt::format("{}:{:016x}:{}", svc_type, digest,
+                                        paths.size());
+          if (!candidates.empty()) {
+            schema_key += fmt::format(":{}", candidates.size());
+          }
+          candidates.push_back(type_schemas.size());
+          type_schemas.push_back(BulkSchema{
+            std::move(schema_key), std::move(paths), std::move(types)});
+          schema = std::prev(candidates.end());
+        }
+        v.schema_key = type_schemas[*schema].key;
+        values.push_back(std::move(v));
+      }
+    }
+  });
+
+  PyFormatter f;
+  {
+    Formatter::ObjectSection schemas_section{f, "schemas"};
+    for (const auto& [svc_type, type_schemas] : schemas_by_type) {
+      for (const auto& schema : type_schemas) {
+        Formatter::ObjectSection schema_section{f, schema.key};
+        f.dump_string("type", svc_type);
+        {
+          Formatter::ArraySection names{f, "names"};
+          for (const auto& path : schema.paths) {
+            auto labels = ceph::perf_counters::key_labels(path);
+            if (labels.begin() != labels.end()) {
+              f.dump_string("name", ceph::perf_counters::key_name(path));
+            } else {
+              f.dump_string("name", path.substr(0, path.rfind('.')));
+            }
+          }
+        }
+        {
+          Formatter::ArraySection counters{f, "counters"};
+          for (const auto& path : schema.paths) {
+            f.dump_string("counter", path.substr(path.rfind('.') + 1));
+          }
+        }
+        if (labeled) {
+          Formatter::ArraySection labels_section{f, "labels"};
+          for (const auto& path : schema.paths) {
+            Formatter::ObjectSection label_section{f, "labels"};
+            for (const auto& label : ceph::perf_counters::key_labels(path)) {
+              if (!label.first.empty()) {
+                f.dump_string(label.first, label.second);
+              }
+            }
+          }
+        }
+        {
+          Formatter::ArraySection descriptions{f, "descriptions"};
+          for (const auto& type : schema.types) {
+            f.dump_string("description", type.description);
+          }
+        }
+        {
+          Formatter::ArraySection nicks{f, "nicks"};
+          for (const auto& type : schema.types) {
+            f.dump_string("nick", type.nick);
+          }
+        }
+        {
+          Formatter::ArraySection types{f, "types"};
+          for (const auto& type : schema.types) {
+            f.dump_unsigned("type", type.type);
+          }
+        }
+        {
+          Formatter::ArraySection priorities{f, "priorities"};
+          for (const auto& type : schema.types) {
+            f.dump_unsigned("priority", type.priority);
+          }
+        }
+        {
+          Formatter::ArraySection units{f, "units"};
+          for (const auto& type : schema.types) {
+            f.dump_unsigned("units", type.unit);
+          }
+        }
+      }
+    }
+  }
+  {
+    Formatter::ObjectSection daemons_section{f, "daemons"};
+    for (const auto& v : values) {
+      Formatter::ObjectSection daemon_section{f, v.daemon};
+      f.dump_string("schema", v.schema_key);
+      {
+        Formatter::ArraySection values_section{f, "values"};
+        for (auto value : v.values) {
+          f.dump_unsigned("value", value);
+        }
+      }
+      {
+        Formatter::ArraySection counts_section{f, "counts"};
+        for (auto count : v.counts) {
+          f.dump_unsigned("count", count);
+        }
+      }
+    }
+  }
+  return f.get();
+}
+
 PyObject* ActivePyModules::get_rocksdb_version()
 {
   std::string version = std::to_string(ROCKSDB_MAJOR) + "." +
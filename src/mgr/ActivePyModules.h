@@ -124,6 +124,10 @@ public:
   PyObject *get_perf_schema_python(
       const std::string &svc_type,
       const std::string &svc_id);
+  PyObject *get_perf_counters_bulk_python(
+      const std::set<std::string> &svc_types,
+      uint64_t prio_limit,
+      bool labeled);
   PyObject *get_rocksdb_version();
   PyObject *get_context();
   PyObject *get_osdmap();
@@ -751,6 +751,36 @@ static PyObject* get_perf_schema(BaseMgrModule *self, PyObject *args)
   return self->py_modules->get_perf_schema_python(type_str, svc_id);
 }
 
+static PyObject*
+get_perf_counters_bulk(BaseMgrModule *self, PyObject *args)
+{
+  PyObject *svc_types_list = nullptr;
+  unsigned long long prio_limit = 0;
+  int labeled = 0;
+  if (!PyArg_ParseTuple(args, "OKp:get_perf_counters_bulk", &svc_types_list,
+                        &prio_limit, &labeled)) {
+    return nullptr;
+  }
+
+  if (!PyList_Check(svc_types_list)) {
+    derr << __func__ << " svc_types not a list" << dendl;
+    Py_RETURN_FALSE;
+  }
+
+  std::set<std::string> svc_types;
+  for (int i = 0; i < PyList_Size(svc_types_list); ++i) {
+    PyObject *svc_type = PyList_GET_ITEM(svc_types_list, i);
+    if (!PyUnicode_Check(svc_type)) {
+      derr << fmt::format("{} list item {} not a string", __func__, i) << dendl;
+      continue;
+    }
+    svc_types.insert(PyUnicode_AsUTF8(svc_type));
+  }
+
+  return self->py_modules->get_perf_counters_bulk_python(
+      svc_types, prio_limit, labeled);
+}
+
 static PyObject*
 ceph_get_rocksdb_version(BaseMgrModule *self)
 {
@@ -1668,6 +1698,9 @@ PyMethodDef BaseMgrModule_methods[] = {
   {"_ceph_get_perf_schema", (PyCFunction)get_perf_schema, METH_VARARGS,
    "Get the performance counter schema"},
 
+  {"_ceph_get_perf_counters_bulk", (PyCFunction)get_perf_counters_bulk, METH_VARARGS,
+   "Get the schema and latest values of all perf counters of a set of services"},
+
   {"_ceph_get_rocksdb_version", (PyCFunction)ceph_get_rocksdb_version, METH_NOARGS,
     "Get the current RocksDB version number"},
 
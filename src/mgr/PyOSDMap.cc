@@ -96,6 +96,15 @@ static PyObject *osdmap_get_crush(BasePyOSDMap* self, PyObject *obj)
       (void*)(&(self->osdmap->crush)));
 }
 
+static PyObject *osdmap_get_pool_pg_nums(BasePyOSDMap* self, PyObject *obj)
+{
+  PyFormatter f;
+  for (auto& [poolid, pi] : self->osdmap->get_pools()) {
+    f.dump_unsigned(stringify(poolid).c_str(), pi.get_pg_num());
+  }
+  return f.get();
+}
+
 static PyObject *osdmap_get_pools_by_take(BasePyOSDMap* self, PyObject *args)
 {
   int take;
@@ -220,6 +229,174 @@ static PyObject *osdmap_map_pool_pgs_up(BasePyOSDMap* self, PyObject *args)
   return f.get();
 }
 
+static PyObject *osdmap_get_pgs_up_with_osd(BasePyOSDMap* self, PyObject *args)
+{
+  BasePyOSDMap *other = nullptr;
+  int osd;
+  int only_changed = 1;
+  if (!PyArg_ParseTuple(args, "O!i|p:get_pgs_up_with_osd",
+			&BasePyOSDMapType, &other, &osd, &only_changed)) {
+    return nullptr;
+  }
+  auto pgs = without_gil([&] {
+    vector<pg_t> pgs;
+    vector<int> up, other_up;
+    for (auto& [poolid, pi] : self->osdmap->get_pools()) {
+      bool in_other = other->osdmap->have_pg_pool(poolid);
+      for (unsigned ps = 0; ps < pi.get_pg_num(); ++ps) {
+	pg_t pgid(ps, poolid);
+	self->osdmap->pg_to_up_acting_osds(pgid, &up, nullptr, nullptr, nullptr);
+	other_up.clear();
+	if (in_other) {
+	  other->osdmap->pg_to_up_acting_osds(pgid, &other_up, nullptr, nullptr, nullptr);
+	}
+	if (std::find(up.begin(), up.end(), osd) == up.end() &&
+	    std::find(other_up.begin(), other_up.end(), osd) == other_up.end()) {
+	  continue;
+	}
+	if (only_changed && up == other_up) {
+	  continue;
+	}
+	pgs.push_back(pgid);
+      }
+    }
+    return pgs;
+  });
+  PyFormatter f;
+  f.open_array_section("pgs");
+  for (const auto& pgid : pgs) {
+    f.open_array_section("pg");
+    f.dump_int("pool", pgid.pool());
+    f.dump_unsigned("ps", pgid.ps());
+    f.close_section();
+  }
+  f.close_section();
+  return f.get();
+}
+
+static PyObject *osdmap_diff(BasePyOSDMap* self, PyObject *args)
+{
+  BasePyOSDMap *other = nullptr;
+  int with_pgs = 1;
+  if (!PyArg_ParseTuple(args, "O!|p:diff", &BasePyOSDMapType, &other,
+			&with_pgs)) {
+    return nullptr;
+  }
+  struct osd_state_t {
+    bool exists = false;
+    bool up = false;
+    bool in = false;
+    float weight = 0;
+    bool operator==(const osd_state_t&) const = default;
+  };
+  struct osd_change_t {
+    int osd;
+    osd_state_t before, after;
+  };
+  struct pg_change_t {
+    pg_t pgid;
+    vector<int> before_up, after_up;
+    vector<int> before_acting, after_acting;
+  };
+  auto get_osd_state = [](const OSDMap& m, int osd) {
+    osd_state_t s;
+    if (m.exists(osd)) {
+      s.exists = true;
+      s.up = m.is_up(osd);
+      s.in = m.is_in(osd);
+      s.weight = m.get_weightf(osd);
+    }
+    return s;
+  };
+  auto [osds, pgs] = without_gil([&] {
+    const OSDMap& before = *self->osdmap;
+    const OSDMap& after = *other->osdmap;
+    vector<osd_change_t> osds;
+    int max_osd = std::max(before.get_max_osd(), after.get_max_osd());
+    for (int osd = 0; osd < max_osd; ++osd) {
+      auto b = get_osd_state(before, osd);
+      auto a = get_osd_state(after, osd);
+      if (!(a == b)) {
+	osds.push_back({osd, b, a});
+      }
+    }
+    vector<pg_change_t> pgs;
+    if (!with_pgs) {
+      return std::make_tuple(std::move(osds), std::move(pgs));
+    }
+    // compare the mappings of the PGs which exist in either map
+    auto compare_pools = [&](const OSDMap& m, const OSDMap& o, bool is_before) {
+      for (auto& [poolid, pi] : m.get_pools()) {
+	const pg_pool_t *opi = o.get_pg_pool(poolid);
+	unsigned other_pg_num = opi ? opi->get_pg_num() : 0;
+	unsigned ps = 0;
+	if (!is_before) {
+	  // PGs which exist in both maps were done in the first pass
+	  ps = other_pg_num;
+	  other_pg_num = 0;
+	}
+	for (; ps < pi.get_pg_num(); ++ps) {
+	  pg_t pgid(ps, poolid);
+	  pg_change_t c{pgid};
+	  vector<int> *up = is_before ? &c.before_up : &c.after_up;
+	  vector<int> *acting = is_before ? &c.before_acting : &c.after_acting;
+	  m.pg_to_up_acting_osds(pgid, up, nullptr, acting, nullptr);
+	  if (ps < other_pg_num) {
+	    o.pg_to_up_acting_osds(pgid, &c.after_up, nullptr, &c.after_acting, nullptr);
+	  }
+	  if (c.before_up != c.after_up || c.before_acting != c.after_acting) {
+	    pgs.push_back(std::move(c));
+	  }
+	}
+      }
+    };
+    compare_pools(before, after, true);
+    compare_pools(after, before, false);
+    return std::make_tuple(std::move(osds), std::move(pgs));
+  });
+  PyFormatter f;
+  f.dump_int("epoch", self->osdmap->get_epoch());
+  f.dump_int("other_epoch", other->osdmap->get_epoch());
+  auto dump_osd_state = [&f](const char *name, const osd_state_t& s) {
+    f.open_object_section(name);
+    f.dump_bool("exists", s.exists);
+    f.dump_int("up", s.up);
+    f.dump_int("in", s.in);
+    f.dump_float("weight", s.weight);
+    f.close_section();
+  };
+  f.open_array_section("osds");
+  for (const auto& c : osds) {
+    f.open_object_section("osd");
+    f.dump_int("osd", c.osd);
+    dump_osd_state("old", c.before);
+    dump_osd_state("new", c.after);
+    f.close_section();
+  }
+  f.close_section();
+  auto dump_osds = [&f](const char *name, const vector<int>& v) {
+    f.open_array_section(name);
+    for (auto osd : v) {
+      f.dump_int("osd", osd);
+    }
+    f.close_section();
+  };
+  f.open_array_section("pgs");
+  for (const auto& c : pgs) {
+    f.open_object_section("pg");
+    f.dump_stream("pgid") << c.pgid;
+    f.dump_int("pool", c.pgid.pool());
+    f.dump_unsigned("ps", c.pgid.ps());
+    dump_osds("old_up", c.before_up);
+    dump_osds("new_up", c.after_up);
+    dump_osds("old_acting", c.before_acting);
+    dump_osds("new_acting", c.after_acting);
+    f.close_section();
+  }
+  f.close_section();
+  return f.get();
+}
+
 static int
 BasePyOSDMap_init(BasePyOSDMap *self, PyObject *args, PyObject *kwds)
 {
@@ -351,6 +528,8 @@ PyMethodDef BasePyOSDMap_methods[] = {
   {"_apply_incremental", (PyCFunction)osdmap_apply_incremental, METH_O,
    "Apply OSDMap::Incremental and return the resulting OSDMap"},
   {"_get_crush", (PyCFunction)osdmap_get_crush, METH_NOARGS, "Get CrushWrapper"},
+  {"_get_pool_pg_nums", (PyCFunction)osdmap_get_pool_pg_nums, METH_NOARGS,
+   "Get the pg_num of each pool"},
   {"_get_pools_by_take", (PyCFunction)osdmap_get_pools_by_take, METH_VARARGS,
    "Get pools that have CRUSH rules that TAKE the given root"},
   {"_calc_pg_upmaps", (PyCFunction)osdmap_calc_pg_upmaps, METH_VARARGS,
@@ -359,6 +538,10 @@ PyMethodDef BasePyOSDMap_methods[] = {
    "Calculate new pg-upmap-primary values"},
   {"_map_pool_pgs_up", (PyCFunction)osdmap_map_pool_pgs_up, METH_VARARGS,
    "Calculate up set mappings for all PGs in a pool"},
+  {"_get_pgs_up_with_osd", (PyCFunction)osdmap_get_pgs_up_with_osd, METH_VARARGS,
+   "Get the PGs with an OSD in their up set in this or another OSDMap"},
+  {"_diff", (PyCFunction)osdmap_diff, METH_VARARGS,
+   "Get the OSDs and PG mappings which differ in another OSDMap"},
   {"_pg_to_up_acting_osds", (PyCFunction)osdmap_pg_to_up_acting_osds, METH_VARARGS,
     "Calculate up+acting OSDs for a PG ID"},
   {"_pool_raw_used_rate", (PyCFunction)osdmap_pool_raw_used_rate, METH_VARARGS,
@@ -21,8 +21,10 @@ from rados cimport Rados
 {{endif}}
 
 from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import os
+import threading
 import time
 import stat
 from typing import Any, Dict, Optional
@@ -61,6 +63,11 @@ FALLOC_FL_KEEP_SIZE = 0x01
 FALLOC_FL_PUNCH_HOLE = 0x02
 FALLOC_FL_NO_HIDE_STALE = 0x04
 
+# size of the reads done by cptree() and default bound on the file data
+# held in memory by its copying threads.
+CPTREE_CHUNK_SIZE = 1 * 1024 * 1024
+CPTREE_MAX_INFLIGHT_BYTES = 64 * 1024 * 1024
+
 CEPH_SETATTR_MODE = 0x1
 CEPH_SETATTR_UID = 0x2
 CEPH_SETATTR_GID = 0x4
@@ -3217,13 +3224,21 @@ cdef class LibCephFS(object):
                 raise
 
     def cptree(self, src_path, dst_path, should_sync_attrs=False,
-               cp_src_dir=True, should_cancel=False, suppress_errors=False):
+               cp_src_dir=True, should_cancel=False, suppress_errors=False,
+               threads=1, max_inflight_bytes=CPTREE_MAX_INFLIGHT_BYTES,
+               progress=None):
         '''
         Copy entire file hierarchy under src using depth-first (to prevent
         excessive memory consumption) and non-recursive (to prevent hitting
         Python's max recursion limit error) approach.
 
         If src is regfile, symlink or something else, copy it to dst and return.
+
+        :param threads: number of threads copying files concurrently, the
+                        tree itself is still walked by the calling thread
+        :param max_inflight_bytes: bound on the file data read but not
+                                   written yet by the copying threads
+        :param progress: CptreeProgress counting the entries and bytes copied
         '''
         if isinstance(src_path, str):
             src_path = src_path.encode('utf-8')
@@ -3243,7 +3258,8 @@ cdef class LibCephFS(object):
         if stat.S_ISDIR(stx_b['mode']):
             cptree_worker = CptreeWorker(
                 self, src_path, dst_path, should_sync_attrs, cp_src_dir,
-                should_cancel, suppress_errors)
+                should_cancel, suppress_errors, threads, max_inflight_bytes,
+                progress)
 
             cptree_worker.start()
         elif stat.S_ISREG(stx_b['mode']):
@@ -3253,7 +3269,8 @@ cdef class LibCephFS(object):
             src_fd = self.open(src_dir, os.O_RDONLY | os.O_DIRECTORY, 0o755)
             dst_fd = self.open(dst_path, os.O_RDONLY | os.O_DIRECTORY, 0o755)
 
-            copy_reg_file(self, src_fd, dst_fd, src_file_name, should_sync_attrs)
+            copy_reg_file(self, src_fd, dst_fd, src_file_name, should_sync_attrs,
+                          progress=progress)
         elif stat.S_ISLNK(stx_b['mode']):
             src_dir = os.path.dirname(src_path)
             src_link_name = os.path.basename(src_path)
@@ -3261,7 +3278,8 @@ cdef class LibCephFS(object):
             src_fd = self.open(src_dir, os.O_RDONLY | os.O_DIRECTORY, 0o755)
             dst_fd = self.open(dst_path, os.O_RDONLY | os.O_DIRECTORY, 0o755)
 
-            copy_sym_link(self, src_fd, dst_fd, src_link_name, should_sync_attrs)
+            copy_sym_link(self, src_fd, dst_fd, src_link_name, should_sync_attrs,
+                          progress=progress)
         else:
             raise RuntimeError('expected a directory, regfile or symlink but '
                                f'found something else. src = {self.src_path}')
@@ -3528,6 +3546,109 @@ class RmtreeDir:
 
 # following code includes cptree() and related helper methods.
 
+class CptreeProgress:
+    '''
+    Number of entries (dirs, regular files and symlinks) and bytes copied by
+    cptree(). They can be read from another thread while the copy runs.
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = 0
+        self.bytes = 0
+
+    def add(self, entries=0, nbytes=0):
+        with self.lock:
+            self.entries += entries
+            self.bytes += nbytes
+
+    def get(self):
+        '''
+        Get the (entries, bytes) copied so far.
+        '''
+        with self.lock:
+            return self.entries, self.bytes
+
+
+class CptreeInflightBytes:
+    '''
+    Bound the amount of file data held in memory by the threads of a
+    CptreeCopier.
+    '''
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.cond = threading.Condition()
+
+    def acquire(self, size):
+        with self.cond:
+            # always let a single chunk through, whatever the limit.
+            while self.used and self.used + size > self.limit:
+                self.cond.wait()
+            self.used += size
+
+    def release(self, size):
+        with self.cond:
+            self.used -= size
+            self.cond.notify_all()
+
+
+class CptreeCopier:
+    '''
+    Copy the regular files and symlinks found by a CptreeWorker on a pool of
+    threads. The number of copies queued is bounded, so that the walk of the
+    file hierarchy doesn't run too far ahead of the copies.
+
+    The first error hit by a copy is raised by the next call to submit() or
+    wait_for_dir().
+    '''
+
+    def __init__(self, threads, max_inflight_bytes):
+        self.executor = ThreadPoolExecutor(max_workers=threads,
+                                           thread_name_prefix='cptree')
+        self.queue_slots = threading.BoundedSemaphore(threads * 4)
+        self.inflight = CptreeInflightBytes(max_inflight_bytes)
+        self.lock = threading.Lock()
+        self.error = None
+
+    def _raise_error(self):
+        with self.lock:
+            if self.error is not None:
+                raise self.error
+
+    def _run(self, copy_func, args):
+        try:
+            with self.lock:
+                if self.error is not None:
+                    return
+            copy_func(*args)
+        except BaseException as e:
+            with self.lock:
+                if self.error is None:
+                    self.error = e
+        finally:
+            self.queue_slots.release()
+
+    def submit(self, cptree_dir, copy_func, *args):
+        self._raise_error()
+        self.queue_slots.acquire()
+        future = self.executor.submit(self._run, copy_func, args)
+        cptree_dir.pending_copies.append(future)
+
+    def wait_for_dir(self, cptree_dir):
+        '''
+        Wait until the files of a dir have been copied.
+        '''
+        for future in cptree_dir.pending_copies:
+            future.result()
+        cptree_dir.pending_copies = []
+        self._raise_error()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
 class CptreeWorker:
     '''
     Contains code to non-recursively copy a file hierarchy present under a
@@ -3537,7 +3658,8 @@ class CptreeWorker:
 
     def __init__(self, fs, src_path, dst_path, should_sync_attrs=False,
                  cp_src_dir=False, should_cancel=lambda: False,
-                 suppress_errors=False):
+                 suppress_errors=False, threads=1,
+                 max_inflight_bytes=CPTREE_MAX_INFLIGHT_BYTES, progress=None):
         self.fs = fs
 
         # source and destination path passed by the user.
@@ -3564,6 +3686,14 @@ class CptreeWorker:
         # stack.
         self.curr_dir = None
 
+        # files are copied by the calling thread unless more threads are
+        # asked for.
+        self.threads = threads
+        self.max_inflight_bytes = max_inflight_bytes
+        self.copier = None
+
+        self.progress = progress
+
     def _do_sanity_check_for_paths(self):
         if self.src_path == b'/':
             raise PermissionError(1, 'can\'t copy dir into itself')
@@ -3601,6 +3731,8 @@ class CptreeWorker:
             self.stack.append(CptreeDir(self.fs, de_name, de_name,
                                         self.curr_dir,
                                         should_sync_attrs=self.should_sync_attrs))
+            if self.progress:
+                self.progress.add(entries=1)
             return True
         except Error as e:
             if self.suppress_errors:
@@ -3615,6 +3747,16 @@ class CptreeWorker:
                 raise
 
     def start(self):
+        if self.threads > 1:
+            self.copier = CptreeCopier(self.threads, self.max_inflight_bytes)
+        try:
+            self._copy_tree()
+        finally:
+            if self.copier:
+                self.copier.shutdown()
+                self.copier = None
+
+    def _copy_tree(self):
         # initiate stack with first entry
         try:
             if self.cp_src_dir:
@@ -3654,14 +3796,27 @@ class CptreeWorker:
                         # dir that has been freshly added to the stack.
                         finished_copying_curr_dir = False
                         break
+                elif self.copier:
+                    if de.is_symbol_file():
+                        self.copier.submit(self.curr_dir,
+                                           self.curr_dir.copy_sym_link,
+                                           de.d_name, self.progress)
+                    else:
+                        self.copier.submit(self.curr_dir,
+                                           self.curr_dir.copy_reg_file,
+                                           de.d_name, self.copier.inflight,
+                                           self.progress)
                 elif de.is_symbol_file():
-                    self.curr_dir.copy_sym_link(de.d_name)
+                    self.curr_dir.copy_sym_link(de.d_name, self.progress)
                 else:
-                    self.curr_dir.copy_reg_file(de.d_name)
+                    self.curr_dir.copy_reg_file(de.d_name,
+                                                progress=self.progress)
 
                 de = self.curr_dir.read_src_dir()
 
             if finished_copying_curr_dir:
+                if self.copier:
+                    self.copier.wait_for_dir(self.curr_dir)
                 # XXX if attrs are sync-ed during creation of dir on destination
                 # side, it's mtime would change as files are copied underneath
                 # it. to avoid this, first copy all files and then sync attrs.
@@ -3711,6 +3866,10 @@ class CptreeDir:
         # Indicates whether an error occured during call to readdir().
         self.has_readdir_failed = False
 
+        # Copies of the entries of this dir handed to a CptreeCopier that
+        # may not have finished yet.
+        self.pending_copies = []
+
     def __str__(self):
         return f'{self.src_rel_path}, {self.dst_rel_path}'
 
@@ -3779,13 +3938,13 @@ class CptreeDir:
             sync_attrs(self.fs, self.parent_dir_src_fd, self.parent_dir_dst_fd,
                        self.dst_rel_path)
 
-    def copy_reg_file(self, de_name):
+    def copy_reg_file(self, de_name, inflight=None, progress=None):
         copy_reg_file(self.fs, self.src_fd, self.dst_fd, de_name,
-                      self.should_sync_attrs)
+                      self.should_sync_attrs, inflight, progress)
 
-    def copy_sym_link(self, de_name):
+    def copy_sym_link(self, de_name, progress=None):
         copy_sym_link(self.fs, self.src_fd, self.dst_fd, de_name,
-                      self.should_sync_attrs)
+                      self.should_sync_attrs, progress)
 
 
 def sync_attrs(fs, src_fd, dst_fd, de_name, src_stx_b=None):
@@ -3811,7 +3970,8 @@ def sync_attrs(fs, src_fd, dst_fd, de_name, src_stx_b=None):
         raise e
 
 
-def copy_reg_file(fs, src_fd, dst_fd, file_name, should_sync_attrs=False):
+def copy_reg_file(fs, src_fd, dst_fd, file_name, should_sync_attrs=False,
+                  inflight=None, progress=None):
     src_file_fd = dst_file_fd = None
     try:
         src_file_fd = fs.openat(src_fd, file_name, os.O_RDONLY, 0o755)
@@ -3825,13 +3985,21 @@ def copy_reg_file(fs, src_fd, dst_fd, file_name, should_sync_attrs=False):
         raise
 
     while True:
-        data = fs.read(src_file_fd, -1, 1 * 1024 * 1024)
-        if not len(data):
-            break
-
-        written = 0
-        while written < len(data):
-            written += fs.write(dst_file_fd, data[written:], -1)
+        if inflight:
+            inflight.acquire(CPTREE_CHUNK_SIZE)
+        try:
+            data = fs.read(src_file_fd, -1, CPTREE_CHUNK_SIZE)
+            if not len(data):
+                break
+
+            written = 0
+            while written < len(data):
+                written += fs.write(dst_file_fd, data[written:], -1)
+            if progress:
+                progress.add(nbytes=written)
+        finally:
+            if inflight:
+                inflight.release(CPTREE_CHUNK_SIZE)
 
     if should_sync_attrs:
         sync_attrs(fs, src_fd, dst_fd, file_name)
@@ -3840,8 +4008,12 @@ def copy_reg_file(fs, src_fd, dst_fd, file_name, should_sync_attrs=False):
     fs.close(src_file_fd)
     fs.close(dst_file_fd)
 
+    if progress:
+        progress.add(entries=1)
 
-def copy_sym_link(fs, src_fd, dst_fd, de_name, should_sync_attrs=False):
+
+def copy_sym_link(fs, src_fd, dst_fd, de_name, should_sync_attrs=False,
+                  progress=None):
     flags = (CEPH_STATX_UID | CEPH_STATX_GID | CEPH_STATX_MODE |
              CEPH_STATX_ATIME | CEPH_STATX_MTIME | CEPH_STATX_SIZE)
     # src_stx_b = statx buffer for source path
@@ -3865,3 +4037,6 @@ def copy_sym_link(fs, src_fd, dst_fd, de_name, should_sync_attrs=False):
 
     if should_sync_attrs:
         sync_attrs(fs, src_fd, dst_fd, de_name, src_stx_b)
+
+    if progress:
+        progress.add(entries=1)
@@ -2,7 +2,6 @@
 Balance PG distribution across OSDs.
 """
 
-import copy
 import enum
 import errno
 import json
@@ -21,33 +20,153 @@ TIME_FORMAT = '%Y-%m-%d_%H:%M:%S'
 
 
 class MappingState:
-    def __init__(self, osdmap, raw_pg_stats, raw_pool_stats, desc=''):
+    """
+    The up mappings of the PGs of an OSDMap, plus the PG stats to weigh them.
+
+    If a ``parent`` state of the same cluster is given (e.g. the initial
+    state of a plan), the mappings are derived from the parent's by only
+    updating the PGs whose up set differs between the two maps.  If
+    ``moved_pgids`` lists the only PGs which may have moved (e.g. the ones a
+    plan added or removed upmaps for), only those are mapped.  Otherwise the
+    PGs of the new map are mapped and compared with the parent's mappings.
+    """
+
+    def __init__(self, osdmap, raw_pg_stats, raw_pool_stats, desc='', parent=None,
+                 moved_pgids=None):
         self.desc = desc
         self.osdmap = osdmap
-        self.osdmap_dump = self.osdmap.dump()
         self.crush = osdmap.get_crush()
-        self.crush_dump = self.crush.dump()
         self.raw_pg_stats = raw_pg_stats
         self.raw_pool_stats = raw_pool_stats
-        self.pg_stat = {
-            i['pgid']: i['stat_sum'] for i in raw_pg_stats.get('pg_stats', [])
-        }
-        osd_poolids = [p['pool'] for p in self.osdmap_dump.get('pools', [])]
+        self._osdmap_dump: Optional[Dict[str, Any]] = None
+        self._crush_dump: Optional[Dict[str, Any]] = None
+        # pool id -> (pgs, objects, bytes) by osd, see pool_counts()
+        self._pool_counts: Dict[int, Tuple[Dict[int, int], ...]] = {}
+        self.parent: Optional['MappingState'] = None
+        # pgids whose up set differs from the parent's
+        self.changed_pgs: Dict[str, Tuple[List[int], List[int]]] = {}
+        self.pg_num = osdmap.get_pool_pg_nums()
+        if parent is not None and parent.raw_pg_stats is raw_pg_stats:
+            self.pg_stat = parent.pg_stat
+        else:
+            self.pg_stat = {
+                i['pgid']: i['stat_sum'] for i in raw_pg_stats.get('pg_stats', [])
+            }
         pg_poolids = [p['poolid'] for p in raw_pool_stats.get('pool_stats', [])]
-        self.poolids = set(osd_poolids) & set(pg_poolids)
-        self.pg_up = {}
-        self.pg_up_by_poolid = {}
+        self.poolids = set(self.pg_num) & set(pg_poolids)
+        self.pg_up: Dict[str, List[int]] = {}
+        self.pg_up_by_poolid: Dict[int, Dict[str, List[int]]] = {}
+        if parent is not None and parent.poolids == self.poolids:
+            self._derive_from(parent, moved_pgids)
+            return
         for poolid in self.poolids:
             self.pg_up_by_poolid[poolid] = osdmap.map_pool_pgs_up(poolid)
             for a, b in self.pg_up_by_poolid[poolid].items():
                 self.pg_up[a] = b
 
+    def _derive_from(self, parent: 'MappingState',
+                     moved_pgids: Optional[Sequence[str]]) -> None:
+        self.parent = parent
+        if moved_pgids is None:
+            # the parent's mappings are known, only map the new map
+            for poolid in self.poolids:
+                before = parent.pg_up_by_poolid[poolid]
+                after = self.osdmap.map_pool_pgs_up(poolid)
+                self.pg_up_by_poolid[poolid] = after
+                self.pg_up.update(after)
+                for pgid, up in after.items():
+                    old_up = before.get(pgid, [])
+                    if old_up != up:
+                        self.changed_pgs[pgid] = (old_up, up)
+                for pgid, up in before.items():
+                    if pgid not in after:
+                        # the pool was merged
+                        self.changed_pgs[pgid] = (up, [])
+            return
+        self.pg_up = dict(parent.pg_up)
+        for poolid, pm in parent.pg_up_by_poolid.items():
+            self.pg_up_by_poolid[poolid] = dict(pm)
+        for pgid in set(moved_pgids):
+            pool, seed = pgid.split('.')
+            poolid, ps = int(pool), int(seed, 16)
+            if poolid not in self.poolids:
+                continue
+            old_up = parent.pg_up.get(pgid, [])
+            new_up = self.osdmap.pg_to_up_acting_osds(poolid, ps)['up']
+            if old_up == new_up:
+                continue
+            pm = self.pg_up_by_poolid[poolid]
+            if ps < self.pg_num[poolid]:
+                pm[pgid] = new_up
+                self.pg_up[pgid] = new_up
+            else:
+                # the pool was merged
+                pm.pop(pgid, None)
+                self.pg_up.pop(pgid, None)
+            self.changed_pgs[pgid] = (old_up, new_up)
+
+    @property
+    def osdmap_dump(self) -> Dict[str, Any]:
+        if self._osdmap_dump is None:
+            self._osdmap_dump = self.osdmap.dump()
+        return self._osdmap_dump
+
+    @property
+    def crush_dump(self) -> Dict[str, Any]:
+        if self._crush_dump is None:
+            self._crush_dump = self.crush.dump()
+        return self._crush_dump
+
+    def pool_counts(self, poolid: int) -> Tuple[Dict[int, int], ...]:
+        """
+        Get the number of PG instances, objects and bytes of a pool on
+        each OSD of its up sets.  The counts are cached, and updated from
+        the parent's for the PGs which moved if there is one.
+        """
+        counts = self._pool_counts.get(poolid)
+        if counts is not None:
+            return counts
+        pg_stat = self.pg_stat
+        if self.parent is not None:
+            pgs_by_osd, objects_by_osd, bytes_by_osd = \
+                [dict(c) for c in self.parent.pool_counts(poolid)]
+            # PGs removed by a merge are only in the parent's mappings
+            changes = [(pgid, ups) for pgid, ups in self.changed_pgs.items()
+                       if pgid in self.pg_up_by_poolid[poolid]
+                       or pgid in self.parent.pg_up_by_poolid[poolid]]
+        else:
+            pgs_by_osd, objects_by_osd, bytes_by_osd = {}, {}, {}
+            changes = [(pgid, ([], up))
+                       for pgid, up in self.pg_up_by_poolid[poolid].items()]
+        for pgid, (before, after) in changes:
+            for delta, up in ((-1, before), (1, after)):
+                for osd in [int(osd) for osd in up]:
+                    if osd == CRUSHMap.ITEM_NONE:
+                        continue
+                    if osd not in pgs_by_osd:
+                        pgs_by_osd[osd] = 0
+                        objects_by_osd[osd] = 0
+                        bytes_by_osd[osd] = 0
+                    pgs_by_osd[osd] += delta
+                    objects_by_osd[osd] += delta * pg_stat[pgid]['num_objects']
+                    bytes_by_osd[osd] += delta * pg_stat[pgid]['num_bytes']
+                    if pgs_by_osd[osd] == 0:
+                        del pgs_by_osd[osd]
+                        del objects_by_osd[osd]
+                        del bytes_by_osd[osd]
+        counts = (pgs_by_osd, objects_by_osd, bytes_by_osd)
+        self._pool_counts[poolid] = counts
+        return counts
+
     def calc_misplaced_from(self, other_ms):
         num = len(other_ms.pg_up)
         misplaced = 0
-        for pgid, before in other_ms.pg_up.items():
-            if before != self.pg_up.get(pgid, []):
-                misplaced += 1
+        if self.parent is other_ms:
+            misplaced = sum(1 for pgid in self.changed_pgs if pgid in other_ms.pg_up)
+        else:
+            for pgid, before in other_ms.pg_up.items():
+                if before != self.pg_up.get(pgid, []):
+                    misplaced += 1
         if num > 0:
             return float(misplaced) / float(num)
         return 0.0
@@ -89,13 +208,30 @@ class MsPlan(Plan):
         super(MsPlan, self).__init__(name, mode, ms.osdmap, pools)
         self.initial = ms
 
+    def moved_pgids(self) -> Optional[List[str]]:
+        """
+        Get the PGs whose up set this plan may change, or None if it
+        changes weights, which can move any PG.
+        """
+        if self.osd_weights or self.compat_ws:
+            return None
+        incdump = self.inc.dump()
+        pgids: List[str] = []
+        for key in ('new_pg_upmap', 'new_pg_upmap_items', 'new_pg_upmap_primaries'):
+            pgids.extend(item['pgid'] for item in incdump.get(key, []))
+        for key in ('old_pg_upmap', 'old_pg_upmap_items', 'old_pg_upmap_primaries'):
+            pgids.extend(incdump.get(key, []))
+        return pgids
+
     def final_state(self) -> MappingState:
         self.inc.set_osd_reweights(self.osd_weights)
         self.inc.set_crush_compat_weight_set_weights(self.compat_ws)
         return MappingState(self.initial.osdmap.apply_incremental(self.inc),
                             self.initial.raw_pg_stats,
                             self.initial.raw_pool_stats,
-                            'plan %s final' % self.name)
+                            'plan %s final' % self.name,
+                            parent=self.initial,
+                            moved_pgids=self.moved_pgids())
 
     def show(self) -> str:
         ls = []
@@ -871,40 +1007,29 @@ class Module(MgrModule):
         # pool and root actual
         for pool, pi in pool_info.items():
             poolid = pi['pool']
-            pm = ms.pg_up_by_poolid[poolid]
+            pgs_by_osd, objects_by_osd, bytes_by_osd = ms.pool_counts(poolid)
             pgs = 0
             objects = 0
             bytes = 0
-            pgs_by_osd = {}
-            objects_by_osd = {}
-            bytes_by_osd = {}
-            for pgid, up in pm.items():
-                for osd in [int(osd) for osd in up]:
-                    if osd == CRUSHMap.ITEM_NONE:
-                        continue
-                    if osd not in pgs_by_osd:
-                        pgs_by_osd[osd] = 0
-                        objects_by_osd[osd] = 0
-                        bytes_by_osd[osd] = 0
-                    pgs_by_osd[osd] += 1
-                    objects_by_osd[osd] += ms.pg_stat[pgid]['num_objects']
-                    bytes_by_osd[osd] += ms.pg_stat[pgid]['num_bytes']
-                    # pick a root to associate this pg instance with.
-                    # note that this is imprecise if the roots have
-                    # overlapping children.
-                    # FIXME: divide bytes by k for EC pools.
-                    for root in pe.pool_roots[pool]:
-                        if osd in pe.target_by_root[root]:
-                            actual_by_root[root]['pgs'][osd] += 1
-                            actual_by_root[root]['objects'][osd] += ms.pg_stat[pgid]['num_objects']
-                            actual_by_root[root]['bytes'][osd] += ms.pg_stat[pgid]['num_bytes']
-                            pgs += 1
-                            objects += ms.pg_stat[pgid]['num_objects']
-                            bytes += ms.pg_stat[pgid]['num_bytes']
-                            pe.total_by_root[root]['pgs'] += 1
-                            pe.total_by_root[root]['objects'] += ms.pg_stat[pgid]['num_objects']
-                            pe.total_by_root[root]['bytes'] += ms.pg_stat[pgid]['num_bytes']
-                            break
+            for osd, osd_pgs in pgs_by_osd.items():
+                # pick a root to associate the pg instances on this osd
+                # with.  note that this is imprecise if the roots have
+                # overlapping children.
+                # FIXME: divide bytes by k for EC pools.
+                for root in pe.pool_roots[pool]:
+                    if osd in pe.target_by_root[root]:
+                        osd_objects = objects_by_osd[osd]
+                        osd_bytes = bytes_by_osd[osd]
+                        actual_by_root[root]['pgs'][osd] += osd_pgs
+                        actual_by_root[root]['objects'][osd] += osd_objects
+                        actual_by_root[root]['bytes'][osd] += osd_bytes
+                        pgs += osd_pgs
+                        objects += osd_objects
+                        bytes += osd_bytes
+                        pe.total_by_root[root]['pgs'] += osd_pgs
+                        pe.total_by_root[root]['objects'] += osd_objects
+                        pe.total_by_root[root]['bytes'] += osd_bytes
+                        break
             pe.count_by_pool[pool] = {
                 'pgs': {
                     k: v
@@ -1282,13 +1407,13 @@ class Module(MgrModule):
             key = 'pgs'
 
         # go
-        best_ws = copy.deepcopy(orig_ws)
-        best_ow = copy.deepcopy(orig_osd_weight)
+        best_ws = dict(orig_ws)
+        best_ow = dict(orig_osd_weight)
         best_pe = pe
         left = max_iterations
         bad_steps = 0
-        next_ws = copy.deepcopy(best_ws)
-        next_ow = copy.deepcopy(best_ow)
+        next_ws = dict(best_ws)
+        next_ow = dict(best_ow)
         while left > 0:
             # adjust
             self.log.debug('best_ws %s' % best_ws)
@@ -1358,7 +1483,7 @@ class Module(MgrModule):
                         next_ws[osd] = next_ws[osd] / factor
 
             # recalc
-            plan.compat_ws = copy.deepcopy(next_ws)
+            plan.compat_ws = dict(next_ws)
             next_ms = plan.final_state()
             next_pe = self.calc_eval(next_ms, plan.pools)
             next_misplaced = next_ms.calc_misplaced_from(ms)
@@ -1371,8 +1496,8 @@ class Module(MgrModule):
                                    next_misplaced, max_misplaced)
                     break
                 step /= 2.0
-                next_ws = copy.deepcopy(best_ws)
-                next_ow = copy.deepcopy(best_ow)
+                next_ws = dict(best_ws)
+                next_ow = dict(best_ow)
                 self.log.debug('Step misplaced %f > max %f, reducing step to %f',
                                next_misplaced, max_misplaced, step)
             else:
@@ -1382,15 +1507,15 @@ class Module(MgrModule):
                         self.log.debug('Score got worse, taking another step')
                     else:
                         step /= 2.0
-                        next_ws = copy.deepcopy(best_ws)
-                        next_ow = copy.deepcopy(best_ow)
+                        next_ws = dict(best_ws)
+                        next_ow = dict(best_ow)
                         self.log.debug('Score got worse, trying smaller step %f',
                                        step)
                 else:
                     bad_steps = 0
                     best_pe = next_pe
-                    best_ws = copy.deepcopy(next_ws)
-                    best_ow = copy.deepcopy(next_ow)
+                    best_ws = dict(next_ws)
+                    best_ow = dict(next_ow)
                     if best_pe.score == 0:
                         break
             left -= 1
@@ -0,0 +1,162 @@
+from unittest import mock
+
+import pytest
+
+from ..module import MappingState, MsPlan
+
+NUM_OSDS = 6
+PG_NUMS = {1: 16, 2: 8}
+
+
+class FakeIncremental:
+    def __init__(self):
+        self.pg_upmap_items = {}
+        self.old_pg_upmap_items = []
+        self.weights = {}
+
+    def set_osd_reweights(self, weights):
+        self.weights.update(weights)
+
+    def set_crush_compat_weight_set_weights(self, weights):
+        pass
+
+    def dump(self):
+        return {
+            'new_pg_upmap_items': [
+                {'pgid': pgid,
+                 'mappings': [{'from': f, 'to': t} for f, t in items]}
+                for pgid, items in self.pg_upmap_items.items()],
+            'old_pg_upmap_items': list(self.old_pg_upmap_items),
+        }
+
+
+class FakeOSDMap:
+    """
+    Maps the PGs of each pool onto three consecutive OSDs, skipping OSDs
+    with a zero weight, and applies pg_upmap_items.
+    """
+    def __init__(self, weights=None, pg_upmap_items=None, pg_nums=None):
+        self.weights = weights or {}
+        self.pg_nums = pg_nums or PG_NUMS
+        self.pg_upmap_items = pg_upmap_items or {}
+        self.diff = mock.Mock(side_effect=self._diff)
+        self.dump = mock.Mock(return_value={'pools': []})
+
+    def get_crush(self):
+        return mock.MagicMock()
+
+    def get_pool_pg_nums(self):
+        return dict(self.pg_nums)
+
+    def _up(self, poolid, ps):
+        osds = [osd for osd in range(NUM_OSDS) if self.weights.get(osd, 1.0) > 0]
+        start = (poolid + ps) % len(osds)
+        up = [osds[(start + i) % len(osds)] for i in range(3)]
+        for f, t in self.pg_upmap_items.get('%d.%x' % (poolid, ps), []):
+            up = [t if osd == f else osd for osd in up]
+        return up
+
+    def map_pool_pgs_up(self, poolid):
+        return {'%d.%x' % (poolid, ps): self._up(poolid, ps)
+                for ps in range(self.pg_nums[poolid])}
+
+    def pg_to_up_acting_osds(self, poolid, ps):
+        up = self._up(poolid, ps)
+        return {'up': up, 'acting': up, 'up_primary': up[0], 'acting_primary': up[0]}
+
+    def new_incremental(self):
+        return FakeIncremental()
+
+    def apply_incremental(self, inc):
+        weights = dict(self.weights)
+        weights.update(inc.weights)
+        upmaps = dict(self.pg_upmap_items)
+        for pgid in inc.old_pg_upmap_items:
+            upmaps.pop(pgid, None)
+        upmaps.update(inc.pg_upmap_items)
+        return FakeOSDMap(weights, upmaps, self.pg_nums)
+
+    def _diff(self, other):
+        pgs = []
+        for poolid, pg_num in PG_NUMS.items():
+            for ps in range(pg_num):
+                old_up, new_up = self._up(poolid, ps), other._up(poolid, ps)
+                if old_up != new_up:
+                    pgs.append({'pgid': '%d.%x' % (poolid, ps), 'pool': poolid,
+                                'ps': ps, 'old_up': old_up, 'new_up': new_up})
+        return {'pgs': pgs}
+
+
+@pytest.fixture(autouse=True)
+def crush_map():
+    # CRUSHMap derives from the mocked ceph_module here
+    with mock.patch('balancer.module.CRUSHMap') as crush_map:
+        crush_map.ITEM_NONE = 0x7fffffff
+        yield crush_map
+
+
+@pytest.fixture
+def stats():
+    pg_stats = {'pg_stats': [
+        {'pgid': '%d.%x' % (poolid, ps),
+         'stat_sum': {'num_objects': ps + 1, 'num_bytes': 1024 * (ps + poolid)}}
+        for poolid, pg_num in PG_NUMS.items() for ps in range(pg_num)]}
+    pool_stats = {'pool_stats': [{'poolid': poolid} for poolid in PG_NUMS]}
+    return pg_stats, pool_stats
+
+
+def assert_same_state(derived, fresh):
+    assert derived.poolids == fresh.poolids
+    assert derived.pg_up == fresh.pg_up
+    assert derived.pg_up_by_poolid == fresh.pg_up_by_poolid
+    for poolid in fresh.poolids:
+        assert derived.pool_counts(poolid) == fresh.pool_counts(poolid)
+
+
+def test_upmap_plan_derives_from_upmap_deltas(stats):
+    initial_map = FakeOSDMap(pg_upmap_items={'1.3': [(4, 0)], '2.5': [(1, 5)]})
+    initial = MappingState(initial_map, *stats, desc='initial')
+    initial_map.dump.assert_not_called()
+    plan = MsPlan('plan', 'upmap-read', initial, [])
+    plan.inc.pg_upmap_items = {'1.0': [(1, 5)], '2.2': [(4, 1)]}
+    plan.inc.old_pg_upmap_items = ['2.5']
+
+    final = plan.final_state()
+    fresh = MappingState(final.osdmap, *stats, desc='fresh')
+
+    initial_map.diff.assert_not_called()
+    final.osdmap.dump.assert_not_called()
+    assert set(final.changed_pgs) == {'1.0', '2.2', '2.5'}
+    assert_same_state(final, fresh)
+    assert final.calc_misplaced_from(initial) == pytest.approx(3 / 24)
+
+
+def test_weight_plan_maps_only_the_new_map(stats):
+    initial_map = FakeOSDMap()
+    initial = MappingState(initial_map, *stats, desc='initial')
+    plan = MsPlan('plan', 'crush-compat', initial, [])
+    plan.osd_weights = {2: 0.0}
+
+    with mock.patch.object(initial_map, 'map_pool_pgs_up') as map_initial:
+        final = plan.final_state()
+    fresh = MappingState(final.osdmap, *stats, desc='fresh')
+
+    # the parent's mappings are reused, not recomputed
+    map_initial.assert_not_called()
+    initial_map.diff.assert_not_called()
+    assert final.changed_pgs
+    assert_same_state(final, fresh)
+    misplaced = final.calc_misplaced_from(initial)
+    assert misplaced == fresh.calc_misplaced_from(initial)
+    assert misplaced == pytest.approx(len(final.changed_pgs) / 24)
+
+
+def test_merged_pool(stats):
+    initial = MappingState(FakeOSDMap(), *stats, desc='initial')
+    merged_map = FakeOSDMap(weights={0: 0.0}, pg_nums={1: 16, 2: 4})
+
+    derived = MappingState(merged_map, *stats, desc='derived', parent=initial)
+    fresh = MappingState(merged_map, *stats, desc='fresh')
+
+    assert {'2.4', '2.5', '2.6', '2.7'} <= set(derived.changed_pgs)
+    assert_same_state(derived, fresh)
@@ -25,6 +25,8 @@ class BasePyOSDMap(object):
     def _balance_primaries(self, pool_id, inc):...
     def _map_pool_pgs_up(self, poolid):...
     def _pg_to_up_acting_osds(self, pool_id, ps):...
+    def _get_pgs_up_with_osd(self, other, osd, only_changed):...
+    def _diff(self, other):...
     def _pool_raw_used_rate(self, pool_id):...
     @classmethod
     def _build_simple(cls, epoch: int, uuid: Optional[str], num_osd: int) -> 'BasePyOSDMap' :...
@@ -80,6 +82,7 @@ class BaseMgrModule(object):
                                                                  List[ServerInfoT]]: ...
     def _ceph_get_unlabeled_perf_schema(self, svc_type: str, svc_name: str) -> Dict[str, Any]: ...
     def _ceph_get_perf_schema(self, svc_type: str, svc_name: str) -> Dict[str, Any]: ...
+    def _ceph_get_perf_counters_bulk(self, svc_types: List[str], prio_limit: int, labeled: bool) -> Dict[str, Any]: ...
     def _ceph_get_rocksdb_version(self) -> str: ...
     def _ceph_get_unlabeled_counter(self, svc_type: str, svc_name: str, path: str) -> Dict[str, List[Tuple[float, int]]]: ...
     def _ceph_get_latest_unlabeled_counter(self, svc_type, svc_name, path): ...
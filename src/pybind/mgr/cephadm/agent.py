@@ -1,5 +1,6 @@
 import cherrypy
 import json
+import multiprocessing.pool
 import socket
 import ssl
 import threading
@@ -27,6 +28,9 @@ if TYPE_CHECKING:
 
 
 CEPHADM_AGENT_CERT_DURATION = (365 * 5)
+# how long the client cert the mgr uses to message the agents is reused
+CEPHADM_AGENT_CLIENT_CERT_ROTATION = 24 * 60 * 60
+CEPHADM_AGENT_MESSAGE_THREADS = 10
 
 
 class AgentEndpoint:
@@ -759,6 +763,10 @@ class HostData:
             if 'volume' in data and data['volume']:
                 ret = Devices.from_json(json.loads(data['volume']))
                 self.mgr.cache.update_host_devices(host, ret.devices)
+            unchanged = data.get('unchanged') or []
+            if unchanged:
+                # sections left out of the report as they did not change
+                self.mgr.cache.mark_host_metadata_current(host, unchanged)
 
             if (
                 error_daemons_old != set([dd.name() for dd in self.mgr.cache.get_error_daemons()])
@@ -768,7 +776,7 @@ class HostData:
                     f'Change detected in state of daemons from {host} agent metadata. Kicking serve loop')
                 self.mgr._kick_serve_loop()
 
-            if up_to_date and ('ls' in data and data['ls']):
+            if up_to_date and (('ls' in data and data['ls']) or 'ls' in unchanged):
                 was_out_of_date = not self.mgr.cache.all_host_metadata_up_to_date()
                 self.mgr.cache.metadata_up_to_date[host] = True
                 if was_out_of_date and self.mgr.cache.all_host_metadata_up_to_date():
@@ -787,7 +795,70 @@ class HostData:
             return err_str
 
 
-class AgentMessageThread(threading.Thread):
+class AgentClientTLS:
+    """
+    The SSL context used to message the agents.  The client cert is
+    generated once and shared by all messages until it gets rotated, or
+    the root CA changes.  The TLS sessions to each agent are kept as well,
+    so that the next message to an agent can resume it rather than doing a
+    full handshake.
+    """
+
+    def __init__(self, mgr: "CephadmOrchestrator") -> None:
+        self.mgr = mgr
+        self.lock = threading.Lock()
+        self.ssl_ctx: Optional[ssl.SSLContext] = None
+        self.root_cert: Optional[str] = None
+        self.created = 0.0
+        self.sessions: Dict[Tuple[str, int], ssl.SSLSession] = {}
+
+    def get_ssl_context(self) -> ssl.SSLContext:
+        root_cert = self.mgr.cert_mgr.get_root_ca()
+        with self.lock:
+            if (
+                self.ssl_ctx is None
+                or root_cert != self.root_cert
+                or time.monotonic() - self.created > CEPHADM_AGENT_CLIENT_CERT_ROTATION
+            ):
+                self.ssl_ctx = self._create_ssl_context(root_cert)
+                self.root_cert = root_cert
+                self.created = time.monotonic()
+                # sessions can only be resumed by the context which created them
+                self.sessions.clear()
+            return self.ssl_ctx
+
+    def _create_ssl_context(self, root_cert: str) -> ssl.SSLContext:
+        self.mgr.log.debug('Generating client certificate for messaging agents')
+        tls_pair = self.mgr.cert_mgr.generate_cert(self.mgr.get_hostname(), self.mgr.get_mgr_ip(), duration_in_days=CEPHADM_AGENT_CERT_DURATION)
+        ssl_ctx = ssl.create_default_context(ssl.Purpose.SERVER_AUTH, cadata=root_cert)
+        ssl_ctx.verify_mode = ssl.CERT_REQUIRED
+        ssl_ctx.check_hostname = True
+        # load_cert_chain() only reads from files, they are not needed afterwards
+        with tempfile.NamedTemporaryFile() as cert_tmp, tempfile.NamedTemporaryFile() as key_tmp:
+            cert_tmp.write(tls_pair.cert.encode('utf-8'))
+            cert_tmp.flush()
+            key_tmp.write(tls_pair.key.encode('utf-8'))
+            key_tmp.flush()
+            ssl_ctx.load_cert_chain(cert_tmp.name, key_tmp.name)
+        return ssl_ctx
+
+    def get_session(self, ssl_ctx: ssl.SSLContext, addr: str, port: int) -> Optional[ssl.SSLSession]:
+        with self.lock:
+            if ssl_ctx is not self.ssl_ctx:
+                return None
+            return self.sessions.get((addr, port))
+
+    def save_session(self, ssl_ctx: ssl.SSLContext, addr: str, port: int, session: Optional[ssl.SSLSession]) -> None:
+        with self.lock:
+            if ssl_ctx is not self.ssl_ctx:
+                return
+            if session is None:
+                self.sessions.pop((addr, port), None)
+            else:
+                self.sessions[(addr, port)] = session
+
+
+class AgentMessage:
     def __init__(self, host: str, port: int, data: Dict[Any, Any], mgr: "CephadmOrchestrator", daemon_spec: Optional[CephadmDaemonDeploySpec] = None) -> None:
         self.mgr = mgr
         self.agent = mgr.http_server.agent
@@ -797,38 +868,24 @@ class AgentMessageThread(threading.Thread):
         self.data: str = json.dumps(data)
         self.daemon_spec: Optional[CephadmDaemonDeploySpec] = daemon_spec
         self.agent_response: str = ''
-        super().__init__(target=self.run)
 
     def run(self) -> None:
+        # sending_agent_message[host] is set when the message is queued (see
+        # CephadmAgentHelpers._request_agent_acks) so the host is not queued
+        # again while this message waits for a pool thread or retries
+        try:
+            self._send()
+        finally:
+            self.mgr.agent_cache.sending_agent_message[self.host] = False
+
+    def _send(self) -> None:
         self.mgr.log.debug(f'Sending message to agent on host {self.host}')
-        self.mgr.agent_cache.sending_agent_message[self.host] = True
         try:
             assert self.agent
-            root_cert = self.mgr.cert_mgr.get_root_ca()
-            root_cert_tmp = tempfile.NamedTemporaryFile()
-            root_cert_tmp.write(root_cert.encode('utf-8'))
-            root_cert_tmp.flush()
-            root_cert_fname = root_cert_tmp.name
-
-            tls_pair = self.mgr.cert_mgr.generate_cert(self.mgr.get_hostname(), self.mgr.get_mgr_ip(), duration_in_days=CEPHADM_AGENT_CERT_DURATION)
-
-            cert_tmp = tempfile.NamedTemporaryFile()
-            cert_tmp.write(tls_pair.cert.encode('utf-8'))
-            cert_tmp.flush()
-            cert_fname = cert_tmp.name
-
-            key_tmp = tempfile.NamedTemporaryFile()
-            key_tmp.write(tls_pair.key.encode('utf-8'))
-            key_tmp.flush()
-            key_fname = key_tmp.name
-
-            ssl_ctx = ssl.create_default_context(ssl.Purpose.SERVER_AUTH, cafile=root_cert_fname)
-            ssl_ctx.verify_mode = ssl.CERT_REQUIRED
-            ssl_ctx.check_hostname = True
-            ssl_ctx.load_cert_chain(cert_fname, key_fname)
+            client_tls = self.mgr.agent_helpers.client_tls
+            ssl_ctx = client_tls.get_ssl_context()
         except Exception as e:
             self.mgr.log.error(f'Failed to get certs for connecting to agent: {e}')
-            self.mgr.agent_cache.sending_agent_message[self.host] = False
             return
         try:
             bytes_len: str = str(len(self.data.encode('utf-8')))
@@ -839,44 +896,45 @@ class AgentMessageThread(threading.Thread):
                 bytes_len = '0' + bytes_len
         except Exception as e:
             self.mgr.log.error(f'Failed to get length of json payload: {e}')
-            self.mgr.agent_cache.sending_agent_message[self.host] = False
             return
         for retry_wait in [3, 5]:
             try:
                 agent_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                secure_agent_socket = ssl_ctx.wrap_socket(agent_socket, server_hostname=self.addr)
-                secure_agent_socket.connect((self.addr, self.port))
-                msg = (bytes_len + self.data)
-                secure_agent_socket.sendall(msg.encode('utf-8'))
-                self.agent_response = secure_agent_socket.recv(1024).decode()
+                secure_agent_socket = ssl_ctx.wrap_socket(
+                    agent_socket, server_hostname=self.addr,
+                    session=client_tls.get_session(ssl_ctx, self.addr, self.port))
+                with secure_agent_socket:
+                    secure_agent_socket.connect((self.addr, self.port))
+                    msg = (bytes_len + self.data)
+                    secure_agent_socket.sendall(msg.encode('utf-8'))
+                    self.agent_response = secure_agent_socket.recv(1024).decode()
+                    client_tls.save_session(ssl_ctx, self.addr, self.port, secure_agent_socket.session)
                 self.mgr.log.debug(f'Received "{self.agent_response}" from agent on host {self.host}')
                 if self.daemon_spec:
                     self.mgr.agent_cache.agent_config_successfully_delivered(self.daemon_spec)
                     self.mgr.log.info(
                         f'HTTP config push to agent on {self.host} acknowledged; '
                         f'agent config deps updated (deps={self.daemon_spec.deps})')
-                self.mgr.agent_cache.sending_agent_message[self.host] = False
                 return
             except ConnectionError as e:
                 # if it's a connection error, possibly try to connect again.
                 # We could have just deployed agent and it might not be ready
+                client_tls.save_session(ssl_ctx, self.addr, self.port, None)
                 self.mgr.log.debug(
                     f'Retrying connection to agent on {self.host} in {str(retry_wait)} seconds. Connection failed with: {e}')
                 time.sleep(retry_wait)
             except Exception as e:
                 # if it's not a connection error, something has gone wrong. Give up.
                 # Leave agent config deps unchanged so _check_agent can retry.
+                client_tls.save_session(ssl_ctx, self.addr, self.port, None)
                 self.mgr.log.error(
                     f'Failed to contact agent on host {self.host}: {e}. '
                     f'Agent config deps left unchanged for retry')
-                self.mgr.agent_cache.sending_agent_message[self.host] = False
                 return
         # Leave agent config deps unchanged so _check_agent can retry next cycle.
         self.mgr.log.error(
             f'Could not connect to agent on host {self.host}. '
             f'Agent config deps left unchanged for retry')
-        self.mgr.agent_cache.sending_agent_message[self.host] = False
-        return
 
     def get_agent_response(self) -> str:
         return self.agent_response
@@ -886,6 +944,23 @@ class CephadmAgentHelpers:
     def __init__(self, mgr: "CephadmOrchestrator"):
         self.mgr: "CephadmOrchestrator" = mgr
         self.agent = mgr.http_server.agent
+        self.client_tls = AgentClientTLS(mgr)
+        self._message_pool: Optional[multiprocessing.pool.ThreadPool] = None
+        self._message_pool_lock = threading.Lock()
+
+    @property
+    def message_pool(self) -> multiprocessing.pool.ThreadPool:
+        with self._message_pool_lock:
+            if self._message_pool is None:
+                self._message_pool = multiprocessing.pool.ThreadPool(CEPHADM_AGENT_MESSAGE_THREADS)
+            return self._message_pool
+
+    def shutdown(self) -> None:
+        with self._message_pool_lock:
+            pool, self._message_pool = self._message_pool, None
+        if pool is not None:
+            pool.close()
+            pool.join()
 
     def _request_agent_acks(self, hosts: Set[str], increment: bool = False, daemon_spec: Optional[CephadmDaemonDeploySpec] = None) -> None:
         for host in hosts:
@@ -898,9 +973,14 @@ class CephadmAgentHelpers:
             payload: Dict[str, Any] = {'counter': self.mgr.agent_cache.agent_counter[host]}
             if daemon_spec:
                 payload['config'] = daemon_spec.final_config
-            message_thread = AgentMessageThread(
+            message = AgentMessage(
                 host, self.mgr.agent_cache.agent_ports[host], payload, self.mgr, daemon_spec)
-            message_thread.start()
+            self.mgr.agent_cache.sending_agent_message[host] = True
+            try:
+                self.message_pool.apply_async(message.run)
+            except Exception:
+                self.mgr.agent_cache.sending_agent_message[host] = False
+                raise
 
     def _request_ack_all_not_up_to_date(self) -> None:
         self.mgr.agent_helpers._request_agent_acks(
@@ -1092,6 +1092,21 @@ class HostCache():
         self.networks[host] = nets
         self.last_network_update[host] = datetime_now()
 
+    def mark_host_metadata_current(self, host: str, sections: List[str]) -> None:
+        """
+        The agent on the host found these parts of its metadata unchanged
+        since its last report ('ls', 'networks', 'volume').
+        """
+        host = normalize_hostname(host)
+        now = datetime_now()
+        for section, last_update in [
+                ('ls', self.last_daemon_update),
+                ('networks', self.last_network_update),
+                ('volume', self.last_device_update),
+        ]:
+            if section in sections and host in last_update:
+                last_update[host] = now
+
     def get_interface_for_ip(self, host: str, ip: str) -> Optional[str]:
         """Return the network interface name that has the given IP on host, or None."""
         host = normalize_hostname(host)
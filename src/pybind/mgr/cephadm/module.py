@@ -49,10 +49,11 @@ from ceph.deployment.service_spec import (
 from ceph.deployment.drive_group import DeviceSelection
 from ceph.utils import str_to_datetime, datetime_to_str, datetime_now
 from ceph.cryptotools.select import choose_crypto_caller
-from cephadm.serve import CephadmServe
+from cephadm.serve import CephadmServe, REFRESH_PROBES
 from cephadm.services.cephadmservice import CephadmDaemonDeploySpec
 from cephadm.http_server import CephadmHttpServer
 from cephadm.agent import CephadmAgentHelpers
+from cephadm.refresh import HostRefreshScheduler
 from cephadm.services.service_registry import service_registry
 
 
@@ -703,6 +704,7 @@ class CephadmOrchestrator(orchestrator.Orchestrator, MgrModule):
         self.cephadm_binary_path = self._get_cephadm_binary_path()
 
         self._worker_pool = multiprocessing.pool.ThreadPool(10)
+        self.refresh_scheduler = HostRefreshScheduler(self)
 
         self.ssh._reconfig_ssh()
 
@@ -795,6 +797,8 @@ class CephadmOrchestrator(orchestrator.Orchestrator, MgrModule):
         self.log.debug('shutdown')
         self._worker_pool.close()
         self._worker_pool.join()
+        self.refresh_scheduler.shutdown()
+        self.agent_helpers.shutdown()
         self.http_server.shutdown()
         self.offline_watcher.shutdown()
         self.run = False
@@ -1818,6 +1822,28 @@ class CephadmOrchestrator(orchestrator.Orchestrator, MgrModule):
         """
         return HandleCommandResult(stdout=self.extra_ceph_conf().conf)
 
+    @CephadmCLICommand.Read('cephadm refresh-timings')
+    def _refresh_timings(self, format: Format = Format.plain) -> HandleCommandResult:
+        """Show how long the probes of the last metadata refresh of each host took"""
+        timings = self.refresh_scheduler.timings()
+        if format in [Format.json, Format.json_pretty]:
+            return HandleCommandResult(
+                stdout=to_format({'latency': self.refresh_scheduler.latency,
+                                  'hosts': timings},
+                                 format,
+                                 many=False,
+                                 cls=None))
+
+        table = PrettyTable(['HOST'] + [p.upper() for p in REFRESH_PROBES], border=False)
+        table.align = 'l'
+        table.left_padding_width = 0
+        table.right_padding_width = 2
+        for host, host_timings in sorted(timings.items()):
+            table.add_row([host] + [
+                '%.2fs' % host_timings[p] if p in host_timings else '-'
+                for p in REFRESH_PROBES])
+        return HandleCommandResult(stdout=table.get_string())
+
     @CephadmCLICommand.Read('cephadm config-check ls')
     def _config_checks_list(self, format: Format = Format.plain) -> HandleCommandResult:
         """List the available configuration checks and their current state"""
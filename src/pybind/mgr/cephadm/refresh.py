@@ -0,0 +1,122 @@
+import datetime
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Set, TypeVar
+
+if TYPE_CHECKING:
+    from cephadm.module import CephadmOrchestrator
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# never refresh fewer hosts in parallel than the generic worker pool does
+REFRESH_MIN_CONCURRENCY = 10
+REFRESH_MAX_CONCURRENCY = 64
+# try to get through all hosts of a refresh pass within this many seconds
+REFRESH_TARGET_SECONDS = 30.0
+# weight of a new sample in the moving average of the host probe latency
+REFRESH_LATENCY_WEIGHT = 0.2
+
+NEVER = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+
+
+class HostRefreshScheduler:
+    """
+    Runs the per host metadata refresh of the serve loop.
+
+    Hosts are refreshed stalest first. The number of hosts refreshed in
+    parallel follows the observed probe latency: with L seconds per host and
+    N hosts left, N * L / REFRESH_TARGET_SECONDS hosts are kept in flight,
+    bounded by REFRESH_MIN_CONCURRENCY and REFRESH_MAX_CONCURRENCY. The
+    duration of every probe of the last refresh of each host is kept for
+    troubleshooting.
+    """
+
+    def __init__(self, mgr: "CephadmOrchestrator") -> None:
+        self.mgr = mgr
+        self.lock = threading.Lock()
+        self.latency: Optional[float] = None
+        self.host_timings: Dict[str, Dict[str, float]] = {}
+        self.executor = ThreadPoolExecutor(max_workers=REFRESH_MAX_CONCURRENCY,
+                                           thread_name_prefix='cephadm-refresh')
+
+    def last_refresh(self, host: str) -> datetime.datetime:
+        cache = self.mgr.cache
+        return min(
+            cache.last_daemon_update.get(host, NEVER),
+            cache.last_facts_update.get(host, NEVER),
+            cache.last_network_update.get(host, NEVER),
+            cache.last_device_update.get(host, NEVER),
+        )
+
+    def by_staleness(self, hosts: Iterable[str]) -> List[str]:
+        return sorted(hosts, key=self.last_refresh)
+
+    def concurrency(self, pending: int) -> int:
+        with self.lock:
+            latency = self.latency
+        if latency is None:
+            return REFRESH_MIN_CONCURRENCY
+        wanted = math.ceil(pending * latency / REFRESH_TARGET_SECONDS)
+        return max(REFRESH_MIN_CONCURRENCY, min(REFRESH_MAX_CONCURRENCY, wanted))
+
+    def record(self, host: str, timings: Dict[str, float], latency: float) -> None:
+        """
+        record the probe timings of a host along with the time spent
+        waiting on the host for all of them.
+        """
+        with self.lock:
+            self.host_timings[host] = dict(timings)
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += REFRESH_LATENCY_WEIGHT * (latency - self.latency)
+        logger.debug(f'refreshed host {host} in {latency:.3f}s: {timings}')
+
+    def timings(self) -> Dict[str, Dict[str, float]]:
+        with self.lock:
+            return {host: dict(t) for host, t in self.host_timings.items()}
+
+    def forget(self, hosts: Set[str]) -> None:
+        with self.lock:
+            for host in list(self.host_timings):
+                if host not in hosts:
+                    del self.host_timings[host]
+
+    def run(self, hosts: Iterable[str], refresh: Callable[[str], T]) -> List[T]:
+        """
+        call refresh() for every host, stalest first, re-raising the first
+        failure once all hosts are done (like forall_hosts does).
+        """
+        queue = deque(self.by_staleness(hosts))
+        self.forget(set(queue))
+        start = time.monotonic()
+        results: List[T] = []
+        errors: List[BaseException] = []
+        in_flight: Set['Future[T]'] = set()
+        max_in_flight = 0
+        while queue or in_flight:
+            limit = self.concurrency(len(queue) + len(in_flight))
+            while queue and len(in_flight) < limit:
+                in_flight.add(self.executor.submit(refresh, queue.popleft()))
+            max_in_flight = max(max_in_flight, len(in_flight))
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for f in done:
+                try:
+                    results.append(f.result())
+                except Exception as e:
+                    logger.exception(f'refreshing host failed: {e}')
+                    errors.append(e)
+        logger.debug(f'refresh pass took {time.monotonic() - start:.3f}s '
+                     f'(max {max_in_flight} hosts in parallel, latency {self.latency})')
+        if errors:
+            raise errors[0]
+        return results
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
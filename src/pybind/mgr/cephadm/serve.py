@@ -1,10 +1,13 @@
+import asyncio
 import datetime
 import ipaddress
 import hashlib
 import json
 import logging
+import time
 import uuid
 import os
+import re
 from collections import defaultdict
 from typing import TYPE_CHECKING, Optional, List, cast, Dict, Any, Union, Tuple, Set, \
     DefaultDict, Callable
@@ -51,6 +54,14 @@ DISABLED_SERVICES = ['nfs', 'keepalived']
 
 CEPHADM_EXE = ssh.RemoteExecutable('/usr/bin/cephadm')
 
+# metadata refresh probes, in the order their results are applied
+REFRESH_PROBES = {
+    'daemons': 'cephadm ls',
+    'facts': 'cephadm gather-facts',
+    'networks': 'cephadm list-networks',
+    'devices': 'cephadm ceph-volume -- inventory',
+}
+
 
 class CephadmServe:
     """
@@ -254,7 +265,6 @@ class CephadmServe:
         failures = []
         agents_down: List[str] = []
 
-        @forall_hosts
         def refresh(host: str) -> None:
 
             # skip hosts that were removed or are in maintenance - they could be powered off
@@ -273,41 +283,30 @@ class CephadmServe:
                 if r is not None:
                     bad_hosts.append(r)
 
+            probes = []
             if (
                 not self.mgr.use_agent
                 or self.mgr.cache.is_host_draining(host)
                 or host in agents_down
             ):
                 if self.mgr.cache.host_needs_daemon_refresh(host):
-                    self.log.debug('refreshing %s daemons' % host)
-                    r = self._refresh_host_daemons(host)
-                    if r:
-                        failures.append(r)
-
+                    probes.append('daemons')
                 if self.mgr.cache.host_needs_facts_refresh(host):
-                    self.log.debug(('Refreshing %s facts' % host))
-                    r = self._refresh_facts(host)
-                    if r:
-                        failures.append(r)
-
+                    probes.append('facts')
                 if self.mgr.cache.host_needs_network_refresh(host):
-                    self.log.debug(('Refreshing %s networks' % host))
-                    r = self._refresh_host_networks(host)
-                    if r:
-                        failures.append(r)
-
+                    probes.append('networks')
                 if self.mgr.cache.host_needs_device_refresh(host):
-                    self.log.debug('refreshing %s devices' % host)
-                    r = self._refresh_host_devices(host)
-                    if r:
-                        failures.append(r)
-                self.mgr.cache.metadata_up_to_date[host] = True
+                    probes.append('devices')
             elif not self.mgr.cache.get_daemons_by_type('agent', host=host):
                 if self.mgr.cache.host_needs_daemon_refresh(host):
-                    self.log.debug('refreshing %s daemons' % host)
-                    r = self._refresh_host_daemons(host)
-                    if r:
-                        failures.append(r)
+                    probes.append('daemons')
+            else:
+                probes = None
+
+            if probes is not None:
+                if probes:
+                    self.log.debug(f'refreshing {host}: {", ".join(probes)}')
+                    failures.extend(self._refresh_host_probes(host, probes))
                 self.mgr.cache.metadata_up_to_date[host] = True
 
             if self.mgr.cache.host_needs_registry_login(host) and self.mgr.get_store('registry_credentials'):
@@ -331,7 +330,7 @@ class CephadmServe:
                 self.log.debug(f"autotuning memory for {host}")
                 self._autotune_host_memory(host)
 
-        refresh(self.mgr.cache.get_hosts())
+        self.mgr.refresh_scheduler.run(self.mgr.cache.get_hosts(), refresh)
 
         self._write_all_client_files()
 
@@ -378,30 +377,86 @@ class CephadmServe:
             return 'host %s (%s) failed check: %s' % (host, addr, e)
         return None
 
-    def _refresh_host_daemons(self, host: str) -> Optional[str]:
-        try:
-            with self.mgr.async_timeout_handler(host, 'cephadm ls'):
-                ls = self.mgr.wait_async(self._run_cephadm_json(
-                    host, 'mon', 'ls', [], no_fsid=True, log_output=self.mgr.log_refresh_metadata))
-        except OrchestratorError as e:
-            return str(e)
-        self.mgr._process_ls_output(host, ls)
-        return None
+    def _refresh_host_probes(self, host: str, probes: List[str]) -> List[str]:
+        """
+        Run the given REFRESH_PROBES against a host concurrently and apply
+        their results in order. Returns the failures.
+        """
+        fetchers: Dict[str, Callable[[str], Any]] = {
+            'daemons': self._fetch_host_daemons,
+            'facts': self._fetch_facts,
+            'networks': self._fetch_host_networks,
+            'devices': self._fetch_host_devices,
+        }
+        appliers: Dict[str, Callable[[str, Any], None]] = {
+            'daemons': self.mgr._process_ls_output,
+            'facts': self.mgr.cache.update_host_facts,
+            'networks': self._apply_host_networks,
+            'devices': self._apply_host_devices,
+        }
+        probes = [p for p in REFRESH_PROBES if p in probes]
+        timings: Dict[str, float] = {}
+        # every probe gets its own timeout, so that a slow one (typically
+        # ceph-volume inventory) doesn't discard the results of the others
+        timeout = max(self.mgr.default_cephadm_command_timeout, 60)
+
+        async def timed(probe: str) -> Any:
+            start = time.monotonic()
+            try:
+                return await asyncio.wait_for(fetchers[probe](host), timeout)
+            finally:
+                timings[probe] = time.monotonic() - start
 
-    def _refresh_facts(self, host: str) -> Optional[str]:
+        async def fetch_all() -> List[Any]:
+            return await asyncio.gather(*[timed(p) for p in probes],
+                                        return_exceptions=True)
+
+        start = time.monotonic()
         try:
-            with self.mgr.async_timeout_handler(host, 'cephadm gather-facts'):
-                val = self.mgr.wait_async(self._run_cephadm_json(
-                    host, cephadmNoImage, 'gather-facts', [],
-                    no_fsid=True, log_output=self.mgr.log_refresh_metadata))
+            with self.mgr.async_timeout_handler(
+                    host, ', '.join(REFRESH_PROBES[p] for p in probes)):
+                results = self.mgr.wait_async(fetch_all(), timeout + 30)
         except OrchestratorError as e:
-            return str(e)
+            return [str(e)]
+        finally:
+            self.mgr.refresh_scheduler.record(host, timings, time.monotonic() - start)
+
+        failures = []
+        for probe, result in zip(probes, results):
+            if isinstance(result, asyncio.TimeoutError):
+                try:
+                    with self.mgr.async_timeout_handler(host, REFRESH_PROBES[probe]):
+                        raise result
+                except OrchestratorError as e:
+                    failures.append(str(e))
+            elif isinstance(result, OrchestratorError):
+                failures.append(str(result))
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                appliers[probe](host, result)
+        return failures
 
-        self.mgr.cache.update_host_facts(host, val)
+    def _refresh_host_probe(self, host: str, probe: str) -> Optional[str]:
+        failures = self._refresh_host_probes(host, [probe])
+        return failures[0] if failures else None
 
-        return None
+    async def _fetch_host_daemons(self, host: str) -> List[Dict[str, Any]]:
+        return await self._run_cephadm_json(
+            host, 'mon', 'ls', [], no_fsid=True, log_output=self.mgr.log_refresh_metadata)
 
-    def _refresh_host_devices(self, host: str) -> Optional[str]:
+    def _refresh_host_daemons(self, host: str) -> Optional[str]:
+        return self._refresh_host_probe(host, 'daemons')
+
+    async def _fetch_facts(self, host: str) -> Dict[str, Any]:
+        return await self._run_cephadm_json(
+            host, cephadmNoImage, 'gather-facts', [],
+            no_fsid=True, log_output=self.mgr.log_refresh_metadata)
+
+    def _refresh_facts(self, host: str) -> Optional[str]:
+        return self._refresh_host_probe(host, 'facts')
+
+    async def _fetch_host_devices(self, host: str) -> List[Dict[str, Any]]:
         with_lsm = self.mgr.device_enhanced_scan
         list_all = self.mgr.inventory_list_all
         inventory_args = ['--', 'inventory',
@@ -411,57 +466,59 @@ class CephadmServe:
             inventory_args.insert(-1, "--with-lsm")
         if list_all:
             inventory_args.insert(-1, "--list-all")
+        # ceph-volume returns its cached report as long as no device changed
+        inventory_args.append('--cached')
+        if host not in self.mgr.cache.last_device_update:
+            # the devices of this host were invalidated, e.g. `orch device ls --refresh`
+            inventory_args.append('--refresh')
 
         try:
-            try:
-                with self.mgr.async_timeout_handler(host, 'cephadm ceph-volume -- inventory'):
-                    devices = self.mgr.wait_async(self._run_cephadm_json(
-                        host, 'osd', 'ceph-volume', inventory_args, log_output=self.mgr.log_refresh_metadata))
-            except OrchestratorError as e:
-                if 'unrecognized arguments: --filter-for-batch' in str(e):
-                    rerun_args = inventory_args.copy()
-                    rerun_args.remove('--filter-for-batch')
-                    with self.mgr.async_timeout_handler(host, 'cephadm ceph-volume -- inventory'):
-                        devices = self.mgr.wait_async(self._run_cephadm_json(
-                            host, 'osd', 'ceph-volume', rerun_args, log_output=self.mgr.log_refresh_metadata))
-                else:
-                    raise
-
+            return await self._run_cephadm_json(
+                host, 'osd', 'ceph-volume', inventory_args, log_output=self.mgr.log_refresh_metadata)
         except OrchestratorError as e:
-            return str(e)
+            # older ceph-volume versions
+            m = re.search(r'unrecognized arguments: (.*)', str(e))
+            unrecognized = m.group(1).split() if m else []
+            rerun_args = [arg for arg in inventory_args if arg not in unrecognized]
+            if rerun_args != inventory_args:
+                return await self._run_cephadm_json(
+                    host, 'osd', 'ceph-volume', rerun_args, log_output=self.mgr.log_refresh_metadata)
+            raise
 
+    def _apply_host_devices(self, host: str, devices: List[Dict[str, Any]]) -> None:
         self.log.debug('Refreshed host %s devices (%d)' % (
             host, len(devices)))
         ret = inventory.Devices.from_json(devices)
         self.mgr.cache.update_host_devices(host, ret.devices)
         self.update_osdspec_previews(host)
         self.mgr.cache.save_host(host)
-        return None
 
-    def _refresh_host_networks(self, host: str) -> Optional[str]:
-        try:
-            list_net_args: List[str] = []
-            if self.mgr.allow_lo_routes:
-                list_net_args.append('--allow-lo-routes')
-            if self.mgr.allow_bgp_routes:
-                list_net_args.append('--allow-bgp-routes')
-            with self.mgr.async_timeout_handler(host, 'cephadm list-networks'):
-                networks = self.mgr.wait_async(self._run_cephadm_json(
-                    host,
-                    'mon',
-                    'list-networks',
-                    list_net_args,
-                    no_fsid=True,
-                    log_output=self.mgr.log_refresh_metadata,
-                ))
-        except OrchestratorError as e:
-            return str(e)
+    def _refresh_host_devices(self, host: str) -> Optional[str]:
+        return self._refresh_host_probe(host, 'devices')
+
+    async def _fetch_host_networks(self, host: str) -> Dict[str, Any]:
+        list_net_args: List[str] = []
+        if self.mgr.allow_lo_routes:
+            list_net_args.append('--allow-lo-routes')
+        if self.mgr.allow_bgp_routes:
+            list_net_args.append('--allow-bgp-routes')
+        return await self._run_cephadm_json(
+            host,
+            'mon',
+            'list-networks',
+            list_net_args,
+            no_fsid=True,
+            log_output=self.mgr.log_refresh_metadata,
+        )
 
+    def _apply_host_networks(self, host: str, networks: Dict[str, Any]) -> None:
         self.log.debug('Refreshed host %s networks (%s)' % (
             host, len(networks)))
         self.mgr.cache.update_host_networks(host, networks)
         self.mgr.cache.save_host(host)
-        return None
+
+    def _refresh_host_networks(self, host: str) -> Optional[str]:
+        return self._refresh_host_probe(host, 'networks')
 
     async def get_rdma_devices(self, host: str) -> List[Dict[str, Any]]:
         """Return list of RDMA devices on host from cephadm list-rdma, or [] on error."""
@@ -0,0 +1,79 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from cephadm.agent import AgentClientTLS, CephadmAgentHelpers, \
+    CEPHADM_AGENT_CLIENT_CERT_ROTATION
+
+
+class FakeMgr:
+    def __init__(self) -> None:
+        self.log = MagicMock()
+        self.cert_mgr = MagicMock()
+        self.cert_mgr.get_root_ca.return_value = 'root-ca'
+
+
+class TestAgentClientTLS:
+
+    def _client_tls(self):
+        client_tls = AgentClientTLS(FakeMgr())
+        client_tls._create_ssl_context = MagicMock(side_effect=lambda root_cert: MagicMock())
+        return client_tls
+
+    def test_ssl_context_is_reused(self):
+        client_tls = self._client_tls()
+        ctx = client_tls.get_ssl_context()
+        assert client_tls.get_ssl_context() is ctx
+        assert client_tls._create_ssl_context.call_count == 1
+
+    def test_ssl_context_rotation(self):
+        client_tls = self._client_tls()
+        with patch('cephadm.agent.time.monotonic', return_value=1000.0):
+            ctx = client_tls.get_ssl_context()
+            client_tls.save_session(ctx, 'host1', 7150, 'session')
+            assert client_tls.get_session(ctx, 'host1', 7150) == 'session'
+        with patch('cephadm.agent.time.monotonic',
+                   return_value=1001.0 + CEPHADM_AGENT_CLIENT_CERT_ROTATION):
+            new_ctx = client_tls.get_ssl_context()
+        assert new_ctx is not ctx
+        # sessions of the old context are dropped and not stored anymore
+        assert client_tls.get_session(new_ctx, 'host1', 7150) is None
+        client_tls.save_session(ctx, 'host1', 7150, 'session')
+        assert client_tls.get_session(new_ctx, 'host1', 7150) is None
+
+    def test_ssl_context_root_ca_change(self):
+        client_tls = self._client_tls()
+        ctx = client_tls.get_ssl_context()
+        client_tls.mgr.cert_mgr.get_root_ca.return_value = 'new-root-ca'
+        assert client_tls.get_ssl_context() is not ctx
+        client_tls._create_ssl_context.assert_called_with('new-root-ca')
+
+
+class TestAgentMessages:
+
+    def _helpers(self):
+        mgr = MagicMock()
+        mgr.agent_cache.sending_agent_message = {}
+        mgr.agent_cache.agent_counter = {}
+        mgr.agent_cache.agent_ports = {'host1': 7150}
+        mgr.http_server.agent = None
+        helpers = CephadmAgentHelpers(mgr)
+        helpers._message_pool = MagicMock()
+        return helpers
+
+    def test_host_marked_while_message_is_queued(self):
+        helpers = self._helpers()
+        sending = helpers.mgr.agent_cache.sending_agent_message
+        helpers._request_agent_acks({'host1'})
+        # still waiting for a pool thread
+        assert sending['host1'] is True
+        (run,), _ = helpers._message_pool.apply_async.call_args
+        run()
+        assert sending['host1'] is False
+
+    def test_host_unmarked_if_queueing_fails(self):
+        helpers = self._helpers()
+        helpers._message_pool.apply_async.side_effect = ValueError('Pool not running')
+        with pytest.raises(ValueError):
+            helpers._request_agent_acks({'host1'})
+        assert helpers.mgr.agent_cache.sending_agent_message['host1'] is False
@@ -42,6 +42,7 @@ from tests import mock
 from .fixtures import wait, _run_cephadm, match_glob, with_host, \
     with_cephadm_module, with_service, make_daemons_running, async_side_effect
 from cephadm.module import CephadmOrchestrator
+from orchestrator.module import Format
 
 """
 TODOs:
@@ -2848,7 +2849,7 @@ osd_k2 = osd_v2
     def test_ceph_volume_no_filter_for_batch(self, _run_cephadm, cephadm_module: CephadmOrchestrator):
         _run_cephadm.side_effect = async_side_effect(('{}', '', 0))
 
-        error_message = """cephadm exited with an error code: 1, stderr:/usr/bin/podman:stderr usage: ceph-volume inventory [-h] [--format {plain,json,json-pretty}] [path]/usr/bin/podman:stderr ceph-volume inventory: error: unrecognized arguments: --filter-for-batch
+        error_message = """cephadm exited with an error code: 1, stderr:/usr/bin/podman:stderr usage: ceph-volume inventory [-h] [--format {plain,json,json-pretty}] [path]/usr/bin/podman:stderr ceph-volume inventory: error: unrecognized arguments: --filter-for-batch --cached
 Traceback (most recent call last):
   File "<stdin>", line 6112, in <module>
   File "<stdin>", line 1299, in _infer_fsid
@@ -2865,13 +2866,60 @@ Traceback (most recent call last):
 
             assert _run_cephadm.mock_calls == [
                 mock.call('test', 'osd', 'ceph-volume',
-                          ['--', 'inventory', '--format=json-pretty', '--filter-for-batch'], image='',
+                          ['--', 'inventory', '--format=json-pretty', '--filter-for-batch', '--cached'], image='',
                           no_fsid=False, error_ok=False, log_output=False, use_current_daemon_image=False),
                 mock.call('test', 'osd', 'ceph-volume',
                           ['--', 'inventory', '--format=json-pretty'], image='',
                           no_fsid=False, error_ok=False, log_output=False, use_current_daemon_image=False),
             ]
 
+    @mock.patch("cephadm.serve.CephadmServe._run_cephadm")
+    def test_ceph_volume_inventory_refresh(self, _run_cephadm, cephadm_module: CephadmOrchestrator):
+        _run_cephadm.side_effect = async_side_effect(('{}', '', 0))
+
+        with with_host(cephadm_module, 'test'):
+            _run_cephadm.reset_mock()
+            CephadmServe(cephadm_module)._refresh_host_devices('test')
+            assert _run_cephadm.call_args[0][3] == \
+                ['--', 'inventory', '--format=json-pretty', '--filter-for-batch', '--cached']
+
+            cephadm_module.cache.invalidate_host_devices('test')
+            _run_cephadm.reset_mock()
+            CephadmServe(cephadm_module)._refresh_host_devices('test')
+            assert _run_cephadm.call_args[0][3] == \
+                ['--', 'inventory', '--format=json-pretty', '--filter-for-batch', '--cached',
+                 '--refresh']
+
+    @mock.patch("cephadm.serve.CephadmServe._run_cephadm")
+    def test_refresh_probe_timeout_fails_only_itself(self, _run_cephadm, cephadm_module: CephadmOrchestrator):
+        _run_cephadm.side_effect = async_side_effect(('{}', '', 0))
+
+        async def slow_inventory(serve, host):
+            raise asyncio.TimeoutError()
+
+        with with_host(cephadm_module, 'test'):
+            cache = cephadm_module.cache
+            for last_update in [cache.last_daemon_update, cache.last_facts_update,
+                                cache.last_network_update, cache.last_device_update]:
+                last_update.pop('test', None)
+            with mock.patch.object(CephadmServe, '_fetch_host_devices', slow_inventory):
+                failures = CephadmServe(cephadm_module)._refresh_host_probes(
+                    'test', ['daemons', 'facts', 'networks', 'devices'])
+            assert len(failures) == 1
+            assert 'cephadm ceph-volume -- inventory' in failures[0]
+            assert 'timed out on host test' in failures[0]
+            assert 'test' in cache.last_daemon_update
+            assert 'test' in cache.last_facts_update
+            assert 'test' in cache.last_network_update
+            assert 'test' not in cache.last_device_update
+            assert 'CEPHADM_HOST_TIMEOUT_ERROR' in cephadm_module.health_checks
+
+            out = cephadm_module._refresh_timings().stdout
+            assert out.split('\n')[0].split() == ['HOST', 'DAEMONS', 'FACTS', 'NETWORKS', 'DEVICES']
+            assert out.split('\n')[1].split()[0] == 'test'
+            timings = json.loads(cephadm_module._refresh_timings(format=Format.json).stdout)
+            assert set(timings['hosts']['test']) == {'daemons', 'facts', 'networks', 'devices'}
+
     @mock.patch("cephadm.serve.CephadmServe._run_cephadm")
     def test_osd_activate_datadevice(self, _run_cephadm, cephadm_module: CephadmOrchestrator):
         _run_cephadm.side_effect = async_side_effect(('{}', '', 0))
@@ -0,0 +1,87 @@
+import datetime
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from cephadm.refresh import HostRefreshScheduler, REFRESH_MAX_CONCURRENCY, \
+    REFRESH_MIN_CONCURRENCY, REFRESH_TARGET_SECONDS
+
+
+class FakeMgr:
+    def __init__(self) -> None:
+        self.cache = MagicMock()
+        self.cache.last_daemon_update = {}
+        self.cache.last_facts_update = {}
+        self.cache.last_network_update = {}
+        self.cache.last_device_update = {}
+
+
+@pytest.fixture
+def scheduler():
+    s = HostRefreshScheduler(FakeMgr())
+    yield s
+    s.shutdown()
+
+
+class TestHostRefreshScheduler:
+
+    def test_by_staleness(self, scheduler):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cache = scheduler.mgr.cache
+        for host, age in [('fresh', 1), ('old', 100), ('mixed', 2)]:
+            for last_update in [cache.last_daemon_update, cache.last_facts_update,
+                                cache.last_network_update, cache.last_device_update]:
+                last_update[host] = now - datetime.timedelta(seconds=age)
+        cache.last_facts_update['mixed'] = now - datetime.timedelta(seconds=1000)
+        assert scheduler.by_staleness(['fresh', 'old', 'mixed', 'new']) == \
+            ['new', 'mixed', 'old', 'fresh']
+
+    def test_concurrency(self, scheduler):
+        assert scheduler.concurrency(1000) == REFRESH_MIN_CONCURRENCY
+        scheduler.record('host1', {'daemons': 1.0}, 1.0)
+        assert scheduler.concurrency(1) == REFRESH_MIN_CONCURRENCY
+        assert scheduler.concurrency(10000) == REFRESH_MAX_CONCURRENCY
+        assert scheduler.concurrency(int(20 * REFRESH_TARGET_SECONDS)) == 20
+        # moving average of the latency
+        scheduler.record('host2', {'daemons': 2.0}, 2.0)
+        assert scheduler.latency == pytest.approx(1.2)
+        assert scheduler.timings() == {'host1': {'daemons': 1.0},
+                                       'host2': {'daemons': 2.0}}
+
+    def test_run(self, scheduler):
+        lock = threading.Lock()
+        running = 0
+        max_running = 0
+
+        def refresh(host):
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+            return host
+
+        hosts = [f'host{i}' for i in range(50)]
+        assert sorted(scheduler.run(hosts, refresh)) == sorted(hosts)
+        assert max_running <= REFRESH_MIN_CONCURRENCY
+
+    def test_run_failure(self, scheduler):
+        done = []
+
+        def refresh(host):
+            if host == 'bad':
+                raise RuntimeError('bad host')
+            done.append(host)
+
+        with pytest.raises(RuntimeError, match='bad host'):
+            scheduler.run(['a', 'bad', 'b'], refresh)
+        assert sorted(done) == ['a', 'b']
+
+    def test_run_forgets_removed_hosts(self, scheduler):
+        scheduler.record('gone', {'facts': 1.0}, 1.0)
+        scheduler.run(['host1'], lambda host: None)
+        assert 'gone' not in scheduler.timings()
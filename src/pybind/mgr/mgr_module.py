@@ -224,6 +224,13 @@ class OSDMap(ceph_module.BasePyOSDMap):
         d = self._dump()
         return dict([(p['pool_name'], p) for p in d['pools']])
 
+    def get_pool_pg_nums(self) -> Dict[int, int]:
+        """
+        Get the pg_num of each pool by pool id, without dumping the map.
+        """
+        return {int(poolid): pg_num
+                for poolid, pg_num in self._get_pool_pg_nums().items()}
+
     def new_incremental(self) -> 'OSDMapIncremental':
         return self._new_incremental()
 
@@ -256,6 +263,32 @@ class OSDMap(ceph_module.BasePyOSDMap):
     def pg_to_up_acting_osds(self, pool_id: int, ps: int) -> Dict[str, Any]:
         return self._pg_to_up_acting_osds(pool_id, ps)
 
+    def get_pgs_up_with_osd(self, other: 'OSDMap', osd: int,
+                            only_changed: bool = True) -> List[Tuple[int, int]]:
+        """
+        Get the (pool id, ps) of the PGs of the pools of this map that have
+        `osd` in their up set in this map or in `other`.
+
+        :param only_changed: skip PGs with the same up set in both maps
+        """
+        pgs = self._get_pgs_up_with_osd(other, osd, only_changed).get('pgs', [])
+        return [(pool, ps) for pool, ps in pgs]
+
+    def diff(self, other: 'OSDMap', with_pgs: bool = True) -> Dict[str, Any]:
+        """
+        Compare this map with `other`, usually a later epoch of it.
+
+        The result has the ``epoch`` of both maps, the ``osds`` whose
+        existence, up/in state or weight differ (each with an ``old`` and
+        a ``new`` state) and the ``pgs`` whose up or acting sets differ.
+        PGs which only exist in one of the maps have empty sets in the
+        other one.
+
+        :param with_pgs: map the PGs of both maps to compare them; if
+            False, only the OSDs are compared and ``pgs`` is empty
+        """
+        return self._diff(other, with_pgs)
+
     def pool_raw_used_rate(self, pool_id: int) -> float:
         return self._pool_raw_used_rate(pool_id)
 
@@ -1146,7 +1179,9 @@ class MgrModule(ceph_module.BaseMgrModule, MgrModuleLoggingMixin):
 
         self._version = self._ceph_get_version()
 
-        self._perf_schema_cache = None
+        # layouts of bulk perf counter schemas, by (schema key, labeled)
+        # (schema key, labeled) => (schema, layout), see _perf_counter_layout()
+        self._perf_schema_cache: Optional[Dict[Tuple[str, bool], Tuple[Dict[str, list], list]]] = None
 
         # Keep a librados instance for those that need it.
         self._rados: Optional[rados.Rados] = None
@@ -2379,6 +2414,91 @@ class MgrModule(ceph_module.BaseMgrModule, MgrModuleLoggingMixin):
         else:
             return 0, 0
 
+    @API.expose
+    def get_perf_counters_bulk(
+        self,
+        services: Sequence[str],
+        prio_limit: int = PRIO_USEFUL,
+        labeled: bool = False,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch the schema and the latest values of the perf counters of every
+        daemon of the given service types in a single call.
+
+        The result is columnar. ``schemas`` maps a schema key to parallel
+        lists (``names``, ``counters``, ``descriptions``, ``nicks``,
+        ``types``, ``priorities``, ``units`` and, if ``labeled``, ``labels``)
+        describing the counters, in order. ``daemons`` maps daemon names
+        (like "osd.123") to the key of their schema and to ``values`` and
+        ``counts`` lists aligned with it. Within a result, a schema key
+        names exactly one schema. Keys are derived from a digest of the
+        counter paths, so anything derived from a schema and cached under
+        its key across calls must be checked against the schema on reuse.
+
+        :param services: daemon types to fetch counters for
+        :param prio_limit: skip counters with a lower priority
+        :param labeled: also return labeled counters
+        """
+        return self._ceph_get_perf_counters_bulk(list(services), prio_limit, labeled)
+
+    def _perf_counter_layout(self, key: str, schema: Dict[str, list], labeled: bool,
+                             cache: Dict[Tuple[str, bool], Tuple[Dict[str, list], list]]) -> list:
+        """
+        Turn a bulk perf counter schema into a list of ``(index, name,
+        counter, labels, info, is_avg)`` tuples, where ``info`` is the schema
+        dict of the counter as returned by :meth:`get_unlabeled_perf_schema`.
+        Layouts are kept across calls in ``self._perf_schema_cache``.
+        """
+        assert self._perf_schema_cache is not None
+        # keys are unique within a call, so layouts built by this call can
+        # be reused as is
+        entry = cache.get((key, labeled))
+        if entry is not None:
+            return entry[1]
+        # keys are derived from a digest: only reuse the layout of an
+        # earlier call if it was built from the very same schema
+        entry = self._perf_schema_cache.get((key, labeled))
+        if entry is not None and entry[0] == schema:
+            layout = entry[1]
+        else:
+            layout = []
+            for i, (name, counter, description, nick, tp, priority, units) in enumerate(zip(
+                    schema['names'], schema['counters'], schema['descriptions'],
+                    schema['nicks'], schema['types'], schema['priorities'],
+                    schema['units'])):
+                info: Dict[str, Union[str, int]] = {'description': description}
+                if nick:
+                    info['nick'] = nick
+                info['type'] = tp
+                info['priority'] = priority
+                info['units'] = units
+                labels = schema['labels'][i] if labeled else {}
+                layout.append((i, name, counter, labels, info,
+                               bool(tp & self.PERFCOUNTER_LONGRUNAVG)))
+        cache[(key, labeled)] = (schema, layout)
+        return layout
+
+    def _get_perf_counter_layouts(
+        self, prio_limit: int, services: Sequence[str], labeled: bool
+    ) -> Iterator[Tuple[str, list, List[int], List[int]]]:
+        """
+        Yield ``(daemon, layout, values, counts)`` for every daemon of
+        ``services``, see :meth:`get_perf_counters_bulk`.
+        """
+        bulk = self.get_perf_counters_bulk(services, prio_limit, labeled)
+        if self._perf_schema_cache is None:
+            self._perf_schema_cache = {}
+        # only keep layouts of schemas still in use
+        cache: Dict[Tuple[str, bool], Tuple[Dict[str, list], list]] = {
+            k: v for k, v in self._perf_schema_cache.items() if k[1] != labeled
+        }
+        schemas = bulk['schemas']
+        for daemon, data in bulk['daemons'].items():
+            key = data['schema']
+            layout = self._perf_counter_layout(key, schemas[key], labeled, cache)
+            yield daemon, layout, data['values'], data['counts']
+        self._perf_schema_cache = cache
+
     @API.expose
     @profile_method()
     def get_unlabeled_perf_counters(
@@ -2408,54 +2528,16 @@ class MgrModule(ceph_module.BaseMgrModule, MgrModuleLoggingMixin):
 
         result = defaultdict(dict)  # type: Dict[str, dict]
 
-        for server in self.list_servers():
-            for service in cast(List[ServiceInfoT], server['services']):
-                if service['type'] not in services:
-                    continue
-
-                schemas = self.get_unlabeled_perf_schema(service['type'], service['id'])
-                if not schemas:
-                    self.log.warning("No perf counter schema for {0}.{1}".format(
-                        service['type'], service['id']
-                    ))
-                    continue
-
-                # Value is returned in a potentially-multi-service format,
-                # get just the service we're asking about
-                svc_full_name = "{0}.{1}".format(
-                    service['type'], service['id'])
-                schema = schemas[svc_full_name]
-
-                # Populate latest values
-                for counter_path, counter_schema in schema.items():
-                    # self.log.debug("{0}: {1}".format(
-                    #     counter_path, json.dumps(counter_schema)
-                    # ))
-                    priority = counter_schema['priority']
-                    assert isinstance(priority, int)
-                    if priority < prio_limit:
-                        continue
-
-                    tp = counter_schema['type']
-                    assert isinstance(tp, int)
-                    counter_info = dict(counter_schema)
-                    # Also populate count for the long running avgs
-                    if tp & self.PERFCOUNTER_LONGRUNAVG:
-                        v, c = self.get_unlabeled_counter_latest_avg(
-                            service['type'],
-                            service['id'],
-                            counter_path
-                        )
-                        counter_info['value'], counter_info['count'] = v, c
-                        result[svc_full_name][counter_path] = counter_info
-                    else:
-                        counter_info['value'] = self.get_unlabeled_counter_latest(
-                            service['type'],
-                            service['id'],
-                            counter_path
-                        )
-
-                    result[svc_full_name][counter_path] = counter_info
+        for daemon, layout, values, counts in self._get_perf_counter_layouts(
+                prio_limit, services, labeled=False):
+            counters = result[daemon]
+            for i, name, counter, _, info, is_avg in layout:
+                counter_info = dict(info)
+                counter_info['value'] = values[i]
+                # Also populate count for the long running avgs
+                if is_avg:
+                    counter_info['count'] = counts[i]
+                counters[name + '.' + counter] = counter_info
 
         self.log.debug("returning {0} counter".format(len(result)))
 
@@ -2519,65 +2601,27 @@ class MgrModule(ceph_module.BaseMgrModule, MgrModuleLoggingMixin):
 
         result = defaultdict(dict)   # type: Dict[str, dict]
 
-        for server in self.list_servers():
-            for service in cast(List[ServiceInfoT], server['services']):
-                if service['type'] not in services:
-                    continue
-
-                schemas = self.get_perf_schema(service['type'], service['id'])
-
-                if not schemas:
-                    self.log.warning("No perf counter schema for {0}.{1}".format(
-                        service['type'], service['id']
-                    ))
-                    continue
-
-                # Value is returned in a potentially-multi-service format,
-                # get just the service we're asking about
-                svc_full_name = "{0}.{1}".format(
-                    service['type'], service['id'])
-                labeled_schema = schemas[svc_full_name]
-
-                for counter_name, sub_counters_list in labeled_schema.items():
-                    result[svc_full_name][counter_name] = []
-                    for sub_counter in sub_counters_list:
-                        sub_counter_labels = []
-                        sub_counter_info = dict(sub_counter)
-
-                        for label_key, label_value in sub_counter["labels"].items():
-                            sub_counter_labels.append((label_key, label_value))
-
-                        for sub_counter_name, sub_counter_schema in sub_counter["counters"].items():
-                            priority = sub_counter_schema['priority']
-                            assert isinstance(priority, int)
-                            if priority < prio_limit:
-                                continue
-
-                            tp = sub_counter_schema['type']
-                            assert isinstance(tp, int)
-
-                            # Also populate count for the long running avgs
-                            if tp & self.PERFCOUNTER_LONGRUNAVG:
-                                v, c = self.get_counter_latest_avg(
-                                    service['type'],
-                                    service['id'],
-                                    counter_name,
-                                    sub_counter_name,
-                                    sub_counter_labels,
-                                )
-                                sub_counter_info['counters'][sub_counter_name]['value'] = v
-                                sub_counter_info['counters'][sub_counter_name]['count'] = c
-
-                            else:
-                                sub_counter_info['counters'][sub_counter_name]['value'] = self.get_counter_latest(
-                                    service['type'],
-                                    service['id'],
-                                    counter_name,
-                                    sub_counter_name,
-                                    sub_counter_labels
-                                )
-
-                        result[svc_full_name][counter_name].append(sub_counter_info)
+        for daemon, layout, values, counts in self._get_perf_counter_layouts(
+                prio_limit, services, labeled=True):
+            daemon_counters = result[daemon]
+            prev_name: Optional[str] = None
+            prev_labels: Optional[Dict[str, str]] = None
+            sub_counters: Dict[str, dict] = {}
+            # counters sharing a name and a set of labels are adjacent
+            for i, name, counter, labels, info, is_avg in layout:
+                if name != prev_name or labels != prev_labels:
+                    sub_counters = {}
+                    daemon_counters.setdefault(name, []).append({
+                        'labels': dict(labels),
+                        'counters': sub_counters,
+                    })
+                    prev_name, prev_labels = name, labels
+                counter_info = dict(info)
+                counter_info['value'] = values[i]
+                # Also populate count for the long running avgs
+                if is_avg:
+                    counter_info['count'] = counts[i]
+                sub_counters[counter] = counter_info
         self.log.debug("returning {0} counter".format(len(result)))
 
         return result
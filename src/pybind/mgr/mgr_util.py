@@ -24,6 +24,7 @@ from threading import Lock, Condition
 from typing import no_type_check, NewType
 from traceback import format_exc as tb_format_exc
 import urllib
+import weakref
 from functools import wraps
 if sys.version_info >= (3, 3):
     from threading import Timer
@@ -184,13 +185,13 @@ def lock_timeout_log(lock: Lock, timeout: int = 5) -> Iterator[None]:
 
 class CephfsConnectionPool(object):
     class Connection(object):
-        def __init__(self, mgr: Module_T, fs_name: str):
+        def __init__(self, mgr: Module_T, fs_name: str, fs_id: Optional[int] = None):
             self.fs: Optional["cephfs.LibCephFS"] = None
             self.mgr = mgr
             self.fs_name = fs_name
             self.ops_in_progress = 0
             self.last_used = time.time()
-            self.fs_id = self.get_fs_id()
+            self.fs_id = fs_id if fs_id is not None else self.get_fs_id()
 
         def get_fs_id(self) -> int:
             fs_map = self.mgr.get('fs_map')
@@ -211,11 +212,13 @@ class CephfsConnectionPool(object):
             if self.ops_in_progress == 0:
                 notify()
 
-        def del_fs_handle(self, waiter: Optional[Callable]) -> None:
+        def del_fs_handle(self, waiter: Optional[Callable], valid: Optional[bool] = None) -> None:
             if waiter:
                 while self.ops_in_progress != 0:
                     waiter()
-            if self.is_connection_valid():
+            if valid is None:
+                valid = self.is_connection_valid()
+            if valid:
                 self.disconnect()
             else:
                 self.abort()
@@ -273,20 +276,160 @@ class CephfsConnectionPool(object):
             logger.info("abort done from cephfs '{0}'".format(self.fs_name))
             self.fs = None
 
-    # TODO: make this configurable
     TIMER_TASK_RUN_INTERVAL = 30.0   # seconds
     CONNECTION_IDLE_INTERVAL = 60.0  # seconds
     MAX_CONCURRENT_CONNECTIONS = 5   # max number of concurrent connections per volume
 
+    # all pools, so that fs_map updates and configuration changes of a
+    # module reach every pool it created (e.g. per async job clients).
+    _pools: "weakref.WeakSet[CephfsConnectionPool]" = weakref.WeakSet()
+    _settings: "weakref.WeakKeyDictionary[Any, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
     def __init__(self, mgr: Module_T):
         self.mgr = mgr
         self.connections: Dict[str, List[CephfsConnectionPool.Connection]] = {}
         self.lock = Lock()
         self.cond = Condition(self.lock)
+        settings = self._get_settings(mgr)
+        self.max_connections: int = settings.get('max_connections',
+                                                 CephfsConnectionPool.MAX_CONCURRENT_CONNECTIONS)
+        self.max_connections_per_fs: Dict[str, int] = dict(settings.get('max_connections_per_fs', {}))
+        self.idle_timeout: float = settings.get('idle_timeout',
+                                                CephfsConnectionPool.CONNECTION_IDLE_INTERVAL)
+        # filesystem ids as of the last fs_map delivered via notify. until a
+        # map has been delivered, connections are validated against a freshly
+        # fetched fs_map.
+        self.fs_map_epoch: Optional[int] = None
+        self.fs_ids: Dict[str, int] = {}
+        self.metrics: Dict[str, Dict[str, float]] = {}
+        self.stopping = False
+        fs_map = settings.get('fs_map')
+        if fs_map:
+            self._update_fs_map(fs_map)
+        CephfsConnectionPool._pools.add(self)
         self.timer_task = RTimer(CephfsConnectionPool.TIMER_TASK_RUN_INTERVAL,
                                  self.cleanup_connections)
         self.timer_task.start()
 
+    @classmethod
+    def _get_settings(cls, mgr: Module_T) -> Dict[str, Any]:
+        try:
+            return cls._settings.setdefault(mgr, {})
+        except TypeError:
+            # not weak referenceable -- nothing to share
+            return {}
+
+    @classmethod
+    def _mgr_pools(cls, mgr: Module_T) -> List["CephfsConnectionPool"]:
+        return [pool for pool in list(cls._pools) if pool.mgr is mgr]
+
+    @classmethod
+    def notify_fs_map(cls, mgr: Module_T, fs_map: Dict[str, Any]) -> None:
+        """
+        Feed an fs_map (as delivered by a NotifyType.fs_map notification) to
+        all connection pools of a module. Once fed, handle reuse checks the
+        connection against the cached filesystem ids instead of fetching and
+        scanning the fs_map.
+        """
+        cls._get_settings(mgr)['fs_map'] = fs_map
+        for pool in cls._mgr_pools(mgr):
+            pool.update_fs_map(fs_map)
+
+    @classmethod
+    def configure(cls, mgr: Module_T,
+                  max_connections: Optional[int] = None,
+                  idle_timeout: Optional[float] = None,
+                  max_connections_per_fs: Optional[Dict[str, int]] = None) -> None:
+        """
+        Configure the connection pools of a module -- the default number of
+        connections per filesystem, overrides for individual filesystems and
+        the idle timeout after which unused connections are closed.
+        """
+        settings = cls._get_settings(mgr)
+        if max_connections is not None:
+            settings['max_connections'] = max(1, max_connections)
+        if idle_timeout is not None:
+            settings['idle_timeout'] = idle_timeout
+        if max_connections_per_fs is not None:
+            settings['max_connections_per_fs'] = {
+                fs_name: max(1, count) for fs_name, count in max_connections_per_fs.items()}
+        for pool in cls._mgr_pools(mgr):
+            with pool.lock:
+                pool.max_connections = settings.get('max_connections', pool.max_connections)
+                pool.idle_timeout = settings.get('idle_timeout', pool.idle_timeout)
+                pool.max_connections_per_fs = dict(settings.get('max_connections_per_fs', {}))
+
+    def _update_fs_map(self, fs_map: Dict[str, Any]) -> None:
+        self.fs_map_epoch = fs_map.get('epoch', 0)
+        self.fs_ids = {fs['mdsmap']['fs_name']: fs['id'] for fs in fs_map['filesystems']}
+
+    def update_fs_map(self, fs_map: Dict[str, Any]) -> None:
+        with self.lock:
+            if self.fs_map_epoch is not None and fs_map.get('epoch', 0) < self.fs_map_epoch:
+                return
+            self._update_fs_map(fs_map)
+            # drop idle connections to filesystems that went away (or got
+            # recreated). busy ones are dropped once they are done with.
+            for fs_name, connections in list(self.connections.items()):
+                for connection in list(connections):
+                    if connection.ops_in_progress == 0 and not self._is_connection_valid(connection):
+                        logger.info(f'filesystem id changed for volume ({fs_name}), disconnecting ({connection})')
+                        self._del_connection(fs_name, connection)
+
+    def _is_connection_valid(self, connection: Connection) -> bool:
+        if self.fs_map_epoch is None:
+            return connection.is_connection_valid()
+        return self.fs_ids.get(connection.fs_name) == connection.fs_id
+
+    def _get_fs_id(self, fs_name: str) -> Optional[int]:
+        if self.fs_map_epoch is None:
+            return None
+        fs_id = self.fs_ids.get(fs_name)
+        if fs_id is None:
+            # the filesystem may have been created after the last notification
+            # got processed -- double check with the current fs_map.
+            fs_map = self.mgr.get('fs_map')
+            if fs_map.get('epoch', 0) >= self.fs_map_epoch:
+                self._update_fs_map(fs_map)
+            fs_id = self.fs_ids.get(fs_name)
+        if fs_id is None:
+            raise CephfsConnectionException(
+                -errno.ENOENT, "FS '{0}' not found".format(fs_name))
+        return fs_id
+
+    def _metrics(self, fs_name: str) -> Dict[str, float]:
+        metrics = self.metrics.get(fs_name)
+        if metrics is None:
+            metrics = self.metrics[fs_name] = {
+                'acquired': 0,     # handles handed out
+                'shared': 0,       # handles handed out on an already busy connection
+                'connects': 0,     # connections established
+                'reconnects': 0,   # connections dropped since the filesystem changed
+                'waits': 0,        # acquisitions that had to wait for the pool lock
+                'wait_time': 0.0,  # total time (seconds) spent waiting for the pool lock
+            }
+        return metrics
+
+    def _acquire_lock(self, fs_name: str) -> None:
+        if self.lock.acquire(blocking=False):
+            return
+        start = time.monotonic()
+        self.lock.acquire()
+        metrics = self._metrics(fs_name)
+        metrics['waits'] += 1
+        metrics['wait_time'] += time.monotonic() - start
+
+    def get_max_connections(self, fs_name: str) -> int:
+        return self.max_connections_per_fs.get(fs_name, self.max_connections)
+
+    def get_metrics(self) -> Dict[str, Dict[str, float]]:
+        with self.lock:
+            metrics = {}
+            for fs_name, counters in self.metrics.items():
+                metrics[fs_name] = dict(counters)
+                metrics[fs_name]['connections'] = len(self.connections.get(fs_name, []))
+            return metrics
+
     def cleanup_connections(self) -> None:
         with self.lock:
             logger.debug("scanning for idle connections...")
@@ -294,7 +437,7 @@ class CephfsConnectionPool(object):
             for fs_name, connections in self.connections.items():
                 logger.debug(f'fs_name ({fs_name}) connections ({connections})')
                 for connection in connections:
-                    if connection.is_connection_idle(CephfsConnectionPool.CONNECTION_IDLE_INTERVAL):
+                    if connection.is_connection_idle(self.idle_timeout):
                         idle_conns.append((fs_name, connection))
             # Log only if there are idle connections to clean up
             if len(idle_conns) > 0:
@@ -303,52 +446,81 @@ class CephfsConnectionPool(object):
                     self._del_connection(idle_conn[0], idle_conn[1])
             else:
                 logger.debug("No idle connections to clean up.")
+            if self.metrics:
+                logger.debug(f'connection pool metrics: {self.metrics}')
+
+    def _new_connection(self, fs_name: str) -> Connection:
+        connection = CephfsConnectionPool.Connection(self.mgr, fs_name, self._get_fs_id(fs_name))
+        connection.connect()
+        self.connections.setdefault(fs_name, []).append(connection)
+        self._metrics(fs_name)['connects'] += 1
+        return connection
+
+    def warm_up(self, fs_names: Iterable[str], count: int = 1) -> None:
+        """
+        Establish up to @count connections for each of the given filesystems
+        ahead of time, so that the first operations on a volume do not pay
+        for mounting it. Failures are logged and otherwise ignored.
+        """
+        for fs_name in fs_names:
+            with self.lock:
+                if self.stopping:
+                    return
+                try:
+                    want = min(count, self.get_max_connections(fs_name))
+                    while len(self.connections.get(fs_name, [])) < want:
+                        self._new_connection(fs_name)
+                except (cephfs.Error, CephfsConnectionException) as e:
+                    logger.warning(f'failed to warm up connection to volume ({fs_name}): {e}')
 
     def get_fs_handle(self, fs_name: str) -> "cephfs.LibCephFS":
-        with self.lock:
-            try:
-                min_shared = 0
-                shared_connection = None
-                connections = self.connections.setdefault(fs_name, [])
-                logger.debug(f'[get] volume: ({fs_name}) connection: ({connections})')
-                if connections:
-                    min_shared = connections[0].ops_in_progress
-                    shared_connection = connections[0]
-                for connection in list(connections):
-                    logger.debug(f'[get] connection: {connection} usage: {connection.ops_in_progress}')
-                    if connection.ops_in_progress == 0:
-                        if connection.is_connection_valid():
-                            logger.debug(f'[get] connection ({connection}) can be reused')
-                            return connection.get_fs_handle()
-                        else:
-                            # filesystem id changed beneath us (or the filesystem does not exist).
-                            # this is possible if the filesystem got removed (and recreated with
-                            # same name) via "ceph fs rm/new" mon command.
-                            logger.warning(f'[get] filesystem id changed for volume ({fs_name}), disconnecting ({connection})')
-                            # note -- this will mutate @connections too
-                            self._del_connection(fs_name, connection)
+        self._acquire_lock(fs_name)
+        try:
+            metrics = self._metrics(fs_name)
+            metrics['acquired'] += 1
+            min_shared = 0
+            shared_connection = None
+            connections = self.connections.setdefault(fs_name, [])
+            logger.debug(f'[get] volume: ({fs_name}) connection: ({connections})')
+            if connections:
+                min_shared = connections[0].ops_in_progress
+                shared_connection = connections[0]
+            for connection in list(connections):
+                logger.debug(f'[get] connection: {connection} usage: {connection.ops_in_progress}')
+                if connection.ops_in_progress == 0:
+                    if self._is_connection_valid(connection):
+                        logger.debug(f'[get] connection ({connection}) can be reused')
+                        return connection.get_fs_handle()
                     else:
-                        if connection.ops_in_progress < min_shared:
-                            min_shared = connection.ops_in_progress
-                            shared_connection = connection
-                # when we end up here, there are no "free" connections. so either spin up a new
-                # one or share it.
-                if len(connections) < CephfsConnectionPool.MAX_CONCURRENT_CONNECTIONS:
-                    logger.debug('[get] spawning new connection since no connection is unused and we still have room for more')
-                    connection = CephfsConnectionPool.Connection(self.mgr, fs_name)
-                    connection.connect()
-                    self.connections[fs_name].append(connection)
-                    return connection.get_fs_handle()
+                        # filesystem id changed beneath us (or the filesystem does not exist).
+                        # this is possible if the filesystem got removed (and recreated with
+                        # same name) via "ceph fs rm/new" mon command.
+                        logger.warning(f'[get] filesystem id changed for volume ({fs_name}), disconnecting ({connection})')
+                        metrics['reconnects'] += 1
+                        # note -- this will mutate @connections too
+                        self._del_connection(fs_name, connection)
                 else:
-                    assert shared_connection is not None
-                    logger.debug(f'[get] using shared connection ({shared_connection})')
-                    return shared_connection.get_fs_handle()
-            except cephfs.Error as e:
-                # try to provide a better error string if possible
-                if e.args[0] == errno.ENOENT:
-                    raise CephfsConnectionException(
-                        -errno.ENOENT, "FS '{0}' not found".format(fs_name))
-                raise CephfsConnectionException(-e.args[0], e.args[1])
+                    if connection.ops_in_progress < min_shared:
+                        min_shared = connection.ops_in_progress
+                        shared_connection = connection
+            # when we end up here, there are no "free" connections. so either spin up a new
+            # one or share it.
+            if len(connections) < self.get_max_connections(fs_name):
+                logger.debug('[get] spawning new connection since no connection is unused and we still have room for more')
+                return self._new_connection(fs_name).get_fs_handle()
+            else:
+                assert shared_connection is not None
+                logger.debug(f'[get] using shared connection ({shared_connection})')
+                metrics['shared'] += 1
+                return shared_connection.get_fs_handle()
+        except cephfs.Error as e:
+            # try to provide a better error string if possible
+            if e.args[0] == errno.ENOENT:
+                raise CephfsConnectionException(
+                    -errno.ENOENT, "FS '{0}' not found".format(fs_name))
+            raise CephfsConnectionException(-e.args[0], e.args[1])
+        finally:
+            self.lock.release()
 
     def put_fs_handle(self, fs_name: str, fs_handle: cephfs.LibCephFS) -> None:
         with self.lock:
@@ -360,7 +532,8 @@ class CephfsConnectionPool(object):
 
     def _del_connection(self, fs_name: str, connection: Connection, wait: bool = False) -> None:
         self.connections[fs_name].remove(connection)
-        connection.del_fs_handle(waiter=None if not wait else lambda: self.cond.wait())
+        valid = None if self.fs_map_epoch is None else self._is_connection_valid(connection)
+        connection.del_fs_handle(waiter=None if not wait else lambda: self.cond.wait(), valid=valid)
 
     def _del_connections(self, fs_name: str, wait: bool = False) -> None:
         for connection in list(self.connections.get(fs_name, [])):
@@ -372,6 +545,7 @@ class CephfsConnectionPool(object):
 
     def del_all_connections(self) -> None:
         with self.lock:
+            self.stopping = True
             for fs_name in list(self.connections.keys()):
                 logger.info("waiting for pending ops for '{}'".format(fs_name))
                 self._del_connections(fs_name, wait=True)
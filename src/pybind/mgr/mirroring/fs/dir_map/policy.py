@@ -1,9 +1,9 @@
-import os
 import errno
+import heapq
 import logging
 import time
 from threading import Lock
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 from .state_transition import ActionType, PolicyAction, Transition, \
     State, StateTransition
@@ -26,6 +26,74 @@ class DirectoryState:
             f' state={self.state}, transition={self.transition}, next_state={self.next_state},'\
             f' purging={self.purging}]'
 
+class TrackedPathIndex:
+    """Trie of tracked directory paths keyed by path component. Each node
+    counts the tracked paths in its subtree so that finding a tracked
+    ancestor or descendant of a path costs O(depth) rather than a scan over
+    all tracked directories.
+    """
+    class Node:
+        def __init__(self):
+            self.children = {} # type: Dict[str, TrackedPathIndex.Node]
+            self.path = None # type: Optional[str]
+            self.count = 0
+
+    def __init__(self):
+        self.root = TrackedPathIndex.Node()
+
+    @staticmethod
+    def components(dir_path):
+        return [c for c in dir_path.split('/') if c]
+
+    def add(self, dir_path):
+        nodes = [self.root]
+        for c in TrackedPathIndex.components(dir_path):
+            nodes.append(nodes[-1].children.setdefault(c, TrackedPathIndex.Node()))
+        if nodes[-1].path is not None:
+            return
+        nodes[-1].path = dir_path
+        for node in nodes:
+            node.count += 1
+
+    def remove(self, dir_path):
+        nodes = [self.root]
+        comps = TrackedPathIndex.components(dir_path)
+        for c in comps:
+            node = nodes[-1].children.get(c)
+            if node is None:
+                return
+            nodes.append(node)
+        if nodes[-1].path != dir_path:
+            return
+        nodes[-1].path = None
+        for node in nodes:
+            node.count -= 1
+        # prune nodes which do not lead to tracked paths anymore
+        for i in range(len(comps), 0, -1):
+            if nodes[i].count:
+                break
+            del nodes[i - 1].children[comps[i - 1]]
+
+    def find_ancestor_or_subtree(self, dir_path):
+        """Return (tracked_path, 'subtree') if dir_path lies under a tracked
+        path, (tracked_path, 'ancestor') if a tracked path lies under dir_path
+        or None otherwise.
+        """
+        node = self.root
+        for c in TrackedPathIndex.components(dir_path):
+            if node.path is not None:
+                return (node.path, 'subtree')
+            node = node.children.get(c)
+            if node is None:
+                return None
+        if node.path is not None:
+            return (node.path, 'subtree')
+        if not node.count:
+            return None
+        while node.path is None:
+            node = next(child for child in node.children.values() if child.count)
+        return (node.path, 'ancestor')
+
 class Policy:
     # number of seconds after which a directory can be reshuffled
     # to other mirror daemon instances.
@@ -33,7 +101,11 @@ class Policy:
 
     def __init__(self):
         self.dir_states = {}
+        self.tracked_paths = TrackedPathIndex()
         self.instance_to_dir_map = {}
+        # (number of mapped directories, instance_id) -- entries not
+        # matching the current load of a live instance are stale.
+        self.instance_loads = [] # type: List[Tuple[int, str]]
         self.dead_instances = []
         self.lock = Lock()
 
@@ -61,6 +133,28 @@ class Policy:
         return StateTransition.is_idle(dir_state.state) and \
             (time.time() - dir_state['mapped_time']) > Policy.DIR_SHUFFLE_THROTTLE_INTERVAL
 
+    def update_instance_load(self, instance_id):
+        dir_paths = self.instance_to_dir_map.get(instance_id)
+        if dir_paths is None or self.is_dead_instance(instance_id):
+            return
+        heapq.heappush(self.instance_loads, (len(dir_paths), instance_id))
+        # drop stale entries buried in the heap once they pile up
+        if len(self.instance_loads) > 2 * len(self.instance_to_dir_map) + 64:
+            self.instance_loads = [(len(dir_paths), instance_id) for instance_id, dir_paths
+                                   in self.instance_to_dir_map.items()
+                                   if not self.is_dead_instance(instance_id)]
+            heapq.heapify(self.instance_loads)
+
+    def least_loaded_instance(self):
+        while self.instance_loads:
+            nr_dirs, instance_id = self.instance_loads[0]
+            dir_paths = self.instance_to_dir_map.get(instance_id)
+            if dir_paths is not None and len(dir_paths) == nr_dirs and \
+               not self.is_dead_instance(instance_id):
+                return instance_id
+            heapq.heappop(self.instance_loads)
+        return None
+
     def set_state(self, dir_state, state, ignore_current_state=False):
         if not ignore_current_state and dir_state.state == state:
             return False
@@ -82,6 +176,7 @@ class Policy:
                         self.instance_to_dir_map[instance_id] = []
                     self.instance_to_dir_map[instance_id].append(dir_path)
                 self.dir_states[dir_path] = DirectoryState(instance_id, dir_map['last_shuffled'])
+                self.tracked_paths.add(dir_path)
                 dir_state = self.dir_states[dir_path]
                 state = State.INITIALIZING if instance_id else State.ASSOCIATING
                 purging = dir_map.get('purging', 0)
@@ -120,11 +215,7 @@ class Policy:
             return True
         if self.is_dead_instance(current_instance_id):
             self.unmap(dir_path, dir_state)
-        for instance_id, dir_paths in self.instance_to_dir_map.items():
-            if self.is_dead_instance(instance_id):
-                continue
-            if not min_instance_id or len(dir_paths) < len(self.instance_to_dir_map[min_instance_id]):
-                min_instance_id = instance_id
+        min_instance_id = self.least_loaded_instance()
         if not min_instance_id:
             log.debug(f'instance unavailable for {dir_path}')
             return False
@@ -132,6 +223,7 @@ class Policy:
         dir_state.instance_id = min_instance_id
         dir_state.mapped_time = time.time()
         self.instance_to_dir_map[min_instance_id].append(dir_path)
+        self.update_instance_load(min_instance_id)
         return True
 
     def unmap(self, dir_path, dir_state):
@@ -143,6 +235,7 @@ class Policy:
         if self.is_dead_instance(instance_id) and not self.instance_to_dir_map[instance_id]:
             self.instance_to_dir_map.pop(instance_id)
             self.dead_instances.remove(instance_id)
+        self.update_instance_load(instance_id)
 
     def shuffle(self, dirs_per_instance, include_stalled_dirs):
         log.debug(f'directories per instance: {dirs_per_instance}')
@@ -177,6 +270,7 @@ class Policy:
         elif policy_action == PolicyAction.REMOVE:
             if dir_state.state == State.UNASSOCIATED:
                 self.dir_states.pop(dir_path)
+                self.tracked_paths.remove(dir_path)
         else:
             raise Exception()
         return done
@@ -233,28 +327,50 @@ class Policy:
             return pending
 
     def find_tracked_ancestor_or_subtree(self, dir_path):
-        for tracked_path, _ in self.dir_states.items():
-            comp = [dir_path, tracked_path]
-            cpath = os.path.commonpath(comp)
-            if cpath in comp:
-                what = 'subtree' if cpath == tracked_path else 'ancestor'
-                return (tracked_path, what)
-        return None
+        return self.tracked_paths.find_ancestor_or_subtree(dir_path)
 
-    def add_dir(self, dir_path):
+    def _add_dir(self, dir_path):
         log.debug(f'adding dir_path {dir_path}')
+        if dir_path in self.dir_states:
+            return False
+        as_info = self.find_tracked_ancestor_or_subtree(dir_path)
+        if as_info:
+            raise MirrorException(-errno.EINVAL, f'{dir_path} is a {as_info[1]} of tracked path {as_info[0]}')
+        self.dir_states[dir_path] = DirectoryState()
+        self.tracked_paths.add(dir_path)
+        dir_state = self.dir_states[dir_path]
+        log.debug(f'add dir_state: {dir_state}')
+        if dir_state.state == State.INITIALIZING:
+            return False
+        return self.set_state(dir_state, State.ASSOCIATING)
+
+    def add_dir(self, dir_path):
         with self.lock:
-            if dir_path in self.dir_states:
-                return False
-            as_info = self.find_tracked_ancestor_or_subtree(dir_path)
-            if as_info:
-                raise MirrorException(-errno.EINVAL, f'{dir_path} is a {as_info[1]} of tracked path {as_info[0]}')
-            self.dir_states[dir_path] = DirectoryState()
-            dir_state = self.dir_states[dir_path]
-            log.debug(f'add dir_state: {dir_state}')
-            if dir_state.state == State.INITIALIZING:
-                return False
-            return self.set_state(dir_state, State.ASSOCIATING)
+            return self._add_dir(dir_path)
+
+    def add_dirs(self, dir_paths):
+        """Add a batch of directories. Either all directories get added or,
+        when one of them clashes with a tracked directory (or with another
+        directory in the batch), none of them. Returns the directories for
+        which an action needs to be scheduled.
+        """
+        with self.lock:
+            added = []
+            schedules = []
+            try:
+                for dir_path in dir_paths:
+                    if dir_path in self.dir_states:
+                        continue
+                    schedule = self._add_dir(dir_path)
+                    added.append(dir_path)
+                    if schedule:
+                        schedules.append(dir_path)
+            except MirrorException:
+                for dir_path in added:
+                    self.dir_states.pop(dir_path)
+                    self.tracked_paths.remove(dir_path)
+                raise
+            return schedules
 
     def remove_dir(self, dir_path):
         log.debug(f'removing dir_path {dir_path}')
@@ -287,6 +403,8 @@ class Policy:
                 dead_instances.append(instance_id)
         if dead_instances:
             self._remove_instances(dead_instances)
+        for instance_id in self.instance_to_dir_map:
+            self.update_instance_load(instance_id)
 
     def add_instances(self, instance_ids, initial_update=False):
         log.debug(f'adding instances: {instance_ids} initial_update {initial_update}')
@@ -303,6 +421,7 @@ class Policy:
                 for instance_id in instance_ids:
                     if not instance_id in self.instance_to_dir_map:
                         self.instance_to_dir_map[instance_id] = []
+                        self.update_instance_load(instance_id)
                 dirs_per_instance = int(len(self.dir_states) /
                                         (len(self.instance_to_dir_map) - nr_dead_instances))
                 if dirs_per_instance == 0:
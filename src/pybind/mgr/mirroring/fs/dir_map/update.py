@@ -9,7 +9,8 @@ from ..utils import MIRROR_OBJECT_NAME, DIRECTORY_MAP_PREFIX, \
 
 log = logging.getLogger(__name__)
 
-MAX_UPDATE = 256
+# maximum number of omap keys set or removed in a single write op
+MAX_UPDATE = 1024
 
 class UpdateDirMapRequest:
     def __init__(self, ioctx, update_mapping, removals, on_finish_callback):
@@ -38,12 +39,14 @@ class UpdateDirMapRequest:
                     mapping = self.update_mapping.pop(dir_path)
                     keys.append(UpdateDirMapRequest.omap_key(dir_path))
                     vals.append(pickle.dumps(mapping))
+                if keys:
                     self.ioctx.set_omap(write_op, tuple(keys), tuple(vals))
                 # gather deletes
                 slicept = MAX_UPDATE - len(dir_keys)
                 removals = [UpdateDirMapRequest.omap_key(dir_path) for dir_path in self.removals[0:slicept]]
                 self.removals = self.removals[slicept:]
-                self.ioctx.remove_omap_keys(write_op, tuple(removals))
+                if removals:
+                    self.ioctx.remove_omap_keys(write_op, tuple(removals))
                 log.debug(f'applying {len(keys)} updates, {len(removals)} deletes')
                 self.ioctx.operate_aio_write_op(write_op, MIRROR_OBJECT_NAME, oncomplete=self.handle_update)
         except rados.Error as e:
@@ -123,6 +126,7 @@ class UpdateInstanceRequest:
                     data = self.instances_added.pop(instance_id)
                     keys.append(UpdateInstanceRequest.omap_key(instance_id))
                     vals.append(pickle.dumps(data))
+                if keys:
                     self.ioctx.set_omap(write_op, tuple(keys), tuple(vals))
                 # gather deletes
                 slicept = MAX_UPDATE - len(instance_ids)
@@ -103,7 +103,8 @@ class FSPolicy:
         log.debug('FSPolicy.shutdown done')
 
     def handle_update_mapping(self, updates, removals, request_id, callback, r):
-        log.info(f'handle_update_mapping: {updates} {removals} {request_id} {callback} {r}')
+        log.info(f'handle_update_mapping: {len(updates)}+{len(removals)} updates {request_id} {callback} {r}')
+        log.debug(f'handle_update_mapping: {updates} {removals}')
         with self.lock:
             try:
                 self.async_requests.pop(request_id)
@@ -252,17 +253,24 @@ class FSPolicy:
             self.dir_paths.clear()
 
     def add_dir(self, dir_path):
+        self.add_dirs([dir_path])
+
+    def add_dirs(self, dir_paths):
         with self.lock:
-            lookup_info = self.policy.lookup(dir_path)
-            if lookup_info:
-                if lookup_info['purging']:
-                    raise MirrorException(-errno.EAGAIN, f'remove in-progress for {dir_path}')
-                else:
-                    raise MirrorException(-errno.EEXIST, f'directory {dir_path} is already tracked')
-            schedule = self.policy.add_dir(dir_path)
-            if not schedule:
+            for dir_path in dir_paths:
+                lookup_info = self.policy.lookup(dir_path)
+                if lookup_info:
+                    if lookup_info['purging']:
+                        raise MirrorException(-errno.EAGAIN, f'remove in-progress for {dir_path}')
+                    else:
+                        raise MirrorException(-errno.EEXIST, f'directory {dir_path} is already tracked')
+            schedules = self.policy.add_dirs(dir_paths)
+            if not schedules:
                 return
-            update_map = {dir_path: {'version': 1, 'instance_id': '', 'last_shuffled': 0.0}}
+            # persist the whole batch before scheduling -- the update request
+            # splits it into omap transactions of MAX_UPDATE keys.
+            update_map = {dir_path: {'version': 1, 'instance_id': '', 'last_shuffled': 0.0}
+                          for dir_path in schedules}
             updated = False
             def update_safe(updates, removals, r):
                 nonlocal updated
@@ -270,19 +278,24 @@ class FSPolicy:
                 self.cond.notifyAll()
             self.update_mapping(update_map, [], callback=update_safe)
             self.cond.wait_for(lambda: updated)
-            self.schedule_action([dir_path])
+            self.schedule_action(schedules)
 
     def remove_dir(self, dir_path):
+        self.remove_dirs([dir_path])
+
+    def remove_dirs(self, dir_paths):
         with self.lock:
-            lookup_info = self.policy.lookup(dir_path)
-            if not lookup_info:
-                raise MirrorException(-errno.ENOENT, f'directory {dir_path} id not tracked')
-            if lookup_info['purging']:
-                raise MirrorException(-errno.EINVAL, f'directory {dir_path} is under removal')
-            update_map = {dir_path: {'version': 1,
-                                     'instance_id': lookup_info['instance_id'],
-                                     'last_shuffled': lookup_info['mapped_time'],
-                                     'purging': 1}}
+            update_map = {}
+            for dir_path in dir_paths:
+                lookup_info = self.policy.lookup(dir_path)
+                if not lookup_info:
+                    raise MirrorException(-errno.ENOENT, f'directory {dir_path} id not tracked')
+                if lookup_info['purging']:
+                    raise MirrorException(-errno.EINVAL, f'directory {dir_path} is under removal')
+                update_map[dir_path] = {'version': 1,
+                                        'instance_id': lookup_info['instance_id'],
+                                        'last_shuffled': lookup_info['mapped_time'],
+                                        'purging': 1}
             updated = False
             sync_lock = threading.Lock()
             sync_cond = threading.Condition(sync_lock)
@@ -295,9 +308,11 @@ class FSPolicy:
             request.send()
             with sync_lock:
                 sync_cond.wait_for(lambda: updated)
-            schedule = self.policy.remove_dir(dir_path)
-            if schedule:
-                self.schedule_action([dir_path])
+            schedules = []
+            for dir_path in update_map:
+                if self.policy.remove_dir(dir_path):
+                    schedules.append(dir_path)
+            self.schedule_action(schedules)
 
     def status(self, dir_path):
         with self.lock:
@@ -713,6 +728,9 @@ class FSSnapshotMirror:
         return self.peer_add(filesystem, remote_cluster_spec, remote_fs_name, token_dct)
 
     def add_dir(self, filesystem, dir_path):
+        return self.add_dirs(filesystem, [dir_path])
+
+    def add_dirs(self, filesystem, dir_paths):
         try:
             with self.lock:
                 if not self.filesystem_exist(filesystem):
@@ -720,9 +738,9 @@ class FSSnapshotMirror:
                 fspolicy = self.pool_policy.get(filesystem, None)
                 if not fspolicy:
                     raise MirrorException(-errno.EINVAL, f'filesystem {filesystem} is not mirrored')
-                dir_path = norm_path(dir_path)
-                log.debug(f'path normalized to {dir_path}')
-                fspolicy.add_dir(dir_path)
+                dir_paths = list(dict.fromkeys(norm_path(dir_path) for dir_path in dir_paths))
+                log.debug(f'paths normalized to {dir_paths}')
+                fspolicy.add_dirs(dir_paths)
                 return 0, json.dumps({}), ''
         except MirrorException as me:
             return me.args[0], '', me.args[1]
@@ -730,6 +748,9 @@ class FSSnapshotMirror:
             return e.args[0], '', 'failed to add directory'
 
     def remove_dir(self, filesystem, dir_path):
+        return self.remove_dirs(filesystem, [dir_path])
+
+    def remove_dirs(self, filesystem, dir_paths):
         try:
             with self.lock:
                 if not self.filesystem_exist(filesystem):
@@ -737,8 +758,8 @@ class FSSnapshotMirror:
                 fspolicy = self.pool_policy.get(filesystem, None)
                 if not fspolicy:
                     raise MirrorException(-errno.EINVAL, f'filesystem {filesystem} is not mirrored')
-                dir_path = norm_path(dir_path)
-                fspolicy.remove_dir(dir_path)
+                dir_paths = list(dict.fromkeys(norm_path(dir_path) for dir_path in dir_paths))
+                fspolicy.remove_dirs(dir_paths)
                 return 0, json.dumps({}), ''
         except MirrorException as me:
             return me.args[0], '', me.args[1]
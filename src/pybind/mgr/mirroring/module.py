@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
 from .cli import MirroringCLICommand
 
@@ -96,16 +96,16 @@ class Module(MgrModule):
     @MirroringCLICommand.Write('fs snapshot mirror add')
     def snapshot_mirror_add_dir(self,
                                 fs_name: str,
-                                path: str):
-        """Add a directory for snapshot mirroring"""
-        return self.fs_snapshot_mirror.add_dir(fs_name, path)
+                                path: Sequence[str]):
+        """Add one or more directories for snapshot mirroring"""
+        return self.fs_snapshot_mirror.add_dirs(fs_name, path)
 
     @MirroringCLICommand.Write('fs snapshot mirror remove')
     def snapshot_mirror_remove_dir(self,
                                    fs_name: str,
-                                   path: str):
-        """Remove a snapshot mirrored directory"""
-        return self.fs_snapshot_mirror.remove_dir(fs_name, path)
+                                   path: Sequence[str]):
+        """Remove one or more snapshot mirrored directories"""
+        return self.fs_snapshot_mirror.remove_dirs(fs_name, path)
 
     @MirroringCLICommand.Read('fs snapshot mirror ls')
     def snapshot_mirror_ls(self,
@@ -7,6 +7,7 @@ except ImportError:
 from mgr_module import MgrModule, OSDMap, Option
 from mgr_util import to_pretty_timedelta
 from datetime import timedelta
+from array import array
 import os
 import threading
 import datetime
@@ -282,6 +283,105 @@ class RemoteEvent(Event):
         return self._failure_message if self._failed else None
 
 
+# memoized result of is_active_clean(), keyed by PG state string
+_active_clean_states = {}  # type: Dict[str, bool]
+
+
+def is_active_clean(state):
+    # type: (str) -> bool
+    try:
+        return _active_clean_states[state]
+    except KeyError:
+        states = state.split("+")
+        r = "active" in states and "clean" in states
+        _active_clean_states[state] = r
+        return r
+
+
+class PgStateTable(object):
+    """
+    The PGs tracked by a PgRecoveryEvent, held in flat arrays indexed
+    by position rather than as a list of PgId objects, so that an
+    update only touches the PGs which have not completed yet.
+    """
+
+    def __init__(self, pgs):
+        # type: (List[PgId]) -> None
+        self.pool_ids = array('q', (int(pg.pool_id) for pg in pgs))
+        self.ps = array('Q', (pg.ps for pg in pgs))
+        # keys of the PGs in the pg_progress map
+        self.keys = [str(pg) for pg in pgs]
+        # num_bytes_recovered of each PG when we started tracking it
+        self.bytes_recovered = array('d', [0.0]) * len(self.keys)
+        # indices of the PGs which are still recovering
+        self.pending = array('l', range(len(self.keys)))
+        self.initialized = False
+
+    def __len__(self):
+        # type: () -> int
+        return len(self.pending)
+
+    def pgs(self):
+        # type: () -> List[PgId]
+        return [PgId(self.pool_ids[i], self.ps[i]) for i in self.pending]
+
+    def start(self, pg_to_state, pg_ready):
+        # type: (Dict[str, Any], bool) -> None
+        pending = array('l')
+        for i in self.pending:
+            info = pg_to_state.get(self.keys[i])
+            if info is not None:
+                self.bytes_recovered[i] = info['num_bytes_recovered']
+            elif pg_ready:
+                continue
+            pending.append(i)
+        self.pending = pending
+        self.initialized = True
+
+    def update(self, pg_to_state, start_epoch):
+        # type: (Dict[str, Any], int) -> float
+        """
+        Drop the PGs which became active+clean (or disappeared) and
+        return the summed fractional progress of the remaining ones.
+        """
+        keys = self.keys
+        bytes_recovered = self.bytes_recovered
+        pending = array('l')
+        accumulate = 0.0
+        for i in self.pending:
+            info = pg_to_state.get(keys[i])
+            if info is None:
+                # The PG is gone!  Probably a pool was deleted. Drop it.
+                continue
+            # Only checks the state of each PGs when it's epoch >= the OSDMap's epoch
+            if info['reported_epoch'] < start_epoch:
+                pending.append(i)
+                continue
+            if is_active_clean(info['state']):
+                continue
+            pending.append(i)
+            total_bytes = info['num_bytes']
+            if total_bytes == 0:
+                # Empty PGs are considered 0% done until they are
+                # in the correct state.
+                continue
+            if total_bytes > 0:
+                ratio = float(info['num_bytes_recovered'] -
+                              bytes_recovered[i]) / total_bytes
+                # Since the recovered bytes (over time) could perhaps
+                # exceed the contents of the PG (moment in time), we
+                # must clamp this
+                ratio = min(ratio, 1.0)
+                ratio = max(ratio, 0.0)
+            else:
+                # Dataless PGs (e.g. containing only OMAPs) count
+                # as half done.
+                ratio = 0.5
+            accumulate += ratio
+        self.pending = pending
+        return accumulate
+
+
 class PgRecoveryEvent(Event):
     """
     An event whose completion is determined by the recovery of a set of
@@ -293,10 +393,9 @@ class PgRecoveryEvent(Event):
     def __init__(self, message, refs, which_pgs, which_osds, start_epoch, add_to_ceph_s):
         # type: (str, List[Any], List[PgId], List[str], int, bool) -> None
         super().__init__(str(uuid.uuid4()), message, refs, add_to_ceph_s)
-        self._pgs = which_pgs
+        self._pg_table = PgStateTable(which_pgs)
         self._which_osds = which_osds
-        self._original_pg_count = len(self._pgs)
-        self._original_bytes_recovered = None  # type: Optional[Dict[PgId, float]]
+        self._original_pg_count = len(which_pgs)
         self._progress = 0.0
 
         self._start_epoch = start_epoch
@@ -306,28 +405,20 @@ class PgRecoveryEvent(Event):
     def which_osds(self):
         return self. _which_osds
 
+    @property
+    def _pgs(self):
+        # type: () -> List[PgId]
+        return self._pg_table.pgs()
+
     def pg_update(self, pg_progress: Dict, log: Any) -> None:
-        # FIXME: O(pg_num) in python
-        # Sanity check to see if there are any missing PGs and to assign
-        # empty array and dictionary if there hasn't been any recovery
+        # Sanity check to see if there are any missing PGs and to record
+        # how many bytes had been recovered before the event started
         pg_to_state: Dict[str, Any] = pg_progress["pgs"]
         pg_ready: bool = pg_progress["pg_ready"]
 
-        if self._original_bytes_recovered is None:
-            self._original_bytes_recovered = {}
-            missing_pgs = []
-            for pg in self._pgs:
-                pg_str = str(pg)
-                if pg_str in pg_to_state:
-                    self._original_bytes_recovered[pg] = \
-                        pg_to_state[pg_str]['num_bytes_recovered']
-                else:
-                    missing_pgs.append(pg)
-            if pg_ready:
-                for pg in missing_pgs:
-                    self._pgs.remove(pg)
-
-        complete_accumulate = 0.0
+        table = self._pg_table
+        if not table.initialized:
+            table.start(pg_to_state, pg_ready)
 
         # Calculating progress as the number of PGs recovered divided by the
         # original where partially completed PGs count for something
@@ -336,52 +427,9 @@ class PgRecoveryEvent(Event):
         # representing the work still to do if there are a number of very
         # few-bytes PGs that still need the housekeeping of their recovery
         # to be done. This is subjective...
+        complete_accumulate = table.update(pg_to_state, self._start_epoch)
 
-        complete = set()
-        for pg in self._pgs:
-            pg_str = str(pg)
-            try:
-                info = pg_to_state[pg_str]
-            except KeyError:
-                # The PG is gone!  Probably a pool was deleted. Drop it.
-                complete.add(pg)
-                continue
-            # Only checks the state of each PGs when it's epoch >= the OSDMap's epoch
-            if info['reported_epoch'] < self._start_epoch:
-                continue
-
-            state = info['state']
-
-            states = state.split("+")
-
-            if "active" in states and "clean" in states:
-                complete.add(pg)
-            else:
-                if info['num_bytes'] == 0:
-                    # Empty PGs are considered 0% done until they are
-                    # in the correct state.
-                    pass
-                else:
-                    recovered = info['num_bytes_recovered']
-                    total_bytes = info['num_bytes']
-                    if total_bytes > 0:
-                        ratio = float(recovered -
-                                      self._original_bytes_recovered[pg]) / \
-                            total_bytes
-                        # Since the recovered bytes (over time) could perhaps
-                        # exceed the contents of the PG (moment in time), we
-                        # must clamp this
-                        ratio = min(ratio, 1.0)
-                        ratio = max(ratio, 0.0)
-
-                    else:
-                        # Dataless PGs (e.g. containing only OMAPs) count
-                        # as half done.
-                        ratio = 0.5
-                    complete_accumulate += ratio
-
-        self._pgs = list(set(self._pgs) ^ complete)
-        completed_pgs = self._original_pg_count - len(self._pgs)
+        completed_pgs = self._original_pg_count - len(table)
         completed_pgs = max(completed_pgs, 0)
         try:
             prog = (completed_pgs + complete_accumulate)\
@@ -498,38 +546,14 @@ class Module(MgrModule):
                     self.get_module_option(opt['name']))
             self.log.debug(' %s = %s', opt['name'], getattr(self, opt['name']))
 
-    def _osd_in_out(self, old_map: OSDMap, old_dump: Dict,
-                    new_map: OSDMap, osd_id: str, marked: str) -> None:
+    def _osd_in_out(self, old_map: OSDMap, new_map: OSDMap,
+                    osd_id: int, marked: str) -> None:
         # A function that will create or complete an event when an
-        # OSD is marked in or out according to the affected PGs
-        affected_pgs = []
-        for pool in old_dump['pools']:
-            pool_id = pool['pool']  # type: str
-            for ps in range(0, pool['pg_num']):
-
-                # Was this pg affected by the OSD coming in/out?
-                # Compare old and new OSDs using
-                # data from the old/new acting and up sets.
-                old_up_acting = old_map.pg_to_up_acting_osds(pool['pool'], ps)
-                old_acting_osds = old_up_acting['acting']
-                old_up_set_osds = old_up_acting['up']
-                new_up_acting = new_map.pg_to_up_acting_osds(pool['pool'], ps)
-                new_acting_osds = new_up_acting['acting']
-                new_up_set_osds = new_up_acting['up']
-
-                # Check if this PG involves the OSD that was marked in/out
-                osd_affected = osd_id in old_up_set_osds or osd_id in new_up_set_osds
-                if not osd_affected:
-                    continue
-                
-                up_set_changed = old_up_set_osds != new_up_set_osds
-
-                if osd_affected and up_set_changed:
-                    self.log.debug("PG %s.%x: acting %s->%s up %s->%s (relocated=%s)",
-                            pool_id, ps, old_acting_osds, new_acting_osds, old_up_set_osds,
-                            new_up_set_osds, up_set_changed)
-                    # This PG is now in motion, track its progress
-                    affected_pgs.append(PgId(pool_id, ps))
+        # OSD is marked in or out according to the affected PGs.
+        # A PG is in motion (and we track its progress) if the OSD is
+        # in its old or new up set, and that up set changed.
+        affected_pgs = [PgId(pool_id, ps) for pool_id, ps in
+                        old_map.get_pgs_up_with_osd(new_map, osd_id)]
 
         # In the case of the osd coming back in, we might need to cancel
         # previous recovery event for that osd
@@ -568,27 +592,27 @@ class Module(MgrModule):
 
     def _osdmap_changed(self, old_osdmap, new_osdmap):
         # type: (OSDMap, OSDMap) -> None
-        old_dump = old_osdmap.dump()
-        new_dump = new_osdmap.dump()
+        # only the OSD changes are of interest, skip mapping the PGs
+        diff = old_osdmap.diff(new_osdmap, with_pgs=False)
 
-        old_osds = dict([(o['osd'], o) for o in old_dump['osds']])
-
-        for osd in new_dump['osds']:
+        for osd in diff['osds']:
             osd_id = osd['osd']
-            new_weight = osd['in']
-            if osd_id in old_osds:
-                self.log.debug("Processing osd.{0}: {1} -> {2}".format(osd_id, old_osds[osd_id]['weight'], osd['weight']))
-                old_weight = old_osds[osd_id]['in']
-
-                if new_weight == 0.0 and old_weight > new_weight:
-                    self.log.warning("osd.{0} marked out".format(osd_id))
-                    self._osd_in_out(old_osdmap, old_dump, new_osdmap, osd_id, "out")
-                elif new_weight >= 1.0 and old_weight == 0.0:
-                    # Only consider weight>=1.0 as "in" to avoid spawning
-                    # individual recovery events on every adjustment
-                    # in a gradual weight-in
-                    self.log.warning("osd.{0} marked in".format(osd_id))
-                    self._osd_in_out(old_osdmap, old_dump, new_osdmap, osd_id, "in")
+            old, new = osd['old'], osd['new']
+            if not (old['exists'] and new['exists']):
+                continue
+            self.log.debug("Processing osd.{0}: {1} -> {2}".format(osd_id, old['weight'], new['weight']))
+            new_weight = new['in']
+            old_weight = old['in']
+
+            if new_weight == 0.0 and old_weight > new_weight:
+                self.log.warning("osd.{0} marked out".format(osd_id))
+                self._osd_in_out(old_osdmap, new_osdmap, osd_id, "out")
+            elif new_weight >= 1.0 and old_weight == 0.0:
+                # Only consider weight>=1.0 as "in" to avoid spawning
+                # individual recovery events on every adjustment
+                # in a gradual weight-in
+                self.log.warning("osd.{0} marked in".format(osd_id))
+                self._osd_in_out(old_osdmap, new_osdmap, osd_id, "in")
 
     def _pg_state_changed(self):
 
@@ -47,6 +47,64 @@ class TestPgRecoveryEvent(object):
         self.test_event.pg_update(pg_progress, mock.Mock())
         assert self.test_event._progress == 1.0
 
+    def test_pg_update_partial(self):
+        # 1.0 is done, 1.1 is half way through, 1.2 has not reported yet
+        pg_progress = {
+            "pgs": {
+                "1.0": {
+                    "state": "active+clean",
+                    "num_bytes": 10,
+                    "num_bytes_recovered": 10,
+                    "reported_epoch": 30,
+                },
+                "1.1": {
+                    "state": "active+recovering",
+                    "num_bytes": 10,
+                    "num_bytes_recovered": 2,
+                    "reported_epoch": 30,
+                },
+                "1.2": {
+                    "state": "active+recovering",
+                    "num_bytes": 10,
+                    "num_bytes_recovered": 0,
+                    "reported_epoch": 29,
+                },
+            },
+            "pg_ready": True,
+        }
+        self.test_event.pg_update(pg_progress, mock.Mock())
+        assert self.test_event._progress == pytest.approx(1 / 3)
+        assert [str(pg) for pg in self.test_event._pgs] == ["1.1", "1.2"]
+
+        pg_progress["pgs"]["1.1"]["num_bytes_recovered"] = 7
+        pg_progress["pgs"]["1.2"]["reported_epoch"] = 30
+        self.test_event.pg_update(pg_progress, mock.Mock())
+        assert self.test_event._progress == pytest.approx(1.5 / 3)
+
+        # a PG which disappeared counts as complete
+        del pg_progress["pgs"]["1.2"]
+        pg_progress["pgs"]["1.1"]["state"] = "active+clean"
+        self.test_event.pg_update(pg_progress, mock.Mock())
+        assert self.test_event._progress == 1.0
+        assert self.test_event._pgs == []
+
+    def test_pg_update_missing(self):
+        # PGs missing from a complete pg_progress are dropped on the first update
+        pg_progress = {
+            "pgs": {
+                "1.0": {
+                    "state": "active+backfilling",
+                    "num_bytes": 0,
+                    "num_bytes_recovered": 0,
+                    "reported_epoch": 30,
+                },
+            },
+            "pg_ready": True,
+        }
+        self.test_event.pg_update(pg_progress, mock.Mock())
+        assert self.test_event._progress == pytest.approx(2 / 3)
+        assert [str(pg) for pg in self.test_event._pgs] == ["1.0"]
+
 
 class OSDMap: 
     
@@ -86,6 +144,38 @@ class OSDMap:
     def pg_to_up_acting_osds(self, pool_id, ps):
         return self._pg_to_up_acting_osds(pool_id, ps)
 
+    def get_pgs_up_with_osd(self, other, osd, only_changed=True):
+        pgs = []
+        for pool in self._dump['pools']:
+            for ps in range(0, pool['pg_num']):
+                up = self.pg_to_up_acting_osds(pool['pool'], ps)['up']
+                other_up = other.pg_to_up_acting_osds(pool['pool'], ps)['up']
+                if osd not in up and osd not in other_up:
+                    continue
+                if only_changed and up == other_up:
+                    continue
+                pgs.append((pool['pool'], ps))
+        return pgs
+
+    def diff(self, other, with_pgs=True):
+        assert not with_pgs, 'progress only needs the OSD changes'
+        old = dict([(o['osd'], o) for o in self._dump.get('osds', [])])
+        new = dict([(o['osd'], o) for o in other._dump.get('osds', [])])
+        osds = []
+        for osd_id in sorted(set(old) | set(new)):
+            states = []
+            for osds_by_id in (old, new):
+                o = osds_by_id.get(osd_id)
+                states.append({
+                    "exists": o is not None,
+                    "up": o['up'] if o else 0,
+                    "in": o['in'] if o else 0,
+                    "weight": o['weight'] if o else 0.0,
+                })
+            if states[0] != states[1]:
+                osds.append({"osd": osd_id, "old": states[0], "new": states[1]})
+        return {"osds": osds, "pgs": []}
+
 
 class TestModule(object):
     # Testing Module Class
@@ -164,11 +254,24 @@ class TestModule(object):
 
         new_map = OSDMap(new_dump, new_pg_stats)
         old_map = OSDMap(old_dump, old_pg_stats)
-        self.test_module._osd_in_out(old_map, old_dump, new_map, 3, "out")
+        self.test_module._osd_in_out(old_map, new_map, 3, "out")
         # check if only one event is created
         assert len(self.test_module._events) == 1
-        self.test_module._osd_in_out(old_map, old_dump, new_map, 3, "in")
+        self.test_module._osd_in_out(old_map, new_map, 3, "in")
         # check if complete function is called
         assert self.test_module._complete.call_count == 1
         # check if a PgRecovery Event was created and pg_update gets triggered
         assert module.PgRecoveryEvent.pg_update.call_count == 2
+
+    def test_osdmap_changed(self):
+        # only OSDs existing in both maps and changing in/out are processed
+        def osd(osd_id, osd_in):
+            return {"osd": osd_id, "up": 1, "in": osd_in, "weight": float(osd_in)}
+        old_map = OSDMap({"osds": [osd(0, 1), osd(1, 1), osd(2, 0)]}, None)
+        new_map = OSDMap({"osds": [osd(0, 1), osd(1, 0), osd(2, 1), osd(3, 1)]}, None)
+        self.test_module._osd_in_out = mock.Mock()
+        self.test_module._osdmap_changed(old_map, new_map)
+        assert self.test_module._osd_in_out.call_args_list == [
+            mock.call(old_map, new_map, 1, "out"),
+            mock.call(old_map, new_map, 2, "in"),
+        ]
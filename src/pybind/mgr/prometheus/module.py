@@ -1,9 +1,13 @@
 import cherrypy
 import yaml
 from collections import defaultdict
+import copy
+import gzip
 import json
 import math
+import multiprocessing.pool
 import re
+import struct
 import threading
 import time
 import errno
@@ -443,6 +447,65 @@ class ThreadSafeLRUCacheDict(LRUCacheDict[K, V]):
             return list(super().values())
 
 
+# Must be kept in sync with promethize() in src/exporter/util.cc
+def promethize(path: str) -> str:
+    ''' replace illegal metric name characters '''
+    result = re.sub(r'[./\s]|::', '_', path).replace('+', '_plus')
+
+    # Hyphens usually turn into underscores, unless they are
+    # trailing
+    if result.endswith("-"):
+        result = result[0:-1] + "_minus"
+    else:
+        result = result.replace("-", "_")
+
+    return "ceph_{0}".format(result)
+
+
+def floatstr(value: float) -> str:
+    ''' represent as Go-compatible float '''
+    if value == float('inf'):
+        return '+Inf'
+    if value == float('-inf'):
+        return '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value))
+
+
+# Metric types of io.prometheus.client.MetricFamily, and the field of
+# io.prometheus.client.Metric holding their value
+PROTOBUF_TYPES = {
+    'counter': (0, 3),
+    'gauge': (1, 2),
+    'untyped': (3, 5),
+}
+
+# OpenMetrics has no 'untyped' metric type, and counters would need a
+# '_total' suffix: keep the series names of the text format instead.
+OPENMETRICS_TYPES = {
+    'gauge': 'gauge',
+}
+
+
+def pb_varint(value: int) -> bytes:
+    ''' encode a protobuf varint '''
+    out = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def pb_field(field: int, data: bytes) -> bytes:
+    ''' encode a length-delimited protobuf field '''
+    return pb_varint(field << 3 | 2) + pb_varint(len(data)) + data
+
+
 class Metric(object):
     def __init__(self, mtype: str, name: str, desc: str, labels: Optional[LabelValues] = None) -> None:
         self.mtype = mtype
@@ -450,66 +513,134 @@ class Metric(object):
         self.desc = desc
         self.labelnames = labels  # tuple if present
         self.value: Dict[LabelValues, Number] = {}
+        self._name = promethize(name)
+        self._header = '''
+# HELP {name} {desc}
+# TYPE {name} {mtype}'''.format(
+            name=self._name,
+            desc=desc,
+            mtype=mtype,
+        )
+        self._reset_rendering()
+
+    def _reset_rendering(self) -> None:
+        # Rendering state kept across scrapes by str_expfmt() and
+        # protobuf(): the values rendered last time, per label tuple the
+        # sample prefix and the rendered sample line, and the encoded labels.
+        self._rendered_value: Dict[LabelValues, Number] = {}
+        self._samples: Dict[LabelValues, Tuple[str, str]] = {}
+        self._expfmt: Optional[str] = None
+        self._pb_rendered_value: Dict[LabelValues, Number] = {}
+        self._pb_labels: Dict[LabelValues, bytes] = {}
+        self._pb: Optional[bytes] = None
 
     def clear(self) -> None:
         self.value = {}
 
+    def empty_copy(self) -> 'Metric':
+        """
+        Return a copy of this metric without values nor rendering state.
+        """
+        metric = copy.copy(self)
+        metric.value = {}
+        metric._reset_rendering()
+        return metric
+
     def set(self, value: Number, labelvalues: Optional[LabelValues] = None) -> None:
         # labelvalues must be a tuple
         labelvalues = labelvalues or ('',)
         self.value[labelvalues] = value
 
+    def _sample_prefix(self, labelvalues: LabelValues) -> str:
+        if self.labelnames:
+            labels_list = zip(self.labelnames, labelvalues)
+            labels = ','.join('%s="%s"' % (k, v) for k, v in labels_list)
+        else:
+            labels = ''
+        if labels:
+            return '\n{name}{{{labels}}} '.format(name=self._name, labels=labels)
+        return '\n{name} '.format(name=self._name)
+
     def str_expfmt(self) -> str:
+        """
+        Render the metric in the text exposition format.
 
-        # Must be kept in sync with promethize() in src/exporter/util.cc
-        def promethize(path: str) -> str:
-            ''' replace illegal metric name characters '''
-            result = re.sub(r'[./\s]|::', '_', path).replace('+', '_plus')
+        Only samples whose value changed since the previous call are
+        rendered again; if no sample changed, the previous output is
+        returned as is.
+        """
+        if self._expfmt is not None and self.value == self._rendered_value:
+            return self._expfmt
 
-            # Hyphens usually turn into underscores, unless they are
-            # trailing
-            if result.endswith("-"):
-                result = result[0:-1] + "_minus"
-            else:
-                result = result.replace("-", "_")
-
-            return "ceph_{0}".format(result)
-
-        def floatstr(value: float) -> str:
-            ''' represent as Go-compatible float '''
-            if value == float('inf'):
-                return '+Inf'
-            if value == float('-inf'):
-                return '-Inf'
-            if math.isnan(value):
-                return 'NaN'
-            return repr(float(value))
-
-        name = promethize(self.name)
-        expfmt = '''
+        old_value = self._rendered_value
+        old_samples = self._samples
+        samples: Dict[LabelValues, Tuple[str, str]] = {}
+        lines = [self._header]
+        for labelvalues, value in self.value.items():
+            sample = old_samples.get(labelvalues)
+            if sample is None:
+                prefix = self._sample_prefix(labelvalues)
+                sample = (prefix, prefix + floatstr(value))
+            elif old_value.get(labelvalues) != value:
+                sample = (sample[0], sample[0] + floatstr(value))
+            samples[labelvalues] = sample
+            lines.append(sample[1])
+
+        self._rendered_value = dict(self.value)
+        self._samples = samples
+        self._expfmt = ''.join(lines)
+        return self._expfmt
+
+    def str_openmetrics(self) -> str:
+        """
+        Render the metric in the OpenMetrics text format, without the final
+        '# EOF' line. Samples are the same as in str_expfmt().
+        """
+        expfmt = self.str_expfmt()
+        mtype = OPENMETRICS_TYPES.get(self.mtype, 'unknown')
+        header = '''
 # HELP {name} {desc}
 # TYPE {name} {mtype}'''.format(
-            name=name,
-            desc=self.desc,
-            mtype=self.mtype,
+            name=self._name,
+            desc=self.desc.replace('\\', r'\\').replace('\n', r'\n'),
+            mtype=mtype,
         )
+        return header + expfmt[len(self._header):]
 
+    def protobuf(self) -> bytes:
+        """
+        Encode the metric as a length-delimited
+        io.prometheus.client.MetricFamily message.
+        """
+        if self._pb is not None and self.value == self._pb_rendered_value:
+            return self._pb
+
+        pb_type, value_field = PROTOBUF_TYPES.get(self.mtype, PROTOBUF_TYPES['untyped'])
+        labels = self._pb_labels
+        pb_labels: Dict[LabelValues, bytes] = {}
+        family = [
+            pb_field(1, self._name.encode('utf-8')),
+            pb_field(2, self.desc.encode('utf-8')),
+            pb_varint(3 << 3) + pb_varint(pb_type),
+        ]
         for labelvalues, value in self.value.items():
-            if self.labelnames:
-                labels_list = zip(self.labelnames, labelvalues)
-                labels = ','.join('%s="%s"' % (k, v) for k, v in labels_list)
-            else:
-                labels = ''
-            if labels:
-                fmtstr = '\n{name}{{{labels}}} {value}'
-            else:
-                fmtstr = '\n{name} {value}'
-            expfmt += fmtstr.format(
-                name=name,
-                labels=labels,
-                value=floatstr(value),
-            )
-        return expfmt
+            encoded_labels = labels.get(labelvalues)
+            if encoded_labels is None:
+                encoded_labels = b''
+                if self.labelnames:
+                    encoded_labels = b''.join(
+                        pb_field(1, pb_field(1, k.encode('utf-8')) + pb_field(2, str(v).encode('utf-8')))
+                        for k, v in zip(self.labelnames, labelvalues))
+            pb_labels[labelvalues] = encoded_labels
+            # a single double field holding the value
+            encoded_value = pb_field(value_field, b'\x09' + struct.pack('<d', value))
+            family.append(pb_field(4, encoded_labels + encoded_value))
+
+        data = b''.join(family)
+        self._pb_rendered_value = dict(self.value)
+        self._pb_labels = pb_labels
+        self._pb = pb_varint(len(data)) + data
+        return self._pb
 
     def group_by(
         self,
@@ -615,6 +746,9 @@ class MetricCounter(Metric):
     def clear(self) -> None:
         pass  # Skip calls to clear as we want to keep the counters here.
 
+    def empty_copy(self) -> 'Metric':
+        return self  # Counters are shared by all collectors
+
     def set(self,
             value: Number,
             labelvalues: Optional[LabelValues] = None) -> None:
@@ -629,6 +763,178 @@ class MetricCounter(Metric):
         self.value[labelvalues] += value
 
 
+CONTENT_TYPE_TEXT = 'text/plain; version=0.0.4; charset=utf-8'
+CONTENT_TYPE_OPENMETRICS = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+CONTENT_TYPE_PROTOBUF = ('application/vnd.google.protobuf; '
+                         'proto=io.prometheus.client.MetricFamily; encoding=delimited')
+
+EXPOSITION_FORMATS = ['text', 'openmetrics', 'protobuf']
+
+
+def negotiate_format(accept: str, formats: List[str]) -> str:
+    """
+    Pick the exposition format among `formats` preferred by an HTTP Accept
+    header, the text format if none of them is acceptable.
+
+    >>> negotiate_format('application/openmetrics-text;version=1.0.0;q=0.5,'
+    ...                  'text/plain;version=0.0.4;q=0.3', ['text', 'openmetrics'])
+    'openmetrics'
+    >>> negotiate_format('application/openmetrics-text;version=1.0.0', ['text'])
+    'text'
+    """
+    best = ('text', 0.0)
+    for media_range in accept.split(','):
+        media_type, *params = [p.strip() for p in media_range.split(';')]
+        args = dict(p.split('=', 1) for p in params if '=' in p)
+        try:
+            q = float(args.get('q', 1.0))
+        except ValueError:
+            continue
+        if media_type == 'application/openmetrics-text':
+            fmt = 'openmetrics'
+        elif (media_type == 'application/vnd.google.protobuf'
+              and args.get('proto') == 'io.prometheus.client.MetricFamily'
+              and args.get('encoding') == 'delimited'):
+            fmt = 'protobuf'
+        else:
+            continue
+        if fmt in formats and q > best[1]:
+            best = (fmt, q)
+    return best[0]
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    >>> accepts_gzip('gzip, deflate')
+    True
+    >>> accepts_gzip('gzip;q=0, identity')
+    False
+    """
+    for coding in accept_encoding.split(','):
+        name, *params = [p.strip() for p in coding.split(';')]
+        if name == 'gzip':
+            return 'q=0' not in params and 'q=0.0' not in params
+    return False
+
+
+class Exposition(object):
+    """
+    The metrics of one collection in the enabled exposition formats.
+    Encoded and gzip compressed bodies are computed on first use and
+    shared by all scrapes of this collection.
+    """
+
+    def __init__(self, text: str, openmetrics: Optional[str] = None,
+                 protobuf: Optional[bytes] = None) -> None:
+        self.text = text
+        self._formats: Dict[str, Union[str, bytes]] = {'text': text}
+        if openmetrics is not None:
+            self._formats['openmetrics'] = openmetrics
+        if protobuf is not None:
+            self._formats['protobuf'] = protobuf
+        self._bodies: Dict[Tuple[str, bool], bytes] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def formats(self) -> List[str]:
+        return list(self._formats)
+
+    def body(self, fmt: str, compress: bool) -> bytes:
+        with self._lock:
+            body = self._bodies.get((fmt, compress))
+            if body is None:
+                data = self._formats[fmt]
+                body = data.encode('utf-8') if isinstance(data, str) else data
+                if compress:
+                    body = gzip.compress(body, compresslevel=6)
+                self._bodies[(fmt, compress)] = body
+            return body
+
+
+class StagedMetrics(Dict[str, Metric]):
+    """
+    The metrics a collector sees while it runs: a copy without values of a
+    metric of the module is made on first access, metrics the collector
+    adds are only added here and metrics it deletes are only recorded in
+    ``removed``.
+    """
+
+    def __init__(self, metrics: Dict[str, Metric]) -> None:
+        super().__init__()
+        self._metrics = metrics
+        self.removed: Set[str] = set()
+
+    def __missing__(self, key: str) -> Metric:
+        if key in self.removed:
+            raise KeyError(key)
+        metric = self._metrics[key].empty_copy()
+        self[key] = metric
+        return metric
+
+    def __setitem__(self, key: str, metric: Metric) -> None:
+        self.removed.discard(key)
+        super().__setitem__(key, metric)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self.pop(key, None)
+        self.removed.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        if key in self.removed:
+            return False
+        return super().__contains__(key) or key in self._metrics
+
+    def get(self, key: str, default: Optional[Metric] = None) -> Optional[Metric]:  # type: ignore[override]
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class Collector(object):
+    """
+    A function of the module setting the values of some of its metrics.
+
+    :param name: used as the label of the collector's own metrics
+    :param func: the function collecting metrics into ``Module.metrics``
+    :param interval_option: module option holding the refresh interval in
+        seconds, the collector runs on every scrape if unset or 0
+    :param budget: seconds a scrape waits for the collector before it
+        uses the previous values of its metrics, defaults to half of the
+        scrape interval
+    :param stale_after: number of refresh intervals without a successful
+        run after which the values of the collector are dropped, ``None``
+        to keep them until the next successful run
+    :param condition: the collector only runs if it returns True
+    """
+
+    def __init__(self,
+                 name: str,
+                 func: Callable[[], None],
+                 interval_option: Optional[str] = None,
+                 budget: Optional[float] = None,
+                 stale_after: Optional[int] = 3,
+                 condition: Optional[Callable[[], bool]] = None) -> None:
+        self.name = name
+        self.func = func
+        self.interval_option = interval_option
+        self.budget = budget
+        self.stale_after = stale_after
+        self.condition = condition
+        # scheduling state, guarded by Module.collectors_lock
+        self.next_run = 0.0
+        self.started = 0.0
+        self.running: Optional[multiprocessing.pool.AsyncResult] = None
+        self.duration = 0.0
+        self.last_success = 0.0
+        self.values: Dict[str, MetricValue] = {}
+        # metrics deleted by the last successful run, dropped from the
+        # module's metrics on the next merge
+        self.removed: Set[str] = set()
+
+
 class MetricCollectionThread(threading.Thread):
     def __init__(self, module: 'Module') -> None:
         self.mod = module
@@ -644,7 +950,7 @@ class MetricCollectionThread(threading.Thread):
                 start_time = time.time()
 
                 try:
-                    data = self.mod.collect()
+                    data = self.mod.collect_exposition()
                 except Exception:
                     # Log any issues encountered during the data collection and continue
                     self.mod.log.exception("failed to collect metrics:")
@@ -743,6 +1049,37 @@ class Module(MgrModule, OrchestratorClientMixin):
             long_desc='Gathering perf-counters from a single Prometheus exporter can degrade ceph-mgr performance, especially in large clusters. Instead, Ceph-exporter daemons are now used by default for perf-counter gathering. This should only be disabled when no ceph-exporters are deployed.',
             runtime=True
         ),
+        Option(
+            name='exposition_formats',
+            type='str',
+            default='text',
+            desc='Comma separated exposition formats offered to scrapers',
+            long_desc='Any of text, openmetrics and protobuf. The format is negotiated '
+            'with the Accept header of each scrape, text is always available.',
+        ),
+        Option(
+            name='collector_threads',
+            type='int',
+            default=4,
+            min=1,
+            desc='Number of threads running metric collectors',
+        ),
+        Option(
+            name='perf_counters_refresh_interval',
+            type='float',
+            default=0.0,
+            desc='How often perf-counters are collected, in seconds',
+            long_desc='0 collects them on every scrape. The previous values are exported in between.',
+            runtime=True
+        ),
+        Option(
+            name='rbd_stats_refresh_interval',
+            type='float',
+            default=0.0,
+            desc='How often RBD image stats are collected, in seconds',
+            long_desc='0 collects them on every scrape. The previous values are exported in between.',
+            runtime=True
+        ),
         Option(
             name='healthcheck_history_max_entries',
             type='int',
@@ -759,7 +1096,11 @@ class Module(MgrModule, OrchestratorClientMixin):
         super(Module, self).__init__(*args, **kwargs)
         self.key_file: IO[bytes]
         self.cert_file: IO[bytes]
+        self._collector_local = threading.local()
         self.metrics = self._setup_static_metrics()
+        self.collectors = self._setup_collectors()
+        self.collectors_lock = threading.Lock()
+        self._collector_pool: Optional[multiprocessing.pool.ThreadPool] = None
         self.shutdown_event = threading.Event()
         self.config_change_event = threading.Event()
         self.collect_lock = threading.Lock()
@@ -767,7 +1108,7 @@ class Module(MgrModule, OrchestratorClientMixin):
         self.scrape_interval: float = 15.0
         self.cache = True
         self.stale_cache_strategy: str = self.STALE_CACHE_FAIL
-        self.collect_cache: Optional[str] = None
+        self.collect_cache: Optional[Exposition] = None
         self.rbd_stats = {
             'pools': {},
             'pools_refresh_time': 0,
@@ -791,6 +1132,46 @@ class Module(MgrModule, OrchestratorClientMixin):
         self.metrics_thread = MetricCollectionThread(_global_instance)
         self.health_history = HealthHistory(self)
 
+    @property
+    def metrics(self) -> Dict[str, Metric]:
+        """
+        The metrics of the module, or the staged metrics of the collector
+        running in the current thread.
+        """
+        staged = getattr(self._collector_local, 'metrics', None)
+        if staged is not None:
+            return staged
+        return self._metrics
+
+    @metrics.setter
+    def metrics(self, metrics: Dict[str, Metric]) -> None:
+        self._metrics = metrics
+
+    def _setup_collectors(self) -> List[Collector]:
+        return [
+            Collector('health', self.get_health),
+            Collector('df', self.get_df),
+            Collector('osd_blocklisted_entries', self.get_osd_blocklisted_entries),
+            Collector('pool_stats', self.get_pool_stats),
+            Collector('fs', self.get_fs),
+            Collector('osd_stats', self.get_osd_stats),
+            Collector('quorum_status', self.get_quorum_status),
+            Collector('mgr_status', self.get_mgr_status),
+            Collector('metadata_and_osd_status', self.get_metadata_and_osd_status),
+            Collector('pg_status', self.get_pg_status),
+            Collector('pool_repaired_objects', self.get_pool_repaired_objects),
+            Collector('num_objects', self.get_num_objects),
+            Collector('daemon_health_metrics', self.get_all_daemon_health_metrics),
+            Collector('smb_metadata', self.get_smb_metadata),
+            Collector('hardware_metrics', self.get_hardware_metrics),
+            Collector('cephadm_daemon_status', self.set_cephadm_daemon_status_metrics),
+            Collector('perf_counters', self.get_perf_counters,
+                      interval_option='perf_counters_refresh_interval',
+                      condition=lambda: not self.get_module_option('exclude_perf_counters')),
+            Collector('rbd_stats', self.get_rbd_stats,
+                      interval_option='rbd_stats_refresh_interval'),
+        ]
+
     def _setup_static_metrics(self) -> Dict[str, Metric]:
         metrics = {}
         metrics['health_status'] = Metric(
@@ -1079,6 +1460,20 @@ class Module(MgrModule, OrchestratorClientMixin):
             HW_FIRMWARE_LABELS
         )
 
+        metrics['prometheus_collector_duration_seconds'] = Metric(
+            'gauge',
+            'prometheus_collector_duration_seconds',
+            'Duration of the last run of a metric collector',
+            ('collector',)
+        )
+
+        metrics['prometheus_collector_last_success_timestamp_seconds'] = Metric(
+            'gauge',
+            'prometheus_collector_last_success_timestamp_seconds',
+            'Time of the last successful run of a metric collector',
+            ('collector',)
+        )
+
         return metrics
 
     def orch_is_available(self) -> bool:
@@ -1698,14 +2093,15 @@ class Module(MgrModule, OrchestratorClientMixin):
                 continue
             pools[pool_name].add(namespace_name)
 
+        # self.rbd_stats is only touched by this collector (and on shutdown,
+        # once the collectors are stopped); iterate over a copy since pools
+        # which are no longer configured are dropped on the way
         rbd_stats_pools = {}
-        for pool_id in self.rbd_stats['pools'].keys():
-            name = self.rbd_stats['pools'][pool_id]['name']
-            if name not in pools:
+        for pool_id, pool in list(self.rbd_stats['pools'].items()):
+            if pool['name'] not in pools:
                 del self.rbd_stats['pools'][pool_id]
             else:
-                rbd_stats_pools[name] = \
-                    self.rbd_stats['pools'][pool_id]['ns_names']
+                rbd_stats_pools[pool['name']] = pool['ns_names']
 
         pools_refreshed = False
         if pools:
@@ -2243,41 +2639,138 @@ class Module(MgrModule, OrchestratorClientMixin):
             self._process_power_network(status, hostname)
             self._process_sensors(status, hostname)
 
-    @profile_method(True)
+    def _collector_interval(self, collector: Collector) -> float:
+        interval = 0.0
+        if collector.interval_option:
+            interval = cast(float, self.get_module_option(collector.interval_option))
+        return interval or self.scrape_interval
+
+    def _run_collector(self, collector: Collector) -> None:
+        staged = StagedMetrics(self._metrics)
+        self._collector_local.metrics = staged
+        start = time.time()
+        success = False
+        try:
+            collector.func()
+            success = True
+        except Exception:
+            self.log.exception('metric collector %s failed:', collector.name)
+        finally:
+            self._collector_local.metrics = None
+
+        with self.collectors_lock:
+            collector.duration = time.time() - start
+            if success:
+                for key, metric in staged.items():
+                    self._metrics.setdefault(key, metric)
+                collector.values = {key: metric.value for key, metric in staged.items()}
+                collector.removed |= staged.removed
+                collector.last_success = time.time()
+
+    def _start_collectors(self, now: float) -> List[Collector]:
+        """
+        Start the collectors which are due and not still running.
+        """
+        if self._collector_pool is None:
+            self._collector_pool = multiprocessing.pool.ThreadPool(
+                cast(int, self.get_module_option('collector_threads')))
+        started = []
+        for collector in self.collectors:
+            if collector.running is not None and not collector.running.ready():
+                continue
+            collector.running = None
+            if collector.condition is not None and not collector.condition():
+                with self.collectors_lock:
+                    collector.values = {}
+                continue
+            if now < collector.next_run:
+                continue
+            collector.next_run = now + self._collector_interval(collector)
+            collector.started = now
+            collector.running = self._collector_pool.apply_async(
+                self._run_collector, (collector,))
+            started.append(collector)
+        return started
+
+    def _wait_for_collectors(self, collectors: List[Collector]) -> None:
+        for collector in collectors:
+            assert collector.running is not None
+            budget = collector.budget
+            if budget is None:
+                budget = self.scrape_interval / 2
+            collector.running.wait(max(0.0, collector.started + budget - time.time()))
+            if not collector.running.ready():
+                self.log.warning(
+                    'Metric collector {} did not finish within {:.2f} seconds, '
+                    'exporting its previous values.'.format(collector.name, budget))
+
+    def _merge_collected_metrics(self, now: float) -> None:
+        """
+        Set the values of the module's metrics from the values of the last
+        successful run of each collector.
+        """
+        merged: Dict[str, MetricValue] = {}
+        with self.collectors_lock:
+            for collector in self.collectors:
+                for key in collector.removed:
+                    self._metrics.pop(key, None)
+                collector.removed = set()
+                if collector.stale_after is not None and collector.values:
+                    max_age = collector.stale_after * self._collector_interval(collector)
+                    if now - collector.last_success > max_age:
+                        self.log.warning(
+                            'Dropping metrics of collector {}, its last successful '
+                            'run is older than {:.0f} seconds.'.format(collector.name, max_age))
+                        collector.values = {}
+                for key, value in collector.values.items():
+                    if key in merged:
+                        merged[key] = {**merged[key], **value}
+                    else:
+                        merged[key] = value
+            for key, metric in self._metrics.items():
+                if not isinstance(metric, MetricCounter):
+                    metric.value = merged.get(key, {})
+
+            for collector in self.collectors:
+                self._metrics['prometheus_collector_duration_seconds'].set(
+                    collector.duration, (collector.name,))
+                if collector.last_success:
+                    self._metrics['prometheus_collector_last_success_timestamp_seconds'].set(
+                        collector.last_success, (collector.name,))
+
+    def shutdown_collectors(self) -> None:
+        if self._collector_pool is not None:
+            self._collector_pool.close()
+            self._collector_pool.join()
+            self._collector_pool = None
+
     def collect(self) -> str:
-        # Clear the metrics before scraping
-        for k in self.metrics.keys():
-            self.metrics[k].clear()
-
-        self.get_health()
-        self.get_df()
-        self.get_osd_blocklisted_entries()
-        self.get_pool_stats()
-        self.get_fs()
-        self.get_osd_stats()
-        self.get_quorum_status()
-        self.get_mgr_status()
-        self.get_metadata_and_osd_status()
-        self.get_pg_status()
-        self.get_pool_repaired_objects()
-        self.get_num_objects()
-        self.get_all_daemon_health_metrics()
-        self.get_smb_metadata()
-        self.get_hardware_metrics()
-        self.set_cephadm_daemon_status_metrics()
-
-        if not self.get_module_option('exclude_perf_counters'):
-            self.get_perf_counters()
-        self.get_rbd_stats()
+        return self.collect_exposition().text
 
-        self.get_collect_time_metrics()
+    @profile_method(True)
+    def collect_exposition(self) -> Exposition:
+        now = time.time()
+        self._wait_for_collectors(self._start_collectors(now))
+        self._merge_collected_metrics(now)
 
-        # Return formatted metrics and clear no longer used data
-        _metrics = [m.str_expfmt() for m in self.metrics.values()]
-        for k in self.metrics.keys():
-            self.metrics[k].clear()
+        self.get_collect_time_metrics()
 
-        return ''.join(_metrics) + '\n'
+        # Return formatted metrics
+        with self.collectors_lock:
+            metrics = list(self._metrics.values())
+        _metrics = [m.str_expfmt() for m in metrics]
+        text = ''.join(_metrics) + '\n'
+
+        formats = cast(str, self.get_module_option('exposition_formats')).split(',')
+        formats = [f.strip() for f in formats]
+        openmetrics = None
+        if 'openmetrics' in formats:
+            # no empty line allowed before the first family
+            openmetrics = ''.join(m.str_openmetrics() for m in metrics)[1:] + '\n# EOF\n'
+        protobuf = None
+        if 'protobuf' in formats:
+            protobuf = b''.join(m.protobuf() for m in metrics)
+        return Exposition(text, openmetrics, protobuf)
 
     @PrometheusCLICommand.Read('prometheus file_sd_config')
     def get_file_sd_config(self) -> Tuple[int, str, str]:
@@ -2399,24 +2892,41 @@ class Module(MgrModule, OrchestratorClientMixin):
 </html>'''
 
             @cherrypy.expose
-            def metrics(self) -> Optional[str]:
+            def metrics(self) -> Optional[bytes]:
                 # Lock the function execution
                 assert isinstance(_global_instance, Module)
                 with _global_instance.collect_lock:
-                    cherrypy.response.headers['Content-Type'] = 'text/plain; charset=utf-8'
-                    return self._metrics(_global_instance)
+                    exposition = self._metrics(_global_instance)
+                if exposition is None:
+                    return None
+                return self._respond(exposition)
+
+            @staticmethod
+            def _respond(exposition: Exposition) -> bytes:
+                headers = cherrypy.request.headers
+                fmt = negotiate_format(headers.get('Accept', ''), exposition.formats)
+                compress = accepts_gzip(headers.get('Accept-Encoding', ''))
+                cherrypy.response.headers['Content-Type'] = {
+                    'text': CONTENT_TYPE_TEXT,
+                    'openmetrics': CONTENT_TYPE_OPENMETRICS,
+                    'protobuf': CONTENT_TYPE_PROTOBUF,
+                }[fmt]
+                cherrypy.response.headers['Vary'] = 'Accept, Accept-Encoding'
+                if compress:
+                    cherrypy.response.headers['Content-Encoding'] = 'gzip'
+                return exposition.body(fmt, compress)
 
             @staticmethod
-            def _metrics(instance: 'Module') -> Optional[str]:
+            def _metrics(instance: 'Module') -> Optional[Exposition]:
                 if not instance.cache:
                     instance.log.debug('Cache disabled, collecting and returning without cache')
-                    return instance.collect()
+                    return instance.collect_exposition()
 
                 # Return cached data if available
                 if not instance.collect_cache:
                     raise cherrypy.HTTPError(503, 'No cached data available yet')
 
-                def respond() -> Optional[str]:
+                def respond() -> Optional[Exposition]:
                     assert isinstance(instance, Module)
                     return instance.collect_cache
 
@@ -2535,6 +3045,7 @@ class Module(MgrModule, OrchestratorClientMixin):
         self.metrics_thread.stop()
         self.stop_adapter()
         self.log.info('Engine stopped.')
+        self.shutdown_collectors()
         self.shutdown_rbd_stats()
         # wait for the metrics collection thread to stop
         self.metrics_thread.join()
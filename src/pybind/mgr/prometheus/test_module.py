@@ -1,7 +1,10 @@
+import gzip
+import struct
 from typing import Dict
 from unittest import TestCase, mock
 
-from prometheus.module import Metric, LabelValues, Number, HealthHistory, ThreadSafeLRUCacheDict
+from prometheus.module import Collector, Exposition, Metric, LabelValues, Number, HealthHistory, \
+    ThreadSafeLRUCacheDict
 import threading
 
 
@@ -94,6 +97,265 @@ ceph_disk_occupation_display{ceph_daemon="osd.5+osd.6",device="/dev/dm-1",instan
         self.assertEqual(str(cm.exception), "joins must be callable")
 
 
+class MetricExpfmtTest(TestCase):
+    def test_str_expfmt(self):
+        m = Metric('gauge', 'osd.op_r', 'Client read operations', ('ceph_daemon',))
+        m.set(1, ('osd.0',))
+        m.set(2.5, ('osd.1',))
+        self.assertEqual(
+            m.str_expfmt(),
+            """
+# HELP ceph_osd_op_r Client read operations
+# TYPE ceph_osd_op_r gauge
+ceph_osd_op_r{ceph_daemon="osd.0"} 1.0
+ceph_osd_op_r{ceph_daemon="osd.1"} 2.5""",
+        )
+
+    def test_str_expfmt_no_labels(self):
+        m = Metric('untyped', 'health_status', 'Cluster health status')
+        m.set(float('inf'))
+        self.assertEqual(
+            m.str_expfmt(),
+            """
+# HELP ceph_health_status Cluster health status
+# TYPE ceph_health_status untyped
+ceph_health_status +Inf""",
+        )
+
+    def test_str_expfmt_unchanged_is_cached(self):
+        m = Metric('gauge', 'pool_objects', 'objects', ('pool_id',))
+        m.set(10, ('1',))
+        first = m.str_expfmt()
+        m.clear()
+        m.set(10, ('1',))
+        self.assertIs(m.str_expfmt(), first)
+
+    def test_str_expfmt_rerenders_changed_samples(self):
+        m = Metric('gauge', 'pool_objects', 'objects', ('pool_id',))
+        m.set(10, ('1',))
+        m.set(20, ('2',))
+        m.str_expfmt()
+        m.clear()
+        m.set(11, ('1',))
+        m.set(30, ('3',))
+        with mock.patch('prometheus.module.floatstr', side_effect=str) as floatstr:
+            self.assertEqual(
+                m.str_expfmt(),
+                """
+# HELP ceph_pool_objects objects
+# TYPE ceph_pool_objects gauge
+ceph_pool_objects{pool_id="1"} 11
+ceph_pool_objects{pool_id="3"} 30""",
+            )
+        self.assertEqual(floatstr.call_count, 2)
+        self.assertEqual(set(m._samples), {('1',), ('3',)})
+
+
+class ExpositionFormatsTest(TestCase):
+    def test_openmetrics(self):
+        m = Metric('counter', 'osd.op_r', 'Client read operations', ('ceph_daemon',))
+        m.set(1, ('osd.0',))
+        self.assertEqual(
+            m.str_openmetrics(),
+            """
+# HELP ceph_osd_op_r Client read operations
+# TYPE ceph_osd_op_r unknown
+ceph_osd_op_r{ceph_daemon="osd.0"} 1.0""",
+        )
+
+    def test_protobuf(self):
+        m = Metric('untyped', 'health_status', 'x')
+        m.set(1)
+        sample = b'\x2a\x09\x09' + struct.pack('<d', 1.0)
+        family = (b'\x0a\x12ceph_health_status' + b'\x12\x01x' + b'\x18\x03'
+                  + b'\x22' + bytes([len(sample)]) + sample)
+        self.assertEqual(m.protobuf(), bytes([len(family)]) + family)
+
+    def test_protobuf_labels(self):
+        m = Metric('gauge', 'pool_objects', '', ('pool_id',))
+        m.set(2, ('1',))
+        pb = m.protobuf()
+        label = b'\x0a\x0c' + b'\x0a\x07pool_id' + b'\x12\x011'
+        value = b'\x12\x09\x09' + struct.pack('<d', 2.0)
+        self.assertTrue(pb.endswith(b'\x22' + bytes([len(label + value)]) + label + value))
+        self.assertIs(m.protobuf(), pb)
+
+    def test_exposition_body(self):
+        e = Exposition('text', openmetrics='om')
+        self.assertEqual(e.formats, ['text', 'openmetrics'])
+        self.assertEqual(e.body('text', False), b'text')
+        compressed = e.body('openmetrics', True)
+        self.assertEqual(gzip.decompress(compressed), b'om')
+        self.assertIs(e.body('openmetrics', True), compressed)
+
+
+class CollectorTest(TestCase):
+    def setUp(self):
+        from prometheus.module import Module
+        self.options = {
+            'collector_threads': 2,
+            'exposition_formats': 'text,openmetrics,protobuf',
+            'slow_interval': 60.0,
+        }
+        m = Module.__new__(Module)
+        m._logger = mock.MagicMock()
+        m._collector_local = threading.local()
+        m.metrics = {
+            'pool_objects': Metric('gauge', 'pool_objects', 'objects', ('pool_id',)),
+            'prometheus_collector_duration_seconds': Metric(
+                'gauge', 'prometheus_collector_duration_seconds', '', ('collector',)),
+            'prometheus_collector_last_success_timestamp_seconds': Metric(
+                'gauge', 'prometheus_collector_last_success_timestamp_seconds', '', ('collector',)),
+        }
+        m.collectors_lock = threading.Lock()
+        m._collector_pool = None
+        m.scrape_interval = 10.0
+        m.get_module_option = mock.Mock(side_effect=lambda key: self.options[key])
+        self.module = m
+        self.addCleanup(m.shutdown_collectors)
+
+    def _pool_objects(self):
+        return self.module.metrics['pool_objects'].value
+
+    def test_merge(self):
+        def first():
+            self.module.metrics['pool_objects'].set(1, ('1',))
+
+        def second():
+            self.module.metrics['pool_objects'].set(2, ('2',))
+            self.module.metrics['new'] = Metric('gauge', 'new', 'new')
+            self.module.metrics['new'].set(3)
+
+        self.module.collectors = [Collector('first', first), Collector('second', second)]
+        out = self.module.collect()
+        self.assertEqual(self._pool_objects(), {('1',): 1, ('2',): 2})
+        self.assertIn('\nceph_new 3.0', out)
+        exposition = self.module.collect_exposition()
+        self.assertEqual(exposition.formats, ['text', 'openmetrics', 'protobuf'])
+        openmetrics = exposition.body('openmetrics', False).decode()
+        self.assertTrue(openmetrics.startswith('# HELP ceph_pool_objects objects\n'))
+        self.assertIn('\nceph_new 3.0\n', openmetrics)
+        self.assertTrue(openmetrics.endswith('\n# EOF\n'))
+        self.assertEqual(
+            set(self.module.metrics['prometheus_collector_duration_seconds'].value),
+            {('first',), ('second',)})
+
+    def test_refresh_interval(self):
+        calls = []
+
+        def slow():
+            calls.append(1)
+            self.module.metrics['pool_objects'].set(len(calls), ('1',))
+
+        self.module.collectors = [Collector('slow', slow, interval_option='slow_interval')]
+        self.module.collect()
+        self.module.collect()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self._pool_objects(), {('1',): 1})
+
+    def test_failure_keeps_values_until_stale(self):
+        fail = []
+
+        def flaky():
+            if fail:
+                raise RuntimeError('boom')
+            self.module.metrics['pool_objects'].set(5, ('1',))
+
+        collector = Collector('flaky', flaky)
+        self.module.collectors = [collector]
+        self.module.collect()
+        fail.append(1)
+        self.module.collect()
+        self.assertEqual(self._pool_objects(), {('1',): 5})
+
+        collector.last_success -= 3 * self.module.scrape_interval + 1
+        self.module.collect()
+        self.assertEqual(self._pool_objects(), {})
+
+    def test_budget(self):
+        release = threading.Event()
+
+        def blocking():
+            value = 2 if release.is_set() else 1
+            self.module.metrics['pool_objects'].set(value, ('1',))
+            if value == 1:
+                release.wait(5)
+
+        collector = Collector('blocking', blocking, budget=0.1)
+        self.module.collectors = [Collector('fast', lambda: None), collector]
+        self.module.collect()
+        # the values set so far are not exported before the collector is done
+        self.assertEqual(self._pool_objects(), {})
+        release.set()
+        collector.running.wait(5)
+        self.module.collect()
+        self.assertEqual(self._pool_objects(), {('1',): 1})
+
+    def test_condition(self):
+        enabled = [True]
+
+        def collect():
+            self.module.metrics['pool_objects'].set(1, ('1',))
+
+        self.module.collectors = [Collector('cond', collect, condition=lambda: enabled[0])]
+        self.module.collect()
+        self.assertEqual(self._pool_objects(), {('1',): 1})
+        enabled[0] = False
+        self.module.collect()
+        self.assertEqual(self._pool_objects(), {})
+
+    def test_health_drops_incompatible_slow_ops(self):
+        import json
+        from prometheus.module import HEALTH_CHECKS
+        m = self.module
+        for name in ('health_status', 'health_detail', 'healthcheck_slow_ops'):
+            m.metrics[name] = Metric('gauge', name, name)
+        health = {
+            'status': 'HEALTH_WARN',
+            'checks': {'SLOW_OPS': {'severity': 'HEALTH_WARN',
+                                    'summary': {'message': 'some slow ops'}}},
+        }
+        m.get = mock.Mock(return_value={'json': json.dumps(health)})
+        m.health_history = mock.MagicMock()
+        m.health_history.healthcheck = {}
+        self.assertEqual(HEALTH_CHECKS[0].name, 'SLOW_OPS')
+        collector = Collector('health', m.get_health)
+        m.collectors = [collector]
+
+        out = m.collect()
+        self.assertGreater(collector.last_success, 0)
+        self.assertNotIn('healthcheck_slow_ops', m.metrics)
+        self.assertNotIn('ceph_healthcheck_slow_ops', out)
+        self.assertIn('\nceph_health_status 1.0', out)
+
+        # stays dropped on the next runs
+        health['checks'] = {}
+        m.get.return_value = {'json': json.dumps(health)}
+        out = m.collect()
+        self.assertNotIn('healthcheck_slow_ops', m.metrics)
+        self.assertIn('\nceph_health_status 1.0', out)
+
+
+    def test_rbd_stats_drops_unconfigured_pools(self):
+        m = self.module
+        m.rbd_stats = {
+            'pools': {
+                1: {'name': 'a', 'ns_names': [], 'images': {}},
+                2: {'name': 'b', 'ns_names': [], 'images': {}},
+            },
+            'pools_refresh_time': 0,
+            'counters_info': {},
+        }
+        m.get_localized_module_option = mock.Mock(return_value='')
+        m.get = mock.Mock(return_value={'pools': []})
+        collector = Collector('rbd_stats', m.get_rbd_stats)
+        m.collectors = [collector]
+
+        m.collect()
+        self.assertGreater(collector.last_success, 0)
+        self.assertEqual(m.rbd_stats['pools'], {})
+
+
 class HealthHistoryTest(TestCase):
     def setUp(self):
         self.mgr = mock.MagicMock()
@@ -1,16 +1,21 @@
 import errno
 import json
 import rados
-import random
 import rbd
 import traceback
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from threading import Condition, Lock, Thread
 from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple, Union
 
 from .common import get_rbd_pools
-from .schedule import LevelSpec, Schedules
+from .schedule import LevelSpec, Schedules, ScheduleQueue
+
+# objects updated whenever mirror images or images (names) of a
+# namespace change
+RBD_MIRRORING_OID = "rbd_mirroring"
+RBD_DIRECTORY_OID = "rbd_directory"
 
 
 def namespace_validator(ioctx: rados.Ioctx) -> None:
@@ -26,12 +31,27 @@ def image_validator(image: rbd.Image) -> None:
         raise rbd.InvalidArgument("Invalid mirror image mode")
 
 
+def get_object_version(ioctx: rados.Ioctx, oid: str) -> Optional[int]:
+    try:
+        ioctx.stat(oid)
+    except rados.ObjectNotFound:
+        return None
+    return ioctx.get_last_version()
+
+
 class ImageSpec(NamedTuple):
     pool_id: str
     namespace: str
     image_id: str
 
 
+# (pool_id, namespace) => (pool_name, versions of the rbd_mirroring and
+# rbd_directory objects, {image_id => image_name} of snapshot mirrored images)
+NamespaceCache = Dict[Tuple[str, str],
+                      Tuple[str, Tuple[Optional[int], Optional[int]],
+                            Dict[str, str]]]
+
+
 class CreateSnapshotRequests:
 
     def __init__(self, handler: Any) -> None:
@@ -333,6 +353,7 @@ class MirrorSnapshotScheduleHandler:
     MODULE_OPTION_NAME_MAX_CONCURRENT_SNAP_CREATE = "max_concurrent_snap_create"
     SCHEDULE_OID = "rbd_mirror_snapshot_schedule"
     REFRESH_DELAY_SECONDS = 60.0
+    MAX_LOAD_POOL_THREADS = 4
 
     def __init__(self, module: Any) -> None:
         self.lock = Lock()
@@ -381,10 +402,10 @@ class MirrorSnapshotScheduleHandler:
                 ex, traceback.format_exc()))
 
     def init_schedule_queue(self) -> None:
-        # schedule_time => image_spec
-        self.queue: Dict[datetime, List[ImageSpec]] = {}
+        self.queue: ScheduleQueue[ImageSpec] = ScheduleQueue()
         # pool_id => {namespace => image_id}
         self.images: Dict[str, Dict[str, Dict[str, str]]] = {}
+        self.namespace_cache: NamespaceCache = {}
         self.schedules = Schedules(self)
         self.refresh_images()
         self.log.debug("MirrorSnapshotScheduleHandler: queue is initialized")
@@ -405,29 +426,41 @@ class MirrorSnapshotScheduleHandler:
             if not self.schedules:
                 self.log.debug("MirrorSnapshotScheduleHandler: no schedules")
                 self.images = {}
-                self.queue = {}
+                self.queue.clear()
                 self.last_refresh_images = datetime.now(timezone.utc)
                 return self.REFRESH_DELAY_SECONDS
 
         images: Dict[str, Dict[str, Dict[str, str]]] = {}
+        namespace_cache: NamespaceCache = {}
 
-        for pool_id, pool_name in get_rbd_pools(self.module).items():
-            if not self.schedules.intersects(
-                    LevelSpec.from_pool_spec(pool_id, pool_name)):
-                continue
+        pool_ids = [pool_id for pool_id, pool_name in get_rbd_pools(self.module).items()
+                    if self.schedules.intersects(
+                        LevelSpec.from_pool_spec(pool_id, pool_name))]
+
+        def load_pool(pool_id: str) -> None:
             with self.module.rados.open_ioctx2(int(pool_id)) as ioctx:
-                self.load_pool_images(ioctx, images)
+                self.load_pool_images(ioctx, images, namespace_cache)
+
+        # pools are scanned concurrently; each scan only touches its own
+        # pool's entries in images and namespace_cache
+        if pool_ids:
+            with ThreadPoolExecutor(
+                    max_workers=min(len(pool_ids), self.MAX_LOAD_POOL_THREADS)) as executor:
+                for _ in executor.map(load_pool, pool_ids):
+                    pass
 
         with self.lock:
             self.refresh_queue(images)
             self.images = images
+            self.namespace_cache = namespace_cache
 
         self.last_refresh_images = datetime.now(timezone.utc)
         return self.REFRESH_DELAY_SECONDS
 
     def load_pool_images(self,
                          ioctx: rados.Ioctx,
-                         images: Dict[str, Dict[str, Dict[str, str]]]) -> None:
+                         images: Dict[str, Dict[str, Dict[str, str]]],
+                         namespace_cache: NamespaceCache) -> None:
         pool_id = str(ioctx.get_pool_id())
         pool_name = ioctx.get_pool_name()
         images[pool_id] = {}
@@ -444,14 +477,31 @@ class MirrorSnapshotScheduleHandler:
                     pool_name, namespace))
                 images[pool_id][namespace] = {}
                 ioctx.set_namespace(namespace)
+                # mirror image and image directory updates bump the versions
+                # of these objects. Promotions and demotions don't, so the
+                # mirror image info (with the primary flag) is always listed,
+                # but image names are only looked up again if either changed
+                versions = (get_object_version(ioctx, RBD_MIRRORING_OID),
+                            get_object_version(ioctx, RBD_DIRECTORY_OID))
                 mirror_images = dict(rbd.RBD().mirror_image_info_list(
                     ioctx, rbd.RBD_MIRROR_IMAGE_MODE_SNAPSHOT))
                 if not mirror_images:
+                    namespace_cache[(pool_id, namespace)] = (pool_name, versions, {})
                     continue
-                image_names = dict(
-                    [(x['id'], x['name']) for x in filter(
-                        lambda x: x['id'] in mirror_images,
-                        rbd.RBD().list2(ioctx))])
+                cached = self.namespace_cache.get((pool_id, namespace))
+                if cached and cached[0] == pool_name and cached[1] == versions and \
+                   all(image_id in cached[2] for image_id in mirror_images):
+                    self.log.debug(
+                        "load_pool_images: pool={}, namespace={} names unchanged".format(
+                            pool_name, namespace))
+                    image_names = cached[2]
+                else:
+                    image_names = dict(
+                        [(x['id'], x['name']) for x in filter(
+                            lambda x: x['id'] in mirror_images,
+                            rbd.RBD().list2(ioctx))])
+                namespace_cache[(pool_id, namespace)] = (
+                    pool_name, versions, image_names)
                 for image_id, info in mirror_images.items():
                     if not info['primary']:
                         continue
@@ -473,19 +523,28 @@ class MirrorSnapshotScheduleHandler:
                 "load_pool_images: exception when scanning pool {}: {}".format(
                     pool_name, e))
 
-    def rebuild_queue(self) -> None:
+    def rebuild_queue(self, level_spec: Optional[LevelSpec] = None) -> None:
         # don't remove from queue "due" images
         now = datetime.now(timezone.utc)
-        for schedule_time in list(self.queue):
-            if schedule_time > now:
-                del self.queue[schedule_time]
 
         if not self.schedules:
+            for schedule_time, image_spec in self.queue.items():
+                if schedule_time > now:
+                    self.queue.remove(image_spec)
             return
 
+        # only images covered by the changed level spec (if any) can have
+        # their schedule affected
         for pool_id in self.images:
             for namespace in self.images[pool_id]:
                 for image_id in self.images[pool_id][namespace]:
+                    if level_spec and not level_spec.matches(pool_id, namespace, image_id):
+                        continue
+                    image_spec = ImageSpec(pool_id, namespace, image_id)
+                    schedule_time = self.queue.schedule_time(image_spec)
+                    if schedule_time is not None and schedule_time <= now:
+                        continue
+                    self.queue.remove(image_spec)
                     self.enqueue(now, pool_id, namespace, image_id)
 
         self.condition.notify()
@@ -522,46 +581,20 @@ class MirrorSnapshotScheduleHandler:
 
         schedule_time = schedule.next_run(
             now, "{}/{}/{}".format(pool_id, namespace, image_id))
-        if schedule_time not in self.queue:
-            self.queue[schedule_time] = []
         self.log.debug(
             "MirrorSnapshotScheduleHandler: scheduling {}/{}/{} at {}".format(
                 pool_id, namespace, image_id, schedule_time))
-        image_spec = ImageSpec(pool_id, namespace, image_id)
-        if image_spec not in self.queue[schedule_time]:
-            self.queue[schedule_time].append(image_spec)
+        self.queue.enqueue(schedule_time, ImageSpec(pool_id, namespace, image_id))
 
     def dequeue(self) -> Tuple[Optional[ImageSpec], float]:
-        if not self.queue:
-            return None, 1000.0
-
-        now = datetime.now(timezone.utc)
-        schedule_time = min(self.queue)
-
-        if now < schedule_time:
-            return None, (schedule_time - now).total_seconds()
-
-        images = self.queue[schedule_time]
-        rng = random.Random(schedule_time.timestamp())
-        image = images.pop(rng.randrange(len(images)))
-        if not images:
-            del self.queue[schedule_time]
-        return image, 0.0
+        return self.queue.dequeue(datetime.now(timezone.utc))
 
     def remove_from_queue(self, pool_id: str, namespace: str, image_id: str) -> None:
         self.log.debug(
             "MirrorSnapshotScheduleHandler: descheduling {}/{}/{}".format(
                 pool_id, namespace, image_id))
 
-        empty_slots = []
-        image_spec = ImageSpec(pool_id, namespace, image_id)
-        for schedule_time, images in self.queue.items():
-            if image_spec in images:
-                images.remove(image_spec)
-                if not images:
-                    empty_slots.append(schedule_time)
-        for schedule_time in empty_slots:
-            del self.queue[schedule_time]
+        self.queue.remove(ImageSpec(pool_id, namespace, image_id))
 
     def add_schedule(self,
                      level_spec: LevelSpec,
@@ -571,10 +604,9 @@ class MirrorSnapshotScheduleHandler:
             "MirrorSnapshotScheduleHandler: add_schedule: level_spec={}, interval={}, start_time={}".format(
                 level_spec.name, interval, start_time))
 
-        # TODO: optimize to rebuild only affected part of the queue
         with self.lock:
             self.schedules.add(level_spec, interval, start_time)
-            self.rebuild_queue()
+            self.rebuild_queue(level_spec)
         return 0, "", ""
 
     def remove_schedule(self,
@@ -585,10 +617,9 @@ class MirrorSnapshotScheduleHandler:
             "MirrorSnapshotScheduleHandler: remove_schedule: level_spec={}, interval={}, start_time={}".format(
                 level_spec.name, interval, start_time))
 
-        # TODO: optimize to rebuild only affected part of the queue
         with self.lock:
             self.schedules.remove(level_spec, interval, start_time)
-            self.rebuild_queue()
+            self.rebuild_queue(level_spec)
         return 0, "", ""
 
     def list(self, level_spec: LevelSpec) -> Tuple[int, str, str]:
@@ -608,14 +639,13 @@ class MirrorSnapshotScheduleHandler:
 
         scheduled_images = []
         with self.lock:
-            for schedule_time in sorted(self.queue):
-                for pool_id, namespace, image_id in self.queue[schedule_time]:
-                    if not level_spec.matches(pool_id, namespace, image_id):
-                        continue
-                    image_name = self.images[pool_id][namespace][image_id]
-                    scheduled_images.append({
-                        'schedule_time': schedule_time.strftime("%Y-%m-%d %H:%M:00"),
-                        'image': image_name
-                    })
+            for schedule_time, (pool_id, namespace, image_id) in self.queue.items():
+                if not level_spec.matches(pool_id, namespace, image_id):
+                    continue
+                image_name = self.images[pool_id][namespace][image_id]
+                scheduled_images.append({
+                    'schedule_time': schedule_time.strftime("%Y-%m-%d %H:%M:00"),
+                    'image': image_name
+                })
         return 0, json.dumps({'scheduled_images': scheduled_images},
                              indent=4, sort_keys=True), ""
@@ -1,13 +1,15 @@
 import errno
+import heapq
 import json
 import rados
 import rbd
 import time
 import traceback
 
+from array import array
 from datetime import datetime, timedelta
 from threading import Condition, Lock, Thread
-from typing import cast, Any, Callable, Dict, List, Optional, Set, Tuple, Union
+from typing import cast, Any, Callable, Dict, List, Optional, Set, Tuple
 
 from .common import (GLOBAL_POOL_KEY, authorize_request, extract_pool_key,
                      get_rbd_pools, PoolKeyT)
@@ -15,8 +17,7 @@ from .common import (GLOBAL_POOL_KEY, authorize_request, extract_pool_key,
 QUERY_POOL_ID = "pool_id"
 QUERY_POOL_ID_MAP = "pool_id_map"
 QUERY_IDS = "query_ids"
-QUERY_SUM_POOL_COUNTERS = "pool_counters"
-QUERY_RAW_POOL_COUNTERS = "raw_pool_counters"
+QUERY_COUNTERS = "counters"
 QUERY_LAST_REQUEST = "last_request"
 
 OSD_PERF_QUERY_REGEX_MATCH_ALL = '^(.*)$'
@@ -30,6 +31,13 @@ OSD_PERF_QUERY_COUNTERS_INDICES = {
     OSD_PERF_QUERY_COUNTERS[i]: i for i in range(len(OSD_PERF_QUERY_COUNTERS))}
 
 OSD_PERF_QUERY_LATENCY_COUNTER_INDICES = [4, 5]
+# latency counter index => index of the ops counter it is averaged over
+OSD_PERF_QUERY_LATENCY_OPS_INDICES = {
+    OSD_PERF_QUERY_COUNTERS_INDICES['write_latency']:
+        OSD_PERF_QUERY_COUNTERS_INDICES['write_ops'],
+    OSD_PERF_QUERY_COUNTERS_INDICES['read_latency']:
+        OSD_PERF_QUERY_COUNTERS_INDICES['read_ops'],
+}
 OSD_PERF_QUERY_MAX_RESULTS = 256
 
 POOL_REFRESH_INTERVAL = timedelta(minutes=5)
@@ -38,30 +46,193 @@ STATS_RATE_INTERVAL = timedelta(minutes=1)
 
 REPORT_MAX_RESULTS = 64
 
+# compact a counter table once this many rows (and at least half of
+# them) are unused
+TABLE_COMPACT_MIN_FREE_ROWS = 1024
+
 
 # {(pool_id, namespace)...}
 ResolveImageNamesT = Set[Tuple[int, str]]
 
-# (time, [value,...])
-PerfCounterT = Tuple[int, List[int]]
-# current, previous
-RawImageCounterT = Tuple[PerfCounterT, Optional[PerfCounterT]]
-# image_id => perf_counter
-RawImagesCounterT = Dict[str, RawImageCounterT]
-# namespace_counters => raw_images
-RawNamespacesCountersT = Dict[str, RawImagesCounterT]
-# pool_id => namespaces_counters
-RawPoolCountersT = Dict[int, RawNamespacesCountersT]
+# (pool_id, namespace, image_id)
+ImageKeyT = Tuple[int, str, str]
+
+ExtractDataFuncT = Callable[['PerfCounterTable', int, int], float]
+
+
+class PerfCounterTable:
+    """
+    Image counters of a single user query.
+
+    Every image owns a row in a set of flat arrays holding the last two
+    samples of its counters (along with their timestamps) and the counter
+    sums, so a pool with many images costs a few machine words per counter
+    instead of a tree of dicts, tuples and lists. Rows of dropped images are
+    recycled and the arrays are compacted once most rows are unused.
+    """
+
+    def __init__(self) -> None:
+        self.width = len(OSD_PERF_QUERY_COUNTERS)
+        self.rows: Dict[ImageKeyT, int] = {}
+        self.keys: List[Optional[ImageKeyT]] = []
+        self.free_rows: List[int] = []
+        # time of the current and previous sample, 0 if there is none
+        self.current_ts = array('q')
+        self.previous_ts = array('q')
+        self.current = array('Q')
+        self.previous = array('Q')
+        self.sums = array('Q')
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _zeros(self) -> array:
+        return array('Q', [0]) * self.width
+
+    def add_row(self, key: ImageKeyT) -> int:
+        row = self.rows.get(key)
+        if row is not None:
+            return row
+
+        if self.free_rows:
+            row = self.free_rows.pop()
+            self.keys[row] = key
+            self.current_ts[row] = 0
+            self.previous_ts[row] = 0
+            base = row * self.width
+            zeros = self._zeros()
+            self.current[base:base + self.width] = zeros
+            self.previous[base:base + self.width] = zeros
+            self.sums[base:base + self.width] = zeros
+        else:
+            row = len(self.keys)
+            self.keys.append(key)
+            self.current_ts.append(0)
+            self.previous_ts.append(0)
+            zeros = self._zeros()
+            self.current.extend(zeros)
+            self.previous.extend(zeros)
+            self.sums.extend(zeros)
+
+        self.rows[key] = row
+        return row
+
+    def remove_row(self, key: ImageKeyT) -> None:
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+
+        self.keys[row] = None
+        self.free_rows.append(row)
+        if len(self.free_rows) >= max(TABLE_COMPACT_MIN_FREE_ROWS,
+                                      len(self.rows)):
+            self.compact()
+
+    def compact(self) -> None:
+        w = self.width
+        live = sorted(self.rows.values())
+        current_ts = array('q', (self.current_ts[row] for row in live))
+        previous_ts = array('q', (self.previous_ts[row] for row in live))
+        current = array('Q')
+        previous = array('Q')
+        sums = array('Q')
+        for row in live:
+            base = row * w
+            current.extend(self.current[base:base + w])
+            previous.extend(self.previous[base:base + w])
+            sums.extend(self.sums[base:base + w])
+
+        self.keys = [self.keys[row] for row in live]
+        self.rows = {cast(ImageKeyT, key): row
+                     for row, key in enumerate(self.keys)}
+        self.free_rows = []
+        self.current_ts = current_ts
+        self.previous_ts = previous_ts
+        self.current = current
+        self.previous = previous
+        self.sums = sums
+
+    def update(self, key: ImageKeyT, now_ts: int, values: List[int]) -> None:
+        # save the last two samples for each image, an image is reported by
+        # every sort order query so only the first sample in a round is kept
+        row = self.add_row(key)
+        current_ts = self.current_ts[row]
+        if current_ts >= now_ts:
+            return
+
+        w = self.width
+        base = row * w
+        self.previous[base:base + w] = self.current[base:base + w]
+        self.previous_ts[row] = current_ts
+        self.current[base:base + w] = array('Q', values)
+        self.current_ts[row] = now_ts
+
+    def accumulate(self, now_ts: int) -> None:
+        w = self.width
+        current_ts = self.current_ts
+        previous_ts = self.previous_ts
+        current = self.current
+        previous = self.previous
+        sums = self.sums
+        zeros = self._zeros()
+        for row in self.rows.values():
+            base = row * w
+            if current_ts[row] < now_ts:
+                # zero-out non-updated counters
+                previous[base:base + w] = current[base:base + w]
+                previous_ts[row] = current_ts[row]
+                current[base:base + w] = zeros
+                current_ts[row] = now_ts
+                continue
+
+            for i in range(base, base + w):
+                sums[i] += current[i]
+
+    def _elapsed(self, row: int) -> int:
+        # require two samples within a fixed time window
+        if not self.previous_ts[row]:
+            return 0
+        elapsed = self.current_ts[row] - self.previous_ts[row]
+        if elapsed <= 0 or elapsed > STATS_RATE_INTERVAL.total_seconds():
+            return 0
+        return elapsed
+
+    def stat(self, row: int, index: int) -> float:
+        elapsed = self._elapsed(row)
+        if not elapsed:
+            return 0
 
-SumImageCounterT = List[int]
-# image_id => sum_image
-SumImagesCounterT = Dict[str, SumImageCounterT]
-# namespace => sum_images
-SumNamespacesCountersT = Dict[str, SumImagesCounterT]
-# pool_id, sum_namespaces
-SumPoolCountersT = Dict[int, SumNamespacesCountersT]
+        base = row * self.width
+        rate = float(self.current[base + index]) / elapsed
 
-ExtractDataFuncT = Callable[[int, Optional[RawImageCounterT], SumImageCounterT], float]
+        # convert latencies from sum to average per op
+        ops_index = OSD_PERF_QUERY_LATENCY_OPS_INDICES.get(index)
+        if ops_index is not None:
+            rate /= max(1, float(self.current[base + ops_index]) / elapsed)
+        return rate
+
+    def counter(self, row: int, index: int) -> int:
+        return self.sums[row * self.width + index]
+
+    def stat_column(self, index: int) -> array:
+        """
+        compute the rate of a single counter for all rows in one pass
+        (unused rows are left at zero)
+        """
+        column = array('d', [0.0]) * len(self.keys)
+        ops_index = OSD_PERF_QUERY_LATENCY_OPS_INDICES.get(index)
+        w = self.width
+        current = self.current
+        for row in self.rows.values():
+            elapsed = self._elapsed(row)
+            if not elapsed:
+                continue
+            base = row * w
+            rate = float(current[base + index]) / elapsed
+            if ops_index is not None:
+                rate /= max(1, float(current[base + ops_index]) / elapsed)
+            column[row] = rate
+        return column
 
 
 class PerfHandler:
@@ -157,11 +328,11 @@ class PerfHandler:
                                     pool_key: PoolKeyT,
                                     query: Dict[str, Any],
                                     now_ts: int,
-                                    resolve_image_names: ResolveImageNamesT) -> RawPoolCountersT:
+                                    resolve_image_names: ResolveImageNamesT) -> PerfCounterTable:
         pool_id_map = query[QUERY_POOL_ID_MAP]
 
         # collect and combine the raw counters from all sort orders
-        raw_pool_counters: Dict[int, Dict[str, Dict[str, Any]]] = query.setdefault(QUERY_RAW_POOL_COUNTERS, {})
+        table = query.setdefault(QUERY_COUNTERS, PerfCounterTable())
         for query_id in query[QUERY_IDS]:
             res = self.module.get_osd_perf_counters(query_id)
             for counter in res['counters']:
@@ -184,55 +355,20 @@ class PerfHandler:
                     resolve_image_names.add(resolve_image_key)
 
                 # copy the 'sum' counter values for each image (ignore count)
-                # if we haven't already processed it for this round
-                raw_namespaces = raw_pool_counters.setdefault(pool_id, {})
-                raw_images = raw_namespaces.setdefault(namespace, {})
-                raw_image = raw_images.get(image_id)
-                # save the last two perf counters for each image
-                new_current = (now_ts, [int(x[0]) for x in counter['c']])
-                if raw_image:
-                    old_current, _ = raw_image
-                    if old_current[0] < now_ts:
-                        raw_images[image_id] = (new_current, old_current)
-                else:
-                    raw_images[image_id] = (new_current, None)
-
-        self.log.debug("merge_raw_osd_perf_counters: {}".format(raw_pool_counters))
-        return raw_pool_counters
+                table.update((pool_id, namespace, image_id), now_ts,
+                             [int(x[0]) for x in counter['c']])
+
+        self.log.debug("merge_raw_osd_perf_counters: pool_key={}, images={}".format(
+            pool_key, len(table)))
+        return table
 
     def sum_osd_perf_counters(self,
-                              query: Dict[str, dict],
-                              raw_pool_counters: RawPoolCountersT,
-                              now_ts: int) -> SumPoolCountersT:
+                              table: PerfCounterTable,
+                              now_ts: int) -> PerfCounterTable:
         # update the cumulative counters for each image
-        sum_pool_counters = query.setdefault(QUERY_SUM_POOL_COUNTERS, {})
-        for pool_id, raw_namespaces in raw_pool_counters.items():
-            sum_namespaces = sum_pool_counters.setdefault(pool_id, {})
-            for namespace, raw_images in raw_namespaces.items():
-                sum_namespace = sum_namespaces.setdefault(namespace, {})
-                for image_id, raw_image in raw_images.items():
-                    # zero-out non-updated raw counters
-                    if not raw_image[0]:
-                        continue
-                    old_current, _ = raw_image
-                    if old_current[0] < now_ts:
-                        new_current = (now_ts, [0] * len(old_current[1]))
-                        raw_images[image_id] = (new_current, old_current)
-                        continue
-
-                    counters = old_current[1]
-
-                    # copy raw counters if this is a newly discovered image or
-                    # increment existing counters
-                    sum_image = sum_namespace.setdefault(image_id, None)
-                    if sum_image:
-                        for i in range(len(counters)):
-                            sum_image[i] += counters[i]
-                    else:
-                        sum_namespace[image_id] = [x for x in counters]
-
-        self.log.debug("sum_osd_perf_counters: {}".format(sum_pool_counters))
-        return sum_pool_counters
+        table.accumulate(now_ts)
+        self.log.debug("sum_osd_perf_counters: images={}".format(len(table)))
+        return table
 
     def refresh_image_names(self, resolve_image_names: ResolveImageNamesT) -> None:
         for pool_id, namespace in resolve_image_names:
@@ -246,23 +382,17 @@ class PerfHandler:
 
     def scrub_missing_images(self) -> None:
         for pool_key, query in self.user_queries.items():
-            raw_pool_counters = query.get(QUERY_RAW_POOL_COUNTERS, {})
-            sum_pool_counters = query.get(QUERY_SUM_POOL_COUNTERS, {})
-            for pool_id, sum_namespaces in sum_pool_counters.items():
-                raw_namespaces = raw_pool_counters.get(pool_id, {})
-                for namespace, sum_images in sum_namespaces.items():
-                    raw_images = raw_namespaces.get(namespace, {})
-
-                    image_key = (pool_id, namespace)
-                    image_names = self.image_name_cache.get(image_key, {})
-                    for image_id in list(sum_images.keys()):
-                        # scrub image counters if we failed to resolve image name
-                        if image_id not in image_names:
-                            self.log.debug("scrub_missing_images: dropping {}/{}".format(
-                                image_key, image_id))
-                            del sum_images[image_id]
-                            if image_id in raw_images:
-                                del raw_images[image_id]
+            table = query.get(QUERY_COUNTERS)
+            if table is None:
+                continue
+
+            for image_key in list(table.rows.keys()):
+                pool_id, namespace, image_id = image_key
+                # scrub image counters if we failed to resolve image name
+                if image_id not in self.image_name_cache.get((pool_id, namespace), {}):
+                    self.log.debug("scrub_missing_images: dropping {}/{}".format(
+                        (pool_id, namespace), image_id))
+                    table.remove_row(image_key)
 
     def process_raw_osd_perf_counters(self) -> None:
         now = datetime.now()
@@ -279,9 +409,9 @@ class PerfHandler:
             if not query[QUERY_IDS]:
                 continue
 
-            raw_pool_counters = self.merge_raw_osd_perf_counters(
+            table = self.merge_raw_osd_perf_counters(
                 pool_key, query, now_ts, resolve_image_names)
-            self.sum_osd_perf_counters(query, raw_pool_counters, now_ts)
+            self.sum_osd_perf_counters(table, now_ts)
 
         if resolve_image_names:
             self.image_name_refresh_time = now
@@ -374,109 +504,56 @@ class PerfHandler:
         return user_query
 
     def extract_stat(self,
-                     index: int,
-                     raw_image: Optional[RawImageCounterT],
-                     sum_image: Any) -> float:
-        # require two raw counters between a fixed time window
-        if not raw_image or not raw_image[0] or not raw_image[1]:
-            return 0
-
-        current_counter, previous_counter = cast(Tuple[PerfCounterT, PerfCounterT], raw_image)
-        current_time = current_counter[0]
-        previous_time = previous_counter[0]
-        if current_time <= previous_time or \
-                current_time - previous_time > STATS_RATE_INTERVAL.total_seconds():
-            return 0
-
-        current_value = current_counter[1][index]
-        instant_rate = float(current_value) / (current_time - previous_time)
-
-        # convert latencies from sum to average per op
-        ops_index = None
-        if OSD_PERF_QUERY_COUNTERS[index] == 'write_latency':
-            ops_index = OSD_PERF_QUERY_COUNTERS_INDICES['write_ops']
-        elif OSD_PERF_QUERY_COUNTERS[index] == 'read_latency':
-            ops_index = OSD_PERF_QUERY_COUNTERS_INDICES['read_ops']
-
-        if ops_index is not None:
-            ops = max(1, self.extract_stat(ops_index, raw_image, sum_image))
-            instant_rate /= ops
-
-        return instant_rate
+                     table: PerfCounterTable,
+                     row: int,
+                     index: int) -> float:
+        return table.stat(row, index)
 
     def extract_counter(self,
-                        index: int,
-                        raw_image: Optional[RawImageCounterT],
-                        sum_image: List[int]) -> int:
-        if sum_image:
-            return sum_image[index]
-        return 0
+                        table: PerfCounterTable,
+                        row: int,
+                        index: int) -> int:
+        return table.counter(row, index)
 
     def generate_report(self,
-                        query: Dict[str, Union[Dict[str, str],
-                                               Dict[int, Dict[str, dict]]]],
+                        query: Dict[str, Any],
                         sort_by: str,
                         extract_data: ExtractDataFuncT) -> Tuple[Dict[int, str],
                                                                  List[Dict[str, List[float]]]]:
         pool_id_map = cast(Dict[int, str], query[QUERY_POOL_ID_MAP])
-        sum_pool_counters = cast(SumPoolCountersT,
-                                 query.setdefault(QUERY_SUM_POOL_COUNTERS,
-                                                  cast(SumPoolCountersT, {})))
-        # pool_id => {namespace => {image_id => [counter..] }
-        raw_pool_counters = cast(RawPoolCountersT,
-                                 query.setdefault(QUERY_RAW_POOL_COUNTERS,
-                                                  cast(RawPoolCountersT, {})))
+        table = cast(PerfCounterTable,
+                     query.setdefault(QUERY_COUNTERS, PerfCounterTable()))
 
         sort_by_index = OSD_PERF_QUERY_COUNTERS.index(sort_by)
 
-        # pre-sort and limit the response
-        results = []
-        for pool_id, sum_namespaces in sum_pool_counters.items():
-            if pool_id not in pool_id_map:
-                continue
-            raw_namespaces: RawNamespacesCountersT = raw_pool_counters.get(pool_id, {})
-            for namespace, sum_images in sum_namespaces.items():
-                raw_images = raw_namespaces.get(namespace, {})
-                for image_id, sum_image in sum_images.items():
-                    raw_image = raw_images.get(image_id)
-
-                    # always sort by recent IO activity
-                    results.append(((pool_id, namespace, image_id),
-                                    self.extract_stat(sort_by_index, raw_image,
-                                                      sum_image)))
-        results = sorted(results, key=lambda x: x[1], reverse=True)[:REPORT_MAX_RESULTS]
+        # always sort by recent IO activity, only keeping the top entries
+        sort_column = table.stat_column(sort_by_index)
+        rows = heapq.nlargest(REPORT_MAX_RESULTS,
+                              (row for key, row in table.rows.items()
+                               if key[0] in pool_id_map),
+                              key=sort_column.__getitem__)
 
         # build the report in sorted order
         pool_descriptors: Dict[str, int] = {}
         counters = []
-        for key, _ in results:
-            pool_id = key[0]
+        for row in rows:
+            pool_id, namespace, image_id = cast(ImageKeyT, table.keys[row])
             pool_name = pool_id_map[pool_id]
 
-            namespace = key[1]
-            image_id = key[2]
             image_names = self.image_name_cache.get((pool_id, namespace), {})
             image_name = image_names[image_id]
 
-            raw_namespaces = raw_pool_counters.get(pool_id, {})
-            raw_images = raw_namespaces.get(namespace, {})
-            raw_image = raw_images.get(image_id)
-
-            sum_namespaces = sum_pool_counters[pool_id]
-            sum_images = sum_namespaces[namespace]
-            sum_image = sum_images.get(image_id, [])
-
             pool_descriptor = pool_name
             if namespace:
                 pool_descriptor += "/{}".format(namespace)
             pool_index = pool_descriptors.setdefault(pool_descriptor,
                                                      len(pool_descriptors))
             image_descriptor = "{}/{}".format(pool_index, image_name)
-            data = [extract_data(i, raw_image, sum_image)
+            data = [extract_data(table, row, i)
                     for i in range(len(OSD_PERF_QUERY_COUNTERS))]
 
             # skip if no data to report
-            if data == [0 for i in range(len(OSD_PERF_QUERY_COUNTERS))]:
+            if not any(data):
                 continue
 
             counters.append({image_descriptor: data})
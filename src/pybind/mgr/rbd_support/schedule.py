@@ -1,12 +1,15 @@
 import hashlib
+import heapq
 import json
 import rados
+import random
 import rbd
 import re
 
 from datetime import date, datetime, timezone, timedelta
 from dateutil.parser import parse, isoparse
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, Set, Tuple, \
+    TypeVar, TYPE_CHECKING
 
 from .common import get_rbd_pools
 if TYPE_CHECKING:
@@ -399,6 +402,87 @@ class Schedule:
             raise ValueError("Invalid schedule format ({})".format(str(e)))
 
 
+K = TypeVar('K', bound=Hashable)
+
+
+class ScheduleQueue(Generic[K]):
+    """
+    Indexed priority queue of scheduled items (images, namespaces), each
+    due at a single schedule time. A heap orders the items by schedule
+    time; an item -> heap entry map allows rescheduling and removing items
+    in O(log n) by invalidating their current entry, stale entries being
+    dropped when they reach the top of the heap (or on compaction).
+
+    Items due at the same time are dequeued in random order.
+    """
+
+    def __init__(self) -> None:
+        # [schedule_time, tie breaker, item, valid]
+        self.heap: List[List[Any]] = []
+        self.entries: Dict[K, List[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, item: K) -> bool:
+        return item in self.entries
+
+    def clear(self) -> None:
+        self.heap = []
+        self.entries = {}
+
+    def schedule_time(self, item: K) -> Optional[datetime]:
+        entry = self.entries.get(item)
+        return entry[0] if entry else None
+
+    def enqueue(self, schedule_time: datetime, item: K) -> None:
+        entry = self.entries.get(item)
+        if entry is not None:
+            if entry[0] == schedule_time:
+                return
+            entry[3] = False
+        entry = [schedule_time, random.random(), item, True]
+        self.entries[item] = entry
+        heapq.heappush(self.heap, entry)
+
+    def remove(self, item: K) -> bool:
+        entry = self.entries.pop(item, None)
+        if entry is None:
+            return False
+        entry[3] = False
+        # keep the stale entries from outnumbering the live ones
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.heap = [e for e in self.heap if e[3]]
+            heapq.heapify(self.heap)
+        return True
+
+    def _top(self) -> Optional[List[Any]]:
+        while self.heap and not self.heap[0][3]:
+            heapq.heappop(self.heap)
+        return self.heap[0] if self.heap else None
+
+    def dequeue(self, now: datetime) -> Tuple[Optional[K], float]:
+        """
+        pop the first item if it is due, otherwise return the number of
+        seconds until it is.
+        """
+        entry = self._top()
+        if entry is None:
+            return None, 1000.0
+        if now < entry[0]:
+            return None, (entry[0] - now).total_seconds()
+        heapq.heappop(self.heap)
+        del self.entries[entry[2]]
+        return entry[2], 0.0
+
+    def items(self) -> List[Tuple[datetime, K]]:
+        """
+        (schedule_time, item) pairs in schedule order
+        """
+        return [(e[0], e[2]) for e in sorted(self.entries.values(),
+                                             key=lambda e: (e[0], e[1]))]
+
+
 class Schedules:
 
     def __init__(self, handler: Any) -> None:
@@ -0,0 +1,76 @@
+from unittest import mock
+
+import pytest
+
+from ..mirror_snapshot_schedule import MirrorSnapshotScheduleHandler
+
+
+class TestLoadPoolImages:
+    @pytest.fixture
+    def handler(self):
+        with mock.patch('rbd_support.mirror_snapshot_schedule.Thread'):
+            handler = MirrorSnapshotScheduleHandler(mock.MagicMock())
+        handler.schedules = mock.MagicMock()
+        handler.schedules.intersects.return_value = True
+        handler.namespace_cache = {}
+        return handler
+
+    @pytest.fixture
+    def ioctx(self):
+        ioctx = mock.MagicMock()
+        ioctx.get_pool_id.return_value = 1
+        ioctx.get_pool_name.return_value = 'rbd'
+        return ioctx
+
+    @pytest.fixture
+    def rbd(self):
+        with mock.patch('rbd_support.mirror_snapshot_schedule.rbd') as rbd:
+            rbd.RBD.return_value.namespace_list.return_value = []
+            rbd.RBD.return_value.list2.return_value = [
+                {'id': 'a', 'name': 'img_a'},
+                {'id': 'b', 'name': 'img_b'},
+                {'id': 'c', 'name': 'img_c'},
+            ]
+            yield rbd
+
+    def load(self, handler, ioctx, versions):
+        images = {}
+        namespace_cache = {}
+        with mock.patch('rbd_support.mirror_snapshot_schedule.get_object_version',
+                        side_effect=versions):
+            handler.load_pool_images(ioctx, images, namespace_cache)
+        handler.namespace_cache = namespace_cache
+        return images['1']['']
+
+    def test_unchanged_versions_skip_name_lookup(self, handler, ioctx, rbd):
+        info_list = rbd.RBD.return_value.mirror_image_info_list
+        info_list.return_value = [('a', {'primary': True}),
+                                  ('b', {'primary': False})]
+        assert self.load(handler, ioctx, [1, 1]) == {'a': 'rbd/img_a'}
+        assert rbd.RBD.return_value.list2.call_count == 1
+
+        # a promotion doesn't change the object versions, but is picked up
+        info_list.return_value = [('a', {'primary': False}),
+                                  ('b', {'primary': True})]
+        assert self.load(handler, ioctx, [1, 1]) == {'b': 'rbd/img_b'}
+        assert info_list.call_count == 2
+        assert rbd.RBD.return_value.list2.call_count == 1
+
+    def test_changed_versions_reload_names(self, handler, ioctx, rbd):
+        info_list = rbd.RBD.return_value.mirror_image_info_list
+        info_list.return_value = [('a', {'primary': True})]
+        assert self.load(handler, ioctx, [1, 1]) == {'a': 'rbd/img_a'}
+
+        info_list.return_value = [('a', {'primary': True}),
+                                  ('c', {'primary': True})]
+        assert self.load(handler, ioctx, [2, 1]) == {'a': 'rbd/img_a',
+                                                     'c': 'rbd/img_c'}
+        assert rbd.RBD.return_value.list2.call_count == 2
+
+        rbd.RBD.return_value.list2.return_value = [
+            {'id': 'a', 'name': 'renamed'},
+            {'id': 'c', 'name': 'img_c'},
+        ]
+        assert self.load(handler, ioctx, [2, 2]) == {'a': 'rbd/renamed',
+                                                     'c': 'rbd/img_c'}
+        assert rbd.RBD.return_value.list2.call_count == 3
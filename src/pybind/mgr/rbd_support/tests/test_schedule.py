@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+from ..schedule import ScheduleQueue
+
+
+T0 = datetime(2024, 1, 1)
+
+
+def at(minutes):
+    return T0 + timedelta(minutes=minutes)
+
+
+def drain(queue, now):
+    items = []
+    while True:
+        item, wait = queue.dequeue(now)
+        if item is None:
+            return items, wait
+        items.append(item)
+
+
+class TestScheduleQueue:
+    def test_empty(self):
+        queue = ScheduleQueue()
+        assert len(queue) == 0
+        assert queue.dequeue(at(0)) == (None, 1000.0)
+
+    def test_dequeue_order(self):
+        queue = ScheduleQueue()
+        queue.enqueue(at(3), 'c')
+        queue.enqueue(at(1), 'a')
+        queue.enqueue(at(2), 'b')
+        assert queue.items() == [(at(1), 'a'), (at(2), 'b'), (at(3), 'c')]
+
+        assert queue.dequeue(at(0)) == (None, 60.0)
+        assert drain(queue, at(2)) == (['a', 'b'], 60.0)
+        assert 'a' not in queue
+        assert 'c' in queue
+        assert drain(queue, at(3)) == (['c'], 1000.0)
+        assert len(queue) == 0
+
+    def test_same_time(self):
+        queue = ScheduleQueue()
+        for item in 'abcd':
+            queue.enqueue(at(1), item)
+        items, _ = drain(queue, at(1))
+        assert sorted(items) == list('abcd')
+
+    def test_enqueue_same_time_is_noop(self):
+        queue = ScheduleQueue()
+        queue.enqueue(at(1), 'a')
+        queue.enqueue(at(1), 'a')
+        assert len(queue.heap) == 1
+        assert drain(queue, at(1)) == (['a'], 1000.0)
+
+    def test_reschedule_before_due(self):
+        queue = ScheduleQueue()
+        queue.enqueue(at(5), 'a')
+        queue.enqueue(at(3), 'b')
+        queue.enqueue(at(1), 'a')
+        assert len(queue) == 2
+        assert queue.schedule_time('a') == at(1)
+
+        assert drain(queue, at(1)) == (['a'], 120.0)
+        # the stale entry at the old schedule time is not returned again
+        assert drain(queue, at(5)) == (['b'], 1000.0)
+        assert len(queue) == 0
+
+    def test_reschedule_later(self):
+        queue = ScheduleQueue()
+        queue.enqueue(at(1), 'a')
+        queue.enqueue(at(4), 'a')
+        assert queue.dequeue(at(1)) == (None, 180.0)
+        assert drain(queue, at(4)) == (['a'], 1000.0)
+
+    def test_remove_then_dequeue(self):
+        queue = ScheduleQueue()
+        queue.enqueue(at(1), 'a')
+        queue.enqueue(at(2), 'b')
+        assert queue.remove('a')
+        assert not queue.remove('a')
+        assert 'a' not in queue
+        assert queue.schedule_time('a') is None
+
+        assert queue.dequeue(at(0)) == (None, 120.0)
+        assert drain(queue, at(2)) == (['b'], 1000.0)
+
+    def test_remove_then_enqueue(self):
+        queue = ScheduleQueue()
+        queue.enqueue(at(1), 'a')
+        queue.remove('a')
+        queue.enqueue(at(2), 'a')
+        assert queue.dequeue(at(1)) == (None, 60.0)
+        assert drain(queue, at(2)) == (['a'], 1000.0)
+
+    def test_compaction(self):
+        queue = ScheduleQueue()
+        for i in range(100):
+            queue.enqueue(at(i), i)
+        # rescheduling leaves a stale entry behind for every item
+        for i in range(100):
+            queue.enqueue(at(i + 1000), i)
+        assert len(queue.heap) == 200
+
+        for i in range(32):
+            assert queue.remove(i)
+        assert len(queue.heap) == 200
+        # stale entries are dropped once they outnumber the live ones
+        assert queue.remove(32)
+        assert len(queue) == 67
+        assert len(queue.heap) == 67
+        assert all(e[3] for e in queue.heap)
+
+        expected = [(at(i + 1000), i) for i in range(33, 100)]
+        assert queue.items() == expected
+        assert queue.dequeue(at(999)) == (None, 60.0 * 34)
+        items, wait = drain(queue, at(2000))
+        assert items == list(range(33, 100))
+        assert wait == 1000.0
+
+    def test_clear(self):
+        queue = ScheduleQueue()
+        queue.enqueue(at(1), 'a')
+        queue.clear()
+        assert len(queue) == 0
+        assert queue.dequeue(at(1)) == (None, 1000.0)
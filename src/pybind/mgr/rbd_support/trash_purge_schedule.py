@@ -1,15 +1,14 @@
 import json
 import rados
-import random
 import rbd
 import traceback
 
 from datetime import datetime, timezone
 from threading import Condition, Lock, Thread
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 
 from .common import get_rbd_pools
-from .schedule import LevelSpec, Schedules
+from .schedule import LevelSpec, Schedules, ScheduleQueue
 
 
 class TrashPurgeScheduleHandler:
@@ -73,7 +72,7 @@ class TrashPurgeScheduleHandler:
                 pool_id, namespace, e))
 
     def init_schedule_queue(self) -> None:
-        self.queue: Dict[datetime, List[Tuple[str, str]]] = {}
+        self.queue: ScheduleQueue[Tuple[str, str]] = ScheduleQueue()
         # pool_id => {namespace => pool_name}
         self.pools: Dict[str, Dict[str, str]] = {}
         self.schedules = Schedules(self)
@@ -96,7 +95,7 @@ class TrashPurgeScheduleHandler:
             if not self.schedules:
                 self.log.debug("TrashPurgeScheduleHandler: no schedules")
                 self.pools = {}
-                self.queue = {}
+                self.queue.clear()
                 self.last_refresh_pools = datetime.now(timezone.utc)
                 return self.REFRESH_DELAY_SECONDS
 
@@ -137,18 +136,26 @@ class TrashPurgeScheduleHandler:
         for namespace in pool_namespaces:
             pools[pool_id][namespace] = pool_name
 
-    def rebuild_queue(self) -> None:
+    def rebuild_queue(self, level_spec: Optional[LevelSpec] = None) -> None:
         # don't remove from queue "due" images
         now = datetime.now(timezone.utc)
-        for schedule_time in list(self.queue):
-            if schedule_time > now:
-                del self.queue[schedule_time]
 
         if not self.schedules:
+            for schedule_time, ns_spec in self.queue.items():
+                if schedule_time > now:
+                    self.queue.remove(ns_spec)
             return
 
+        # only namespaces covered by the changed level spec (if any) can
+        # have their schedule affected
         for pool_id, namespaces in self.pools.items():
             for namespace in namespaces:
+                if level_spec and not level_spec.matches(pool_id, namespace):
+                    continue
+                schedule_time = self.queue.schedule_time((pool_id, namespace))
+                if schedule_time is not None and schedule_time <= now:
+                    continue
+                self.queue.remove((pool_id, namespace))
                 self.enqueue(now, pool_id, namespace)
 
         self.condition.notify()
@@ -180,45 +187,20 @@ class TrashPurgeScheduleHandler:
 
         schedule_time = schedule.next_run(now,
                                           "{}/{}".format(pool_id, namespace))
-        if schedule_time not in self.queue:
-            self.queue[schedule_time] = []
         self.log.debug(
             "TrashPurgeScheduleHandler: scheduling {}/{} at {}".format(
                 pool_id, namespace, schedule_time))
-        ns_spec = (pool_id, namespace)
-        if ns_spec not in self.queue[schedule_time]:
-            self.queue[schedule_time].append((pool_id, namespace))
+        self.queue.enqueue(schedule_time, (pool_id, namespace))
 
     def dequeue(self) -> Tuple[Optional[Tuple[str, str]], float]:
-        if not self.queue:
-            return None, 1000.0
-
-        now = datetime.now(timezone.utc)
-        schedule_time = min(self.queue)
-
-        if now < schedule_time:
-            return None, (schedule_time - now).total_seconds()
-
-        namespaces = self.queue[schedule_time]
-        rng = random.Random(schedule_time.timestamp())
-        namespace = namespaces.pop(rng.randrange(len(namespaces)))
-        if not namespaces:
-            del self.queue[schedule_time]
-        return namespace, 0.0
+        return self.queue.dequeue(datetime.now(timezone.utc))
 
     def remove_from_queue(self, pool_id: str, namespace: str) -> None:
         self.log.debug(
             "TrashPurgeScheduleHandler: descheduling {}/{}".format(
                 pool_id, namespace))
 
-        empty_slots = []
-        for schedule_time, namespaces in self.queue.items():
-            if (pool_id, namespace) in namespaces:
-                namespaces.remove((pool_id, namespace))
-                if not namespaces:
-                    empty_slots.append(schedule_time)
-        for schedule_time in empty_slots:
-            del self.queue[schedule_time]
+        self.queue.remove((pool_id, namespace))
 
     def add_schedule(self,
                      level_spec: LevelSpec,
@@ -228,10 +210,9 @@ class TrashPurgeScheduleHandler:
             "TrashPurgeScheduleHandler: add_schedule: level_spec={}, interval={}, start_time={}".format(
                 level_spec.name, interval, start_time))
 
-        # TODO: optimize to rebuild only affected part of the queue
         with self.lock:
             self.schedules.add(level_spec, interval, start_time)
-            self.rebuild_queue()
+            self.rebuild_queue(level_spec)
         return 0, "", ""
 
     def remove_schedule(self,
@@ -242,10 +223,9 @@ class TrashPurgeScheduleHandler:
             "TrashPurgeScheduleHandler: remove_schedule: level_spec={}, interval={}, start_time={}".format(
                 level_spec.name, interval, start_time))
 
-        # TODO: optimize to rebuild only affected part of the queue
         with self.lock:
             self.schedules.remove(level_spec, interval, start_time)
-            self.rebuild_queue()
+            self.rebuild_queue(level_spec)
         return 0, "", ""
 
     def list(self, level_spec: LevelSpec) -> Tuple[int, str, str]:
@@ -265,16 +245,15 @@ class TrashPurgeScheduleHandler:
 
         scheduled = []
         with self.lock:
-            for schedule_time in sorted(self.queue):
-                for pool_id, namespace in self.queue[schedule_time]:
-                    if not level_spec.matches(pool_id, namespace):
-                        continue
-                    pool_name = self.pools[pool_id][namespace]
-                    scheduled.append({
-                        'schedule_time': schedule_time.strftime("%Y-%m-%d %H:%M:00"),
-                        'pool_id': pool_id,
-                        'pool_name': pool_name,
-                        'namespace': namespace
-                    })
+            for schedule_time, (pool_id, namespace) in self.queue.items():
+                if not level_spec.matches(pool_id, namespace):
+                    continue
+                pool_name = self.pools[pool_id][namespace]
+                scheduled.append({
+                    'schedule_time': schedule_time.strftime("%Y-%m-%d %H:%M:00"),
+                    'pool_id': pool_id,
+                    'pool_name': pool_name,
+                    'namespace': namespace
+                })
         return 0, json.dumps({'scheduled': scheduled}, indent=4,
                              sort_keys=True), ""
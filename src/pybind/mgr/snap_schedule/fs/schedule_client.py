@@ -7,15 +7,18 @@ import cephfs
 import rados
 from contextlib import contextmanager
 from mgr_util import CephfsClient, open_filesystem
+from bisect import insort
 from collections import OrderedDict
 from datetime import datetime, timezone
 import logging
-from threading import Timer, Lock
-from typing import cast, Any, Callable, Dict, Iterator, List, Set, Optional, \
-    Tuple, TypeVar, Union, Type
+import time
+from threading import Condition, Lock, Thread
+from typing import cast, Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, \
+    Set, Optional, Tuple, TypeVar, Union, Type
 from types import TracebackType
 import sqlite3
 from .schedule import Schedule
+from .scheduler import SnapScheduler
 import traceback
 
 
@@ -32,6 +35,13 @@ SNAPSHOT_TS_FORMAT = '%Y-%m-%d-%H_%M_%S'
 # e.g.: scheduled-2022-04-19-05_39_00_UTC (len = "2022-04-19-05_39_00")
 SNAPSHOT_TS_FORMAT_LEN = 19
 SNAPSHOT_PREFIX = 'scheduled'
+# number of threads taking scheduled snapshots
+SNAP_SCHEDULE_WORKERS = 4
+# max number of due schedules (of a file system) handed to a worker at once
+SNAP_SCHEDULE_BATCH_SIZE = 16
+# rebuild the in-memory snapshot index of a path from its snapdir after
+# this long (seconds), to pick up snapshots removed behind our back
+SNAP_INDEX_MAX_AGE = 24 * 60 * 60
 
 log = logging.getLogger(__name__)
 
@@ -87,6 +97,7 @@ def get_prune_set(candidates: Set[Tuple[cephfs.DirEntry, datetime]],
         ("y", '%Y'),
     ])
     keep = []
+    kept = set()
     if not retention:
         log.info(f'no retention set, assuming n: {max_snaps_to_retain}')
         retention = {'n': max_snaps_to_retain}
@@ -102,10 +113,11 @@ def get_prune_set(candidates: Set[Tuple[cephfs.DirEntry, datetime]],
             snap_ts = snap[1].strftime(date_pattern)
             if snap_ts != last:
                 last = snap_ts
-                if snap not in keep:
+                if snap not in kept:
                     log.debug((f'keeping {snap[0].d_name} due to '
                                f'{period_count}{period}'))
                     keep.append(snap)
+                    kept.add(snap)
                     kept_for_this_period += 1
                     if kept_for_this_period == period_count:
                         log.debug(('found enough snapshots for '
@@ -122,6 +134,108 @@ def snap_name_to_timestamp(scheduled_snap_name: str) -> str:
     ts = scheduled_snap_name.lstrip(f'{SNAPSHOT_PREFIX}-')
     return ts[0:SNAPSHOT_TS_FORMAT_LEN]
 
+class SnapEntry(NamedTuple):
+    # stands in for a cephfs.DirEntry of a scheduled snapshot in prune sets
+    d_name: bytes
+
+
+class SnapIndex():
+    """
+    In-memory index of the scheduled snapshots of each (fs, path), sorted
+    by name (and hence by creation time). Paths are indexed lazily by
+    scanning their snapdir; afterwards the index is kept up to date with
+    the snapshots this module creates and prunes. An index is dropped (and
+    rebuilt by the next prune) when it turns out to be out of sync with the
+    snapdir, and after SNAP_INDEX_MAX_AGE seconds.
+    """
+    def __init__(self) -> None:
+        self.lock = Lock()
+        # (fs, path) -> (load time, sorted [(name, timestamp)])
+        self.paths: Dict[Tuple[str, str], Tuple[float, List[Tuple[bytes, datetime]]]] = {}
+
+    def get(self, fs: str, path: str) -> Optional[List[Tuple[bytes, datetime]]]:
+        with self.lock:
+            entry = self.paths.get((fs, path))
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > SNAP_INDEX_MAX_AGE:
+                del self.paths[(fs, path)]
+                return None
+            return list(entry[1])
+
+    def load(self, fs: str, path: str, snaps: Iterable[Tuple[bytes, datetime]]) -> None:
+        with self.lock:
+            self.paths[(fs, path)] = (time.monotonic(), sorted(snaps))
+
+    def add(self, fs: str, path: str, name: bytes, ts: datetime) -> None:
+        with self.lock:
+            entry = self.paths.get((fs, path))
+            if entry is not None:
+                insort(entry[1], (name, ts))
+
+    def remove(self, fs: str, path: str, names: Set[bytes]) -> None:
+        with self.lock:
+            entry = self.paths.get((fs, path))
+            if entry is not None:
+                entry[1][:] = [snap for snap in entry[1] if snap[0] not in names]
+
+    def invalidate(self, fs: str, path: str) -> None:
+        with self.lock:
+            self.paths.pop((fs, path), None)
+
+    def drop_fs(self, fs: str) -> None:
+        with self.lock:
+            for key in [key for key in self.paths if key[0] == fs]:
+                del self.paths[key]
+
+
+class PruneQueue():
+    """
+    Background thread pruning snapshots of scheduled paths. Requests for a
+    path that is already queued are coalesced; queued requests are
+    processed in batches, one file system handle per file system.
+    """
+    def __init__(self, prune: Callable[[str, List[Schedule]], None]) -> None:
+        self.prune = prune
+        self.cond = Condition()
+        self.queue: Dict[Tuple[str, str], Schedule] = OrderedDict()
+        self.stopping = False
+        self.thread = Thread(target=self._run, name='snap_schedule.pruner',
+                             daemon=True)
+        self.thread.start()
+
+    def queue_prune(self, sched: Schedule) -> None:
+        with self.cond:
+            self.queue[(sched.fs, sched.path)] = sched
+            self.cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self.cond:
+                while not self.queue and not self.stopping:
+                    self.cond.wait()
+                if self.stopping:
+                    return
+                batch = list(self.queue.values())
+                self.queue.clear()
+            by_fs: Dict[str, List[Schedule]] = OrderedDict()
+            for sched in batch:
+                by_fs.setdefault(sched.fs, []).append(sched)
+            for fs, scheds in by_fs.items():
+                try:
+                    self.prune(fs, scheds)
+                except Exception:
+                    log.error(f'pruning snapshots in fs {fs} raised an exception:')
+                    log.error(traceback.format_exc())
+
+    def shutdown(self) -> None:
+        with self.cond:
+            self.stopping = True
+            self.queue.clear()
+            self.cond.notify()
+        self.thread.join()
+
+
 class DBInfo():
     def __init__(self, fs: str, db: sqlite3.Connection):
         self.fs: str = fs
@@ -161,17 +275,30 @@ class SnapSchedClient(CephfsClient):
         # lock, there are races to use the same connection, causing  nested
         # transactions to be aborted
         self.sqlite_connections: Dict[str, DBInfo] = {}
-        self.active_timers: Dict[Tuple[str, str], List[Timer]] = {}
         self.conn_lock: Lock = Lock()  # lock to protect add/lookup db connections
-        self.timers_lock: Lock = Lock()
+        # a single thread tracks the next due time of every scheduled path
+        # and hands due snapshots to a bounded pool of workers
+        self.scheduler = SnapScheduler(self.create_scheduled_snapshots,
+                                       SNAP_SCHEDULE_WORKERS,
+                                       SNAP_SCHEDULE_BATCH_SIZE)
+        # pruning runs decoupled from snapshot creation, based on an index
+        # of the scheduled snapshots of each path
+        self.snap_index = SnapIndex()
+        self.prune_queue = PruneQueue(self.prune_snapshots_batch)
 
         # restart old schedules
         for fs_name in self.get_all_filesystems():
             with self.get_schedule_db(fs_name) as conn_mgr:
                 db = conn_mgr.dbinfo.db
                 sched_list = Schedule.list_all_schedules(db, fs_name)
-                for sched in sched_list:
-                    self.refresh_snap_timers(fs_name, sched.path, db)
+                # a path with several schedules needs a single refresh
+                for path in dict.fromkeys(sched.path for sched in sched_list):
+                    self.refresh_snap_timers(fs_name, path, db)
+
+    def shutdown(self) -> None:
+        self.scheduler.shutdown()
+        self.prune_queue.shutdown()
+        super(SnapSchedClient, self).shutdown()
 
     @property
     def allow_minute_snaps(self) -> None:
@@ -276,19 +403,17 @@ class SnapSchedClient(CephfsClient):
 
     def delete_references_to_unavailable_fs(self, available_fs_names: Set[str]) -> None:
         fs_to_remove: Set[str] = set()
-        self.timers_lock.acquire()
-        for fs, path in list(self.active_timers.keys()):  # each key is a tuple
+        for fs in self.scheduler.filesystems():
             if fs not in available_fs_names:
                 fs_to_remove.add(fs)
-                log.debug(f'Cancelled timers for "{fs}:{path}"')
-                for t in self.active_timers[(fs, path)]:
-                    t.cancel()
-                log.debug(f'Removed timer instance for "{fs}"')
-                del self.active_timers[(fs, path)]
-        self.timers_lock.release()
+                for _, path in self.scheduler.cancel_fs(fs):
+                    log.debug(f'Cancelled schedule for "{fs}:{path}"')
 
         self.conn_lock.acquire()
         for fs in fs_to_remove:
+            self.snap_index.drop_fs(fs)
+            if fs not in self.sqlite_connections:
+                continue
             log.debug(f'Closed DB connection to "{fs}"')
             self.sqlite_connections[fs].db.close()
             log.debug(f'Removed DB connection to "{fs}"')
@@ -298,7 +423,7 @@ class SnapSchedClient(CephfsClient):
     def refresh_snap_timers(self, fs: str, path: str, olddb: Optional[sqlite3.Connection] = None) -> None:
         try:
             log.debug((f'SnapDB on {fs} changed for {path}, '
-                       'updating next Timer'))
+                       'updating next due time'))
             rows = []
             # olddb is passed in the case where we land here without a timer
             # the lock on the db connection has already been taken
@@ -308,21 +433,11 @@ class SnapSchedClient(CephfsClient):
                 with self.get_schedule_db(fs) as conn_mgr:
                     db = conn_mgr.dbinfo.db
                     rows = self.fetch_schedules(db, path)
-            self.timers_lock.acquire()
-            timers = self.active_timers.get((fs, path), [])
-            for timer in timers:
-                timer.cancel()
-            timers = []
+            if not rows:
+                self.scheduler.cancel((fs, path))
             for row in rows:
-                log.debug(f'Creating new snapshot timer for {path}')
-                t = Timer(row[1],
-                          self.create_scheduled_snapshot,
-                          args=[fs, path, row[0], row[2], row[3]])
-                t.start()
-                timers.append(t)
+                self.scheduler.schedule((fs, path), row[1], (row[0], row[2], row[3]))
                 log.debug(f'Will snapshot {path} in fs {fs} in {row[1]}s')
-            self.active_timers[(fs, path)] = timers
-            self.timers_lock.release()
         except Exception:
             self._log_exception('refresh_snap_timers')
 
@@ -330,6 +445,12 @@ class SnapSchedClient(CephfsClient):
         log.error(f'{fct} raised an exception:')
         log.error(traceback.format_exc())
 
+    def create_scheduled_snapshots(self,
+                                   fs_name: str,
+                                   batch: List[Tuple[str, str, str, str]]) -> None:
+        for path, retention, start, repeat in batch:
+            self.create_scheduled_snapshot(fs_name, path, retention, start, repeat)
+
     def create_scheduled_snapshot(self,
                                   fs_name: str,
                                   path: str,
@@ -353,6 +474,10 @@ class SnapSchedClient(CephfsClient):
                         snap_dir = self.mgr.rados.conf_get('client_snapdir')
                         snap_name = f'{path}/{snap_dir}/{SNAPSHOT_PREFIX}-{snap_ts}'
                         fs_handle.mkdir(snap_name, 0o755)
+                    snap_entry = f'{SNAPSHOT_PREFIX}-{snap_ts}'
+                    self.snap_index.add(fs_name, path, snap_entry.encode('utf-8'),
+                                        datetime.strptime(snap_name_to_timestamp(snap_entry),
+                                                          SNAPSHOT_TS_FORMAT))
                     log.info(f'created scheduled snapshot of {path}')
                     log.debug(f'created scheduled snapshot {snap_name}')
                     sched.update_last(time, db)
@@ -379,39 +504,70 @@ class SnapSchedClient(CephfsClient):
             self.prune_snapshots(sched)
 
     def prune_snapshots(self, sched: Schedule) -> None:
+        self.prune_queue.queue_prune(sched)
+
+    def _load_snap_index(self, fs_handle: Any, sched: Schedule,
+                         snap_dir: str) -> List[Tuple[bytes, datetime]]:
+        log.debug(f'indexing scheduled snapshots of {sched.path}')
+        snaps = []
+        with fs_handle.opendir(f'{sched.path}/{snap_dir}') as d_handle:
+            dir_ = fs_handle.readdir(d_handle)
+            while dir_:
+                if dir_.d_name.decode('utf-8').startswith(f'{SNAPSHOT_PREFIX}-'):
+                    ts = datetime.strptime(
+                        snap_name_to_timestamp(dir_.d_name.decode('utf-8')), SNAPSHOT_TS_FORMAT)
+                    snaps.append((dir_.d_name, ts))
+                else:
+                    log.debug(f'skipping dir entry {dir_.d_name}')
+                dir_ = fs_handle.readdir(d_handle)
+        self.snap_index.load(sched.fs, sched.path, snaps)
+        return snaps
+
+    def prune_snapshots_batch(self, fs_name: str, scheds: List[Schedule]) -> None:
+        mds_max_snaps_per_dir = self.mgr.get_foreign_ceph_option('mds', 'mds_max_snaps_per_dir')
+        snap_dir = self.mgr.rados.conf_get('client_snapdir')
+        pruned = []
+        with open_filesystem(self, fs_name) as fs_handle:
+            for sched in scheds:
+                try:
+                    count = self._prune_path(fs_handle, sched, snap_dir, mds_max_snaps_per_dir)
+                    if count:
+                        pruned.append((sched, count))
+                except Exception:
+                    self._log_exception('prune_snapshots')
+        if pruned:
+            now = datetime.now(timezone.utc)
+            with self.get_schedule_db(fs_name) as conn_mgr:
+                db = conn_mgr.dbinfo.db
+                for sched, count in pruned:
+                    sched.update_pruned(now, db, count)
+
+    def _prune_path(self, fs_handle: Any, sched: Schedule, snap_dir: str,
+                    mds_max_snaps_per_dir: int) -> int:
+        log.debug(f'Pruning snapshots of {sched.path}')
+        path = sched.path
+        snaps = self.snap_index.get(sched.fs, path)
+        if snaps is None:
+            snaps = self._load_snap_index(fs_handle, sched, snap_dir)
+        prune_candidates = set((SnapEntry(name), ts) for name, ts in snaps)
+        # Limit ourselves to one snapshot less than allowed by config to allow for
+        # snapshot creation before pruning
+        to_prune = get_prune_set(prune_candidates, sched.retention, mds_max_snaps_per_dir - 1)
+        removed = set()
         try:
-            log.debug('Pruning snapshots')
-            ret = sched.retention
-            path = sched.path
-            prune_candidates = set()
-            time = datetime.now(timezone.utc)
-            mds_max_snaps_per_dir = self.mgr.get_foreign_ceph_option('mds', 'mds_max_snaps_per_dir')
-            with open_filesystem(self, sched.fs) as fs_handle:
-                snap_dir = self.mgr.rados.conf_get('client_snapdir')
-                with fs_handle.opendir(f'{path}/{snap_dir}') as d_handle:
-                    dir_ = fs_handle.readdir(d_handle)
-                    while dir_:
-                        if dir_.d_name.decode('utf-8').startswith(f'{SNAPSHOT_PREFIX}-'):
-                            log.debug(f'add {dir_.d_name} to pruning')
-                            ts = datetime.strptime(
-                                snap_name_to_timestamp(dir_.d_name.decode('utf-8')), SNAPSHOT_TS_FORMAT)
-                            prune_candidates.add((dir_, ts))
-                        else:
-                            log.debug(f'skipping dir entry {dir_.d_name}')
-                        dir_ = fs_handle.readdir(d_handle)
-                # Limit ourselves to one snapshot less than allowed by config to allow for
-                # snapshot creation before pruning
-                to_prune = get_prune_set(prune_candidates, ret, mds_max_snaps_per_dir - 1)
-                for k in to_prune:
-                    dirname = k[0].d_name.decode('utf-8')
-                    log.debug(f'rmdir on {dirname}')
+            for k in sorted(to_prune, key=lambda x: x[0].d_name):
+                dirname = k[0].d_name.decode('utf-8')
+                log.debug(f'rmdir on {dirname}')
+                try:
                     fs_handle.rmdir(f'{path}/{snap_dir}/{dirname}')
-                if to_prune:
-                    with self.get_schedule_db(sched.fs) as conn_mgr:
-                        db = conn_mgr.dbinfo.db
-                        sched.update_pruned(time, db, len(to_prune))
-        except Exception:
-            self._log_exception('prune_snapshots')
+                    removed.add(k[0].d_name)
+                except cephfs.ObjectNotFound:
+                    # removed behind our back -- the index is out of sync
+                    log.debug(f'snapshot {dirname} of {path} is gone, reindexing')
+                    self.snap_index.invalidate(sched.fs, path)
+        finally:
+            self.snap_index.remove(sched.fs, path, removed)
+        return len(removed)
 
     def get_snap_schedules(self, fs: str, path: str) -> List[Schedule]:
         with self.get_schedule_db(fs) as conn_mgr:
@@ -0,0 +1,172 @@
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import logging
+import time
+from threading import Condition, Thread
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+# (fs name, path)
+ScheduleKey = Tuple[str, str]
+# (path, *args) as handed to the batch callback
+DueSchedule = Tuple[Any, ...]
+
+# schedules firing this late (in seconds) get logged at warning level
+LAG_WARN_SECS = 60.0
+
+
+class SnapScheduler(object):
+    """
+    Single thread driving all snapshot schedules.
+
+    Every (fs, path) has at most one pending deadline, kept in a heap
+    ordered by due time. Re-arming or cancelling a path does not touch the
+    heap; the entry is invalidated through a per path generation number and
+    skipped when it surfaces. Schedules that are due together are grouped by
+    file system and handed to a bounded worker pool in batches.
+    """
+
+    def __init__(self,
+                 fire: Callable[[str, List[DueSchedule]], None],
+                 workers: int,
+                 batch_size: int) -> None:
+        self.fire = fire
+        self.batch_size = batch_size
+        self.cond = Condition()
+        self.heap: List[Tuple[float, int, ScheduleKey]] = []
+        # key -> (generation, due time, args)
+        self.entries: Dict[ScheduleKey, Tuple[int, float, Tuple[Any, ...]]] = {}
+        self.generation = 0
+        self.stopping = False
+        self.fired = 0
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+        self.lag_total = 0.0
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix='snap_schedule')
+        self.thread = Thread(target=self._run, name='snap_schedule.scheduler',
+                             daemon=True)
+        self.thread.start()
+
+    def schedule(self, key: ScheduleKey, delay: float, args: Tuple[Any, ...]) -> None:
+        """
+        (re-)arm the schedule of a path to fire in @delay seconds
+        """
+        with self.cond:
+            self.generation += 1
+            due = time.monotonic() + delay
+            self.entries[key] = (self.generation, due, args)
+            heapq.heappush(self.heap, (due, self.generation, key))
+            if self.heap[0][1] == self.generation:
+                # new earliest deadline
+                self.cond.notify()
+
+    def cancel(self, key: ScheduleKey) -> None:
+        with self.cond:
+            self.entries.pop(key, None)
+
+    def cancel_fs(self, fs: str) -> List[ScheduleKey]:
+        with self.cond:
+            keys = [key for key in self.entries if key[0] == fs]
+            for key in keys:
+                del self.entries[key]
+            return keys
+
+    def filesystems(self) -> Set[str]:
+        with self.cond:
+            return {fs for fs, _ in self.entries}
+
+    def is_scheduled(self, key: ScheduleKey) -> bool:
+        with self.cond:
+            return key in self.entries
+
+    def _pop_due(self, now: float) -> List[Tuple[ScheduleKey, float, Tuple[Any, ...]]]:
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            due_time, gen, key = heapq.heappop(self.heap)
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != gen:
+                # cancelled or re-armed since
+                continue
+            del self.entries[key]
+            due.append((key, due_time, entry[2]))
+        return due
+
+    def _next_deadline(self) -> Optional[float]:
+        while self.heap:
+            due_time, gen, key = self.heap[0]
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == gen:
+                return due_time
+            heapq.heappop(self.heap)
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self.cond:
+                if self.stopping:
+                    return
+                deadline = self._next_deadline()
+                now = time.monotonic()
+                if deadline is None or deadline > now:
+                    self.cond.wait(None if deadline is None else deadline - now)
+                    continue
+                due = self._pop_due(now)
+            self._dispatch(due)
+
+    def _dispatch(self, due: List[Tuple[ScheduleKey, float, Tuple[Any, ...]]]) -> None:
+        by_fs: Dict[str, List[Tuple[float, DueSchedule]]] = {}
+        for (fs, path), due_time, args in due:
+            by_fs.setdefault(fs, []).append((due_time, (path,) + tuple(args)))
+        for fs, scheds in by_fs.items():
+            for i in range(0, len(scheds), self.batch_size):
+                batch = scheds[i:i + self.batch_size]
+                log.debug(f'dispatching {len(batch)} snapshot schedules in fs {fs}')
+                self.executor.submit(self._fire_batch, fs, batch)
+
+    def _record_lag(self, batch: List[Tuple[float, DueSchedule]]) -> float:
+        # lag is measured when a worker picks up the batch, so that it covers
+        # waiting for a free worker too.
+        now = time.monotonic()
+        worst = 0.0
+        with self.cond:
+            for due_time, _ in batch:
+                lag = now - due_time
+                worst = max(worst, lag)
+                self.fired += 1
+                self.lag_last = lag
+                self.lag_total += lag
+                self.lag_max = max(self.lag_max, lag)
+        return worst
+
+    def _fire_batch(self, fs: str, batch: List[Tuple[float, DueSchedule]]) -> None:
+        worst = self._record_lag(batch)
+        if worst >= LAG_WARN_SECS:
+            log.warning(f'snapshot schedules in fs {fs} running up to {worst:.1f}s late')
+        try:
+            self.fire(fs, [sched for _, sched in batch])
+        except Exception:
+            log.exception(f'failed to run snapshot schedules in fs {fs}')
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        scheduling metrics -- number of armed schedules, schedules fired so
+        far and the lag (seconds) between due time and a worker running it.
+        """
+        with self.cond:
+            return {
+                'scheduled': len(self.entries),
+                'fired': self.fired,
+                'lag_last': self.lag_last,
+                'lag_max': self.lag_max,
+                'lag_avg': self.lag_total / self.fired if self.fired else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        with self.cond:
+            self.stopping = True
+            self.entries.clear()
+            self.cond.notify()
+        self.thread.join()
+        self.executor.shutdown(wait=True)
@@ -9,7 +9,7 @@ import sqlite3
 from typing import Any, Dict, Optional, Tuple, Union
 from .fs.schedule_client import SnapSchedClient
 from mgr_module import MgrModule, Option, NotifyType
-from mgr_util import CephfsConnectionException
+from mgr_util import CephfsConnectionException, CephfsConnectionPool
 from threading import Event
 
 from .cli import SnapScheduleCLICommand
@@ -42,12 +42,16 @@ class Module(MgrModule):
         self._initialized = Event()
         self.client = SnapSchedClient(self)
 
+    def shutdown(self) -> None:
+        self.client.shutdown()
+
     def notify(self, notify_type: NotifyType, notify_id: str) -> None:
         if notify_type != NotifyType.fs_map:
             return
         fs_map = self.get('fs_map')
         if not fs_map:
             return
+        CephfsConnectionPool.notify_fs_map(self, fs_map)
 
         # we don't know for which fs config has been changed
         fs_names = set()
@@ -154,6 +158,23 @@ class Module(MgrModule):
         self.log.info(errstr)
         return 0, '\n===\n'.join([ret_sched.report() for ret_sched in ret_scheds]), ''
 
+    @SnapScheduleCLICommand.Read('fs snap-schedule stats')
+    def snap_schedule_stats(self,
+                            format: Optional[str] = 'plain') -> Tuple[int, str, str]:
+        '''
+        Show how late scheduled snapshots are taken
+        '''
+        stats = self.client.scheduler.stats()
+        if format == 'json':
+            return 0, json.dumps(stats), ''
+        return 0, '\n'.join([
+            f"scheduled: {stats['scheduled']}",
+            f"fired: {stats['fired']}",
+            f"lag_last: {stats['lag_last']:.3f}s",
+            f"lag_max: {stats['lag_max']:.3f}s",
+            f"lag_avg: {stats['lag_avg']:.3f}s",
+        ]), ''
+
     @SnapScheduleCLICommand.Read('fs snap-schedule list')
     def snap_schedule_list(self, path: str,
                            recursive: bool = False,
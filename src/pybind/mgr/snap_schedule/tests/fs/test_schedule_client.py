@@ -1,7 +1,8 @@
 from datetime import datetime, timedelta
 from unittest.mock import MagicMock
 import pytest
-from ...fs.schedule_client import get_prune_set, SNAPSHOT_TS_FORMAT
+from ...fs.schedule_client import get_prune_set, SnapIndex, SnapSchedClient, \
+    SNAPSHOT_TS_FORMAT
 
 
 class TestScheduleClient(object):
@@ -35,3 +36,37 @@ class TestScheduleClient(object):
         ret = {'h': 6, 'd': 2}
         prune_set = get_prune_set(candidates, ret, 99)
         assert len(prune_set) == len(candidates) - 8, 'wrong size of prune set'
+
+    def _client_with_snaps(self, names):
+        client = SnapSchedClient.__new__(SnapSchedClient)
+        client.snap_index = SnapIndex()
+        fs_handle = MagicMock()
+        entries = []
+        for name in names:
+            entry = MagicMock()
+            entry.d_name = name.encode('utf-8')
+            entries.append(entry)
+        fs_handle.readdir.side_effect = entries + [None]
+        sched = MagicMock()
+        sched.fs = 'fs'
+        sched.path = '/foo'
+        sched.retention = {'n': 2}
+        return client, fs_handle, sched
+
+    def test_prune_path_uses_index(self):
+        now = datetime(2024, 1, 1)
+        names = [f'scheduled-{(now + timedelta(hours=i)).strftime(SNAPSHOT_TS_FORMAT)}_UTC'
+                 for i in range(4)]
+        client, fs_handle, sched = self._client_with_snaps(names)
+        assert client._prune_path(fs_handle, sched, '.snap', 100) == 2
+        removed = [c.args[0] for c in fs_handle.rmdir.call_args_list]
+        assert removed == [f'/foo/.snap/{names[0]}', f'/foo/.snap/{names[1]}']
+        assert [snap[0] for snap in client.snap_index.get('fs', '/foo')] == \
+            [name.encode('utf-8') for name in names[2:]]
+        # a new snapshot gets pruned from the index, without scanning the snapdir
+        newer = f'scheduled-{(now + timedelta(hours=5)).strftime(SNAPSHOT_TS_FORMAT)}_UTC'
+        client.snap_index.add('fs', '/foo', newer.encode('utf-8'), now + timedelta(hours=5))
+        fs_handle.reset_mock()
+        assert client._prune_path(fs_handle, sched, '.snap', 100) == 1
+        fs_handle.opendir.assert_not_called()
+        fs_handle.rmdir.assert_called_once_with(f'/foo/.snap/{names[2]}')
@@ -0,0 +1,59 @@
+import threading
+import time
+from ...fs.scheduler import SnapScheduler
+
+
+class TestSnapScheduler(object):
+
+    def _scheduler(self, batch_size=16):
+        fired = []
+        done = threading.Event()
+
+        def fire(fs, batch):
+            fired.append((fs, batch))
+            done.set()
+        return SnapScheduler(fire, 2, batch_size), fired, done
+
+    def test_fire_batches_per_fs(self):
+        scheduler, fired, done = self._scheduler(batch_size=2)
+        try:
+            with scheduler.cond:
+                # hold the scheduler thread so all three are due together
+                for path in ('/a', '/b', '/c'):
+                    scheduler.schedule(('fs1', path), 0, ('1h', 'start', 3600))
+                scheduler.schedule(('fs2', '/a'), 0, ('1h', 'start', 3600))
+            for _ in range(50):
+                if scheduler.stats()['fired'] == 4 and len(fired) == 3:
+                    break
+                time.sleep(0.1)
+        finally:
+            scheduler.shutdown()
+        batches = sorted((fs, [sched[0] for sched in batch]) for fs, batch in fired)
+        assert batches == [('fs1', ['/a', '/b']), ('fs1', ['/c']), ('fs2', ['/a'])]
+        assert scheduler.stats()['fired'] == 4
+
+    def test_reschedule_and_cancel(self):
+        scheduler, fired, done = self._scheduler()
+        try:
+            scheduler.schedule(('fs1', '/a'), 3600, ('1h', 'start', 3600))
+            scheduler.schedule(('fs1', '/b'), 3600, ('1h', 'start', 3600))
+            assert scheduler.filesystems() == {'fs1'}
+            scheduler.cancel(('fs1', '/b'))
+            assert not scheduler.is_scheduled(('fs1', '/b'))
+            # re-arming replaces the pending deadline
+            scheduler.schedule(('fs1', '/a'), 0, ('1h', 'start', 3600))
+            assert done.wait(5)
+            assert fired == [('fs1', [('/a', '1h', 'start', 3600)])]
+            assert scheduler.stats()['scheduled'] == 0
+        finally:
+            scheduler.shutdown()
+
+    def test_cancel_fs(self):
+        scheduler, fired, done = self._scheduler()
+        try:
+            scheduler.schedule(('fs1', '/a'), 3600, ())
+            scheduler.schedule(('fs2', '/a'), 3600, ())
+            assert scheduler.cancel_fs('fs1') == [('fs1', '/a')]
+            assert scheduler.filesystems() == {'fs2'}
+        finally:
+            scheduler.shutdown()
@@ -0,0 +1,44 @@
+import json
+from unittest.mock import MagicMock
+
+from ..fs.scheduler import SnapScheduler
+from ..module import Module
+
+
+def test_snap_schedule_stats():
+    mgr = MagicMock()
+    mgr.client.scheduler.stats.return_value = {
+        'scheduled': 3,
+        'fired': 10,
+        'lag_last': 0.25,
+        'lag_max': 1.5,
+        'lag_avg': 0.5,
+    }
+    rc, out, err = Module.snap_schedule_stats(mgr, format='json')
+    assert rc == 0
+    assert json.loads(out) == mgr.client.scheduler.stats.return_value
+
+    rc, out, err = Module.snap_schedule_stats(mgr)
+    assert rc == 0
+    assert out.splitlines() == [
+        'scheduled: 3',
+        'fired: 10',
+        'lag_last: 0.250s',
+        'lag_max: 1.500s',
+        'lag_avg: 0.500s',
+    ]
+
+
+def test_snap_schedule_stats_from_scheduler():
+    mgr = MagicMock()
+    mgr.client.scheduler = SnapScheduler(lambda fs, batch: None, 1, 16)
+    try:
+        mgr.client.scheduler.schedule(('fs1', '/a'), 3600, ('1h', 'start', 3600))
+        rc, out, err = Module.snap_schedule_stats(mgr, format='json')
+    finally:
+        mgr.client.scheduler.shutdown()
+    assert rc == 0
+    stats = json.loads(out)
+    assert stats['scheduled'] == 1
+    assert stats['fired'] == 0
+    assert stats['lag_avg'] == 0.0
@@ -0,0 +1,133 @@
+import copy
+from unittest import mock
+
+from mgr_module import MgrModule
+
+import pytest
+
+
+BULK = {
+    'schemas': {
+        'osd:1': {
+            'type': 'osd',
+            'names': ['osd', 'osd', 'osd_scrub', 'osd_scrub'],
+            'counters': ['op_r', 'op_r_latency', 'done', 'done'],
+            'labels': [{}, {}, {'level': 'deep'}, {'level': 'shallow'}],
+            'descriptions': ['Client read operations', 'Latency of read operation',
+                             'Scrubs done', 'Scrubs done'],
+            'nicks': ['rd', '', '', ''],
+            'types': [10, 5, 10, 10],
+            'priorities': [8, 8, 5, 5],
+            'units': [2, 1, 2, 2],
+        },
+    },
+    'daemons': {
+        'osd.0': {'schema': 'osd:1', 'values': [12, 300, 1, 2], 'counts': [0, 3, 0, 0]},
+        'osd.1': {'schema': 'osd:1', 'values': [7, 0, 0, 4], 'counts': [0, 0, 0, 0]},
+    },
+}
+
+
+@pytest.fixture
+def module():
+    m = MgrModule.__new__(MgrModule)
+    m._perf_schema_cache = None
+    m._logger = mock.MagicMock()
+    m._ceph_get_perf_counters_bulk = mock.Mock(return_value=BULK)
+    return m
+
+
+def test_get_perf_counters_bulk_args(module):
+    module.get_perf_counters_bulk(('osd', 'mds'), 8, True)
+    module._ceph_get_perf_counters_bulk.assert_called_once_with(['osd', 'mds'], 8, True)
+
+
+def test_get_unlabeled_perf_counters(module):
+    # unlabeled callers don't get the labels column nor labeled counters
+    bulk = copy.deepcopy(BULK)
+    schema = bulk['schemas']['osd:1']
+    del schema['labels']
+    for column in schema.values():
+        if isinstance(column, list):
+            del column[2:]
+    for daemon in bulk['daemons'].values():
+        del daemon['values'][2:]
+        del daemon['counts'][2:]
+    module._ceph_get_perf_counters_bulk.return_value = bulk
+
+    counters = module.get_unlabeled_perf_counters()
+    assert counters['osd.0'] == {
+        'osd.op_r': {
+            'description': 'Client read operations',
+            'nick': 'rd',
+            'type': 10,
+            'priority': 8,
+            'units': 2,
+            'value': 12,
+        },
+        'osd.op_r_latency': {
+            'description': 'Latency of read operation',
+            'type': 5,
+            'priority': 8,
+            'units': 1,
+            'value': 300,
+            'count': 3,
+        },
+    }
+    assert counters['osd.1']['osd.op_r']['value'] == 7
+    # the schema is only turned into a layout once
+    assert list(module._perf_schema_cache) == [('osd:1', False)]
+
+
+def test_get_perf_counters(module):
+    counters = module.get_perf_counters()
+    assert sorted(counters['osd.1']) == ['osd', 'osd_scrub']
+    assert [c['labels'] for c in counters['osd.1']['osd_scrub']] == [
+        {'level': 'deep'}, {'level': 'shallow'}
+    ]
+    assert counters['osd.1']['osd_scrub'][1]['counters']['done']['value'] == 4
+    assert counters['osd.0']['osd'] == [{
+        'labels': {},
+        'counters': {
+            'op_r': {
+                'description': 'Client read operations',
+                'nick': 'rd',
+                'type': 10,
+                'priority': 8,
+                'units': 2,
+                'value': 12,
+            },
+            'op_r_latency': {
+                'description': 'Latency of read operation',
+                'type': 5,
+                'priority': 8,
+                'units': 1,
+                'value': 300,
+                'count': 3,
+            },
+        },
+    }]
+
+
+def test_perf_schema_cache_eviction(module):
+    module.get_perf_counters()
+    assert list(module._perf_schema_cache) == [('osd:1', True)]
+    module._ceph_get_perf_counters_bulk.return_value = {'schemas': {}, 'daemons': {}}
+    assert module.get_perf_counters() == {}
+    assert module._perf_schema_cache == {}
+
+
+def test_perf_schema_cache_checks_schema(module):
+    module.get_unlabeled_perf_counters()
+    layout = module._perf_schema_cache[('osd:1', False)][1]
+    module.get_unlabeled_perf_counters()
+    # same schema: the layout is reused
+    assert module._perf_schema_cache[('osd:1', False)][1] is layout
+
+    # a different schema under the same key is not mistaken for the old one
+    bulk = copy.deepcopy(BULK)
+    bulk['schemas']['osd:1']['counters'][0] = 'op_w'
+    module._ceph_get_perf_counters_bulk.return_value = bulk
+    counters = module.get_unlabeled_perf_counters()
+    assert 'osd.op_w' in counters['osd.0']
+    assert 'osd.op_r' not in counters['osd.0']
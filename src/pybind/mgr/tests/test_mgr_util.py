@@ -153,3 +153,70 @@ def test_is_valid_digest(digest: str, expected: bool):
 )
 def test_is_valid_container_image_ref(ref: str, expected: bool):
     assert mgr_util.is_valid_container_image_ref(ref) is expected
+
+
+class TestCephfsConnectionPool:
+
+    @pytest.fixture
+    def mgr(self):
+        mgr = MagicMock()
+        mgr.get.return_value = {
+            'epoch': 10,
+            'filesystems': [{'id': 1, 'mdsmap': {'fs_name': 'a'}}],
+        }
+        return mgr
+
+    @pytest.fixture
+    def pool(self, mgr):
+        with patch('mgr_util.cephfs.LibCephFS', side_effect=lambda **kw: MagicMock()):
+            pool = mgr_util.CephfsConnectionPool(mgr)
+            yield pool
+            pool.timer_task.cancel()
+
+    def test_reuse_without_fs_map_notify(self, mgr, pool):
+        fs = pool.get_fs_handle('a')
+        pool.put_fs_handle('a', fs)
+        mgr.get.reset_mock()
+        assert pool.get_fs_handle('a') is fs
+        # validity is checked against a freshly fetched fs_map
+        mgr.get.assert_called_with('fs_map')
+
+    def test_reuse_with_fs_map_notify(self, mgr, pool):
+        mgr_util.CephfsConnectionPool.notify_fs_map(mgr, mgr.get.return_value)
+        fs = pool.get_fs_handle('a')
+        pool.put_fs_handle('a', fs)
+        mgr.get.reset_mock()
+        assert pool.get_fs_handle('a') is fs
+        mgr.get.assert_not_called()
+        assert pool.get_metrics()['a']['acquired'] == 2
+
+    def test_fs_recreated(self, mgr, pool):
+        mgr_util.CephfsConnectionPool.notify_fs_map(mgr, mgr.get.return_value)
+        fs = pool.get_fs_handle('a')
+        pool.put_fs_handle('a', fs)
+        mgr_util.CephfsConnectionPool.notify_fs_map(mgr, {
+            'epoch': 11,
+            'filesystems': [{'id': 2, 'mdsmap': {'fs_name': 'a'}}],
+        })
+        # the idle connection to the old filesystem got dropped
+        fs.abort_conn.assert_called_once()
+        assert pool.connections['a'] == []
+        assert pool.get_fs_handle('a') is not fs
+
+    def test_sizing_and_sharing(self, mgr, pool):
+        mgr_util.CephfsConnectionPool.configure(mgr, max_connections=1,
+                                                max_connections_per_fs={'b': 3})
+        assert pool.get_max_connections('a') == 1
+        assert pool.get_max_connections('b') == 3
+        fs1 = pool.get_fs_handle('a')
+        fs2 = pool.get_fs_handle('a')
+        assert fs1 is fs2
+        metrics = pool.get_metrics()['a']
+        assert metrics['connects'] == 1
+        assert metrics['shared'] == 1
+
+    def test_warm_up(self, mgr, pool):
+        mgr_util.CephfsConnectionPool.configure(mgr, max_connections=2)
+        pool.warm_up(['a'], count=3)
+        assert len(pool.connections['a']) == 2
+        assert pool.get_metrics()['a']['connects'] == 2
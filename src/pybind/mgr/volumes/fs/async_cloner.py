@@ -3,8 +3,9 @@ import stat
 import time
 import errno
 import logging
+import threading
 from contextlib import contextmanager
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 import cephfs
 from mgr_util import lock_timeout_log
@@ -107,10 +108,63 @@ def sync_attrs(fs_handle, target_path, source_statx):
         log.warning("error synchronizing attrs for {0} ({1})".format(target_path, e))
         raise e
 
-def bulk_copy(fs_handle, source_path, dst_path, should_cancel):
+class CloneProgress:
+    """
+    Progress of a clone copied by this mgr: the counters updated by cptree()
+    as it copies, against the size of the source snapshot.
+    """
+    def __init__(self, fs_handle, src_path):
+        self.copied = cephfs.CptreeProgress()
+        # the rstats of a snapshot don't change, so a single lookup gives the
+        # amount of data to copy.
+        self.bytes_total = int(fs_handle.getxattr(src_path, 'ceph.dir.rbytes'))
+        # rentries counts the source dir itself, which is not copied.
+        self.entries_total = max(
+            int(fs_handle.getxattr(src_path, 'ceph.dir.rentries')) - 1, 0)
+
+    def get(self):
+        """
+        Get (entries copied, bytes copied, entries total, bytes total).
+        """
+        entries, nbytes = self.copied.get()
+        return entries, nbytes, self.entries_total, self.bytes_total
+
+    def get_percent(self):
+        _, nbytes, _, bytes_total = self.get()
+        if bytes_total == 0:
+            return 0
+        return round(min(nbytes / bytes_total, 1.0) * 100, 3)
+
+# progress of the clones being copied, by (volume name, clone base path)
+clones_progress_lock = threading.Lock()
+clones_progress: Dict[Tuple[str, bytes], CloneProgress] = {}
+
+@contextmanager
+def track_clone_progress(fs_handle, volname, clone_base_path, src_path):
+    try:
+        progress = CloneProgress(fs_handle, src_path)
+    except cephfs.Error as e:
+        log.info(f'not tracking progress of clone {clone_base_path}: {e}')
+        yield None
+        return
+    with clones_progress_lock:
+        clones_progress[(volname, clone_base_path)] = progress
+    try:
+        yield progress
+    finally:
+        with clones_progress_lock:
+            clones_progress.pop((volname, clone_base_path), None)
+
+def get_clone_progress(volname, clone_base_path) -> Optional[CloneProgress]:
+    with clones_progress_lock:
+        return clones_progress.get((volname, clone_base_path))
+
+def bulk_copy(fs_handle, source_path, dst_path, should_cancel, copy_threads=1,
+              progress=None):
     """
     bulk copy data from source to destination -- only directories, symlinks
-    and regular files are synced.
+    and regular files are synced. files are copied by `copy_threads` threads,
+    and the amount copied is counted in `progress` (a cephfs.CptreeProgress).
     """
     log.info("copying data from {0} to {1}".format(source_path, dst_path))
     # TODO: add code set utime on each file
@@ -119,7 +173,8 @@ def bulk_copy(fs_handle, source_path, dst_path, should_cancel):
         # therefore cp_src_dir is set to False.
         fs_handle.cptree(source_path, dst_path, should_sync_attrs=True,
                          cp_src_dir=False, should_cancel=should_cancel,
-                         suppress_errors=False)
+                         suppress_errors=False, threads=copy_threads,
+                         progress=progress)
 
         stx_root = fs_handle.statx(source_path, cephfs.CEPH_STATX_ATIME |
                                                 cephfs.CEPH_STATX_MTIME,
@@ -190,7 +245,11 @@ def do_clone(fs_client, volspec, volname, groupname, subvolname, should_cancel):
             dst_path = subvol0.path
             # XXX: this is where cloning (of subvolume's snapshots) actually
             # happens.
-            bulk_copy(fs_handle, src_path, dst_path, should_cancel)
+            with track_clone_progress(fs_handle, volname, subvol0.base_path,
+                                      src_path) as progress:
+                bulk_copy(fs_handle, src_path, dst_path, should_cancel,
+                          fs_client.mgr.clone_copy_threads,
+                          progress.copied if progress else None)
             set_quota_on_clone(fs_handle, (subvol0, subvol1, subvol2))
 
 def update_clone_failure_status(fs_client, volspec, volname, groupname, subvolname, ve):
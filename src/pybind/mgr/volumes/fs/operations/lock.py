@@ -1,24 +1,48 @@
 from contextlib import contextmanager
 import logging
-from threading import Lock
-from typing import Dict
+import time
+from threading import Condition, Lock
+from typing import Dict, Iterable, Tuple
 
 log = logging.getLogger(__name__)
 
+# waits longer than this (in seconds) get logged at info level
+LOCK_WAIT_WARN_SECS = 5.0
+
 # singleton design pattern taken from http://www.aleax.it/5ep.html
 
-class GlobalLock(object):
+class PathLock(object):
+    """
+    Reader/writer state for a single path. Writers are preferred: once a
+    writer is waiting, new readers queue behind it so that a steady stream
+    of shared operations cannot starve an exclusive one.
+    """
+    def __init__(self):
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+        # number of threads holding or waiting on this entry
+        self.refs = 0
+
+    def can_acquire(self, exclusive):
+        if exclusive:
+            return not self.writer and self.readers == 0
+        return not self.writer and self.waiting_writers == 0
+
+
+class PathLockManager(object):
     """
-    Global lock to serialize operations in mgr/volumes. This lock
-    is currently held when accessing (opening) a volume to perform
-    group/subvolume operations. Since this is a big lock, it's rather
-    inefficient -- but right now it's ok since mgr/volumes does not
-    expect concurrent operations via its APIs.
+    Hierarchical path based locking for mgr/volumes operations. Paths are
+    tuples of components -- (volume,), (volume, group) and (volume, group,
+    subvolume). Locking a path takes all its ancestors in shared mode and
+    the path itself in the requested mode, so operations on different
+    subvolumes (or groups) of a volume run concurrently while an exclusive
+    volume lock still serializes against everything in that volume.
 
-    As and when features get added (such as clone, where mgr/volumes
-    would maintain subvolume states in the filesystem), there might
-    be a need to allow concurrent operations. In that case it would
-    be nice to implement an efficient path based locking mechanism.
+    When multiple paths are locked together (e.g. source and target of a
+    clone), the required locks are merged and acquired in sorted path
+    order. Since an ancestor always sorts before its descendants and every
+    caller follows the same total order, acquisition cannot deadlock.
 
     See: https://people.eecs.berkeley.edu/~kubitron/courses/cs262a-F14/projects/reports/project6_report.pdf
     """
@@ -30,14 +54,120 @@ class GlobalLock(object):
     def __init__(self):
         with self._shared_state['lock']:
             if not self._shared_state['init']:
+                self._shared_state['cond'] = Condition(Lock())
+                self._shared_state['locks'] = {}
+                self._shared_state['acquisitions'] = 0
+                self._shared_state['contended'] = 0
+                self._shared_state['waiters'] = 0
+                self._shared_state['wait_total'] = 0.0
+                self._shared_state['wait_max'] = 0.0
                 self._shared_state['init'] = True
         # share this state among all instances
         self.__dict__ = self._shared_state
 
+    @staticmethod
+    def _required_locks(paths: Iterable[Tuple[str, ...]], exclusive: bool):
+        required: Dict[Tuple[str, ...], bool] = {}
+        for path in paths:
+            for depth in range(1, len(path)):
+                required.setdefault(path[:depth], False)
+            required[path] = required.get(path, False) or exclusive
+        return sorted(required.items())
+
+    def _acquire(self, path, exclusive):
+        entry = self.locks.get(path)
+        if entry is None:
+            entry = self.locks[path] = PathLock()
+        entry.refs += 1
+        contended = not entry.can_acquire(exclusive)
+        if contended:
+            self.waiters += 1
+            if exclusive:
+                entry.waiting_writers += 1
+            try:
+                self.cond.wait_for(lambda: entry.can_acquire(exclusive))
+            except BaseException:
+                entry.refs -= 1
+                if entry.refs == 0:
+                    del self.locks[path]
+                raise
+            finally:
+                self.waiters -= 1
+                if exclusive:
+                    entry.waiting_writers -= 1
+        if exclusive:
+            entry.writer = True
+        else:
+            entry.readers += 1
+        return contended
+
+    def _release(self, path, exclusive):
+        entry = self.locks[path]
+        if exclusive:
+            entry.writer = False
+        else:
+            entry.readers -= 1
+        entry.refs -= 1
+        if entry.refs == 0:
+            del self.locks[path]
+
     @contextmanager
-    def lock_op(self):
-        log.debug("entering global lock")
-        with self._shared_state['lock']:
-            log.debug("acquired global lock")
+    def lock_paths(self, paths: Iterable[Tuple[str, ...]], exclusive: bool = True):
+        """
+        lock a set of paths (along with their ancestors) for the duration
+        of the context.
+
+        :param paths: list of path tuples to lock
+        :param exclusive: lock the paths for exclusive (or shared) access
+        """
+        paths = list(paths)
+        required = self._required_locks(paths, exclusive)
+        acquired = []
+        start = time.monotonic()
+        contended = False
+        try:
+            with self.cond:
+                for path, excl in required:
+                    contended = self._acquire(path, excl) or contended
+                    acquired.append((path, excl))
+                waited = time.monotonic() - start
+                self.acquisitions += 1
+                if contended:
+                    self.contended += 1
+                    self.wait_total += waited
+                    self.wait_max = max(self.wait_max, waited)
+        except BaseException:
+            with self.cond:
+                for path, excl in reversed(acquired):
+                    self._release(path, excl)
+                self.cond.notify_all()
+            raise
+        mode = "exclusive" if exclusive else "shared"
+        if waited >= LOCK_WAIT_WARN_SECS:
+            log.info("waited {0:.2f}s for {1} lock on {2}".format(waited, mode, paths))
+        else:
+            log.debug("acquired {0} lock on {1} (waited {2:.3f}s)".format(mode, paths, waited))
+        try:
             yield
-        log.debug("exited global lock")
+        finally:
+            with self.cond:
+                for path, excl in reversed(acquired):
+                    self._release(path, excl)
+                self.cond.notify_all()
+            log.debug("released {0} lock on {1}".format(mode, paths))
+
+    def stats(self):
+        """
+        return lock wait metrics -- number of lock acquisitions, how many
+        of them had to wait, total and maximum wait time (seconds) and the
+        number of threads currently waiting.
+        """
+        with self.cond:
+            return {
+                'acquisitions': self.acquisitions,
+                'contended': self.contended,
+                'wait_total': self.wait_total,
+                'wait_max': self.wait_max,
+                'waiters': self.waiters,
+                'locked_paths': len(self.locks),
+            }
@@ -8,7 +8,7 @@ from contextlib import contextmanager
 
 import orchestrator
 
-from .lock import GlobalLock
+from .lock import PathLockManager
 from ..exception import VolumeException, IndexException
 from ..fs_util import create_pool, remove_pool, rename_pool, create_filesystem, \
     remove_filesystem, rename_filesystem, create_mds, volume_exists, listdir
@@ -330,17 +330,26 @@ def get_all_pending_clones_count(self, mgr, vol_spec):
 
 
 @contextmanager
-def open_volume(vc, volname):
+def open_volume(vc, volname, lock_paths=None, exclusive=True):
     """
-    open a volume for exclusive access. This API is to be used as a contextr
-    manager.
+    open a volume with the given paths locked. This API is to be used as a
+    context manager.
+
+    By default the volume itself is locked for exclusive access. Operations
+    confined to a group or a subvolume pass the (relative) paths they touch,
+    e.g. [(groupname,)] or [(groupname, subvolname)], which are locked in the
+    requested mode with the volume and intermediate paths held shared.
 
     :param vc: volume client instance
     :param volname: volume name
+    :param lock_paths: list of path tuples (relative to the volume) to lock
+    :param exclusive: lock the paths for exclusive (or shared) access
     :return: yields a volume handle (ceph filesystem handle)
     """
-    g_lock = GlobalLock()
-    with g_lock.lock_op():
+    if lock_paths is None:
+        lock_paths = [()]
+    paths = [(volname,) + tuple(path) for path in lock_paths]
+    with PathLockManager().lock_paths(paths, exclusive):
         try:
             with open_filesystem(vc, volname) as fs_handle:
                 yield fs_handle
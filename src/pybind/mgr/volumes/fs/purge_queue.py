@@ -47,7 +47,7 @@ def subvolume_purge(fs_client, volspec, volname, trashcan, subvolume_trash_entry
                     log.debug("subvolume.path={0}, purgeable={1}".format(subvolume.path, subvolume.purgeable))
                     if not subvolume.purgeable:
                         return
-                    # this is fine under the global lock -- there are just a handful
+                    # this is fine under the volume lock -- there are just a handful
                     # of entries in the subvolume to purge. moreover, the purge needs
                     # to be guarded since a create request might sneak in.
                     trashcan.purge(subvolume.base_path, should_cancel)
@@ -16,7 +16,7 @@ from .operations.template import SubvolumeOpType
 from .operations.clone_index import open_clone_index, PATH_MAX
 from .operations.resolver import resolve_group_and_subvolume_name
 from .exception import VolumeException
-from .async_cloner import get_clone_state
+from .async_cloner import get_clone_state, get_clone_progress
 from .operations.versions.subvolume_attrs import SubvolumeStates
 
 from mgr_util import RTimer, format_bytes, format_dimless
@@ -114,6 +114,19 @@ def get_stats(src_path, dst_path, fs_handle):
     }
 
 
+def get_clone_stats(progress):
+    '''
+    Same as get_stats(), from the counters of a clone copied by this mgr
+    rather than from the rstats of its destination, which lag behind.
+    '''
+    entries_c, size_c, entries_t, size_t = progress.get()
+    return {
+        'percentage cloned': progress.get_percent(),
+        'amount cloned': get_size_ratio_str(size_c, size_t),
+        'files cloned': get_num_ratio_str(entries_c, entries_t),
+    }
+
+
 class CloneInfo:
 
     def __init__(self, volname):
@@ -126,6 +139,7 @@ class CloneInfo:
         self.dst_group_name = None
         self.dst_subvol_name = None
         self.dst_path = None
+        self.dst_base_path = None
 
 
 class CloneProgressReporter:
@@ -177,6 +191,7 @@ class CloneProgressReporter:
                                 SubvolumeOpType.CLONE_INTERNAL) \
                                 as (_, _, dst_subvol):
             ci.dst_path = dst_subvol.path
+            ci.dst_base_path = dst_subvol.base_path
             log.debug(f'destination subvolume path for clone - {ci.dst_path}')
 
         clone_state = get_clone_state(self.volclient, self.vol_spec, ci.volname,
@@ -306,16 +321,20 @@ class CloneProgressReporter:
             total_onpen_clones = len(clones)
 
         for clone in clones:
-            with open_volume_lockless(self.volclient, clone.volname) as \
-                    fs_handle:
-                percent = get_percent_copied(clone.src_path, clone.dst_path,
-                                             fs_handle)
-                if not percent:
-                    continue
-                if clone in clones[:total_ongoing_clones]:
-                    sum_percent_ongoing += percent
-                if show_onpen_bar:
-                    sum_percent_onpen += percent
+            progress = get_clone_progress(clone.volname, clone.dst_base_path)
+            if progress:
+                percent = progress.get_percent()
+            else:
+                with open_volume_lockless(self.volclient, clone.volname) as \
+                        fs_handle:
+                    percent = get_percent_copied(clone.src_path, clone.dst_path,
+                                                 fs_handle)
+            if not percent:
+                continue
+            if clone in clones[:total_ongoing_clones]:
+                sum_percent_ongoing += percent
+            if show_onpen_bar:
+                sum_percent_onpen += percent
 
         avg_percent_ongoing = round(sum_percent_ongoing / total_ongoing_clones, 3)
         # progress module takes progress as a fraction between 0.0 to 1.0.
@@ -4,6 +4,7 @@ import logging
 import mgr_util
 import inspect
 import functools
+import threading
 from typing import TYPE_CHECKING, Any, Callable, Optional, Tuple
 from urllib.parse import urlsplit, urlunsplit
 
@@ -12,12 +13,13 @@ import cephfs
 from ceph.fs.earmarking import CephFSVolumeEarmarking, EarmarkException
 from ceph.fs.enctag import CephFSVolumeEncryptionTag, EncryptionTagException
 
-from mgr_util import CephfsClient
+from mgr_util import CephfsClient, CephfsConnectionPool
 
 from .fs_util import listdir, has_subdir
-from .stats_util import get_stats
+from .stats_util import get_stats, get_clone_stats
 
-from .operations.group import open_group, create_group, remove_group, \
+from .operations.lock import PathLockManager
+from .operations.group import Group, open_group, create_group, remove_group, \
     open_group_unique, set_group_attrs
 from .operations.volume import create_volume, delete_volume, rename_volume, \
     list_volumes, open_volume, get_pool_names, get_pool_ids, \
@@ -28,7 +30,7 @@ from .operations.subvolume import open_subvol, create_subvol, remove_subvol, \
 from .vol_spec import VolSpec
 from .exception import VolumeException, ClusterError, ClusterTimeout, \
     EvictionError
-from .async_cloner import Cloner
+from .async_cloner import Cloner, get_clone_progress
 from .purge_queue import ThreadPoolPurgeQueueMixin
 from .operations.template import SubvolumeOpType
 from .stats_util import CloneProgressReporter
@@ -41,6 +43,21 @@ log = logging.getLogger(__name__)
 ALLOWED_ACCESS_LEVELS = ('r', 'rw')
 
 
+def group_lock_path(groupname):
+    return [(groupname if groupname else Group.NO_GROUP_NAME,)]
+
+
+def subvolume_lock_path(groupname, subvolname):
+    return [(groupname if groupname else Group.NO_GROUP_NAME, subvolname)]
+
+
+def clone_lock_paths(s_groupname, s_subvolname, t_groupname, t_subvolname):
+    # the clone source tracks pending clones in its metadata, so it gets
+    # locked along with the target subvolume.
+    return subvolume_lock_path(s_groupname, s_subvolname) + \
+        subvolume_lock_path(t_groupname, t_subvolname)
+
+
 def octal_str_to_decimal_int(mode):
     try:
         return int(mode, 8)
@@ -74,9 +91,15 @@ class VolumeClient(CephfsClient["Module"]):
         # available for a volume, the volume is removed from the purge
         # job list.
         fs_map = self.mgr.get('fs_map')
+        CephfsConnectionPool.notify_fs_map(self.mgr, fs_map)
         for fs in fs_map['filesystems']:
             self.cloner.queue_job(fs['mdsmap']['fs_name'])
             self.purge_queue.queue_job(fs['mdsmap']['fs_name'])
+        # connect to the known volumes in the background so that the first
+        # requests do not have to wait for the mounts.
+        threading.Thread(target=self.connection_pool.warm_up,
+                         args=([fs['mdsmap']['fs_name'] for fs in fs_map['filesystems']],),
+                         name='volumes.connection_warm_up', daemon=True).start()
 
     def shutdown(self):
         # Overrides CephfsClient.shutdown()
@@ -168,13 +191,20 @@ class VolumeClient(CephfsClient["Module"]):
 
         return rename_volume(self.mgr, volname, newvolname)
 
+    def perf_stats(self):
+        stats = {
+            'locks': PathLockManager().stats(),
+            'connections': self.connection_pool.get_metrics(),
+        }
+        return 0, json.dumps(stats, indent=4, sort_keys=True), ""
+
     def volume_info(self, **kwargs):
         ret     = None
         volname = kwargs['vol_name']
         human_readable    = kwargs['human_readable']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, exclusive=False) as fs_handle:
                 path = self.volspec.base_dir
                 vol_info_dict = {}
                 try:
@@ -265,7 +295,7 @@ class VolumeClient(CephfsClient["Module"]):
         enctag    = kwargs['enctag'] or ''  # if not set, default to empty string --> no encryption tag
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     try:
                         with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.CREATE) as subvolume:
@@ -302,7 +332,7 @@ class VolumeClient(CephfsClient["Module"]):
         retainsnaps = kwargs['retain_snapshots']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     remove_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, force, retainsnaps)
                     # kick the purge threads for async removal -- note that this
@@ -403,7 +433,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname  = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.RESIZE) as subvolume:
                         nsize, usedbytes = subvolume.resize(newsize, noshrink)
@@ -424,7 +454,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname   = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.PIN) as subvolume:
                         subvolume.pin(pin_type, pin_setting)
@@ -442,7 +472,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname   = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.CHARMAP) as subvolume:
                         v = subvolume.charmap_set(setting, value)
@@ -458,7 +488,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname   = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.CHARMAP) as subvolume:
                         subvolume.charmap_rm()
@@ -476,7 +506,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname   = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.CHARMAP) as subvolume:
                         v = subvolume.charmap_get(setting)
@@ -492,7 +522,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname  = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.GETPATH) as subvolume:
                         subvolpath = subvolume.path
@@ -508,7 +538,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname  = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.INFO) as subvolume:
                         mon_addr_lst = []
@@ -579,7 +609,7 @@ class VolumeClient(CephfsClient["Module"]):
         value      = kwargs['value']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.USER_METADATA_SET) as subvolume:
                         subvolume.set_user_metadata(keyname, value)
@@ -595,7 +625,7 @@ class VolumeClient(CephfsClient["Module"]):
         keyname    = kwargs['key_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.USER_METADATA_GET) as subvolume:
                         value = subvolume.get_user_metadata(keyname)
@@ -611,7 +641,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname  = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.USER_METADATA_LIST) as subvolume:
                         subvol_metadata_dict = subvolume.list_user_metadata()
@@ -629,7 +659,7 @@ class VolumeClient(CephfsClient["Module"]):
         force      = kwargs['force']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.USER_METADATA_REMOVE) as subvolume:
                         subvolume.remove_user_metadata(keyname)
@@ -644,7 +674,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname  = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, group_lock_path(groupname), exclusive=False) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     subvolumes = group.list_subvolumes()
                     ret = 0, name_to_json(subvolumes), ""
@@ -659,7 +689,7 @@ class VolumeClient(CephfsClient["Module"]):
         volume_exists = False
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, group_lock_path(groupname), exclusive=False) as fs_handle:
                 volume_exists = True
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     res = group.has_subvolumes()
@@ -681,7 +711,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname  = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.EARMARK_GET) as subvolume:
                         log.info("Getting earmark for subvolume %s", subvolume.path)
@@ -703,7 +733,7 @@ class VolumeClient(CephfsClient["Module"]):
         earmark   = kwargs['earmark']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.EARMARK_SET) as subvolume:
                         log.info("Setting earmark %s for subvolume %s", earmark, subvolume.path)
@@ -723,7 +753,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.EARMARK_CLEAR) as subvolume:
                         log.info("Removing earmark for subvolume %s", subvolume.path)
@@ -743,7 +773,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname  = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.ENCTAG_GET) as subvolume:
                         log.info("Getting enctag for subvolume %s", subvolume.path)
@@ -765,7 +795,7 @@ class VolumeClient(CephfsClient["Module"]):
         enctag   = kwargs['enctag']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.ENCTAG_SET) as subvolume:
                         log.info("Setting enctag %s for subvolume %s", enctag, subvolume.path)
@@ -785,7 +815,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.ENCTAG_CLEAR) as subvolume:
                         log.info("Removing enctag for subvolume %s", subvolume.path)
@@ -808,7 +838,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname  = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.SNAP_CREATE) as subvolume:
                         subvolume.create_snapshot(snapname)
@@ -825,7 +855,7 @@ class VolumeClient(CephfsClient["Module"]):
         force      = kwargs['force']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     op = SubvolumeOpType.SNAP_REMOVE_FORCE if force else SubvolumeOpType.SNAP_REMOVE
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, op) as subvolume:
@@ -847,7 +877,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname  = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.SNAP_INFO) as subvolume:
                         snap_info_dict = subvolume.snapshot_info(snapname)
@@ -883,7 +913,7 @@ class VolumeClient(CephfsClient["Module"]):
         value      = kwargs['value']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.SNAP_METADATA_SET) as subvolume:
                         if not snapname.encode('utf-8') in subvolume.list_snapshots():
@@ -902,7 +932,7 @@ class VolumeClient(CephfsClient["Module"]):
         keyname    = kwargs['key_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.SNAP_METADATA_GET) as subvolume:
                         if not snapname.encode('utf-8') in subvolume.list_snapshots():
@@ -921,7 +951,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname  = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.SNAP_METADATA_LIST) as subvolume:
                         if not snapname.encode('utf-8') in subvolume.list_snapshots():
@@ -942,7 +972,7 @@ class VolumeClient(CephfsClient["Module"]):
         force      = kwargs['force']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.SNAP_METADATA_REMOVE) as subvolume:
                         if not snapname.encode('utf-8') in subvolume.list_snapshots():
@@ -960,7 +990,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname  = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.SNAP_LIST) as subvolume:
                         snapshots = subvolume.list_snapshots()
@@ -976,7 +1006,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname  = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.SNAP_PROTECT):
                         log.warning("snapshot protect call is deprecated and will be removed in a future release")
@@ -991,7 +1021,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname  = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname, SubvolumeOpType.SNAP_UNPROTECT):
                         log.warning("snapshot unprotect call is deprecated and will be removed in a future release")
@@ -1053,7 +1083,9 @@ class VolumeClient(CephfsClient["Module"]):
                get_all_pending_clones_count(self, self.mgr, self.volspec) >= self.mgr.max_concurrent_clones:
                 raise(VolumeException(-errno.EAGAIN, "all cloner threads are busy, please try again later"))
             
-            with open_volume(self, volname) as fs_handle:
+            lock_paths = clone_lock_paths(s_groupname, s_subvolname,
+                                          kwargs['target_group_name'], kwargs['target_sub_name'])
+            with open_volume(self, volname, lock_paths) as fs_handle:
                 with open_group(fs_handle, self.volspec, s_groupname) as s_group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, s_group, s_subvolname, SubvolumeOpType.CLONE_SOURCE) as s_subvolume:
                         self._clone_subvolume_snapshot(fs_handle, volname, s_group, s_subvolume, **kwargs)
@@ -1095,21 +1127,27 @@ class VolumeClient(CephfsClient["Module"]):
 
         return src_path
 
-    def _get_clone_progress_report(self, vol_handle, dst_group, dst_subvol):
-        dst_path = dst_subvol.base_path.decode('utf-8')
-        src_path = self._get_clone_src_path(vol_handle, dst_group, dst_subvol)
-        if not src_path:
-            return None
+    def _get_clone_progress_report(self, volname, vol_handle, dst_group, dst_subvol):
+        # clones copied by this mgr keep count of what they copied, fall back
+        # on the rstats otherwise.
+        progress = get_clone_progress(volname, dst_subvol.base_path)
+        if progress:
+            stats = get_clone_stats(progress)
+        else:
+            dst_path = dst_subvol.base_path.decode('utf-8')
+            src_path = self._get_clone_src_path(vol_handle, dst_group, dst_subvol)
+            if not src_path:
+                return None
 
-        stats = get_stats(src_path, dst_path, vol_handle)
+            stats = get_stats(src_path, dst_path, vol_handle)
         if stats:
             stats['percentage cloned'] = str(stats['percentage cloned']) + '%'
         return stats
 
-    def _get_clone_status(self, vol_handle, group, subvol):
+    def _get_clone_status(self, volname, vol_handle, group, subvol):
         status = subvol.status
         if status['state'] == 'in-progress':
-            stats = self._get_clone_progress_report(vol_handle, group, subvol)
+            stats = self._get_clone_progress_report(volname, vol_handle, group, subvol)
             if stats:
                 status.update({'progress_report': stats})
 
@@ -1122,10 +1160,10 @@ class VolumeClient(CephfsClient["Module"]):
         groupname = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, clonename)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, clonename, SubvolumeOpType.CLONE_STATUS) as subvolume:
-                        status = self._get_clone_status(fs_handle, group, subvolume)
+                        status = self._get_clone_status(volname, fs_handle, group, subvolume)
                         ret = 0, status, ""
         except VolumeException as ve:
             ret = self.volume_exception_to_retval(ve)
@@ -1158,7 +1196,7 @@ class VolumeClient(CephfsClient["Module"]):
         casesensitive = kwargs['casesensitive']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, group_lock_path(groupname)) as fs_handle:
                 try:
                     with open_group(fs_handle, self.volspec, groupname) as group:
                         # idempotent creation -- valid.
@@ -1190,7 +1228,7 @@ class VolumeClient(CephfsClient["Module"]):
         force     = kwargs['force']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, group_lock_path(groupname)) as fs_handle:
                 remove_group(fs_handle, self.volspec, groupname)
         except VolumeException as ve:
             if not (ve.errno == -errno.ENOENT and force):
@@ -1203,7 +1241,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname  = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, group_lock_path(groupname), exclusive=False) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                         mon_addr_lst = []
                         mon_map_mons = self.mgr.get('mon_map')['mons']
@@ -1226,7 +1264,7 @@ class VolumeClient(CephfsClient["Module"]):
         noshrink   = kwargs['no_shrink']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, group_lock_path(groupname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                         nsize, usedbytes = group.resize(newsize, noshrink)
                         ret = 0, json.dumps(
@@ -1242,7 +1280,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname  = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, group_lock_path(groupname), exclusive=False) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     return 0, group.path.decode('utf-8'), ""
         except VolumeException as ve:
@@ -1253,7 +1291,7 @@ class VolumeClient(CephfsClient["Module"]):
         ret     = 0, '[]', ""
         volume_exists = False
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, exclusive=False) as fs_handle:
                 volume_exists = True
                 groups = listdir(fs_handle, self.volspec.base_dir, filter_entries=[dir.encode('utf-8') for dir in self.volspec.INTERNAL_DIRS])
                 ret = 0, name_to_json(groups), ""
@@ -1270,7 +1308,7 @@ class VolumeClient(CephfsClient["Module"]):
         pin_setting   = kwargs['pin_setting']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, group_lock_path(groupname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     group.pin(pin_type, pin_setting)
                     ret = 0, json.dumps({}), ""
@@ -1286,7 +1324,7 @@ class VolumeClient(CephfsClient["Module"]):
         value         = kwargs['value']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, group_lock_path(groupname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     v = group.charmap_set(setting, value)
                     ret = 0, v, ""
@@ -1300,7 +1338,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname     = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, group_lock_path(groupname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     group.charmap_rm()
                     ret = 0, json.dumps({}), ""
@@ -1315,7 +1353,7 @@ class VolumeClient(CephfsClient["Module"]):
         setting       = kwargs['setting']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, group_lock_path(groupname), exclusive=False) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     v = group.charmap_get(setting)
                     ret = 0, v, ""
@@ -1329,7 +1367,7 @@ class VolumeClient(CephfsClient["Module"]):
         volume_exists = False
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, exclusive=False) as fs_handle:
                 volume_exists = True
                 res = has_subdir(fs_handle, self.volspec.base_dir, filter_entries=[
                                  dir.encode('utf-8') for dir in self.volspec.INTERNAL_DIRS])
@@ -1353,7 +1391,7 @@ class VolumeClient(CephfsClient["Module"]):
         # snapname  = kwargs['snap_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, group_lock_path(groupname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname):
                     # as subvolumes are marked with the vxattr ceph.dir.subvolume deny snapshots
                     # at the subvolume group (see: https://tracker.ceph.com/issues/46074)
@@ -1371,7 +1409,7 @@ class VolumeClient(CephfsClient["Module"]):
         force     = kwargs['force']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, group_lock_path(groupname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     group.remove_snapshot(snapname)
         except VolumeException as ve:
@@ -1385,7 +1423,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, group_lock_path(groupname), exclusive=False) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     snapshots = group.list_snapshots()
                     ret = 0, name_to_json(snapshots), ""
@@ -1401,7 +1439,7 @@ class VolumeClient(CephfsClient["Module"]):
         value = kwargs['value']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname,
                                      SubvolumeOpType.SNAPSHOT_VISIBILITY) as subvolume:
@@ -1418,7 +1456,7 @@ class VolumeClient(CephfsClient["Module"]):
         groupname = kwargs['group_name']
 
         try:
-            with open_volume(self, volname) as fs_handle:
+            with open_volume(self, volname, subvolume_lock_path(groupname, subvolname)) as fs_handle:
                 with open_group(fs_handle, self.volspec, groupname) as group:
                     with open_subvol(self.mgr, fs_handle, self.volspec, group, subvolname,
                                      SubvolumeOpType.SNAPSHOT_VISIBILITY) as subvolume:
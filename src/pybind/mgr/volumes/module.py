@@ -5,7 +5,8 @@ import threading
 
 from .cli import VolumesCLICommand
 
-from mgr_module import MgrModule, Option
+from mgr_module import MgrModule, NotifyType, Option
+from mgr_util import CephfsConnectionPool
 import orchestrator
 
 from .fs.volume import VolumeClient
@@ -43,6 +44,7 @@ def mgr_cmd_wrap(f):
 
 class Module(orchestrator.OrchestratorClientMixin, MgrModule):
     CLICommand = VolumesCLICommand
+    NOTIFY_TYPES = [NotifyType.fs_map]
     COMMANDS = [
         {
             'cmd': 'fs volume ls',
@@ -80,6 +82,11 @@ class Module(orchestrator.OrchestratorClientMixin, MgrModule):
             'desc': "Get the information of a CephFS volume",
             'perm': 'r'
         },
+        {
+            'cmd': 'fs volume perf stats',
+            'desc': "Show lock wait and connection pool metrics of the volumes plugin",
+            'perm': 'r'
+        },
         {
             'cmd': 'fs subvolumegroup ls '
             'name=vol_name,type=CephString ',
@@ -645,6 +652,12 @@ class Module(orchestrator.OrchestratorClientMixin, MgrModule):
             type='int',
             default=4,
             desc='Number of asynchronous cloner threads'),
+        Option(
+            'clone_copy_threads',
+            type='int',
+            default=4,
+            min=1,
+            desc='Number of threads copying the files of each clone'),
         Option(
             'snapshot_clone_delay',
             type='int',
@@ -669,18 +682,33 @@ class Module(orchestrator.OrchestratorClientMixin, MgrModule):
             'pause_cloning',
             type='bool',
             default=False,
-            desc='Pause asynchronous cloner threads')
+            desc='Pause asynchronous cloner threads'),
+        Option(
+            'max_connections_per_volume',
+            type='int',
+            default=5,
+            min=1,
+            desc='Maximum number of libcephfs connections kept per volume'),
+        Option(
+            'connection_idle_timeout',
+            type='secs',
+            default=60,
+            min=1,
+            desc='Close libcephfs connections unused for this long')
     ]
 
     def __init__(self, *args, **kwargs):
         self.inited = False
         # for mypy
         self.max_concurrent_clones = None
+        self.clone_copy_threads = 4
         self.snapshot_clone_delay = None
         self.periodic_async_work = False
         self.snapshot_clone_no_wait = None
         self.pause_purging = False
         self.pause_cloning = False
+        self.max_connections_per_volume = 5
+        self.connection_idle_timeout = 60
         self.lock = threading.Lock()
         super(Module, self).__init__(*args, **kwargs)
         # Initialize config option members
@@ -692,6 +720,10 @@ class Module(orchestrator.OrchestratorClientMixin, MgrModule):
     def shutdown(self):
         self.vc.shutdown()
 
+    def notify(self, notify_type, notify_id):
+        if notify_type == NotifyType.fs_map:
+            CephfsConnectionPool.notify_fs_map(self, self.get('fs_map'))
+
     def config_notify(self):
         """
         This method is called whenever one of our config options is changed.
@@ -727,6 +759,9 @@ class Module(orchestrator.OrchestratorClientMixin, MgrModule):
                             self.vc.cloner.pause()
                         else:
                             self.vc.cloner.resume()
+            CephfsConnectionPool.configure(self,
+                                           max_connections=self.max_connections_per_volume,
+                                           idle_timeout=self.connection_idle_timeout)
 
 
     def handle_command(self, inbuf, cmd):
@@ -767,6 +802,10 @@ class Module(orchestrator.OrchestratorClientMixin, MgrModule):
         return self.vc.volume_info(vol_name=cmd['vol_name'],
                                    human_readable=cmd.get('human_readable', False))
 
+    @mgr_cmd_wrap
+    def _cmd_fs_volume_perf_stats(self, inbuf, cmd):
+        return self.vc.perf_stats()
+
     @mgr_cmd_wrap
     def _cmd_fs_subvolumegroup_create(self, inbuf, cmd):
         """
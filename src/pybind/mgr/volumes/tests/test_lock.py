@@ -0,0 +1,205 @@
+import threading
+import time
+from threading import Lock
+from unittest import mock
+
+import pytest
+
+from ..fs.operations.lock import PathLockManager
+
+
+@pytest.fixture
+def manager():
+    # PathLockManager keeps its state in a class level singleton dict; give
+    # every test a fresh one.
+    with mock.patch.object(PathLockManager, '_shared_state',
+                           {'lock': Lock(), 'init': False}):
+        yield PathLockManager()
+
+
+def wait_for_waiters(manager, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with manager.cond:
+            if manager.waiters >= count:
+                return
+        time.sleep(0.01)
+    pytest.fail('timed out waiting for {0} lock waiters'.format(count))
+
+
+class Locker(threading.Thread):
+    """
+    take a lock on paths in a separate thread and hold it until released.
+    """
+    def __init__(self, manager, paths, exclusive=True, events=None):
+        super().__init__(daemon=True)
+        self.manager = manager
+        self.paths = paths
+        self.exclusive = exclusive
+        self.events = events if events is not None else []
+        self.acquired = threading.Event()
+        self.release = threading.Event()
+
+    def run(self):
+        with self.manager.lock_paths(self.paths, self.exclusive):
+            self.events.append(self.name)
+            self.acquired.set()
+            self.release.wait(5.0)
+
+
+class TestRequiredLocks:
+    def test_ancestors_are_shared(self):
+        required = PathLockManager._required_locks([('v', 'g', 's')], True)
+        assert required == [(('v',), False),
+                            (('v', 'g'), False),
+                            (('v', 'g', 's'), True)]
+
+    def test_paths_are_merged_and_sorted(self):
+        required = PathLockManager._required_locks(
+            [('v', 'g', 'dst'), ('v', 'g'), ('v', 'g', 'src')], True)
+        assert required == [(('v',), False),
+                            (('v', 'g'), True),
+                            (('v', 'g', 'dst'), True),
+                            (('v', 'g', 'src'), True)]
+
+    def test_shared_request_stays_shared(self):
+        required = PathLockManager._required_locks([('v', 'g')], False)
+        assert required == [(('v',), False), (('v', 'g'), False)]
+
+
+class TestPathLockManager:
+    def test_siblings_do_not_conflict(self, manager):
+        holder = Locker(manager, [('v', 'g', 's1')])
+        holder.start()
+        assert holder.acquired.wait(5.0)
+        other = Locker(manager, [('v', 'g', 's2')])
+        other.start()
+        assert other.acquired.wait(5.0)
+        holder.release.set()
+        other.release.set()
+        holder.join(5.0)
+        other.join(5.0)
+        assert manager.stats()['contended'] == 0
+
+    def test_volume_lock_blocks_subvolume(self, manager):
+        holder = Locker(manager, [('v',)])
+        holder.start()
+        assert holder.acquired.wait(5.0)
+        waiter = Locker(manager, [('v', 'g', 's')])
+        waiter.start()
+        wait_for_waiters(manager, 1)
+        assert not waiter.acquired.is_set()
+        holder.release.set()
+        assert waiter.acquired.wait(5.0)
+        waiter.release.set()
+        holder.join(5.0)
+        waiter.join(5.0)
+
+    def test_subvolume_lock_blocks_volume(self, manager):
+        holder = Locker(manager, [('v', 'g', 's')])
+        holder.start()
+        assert holder.acquired.wait(5.0)
+        waiter = Locker(manager, [('v',)])
+        waiter.start()
+        wait_for_waiters(manager, 1)
+        assert not waiter.acquired.is_set()
+        # other volumes are not affected
+        with manager.lock_paths([('w',)]):
+            pass
+        holder.release.set()
+        assert waiter.acquired.wait(5.0)
+        waiter.release.set()
+        holder.join(5.0)
+        waiter.join(5.0)
+
+    def test_shared_locks_run_concurrently(self, manager):
+        first = Locker(manager, [('v',)], exclusive=False)
+        first.start()
+        assert first.acquired.wait(5.0)
+        second = Locker(manager, [('v',)], exclusive=False)
+        second.start()
+        assert second.acquired.wait(5.0)
+        first.release.set()
+        second.release.set()
+        first.join(5.0)
+        second.join(5.0)
+
+    def test_writer_preferred_over_new_readers(self, manager):
+        events = []
+        reader = Locker(manager, [('v',)], exclusive=False, events=events)
+        reader.start()
+        assert reader.acquired.wait(5.0)
+        writer = Locker(manager, [('v',)], events=events)
+        writer.start()
+        wait_for_waiters(manager, 1)
+        late_reader = Locker(manager, [('v',)], exclusive=False,
+                             events=events)
+        late_reader.start()
+        wait_for_waiters(manager, 2)
+        # the late reader queues behind the waiting writer
+        assert not late_reader.acquired.is_set()
+        reader.release.set()
+        assert writer.acquired.wait(5.0)
+        assert not late_reader.acquired.is_set()
+        writer.release.set()
+        assert late_reader.acquired.wait(5.0)
+        late_reader.release.set()
+        for t in (reader, writer, late_reader):
+            t.join(5.0)
+        assert events == [reader.name, writer.name, late_reader.name]
+
+    def test_opposite_order_does_not_deadlock(self, manager):
+        src = ('v', 'g', 'src')
+        dst = ('v', 'g', 'dst')
+        iterations = 200
+
+        def worker(paths):
+            for _ in range(iterations):
+                with manager.lock_paths(paths):
+                    pass
+
+        threads = [threading.Thread(target=worker, args=(paths,), daemon=True)
+                   for paths in ([src, dst], [dst, src],
+                                 [('v', 'g'), src], [dst, ('v',)])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(30.0)
+            assert not t.is_alive(), 'lock acquisition deadlocked'
+        stats = manager.stats()
+        assert stats['acquisitions'] == len(threads) * iterations
+        assert stats['waiters'] == 0
+        assert stats['locked_paths'] == 0
+
+    def test_stats(self, manager):
+        holder = Locker(manager, [('v', 'g')])
+        holder.start()
+        assert holder.acquired.wait(5.0)
+        waiter = Locker(manager, [('v', 'g', 's')])
+        waiter.start()
+        wait_for_waiters(manager, 1)
+        stats = manager.stats()
+        assert stats['waiters'] == 1
+        # the waiter is blocked on ('v', 'g') before reaching the subvolume
+        assert stats['locked_paths'] == 2
+        holder.release.set()
+        assert waiter.acquired.wait(5.0)
+        waiter.release.set()
+        holder.join(5.0)
+        waiter.join(5.0)
+        stats = manager.stats()
+        assert stats['acquisitions'] == 2
+        assert stats['contended'] == 1
+        assert stats['wait_max'] > 0
+        assert stats['wait_total'] >= stats['wait_max']
+        assert stats['waiters'] == 0
+        assert stats['locked_paths'] == 0
+
+    def test_failed_acquire_releases_taken_locks(self, manager):
+        with mock.patch.object(manager.cond, 'wait_for',
+                               side_effect=KeyboardInterrupt):
+            with manager.lock_paths([('v',)]):
+                with pytest.raises(KeyboardInterrupt):
+                    with manager.lock_paths([('v', 'g', 's')]):
+                        pass
+        assert manager.stats()['locked_paths'] == 0
@@ -0,0 +1,27 @@
+import json
+from threading import Lock
+from unittest import mock
+
+from ..fs.operations.lock import PathLockManager
+from ..fs.volume import VolumeClient
+
+
+def test_perf_stats():
+    vc = VolumeClient.__new__(VolumeClient)
+    vc.connection_pool = mock.MagicMock()
+    vc.connection_pool.get_metrics.return_value = {
+        'a': {'acquired': 3, 'connects': 1, 'connections': 1},
+    }
+    with mock.patch.object(PathLockManager, '_shared_state',
+                           {'lock': Lock(), 'init': False}):
+        with PathLockManager().lock_paths([('a',)]):
+            pass
+        ret, out, err = vc.perf_stats()
+    assert ret == 0
+    assert err == ''
+    stats = json.loads(out)
+    assert stats['connections'] == {
+        'a': {'acquired': 3, 'connects': 1, 'connections': 1},
+    }
+    assert stats['locks']['acquisitions'] == 1
+    assert stats['locks']['locked_paths'] == 0
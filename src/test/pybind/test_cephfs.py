@@ -2371,6 +2371,70 @@ class TestCptree:
             cephfs.stat(f'{src}/file{i}')
             cephfs.stat(f'{src}/slink{i}')
 
+    def test_cptree_with_threads(self, testdir):
+        '''
+        Test that cptree() copies a file hierarchy containing directories,
+        regular files and symbolic links when copying on several threads
+        with a small bound on the in-flight bytes.
+        '''
+        src = 'dir1'
+        dst = 'dir2'
+        should_cancel = lambda: False
+
+        cephfs.mkdir(src, 0o755)
+        cephfs.mkdir(dst, 0o755)
+        for i in range(1, 6):
+            cephfs.mkdir(f'/{src}/{src}{i}', 0o755)
+            for j in range(1, 6):
+                fd = cephfs.open(f'/{src}/{src}{i}/file{j}', 'w', 0o755)
+                cephfs.write(fd, b'abcd' * i * j, 0)
+                cephfs.close(fd)
+
+                file_name = f'file{j}'.encode('utf-8')
+                slink_name = f'/{src}/{src}{i}/slink{j}'.encode('utf-8')
+                cephfs.symlink(file_name, slink_name)
+
+        # Errors are not expected from the call to this method. Therefore, set
+        # suppress_errors to False so that tests abort as soon as any errors
+        # occur.
+        cephfs.cptree(src, dst, should_cancel=should_cancel,
+                      suppress_errors=False, threads=4, max_inflight_bytes=1)
+
+        # verify that files are copied to dst path with the same contents
+        for i in range(1, 6):
+            cephfs.stat(f'{dst}/{src}/{src}{i}')
+            for j in range(1, 6):
+                fd = cephfs.open(f'{dst}/{src}/{src}{i}/file{j}', 'r', 0)
+                assert cephfs.read(fd, 0, 1024) == b'abcd' * i * j
+                cephfs.close(fd)
+                cephfs.stat(f'{dst}/{src}/{src}{i}/slink{j}')
+
+    def test_cptree_progress(self, testdir):
+        '''
+        Test that cptree() counts the entries and bytes it copied.
+        '''
+        src = 'dir1'
+        dst = 'dir2'
+        should_cancel = lambda: False
+
+        cephfs.mkdir(src, 0o755)
+        cephfs.mkdir(dst, 0o755)
+        for i in range(1, 4):
+            cephfs.mkdir(f'/{src}/{src}{i}', 0o755)
+            fd = cephfs.open(f'/{src}/{src}{i}/file', 'w', 0o755)
+            cephfs.write(fd, b'abcd', 0)
+            cephfs.close(fd)
+            cephfs.symlink(b'file', f'/{src}/{src}{i}/slink'.encode('utf-8'))
+
+        for threads in (1, 4):
+            cephfs.mkdir(f'{dst}/{threads}', 0o755)
+            progress = libcephfs.CptreeProgress()
+            cephfs.cptree(src, f'{dst}/{threads}', should_cancel=should_cancel,
+                          suppress_errors=False, cp_src_dir=False,
+                          threads=threads, progress=progress)
+            # 3 dirs, 3 files and 3 symlinks
+            assert progress.get() == (9, 12)
+
     def test_cptree_path_is_bytes_type(self, testdir):
         '''
         Test that cptree() successfully copies entire file hierarchy that